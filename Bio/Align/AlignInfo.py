@@ -23,6 +23,7 @@ from Bio import Alphabet
 from Bio.Alphabet import IUPAC
 from Bio.Seq import Seq
 from Bio.SubsMat import FreqTable
+from Bio._py3k import _as_bytes
 
 # Expected random distributions for 20-letter protein, and
 # for 4-letter nucleotide alphabets
@@ -30,6 +31,140 @@ Protein20Random = 0.05
 Nucleotide4Random = 0.25
 
 
+def _as_array(rows):
+    """Turn equal length strings into a NumPy array of bytes (PRIVATE).
+
+    Returns None if NumPy is not installed, or the strings are not all
+    single byte characters.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    data = _as_bytes("".join(rows))
+    if len(data) != len(rows) * len(rows[0]):
+        return None
+    return numpy.frombuffer(data, numpy.uint8).reshape(len(rows), -1)
+
+
+def _count_columns(rows, weights=None):
+    """Count the letters in each column of some aligned strings (PRIVATE).
+
+    Takes a list of equal length strings (padded with null characters,
+    which are not counted), and optionally a weight for each string.
+    Returns a list with a dictionary for each column, mapping the letters
+    found in that column to their counts, or the sums of their weights.
+
+    >>> counts = _count_columns(["GTATC", "AT--C", "CTGTC"])
+    >>> sorted(counts[2].items())
+    [('-', 1), ('A', 1), ('G', 1)]
+    >>> counts = _count_columns(["GTA", "AT\\0"], [0.5, 0.8])
+    >>> sorted(counts[1].items()), sorted(counts[2].items())
+    ([('T', 1.3)], [('A', 0.5)])
+
+    With NumPy all of the columns are counted in one pass over an array
+    of the letters, otherwise each column is counted in turn.
+    """
+    if not rows:
+        return []
+    array = _as_array(rows)
+    if array is None:
+        columns = zip(*rows)
+        if weights is None:
+            weights = [1] * len(rows)
+        all_counts = []
+        for column in columns:
+            counts = {}
+            for letter, weight in zip(column, weights):
+                counts[letter] = counts.get(letter, 0) + weight
+            counts.pop("\0", None)
+            all_counts.append(counts)
+        return all_counts
+
+    from Bio.Align.ArrayAlign import _count_letters
+    counts = _count_letters(array, weights)
+    codes = [code for code in range(1, 256) if counts[code].any()]
+    letters = [chr(code) for code in codes]
+    return [dict((letter, count) for letter, count in zip(letters, column)
+                 if count)
+            for column in counts[codes].T.tolist()]
+
+
+def _count_pairs(rows, weights):
+    """Count the pairs of letters in the columns of aligned strings (PRIVATE).
+
+    Takes a list of equal length strings (padded with null characters,
+    which are not counted), and a weight for each string.  Returns a
+    dictionary mapping each pair of letters (first, second) seen in the
+    same column, with first in an earlier string than second, to the sum
+    over all such pairs of the product of the two weights:
+
+    >>> pairs = _count_pairs(["GTATC", "AT--C", "CTGTC"], [0.5, 0.8, 1.0])
+    >>> print("%0.1f %0.1f %0.1f" % (pairs["G", "A"], pairs["G", "C"],
+    ...                              pairs["A", "C"]))
+    0.4 0.5 0.8
+    >>> print("%0.1f %0.1f" % (pairs["T", "T"], pairs["C", "C"]))
+    2.2 1.7
+
+    Rather than looking at every pair of strings, this works down the
+    strings a few at a time (using NumPy if installed), adding up the
+    products of the letter counts in the strings above with those in
+    the current strings.
+    """
+    if len(rows) < 2:
+        return {}
+    array = _as_array(rows)
+    if array is None:
+        pairs = {}
+        for column in zip(*rows):
+            above = {}
+            for letter, weight in zip(column, weights):
+                for other, total in above.items():
+                    pairs[other, letter] = pairs.get((other, letter), 0) \
+                                           + total * weight
+                above[letter] = above.get(letter, 0) + weight
+        for pair in list(pairs):
+            if "\0" in pair:
+                del pairs[pair]
+        return pairs
+
+    import numpy
+    codes = numpy.flatnonzero(numpy.bincount(array.ravel(), minlength=256))
+    lookup = numpy.zeros(256, numpy.intp)
+    lookup[codes] = numpy.arange(len(codes))
+    size = len(codes)
+    cols = array.shape[1]
+    weights = numpy.asarray(weights, float)
+    offsets = numpy.arange(cols)
+    totals = numpy.zeros((size, size))
+    above = numpy.zeros((size, cols))
+    step = 8
+    for start in range(0, len(array), step):
+        block = lookup[array[start:start + step]]
+        block_weights = weights[start:start + step]
+        counts = numpy.bincount((block * cols + offsets).ravel(),
+                                numpy.repeat(block_weights, cols),
+                                minlength=size * cols).reshape(size, cols)
+        # pairs with the first letter in an earlier block
+        totals += numpy.dot(above, counts.T)
+        # pairs with both letters in this block
+        first, second = numpy.triu_indices(len(block), 1)
+        if len(first):
+            totals += numpy.bincount(
+                (block[first] * size + block[second]).ravel(),
+                numpy.repeat(block_weights[first] * block_weights[second],
+                             cols),
+                minlength=size * size).reshape(size, size)
+        above += counts
+    letters = [chr(code) for code in codes]
+    pairs = {}
+    for letter, row in zip(letters, totals.tolist()):
+        for other, total in zip(letters, row):
+            if total and letter != "\0" and other != "\0":
+                pairs[letter, other] = total
+    return pairs
+
+
 class SummaryInfo(object):
     """Calculate summary info about the alignment.
 
@@ -43,6 +178,82 @@ class SummaryInfo(object):
         """
         self.alignment = alignment
         self.ic_vector = {}
+        self._key = None
+        self._kept = None
+        self._counts = None
+        self._weighted_counts = None
+        self._pair_counts = None
+
+    def _check_counts(self):
+        """Forget any cached counts if the alignment has changed (PRIVATE).
+
+        The counts are kept only while the alignment has the same records,
+        in the same order, with the same sequences and weights; adding,
+        removing or sorting the records, or giving one a new sequence or
+        weight, means they are worked out again.
+        """
+        records = self.alignment._records
+        key = [(id(record), id(record.seq),
+                record.annotations.get('weight', 1.0))
+               for record in records]
+        if key != self._key:
+            self._key = key
+            # hold on to the records and sequences, so their ids are not
+            # reused while the counts are kept
+            self._kept = [(record, record.seq) for record in records]
+            self._counts = None
+            self._weighted_counts = None
+            self._pair_counts = None
+
+    def _get_rows(self):
+        """Return the sequences as strings padded to the same length (PRIVATE).
+        """
+        length = self.alignment.get_alignment_length()
+        return [str(record.seq).ljust(length, "\0")
+                for record in self.alignment._records]
+
+    def _get_weights(self):
+        """Return the weight of each sequence (PRIVATE)."""
+        return [record.annotations.get('weight', 1.0)
+                for record in self.alignment._records]
+
+    def _get_counts(self, weighted=False):
+        """Return the letter counts for each column of the alignment (PRIVATE).
+
+        This is a list with a dictionary for each column, mapping the letters
+        in that column to the number of sequences with that letter there, or
+        (if weighted) the sum of their weights.  The counts for all of the
+        columns are worked out together once, and then kept for use by all
+        of the summary methods.
+        """
+        self._check_counts()
+        if self._counts is None:
+            self._counts = _count_columns(self._get_rows())
+        if not weighted:
+            return self._counts
+        if self._weighted_counts is None:
+            weights = self._get_weights()
+            if all(weight == 1.0 for weight in weights):
+                self._weighted_counts = [
+                    dict((letter, float(count))
+                         for letter, count in counts.items())
+                    for counts in self._counts]
+            else:
+                self._weighted_counts = _count_columns(self._get_rows(),
+                                                       weights)
+        return self._weighted_counts
+
+    def _get_pair_counts(self):
+        """Return the weighted counts of letter pairs in columns (PRIVATE).
+
+        See the _count_pairs function for details; these are kept once
+        worked out.
+        """
+        self._check_counts()
+        if self._pair_counts is None:
+            self._pair_counts = _count_pairs(self._get_rows(),
+                                             self._get_weights())
+        return self._pair_counts
 
     def dumb_consensus(self, threshold = .7, ambiguous = "X",
                        consensus_alpha = None, require_multiple = 0):
@@ -70,46 +281,8 @@ class SummaryInfo(object):
         not just 1 sequence and gaps).
         """
         # Iddo Friedberg, 1-JUL-2004: changed ambiguous default to "X"
-        consensus = ''
-
-        # find the length of the consensus we are creating
-        con_len = self.alignment.get_alignment_length()
-
-        # go through each seq item
-        for n in range(con_len):
-            # keep track of the counts of the different atoms we get
-            atom_dict = {}
-            num_atoms = 0
-
-            for record in self.alignment._records:
-                # make sure we haven't run past the end of any sequences
-                # if they are of different lengths
-                if n < len(record.seq):
-                    if record.seq[n] != '-' and record.seq[n] != '.':
-                        if record.seq[n] not in atom_dict:
-                            atom_dict[record.seq[n]] = 1
-                        else:
-                            atom_dict[record.seq[n]] += 1
-
-                        num_atoms = num_atoms + 1
-
-            max_atoms = []
-            max_size = 0
-
-            for atom in atom_dict:
-                if atom_dict[atom] > max_size:
-                    max_atoms = [atom]
-                    max_size = atom_dict[atom]
-                elif atom_dict[atom] == max_size:
-                    max_atoms.append(atom)
-
-            if require_multiple and num_atoms == 1:
-                consensus += ambiguous
-            elif (len(max_atoms) == 1) and ((float(max_size)/float(num_atoms))
-                                         >= threshold):
-                consensus += max_atoms[0]
-            else:
-                consensus += ambiguous
+        consensus = self._get_consensus(threshold, ambiguous,
+                                        require_multiple, "-.")
 
         # we need to guess a consensus alphabet if one isn't specified
         if consensus_alpha is None:
@@ -126,52 +299,47 @@ class SummaryInfo(object):
         it takes the same is input.
         """
         # Iddo Friedberg, 1-JUL-2004: changed ambiguous default to "X"
-        consensus = ''
+        consensus = self._get_consensus(threshold, ambiguous,
+                                        require_multiple, "")
 
-        # find the length of the consensus we are creating
-        con_len = self.alignment.get_alignment_length()
-
-        # go through each seq item
-        for n in range(con_len):
-            # keep track of the counts of the different atoms we get
-            atom_dict = {}
-            num_atoms = 0
+        # we need to guess a consensus alphabet if one isn't specified
+        if consensus_alpha is None:
+            #TODO - Should we make this into a Gapped alphabet?
+            consensus_alpha = self._guess_consensus_alphabet(ambiguous)
 
-            for record in self.alignment._records:
-                # make sure we haven't run past the end of any sequences
-                # if they are of different lengths
-                if n < len(record.seq):
-                    if record.seq[n] not in atom_dict:
-                        atom_dict[record.seq[n]] = 1
-                    else:
-                        atom_dict[record.seq[n]] += 1
+        return Seq(consensus, consensus_alpha)
 
-                    num_atoms += 1
+    def _get_consensus(self, threshold, ambiguous, require_multiple,
+                       ignore_chars):
+        """Work out the consensus letters from the column counts (PRIVATE).
 
+        Shared by dumb_consensus and gap_consensus, returns a string.
+        """
+        consensus = []
+        for atom_dict in self._get_counts():
             max_atoms = []
             max_size = 0
+            num_atoms = 0
 
-            for atom in atom_dict:
-                if atom_dict[atom] > max_size:
+            for atom, count in atom_dict.items():
+                if atom in ignore_chars:
+                    continue
+                num_atoms += count
+                if count > max_size:
                     max_atoms = [atom]
-                    max_size = atom_dict[atom]
-                elif atom_dict[atom] == max_size:
+                    max_size = count
+                elif count == max_size:
                     max_atoms.append(atom)
 
             if require_multiple and num_atoms == 1:
-                consensus += ambiguous
+                consensus.append(ambiguous)
             elif (len(max_atoms) == 1) and ((float(max_size)/float(num_atoms))
                                          >= threshold):
-                consensus += max_atoms[0]
+                consensus.append(max_atoms[0])
             else:
-                consensus += ambiguous
-
-        # we need to guess a consensus alphabet if one isn't specified
-        if consensus_alpha is None:
-            #TODO - Should we make this into a Gapped alphabet?
-            consensus_alpha = self._guess_consensus_alphabet(ambiguous)
+                consensus.append(ambiguous)
 
-        return Seq(consensus, consensus_alpha)
+        return "".join(consensus)
 
     def _guess_consensus_alphabet(self, ambiguous):
         """Pick an (ungapped) alphabet for an alignment consesus sequence.
@@ -250,62 +418,18 @@ class SummaryInfo(object):
         # get a starting dictionary based on the alphabet of the alignment
         rep_dict, skip_items = self._get_base_replacements(skip_chars)
 
-        # iterate through each record
-        for rec_num1 in range(len(self.alignment._records)):
-            # iterate through each record from one beyond the current record
-            # to the end of the list of records
-            for rec_num2 in range(rec_num1 + 1, len(self.alignment._records)):
-                # for each pair of records, compare the sequences and add
-                # the pertinent info to the dictionary
-                rep_dict = self._pair_replacement(
-                    self.alignment._records[rec_num1].seq,
-                    self.alignment._records[rec_num2].seq,
-                    self.alignment._records[rec_num1].annotations.get('weight', 1.0),
-                    self.alignment._records[rec_num2].annotations.get('weight', 1.0),
-                    rep_dict, skip_items)
-
-        return rep_dict
-
-    def _pair_replacement(self, seq1, seq2, weight1, weight2,
-                          start_dict, ignore_chars):
-        """Compare two sequences and generate info on the replacements seen.
-
-        Arguments:
-        o seq1, seq2 - The two sequences to compare.
-        o weight1, weight2 - The relative weights of seq1 and seq2.
-        o start_dict - The dictionary containing the starting replacement
-        info that we will modify.
-        o ignore_chars - A list of characters to ignore when calculating
-        replacements (ie. '-').
-
-        Returns:
-        o A replacment dictionary which is modified from initial_dict with
-        the information from the sequence comparison.
-        """
-        # loop through each residue in the sequences
-        for residue_num in range(len(seq1)):
-            residue1 = seq1[residue_num]
-            try:
-                residue2 = seq2[residue_num]
-            # if seq2 is shorter, then we just stop looking at replacements
-            # and return the information
-            except IndexError:
-                return start_dict
-
-            # if the two residues are characters we want to count
-            if (residue1 not in ignore_chars) and (residue2 not in ignore_chars):
+        # add the weighted counts of each pair of residues seen in a column
+        for (residue1, residue2), count in self._get_pair_counts().items():
+            if (residue1 not in skip_items) and (residue2 not in skip_items):
                 try:
-                    # add info about the replacement to the dictionary,
-                    # modified by the sequence weights
-                    start_dict[(residue1, residue2)] += weight1 * weight2
-
+                    rep_dict[(residue1, residue2)] += count
                 # if we get a key error, then we've got a problem with alphabets
                 except KeyError:
                     raise ValueError("Residues %s, %s not found in alphabet %s"
                                      % (residue1, residue2,
                                         self.alignment._alphabet))
 
-        return start_dict
+        return rep_dict
 
     def _get_all_letters(self):
         """Returns a string containing the expected letters in the alignment."""
@@ -397,19 +521,12 @@ class SummaryInfo(object):
             left_seq = self.dumb_consensus()
 
         pssm_info = []
-        # now start looping through all of the sequences and getting info
+        column_counts = self._get_counts(weighted=True)
+        # now start looping through all of the columns and getting info
         for residue_num in range(len(left_seq)):
             score_dict = self._get_base_letters(all_letters)
-            for record in self.alignment._records:
-                try:
-                    this_residue = record.seq[residue_num]
-                # if we hit an index error we've run out of sequence and
-                # should not add new residues
-                except IndexError:
-                    this_residue = None
-
-                if this_residue and this_residue not in chars_to_ignore:
-                    weight = record.annotations.get('weight', 1.0)
+            for this_residue, weight in column_counts[residue_num].items():
+                if this_residue not in chars_to_ignore:
                     try:
                         score_dict[this_residue] += weight
                     # if we get a KeyError then we have an alphabet problem
@@ -491,9 +608,9 @@ class SummaryInfo(object):
             all_letters = all_letters.replace(char, '')
 
         info_content = {}
+        column_counts = self._get_counts(weighted=True)
         for residue_num in range(start, end):
-            freq_dict = self._get_letter_freqs(residue_num,
-                                               self.alignment._records,
+            freq_dict = self._get_letter_freqs(column_counts[residue_num],
                                                all_letters, chars_to_ignore)
             # print freq_dict,
             column_score = self._get_column_info_content(freq_dict,
@@ -509,37 +626,33 @@ class SummaryInfo(object):
             self.ic_vector[i] = info_content[i]
         return total_info
 
-    def _get_letter_freqs(self, residue_num, all_records, letters, to_ignore):
-        """Determine the frequency of specific letters in the alignment.
+    def _get_letter_freqs(self, counts, letters, to_ignore):
+        """Determine the frequency of specific letters in a column.
 
         Arguments:
-        o residue_num - The number of the column we are getting frequencies
-        from.
-        o all_records - All of the SeqRecords in the alignment.
+        o counts - The (weighted) counts of the letters in the column, as
+        a dictionary.
         o letters - The letters we are interested in getting the frequency
         for.
         o to_ignore - Letters we are specifically supposed to ignore.
 
         This will calculate the frequencies of each of the specified letters
-        in the alignment at the given frequency, and return this as a
-        dictionary where the keys are the letters and the values are the
-        frequencies.
+        in the column, and return this as a dictionary where the keys are the
+        letters and the values are the frequencies.
         """
         freq_info = self._get_base_letters(letters)
 
         total_count = 0
-        # collect the count info into the dictionary for all the records
-        for record in all_records:
-            try:
-                if record.seq[residue_num] not in to_ignore:
-                    weight = record.annotations.get('weight', 1.0)
-                    freq_info[record.seq[residue_num]] += weight
-                    total_count += weight
-            # getting a key error means we've got a problem with the alphabet
-            except KeyError:
-                raise ValueError("Residue %s not found in alphabet %s"
-                                 % (record.seq[residue_num],
-                                    self.alignment._alphabet))
+        # collect the count info into the dictionary
+        for letter, weight in counts.items():
+            if letter not in to_ignore:
+                try:
+                    freq_info[letter] += weight
+                # getting a key error means we've got a problem with the alphabet
+                except KeyError:
+                    raise ValueError("Residue %s not found in alphabet %s"
+                                     % (letter, self.alignment._alphabet))
+                total_count += weight
 
         if total_count == 0:
             # This column must be entirely ignored characters
@@ -0,0 +1,373 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Multiple sequence alignments backed by a NumPy array of letters.
+
+The ArrayAlignment class is a MultipleSeqAlignment which also holds its
+letters as a two dimensional NumPy array of bytes (one row per record,
+one column per alignment column). The rows are still SeqRecord objects,
+so anything which works with a MultipleSeqAlignment (such as Bio.AlignIO
+and Bio.Align.AlignInfo) works with an ArrayAlignment too, but columns
+are views of the array, and there are methods to count the letters in
+every column at once:
+
+>>> from Bio import AlignIO
+>>> from Bio.Align.ArrayAlign import ArrayAlignment
+>>> align = ArrayAlignment(AlignIO.read("Clustalw/opuntia.aln", "clustal"))
+>>> print(align[:, 1])
+AAAAAAA
+>>> align.array.shape
+(7, 156)
+>>> letters, counts = align.column_counts()
+>>> print(letters)
+-ACGT
+>>> print(counts[:, 12])
+[0 4 0 3 0]
+>>> print(align.consensus()[:30])
+TATACATTAAAGXAGGGGGATGCGGATAAA
+
+The array is built from the records when it is first needed (and again
+if rows are added or sorted), and cannot be modified directly.
+"""
+
+from __future__ import print_function
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.Align.ArrayAlign.")
+
+from Bio.Align import MultipleSeqAlignment
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from Bio._py3k import _as_bytes, _bytes_to_string
+
+
+def _encode(records, length):
+    """Make a read only array of the letters in some records (PRIVATE)."""
+    data = _as_bytes("".join(str(record.seq) for record in records))
+    if len(data) != len(records) * length:
+        raise ValueError("Alignment letters should be single byte "
+                         "characters")
+    return numpy.frombuffer(data, numpy.uint8).reshape(len(records), length)
+
+
+def _decode(codes):
+    """Turn an array of letter codes into a string (PRIVATE)."""
+    return _bytes_to_string(numpy.ascontiguousarray(codes).tobytes())
+
+
+def _take_columns(record, cols, codes):
+    """Make a new record from a list of columns of a record (PRIVATE).
+
+    Like slicing a SeqRecord, this keeps the identifiers, description
+    and per-letter annotation, but not the features or annotations.
+    """
+    answer = SeqRecord(Seq(_decode(codes), record.seq.alphabet),
+                       id=record.id, name=record.name,
+                       description=record.description,
+                       dbxrefs=record.dbxrefs[:])
+    for key, value in record.letter_annotations.items():
+        picked = [value[col] for col in cols]
+        if isinstance(value, str):
+            picked = "".join(picked)
+        elif isinstance(value, tuple):
+            picked = tuple(picked)
+        answer.letter_annotations[key] = picked
+    return answer
+
+
+def _count_letters(array, weights=None):
+    """Count each letter code in each column of an array (PRIVATE).
+
+    Returns an array with 256 rows (one for each letter code) and a
+    column for each column of the alignment, holding integer counts,
+    or the sums of the row weights if given.  Works through the rows a
+    chunk at a time to limit the memory used.
+    """
+    rows, cols = array.shape
+    if weights is None:
+        counts = numpy.zeros(256 * cols, numpy.int64)
+    else:
+        weights = numpy.asarray(weights, float)
+        if weights.shape != (rows,):
+            raise ValueError("Need one weight for each row")
+        counts = numpy.zeros(256 * cols, float)
+    offsets = numpy.arange(cols)
+    step = max(1, 2 ** 20 // max(1, cols))
+    for start in range(0, rows, step):
+        codes = array[start:start + step].astype(numpy.intp) * cols + offsets
+        if weights is None:
+            counts += numpy.bincount(codes.ravel(), minlength=256 * cols)
+        else:
+            counts += numpy.bincount(
+                codes.ravel(), numpy.repeat(weights[start:start + step], cols),
+                minlength=256 * cols)
+    return counts.reshape(256, cols)
+
+
+class ArrayAlignment(MultipleSeqAlignment):
+    """A MultipleSeqAlignment with its letters in a NumPy array.
+
+    This is created like a MultipleSeqAlignment, or from an existing
+    alignment (keeping its alphabet and annotations):
+
+    >>> from Bio.Alphabet import generic_dna
+    >>> from Bio.Seq import Seq
+    >>> from Bio.SeqRecord import SeqRecord
+    >>> from Bio.Align.ArrayAlign import ArrayAlignment
+    >>> a = SeqRecord(Seq("AAAACGT", generic_dna), id="Alpha")
+    >>> b = SeqRecord(Seq("AAA-CGT", generic_dna), id="Beta")
+    >>> c = SeqRecord(Seq("AAAAGGT", generic_dna), id="Gamma")
+    >>> align = ArrayAlignment([a, b, c])
+    >>> print(align)
+    DNAAlphabet() alignment with 3 rows and 7 columns
+    AAAACGT Alpha
+    AAA-CGT Beta
+    AAAAGGT Gamma
+
+    Rows are SeqRecord objects as usual, while columns (as strings, or
+    as arrays of letter codes) and sub-alignments come from the array:
+
+    >>> print(align[1].id)
+    Beta
+    >>> print(align[:, 3])
+    A-A
+    >>> align.column(3)
+    array([65, 45, 65], dtype=uint8)
+    >>> print(align[1:, 2:5])
+    DNAAlphabet() alignment with 2 rows and 3 columns
+    A-C Beta
+    AAG Gamma
+    """
+
+    def __init__(self, records, alphabet=None, annotations=None):
+        """Initialize a new ArrayAlignment object.
+
+        Arguments:
+         - records - A list (or iterator) of SeqRecord objects, whose
+                     sequences are all the same length, or an existing
+                     MultipleSeqAlignment.
+         - alphabet - The alphabet for the whole alignment, by default
+                      that of an existing alignment, or a consensus
+                      alphabet.
+         - annotations - Information about the whole alignment
+                         (dictionary), by default a copy of that of an
+                         existing alignment.
+        """
+        self._array = None
+        if isinstance(records, MultipleSeqAlignment):
+            if alphabet is None:
+                alphabet = records._alphabet
+            if annotations is None:
+                annotations = dict(records.annotations)
+            if isinstance(records, ArrayAlignment):
+                array = records._array
+                records = list(records)
+                MultipleSeqAlignment.__init__(self, records, alphabet,
+                                              annotations)
+                self._array = array
+                return
+        MultipleSeqAlignment.__init__(self, records, alphabet, annotations)
+
+    def _append(self, record, expected_length=None):
+        """Helper function (PRIVATE)."""
+        MultipleSeqAlignment._append(self, record, expected_length)
+        self._array = None
+
+    def sort(self, key=None, reverse=False):
+        """Sort the rows (SeqRecord objects) of the alignment in place.
+
+        See the MultipleSeqAlignment sort method for details.
+        """
+        MultipleSeqAlignment.sort(self, key, reverse)
+        self._array = None
+
+    @property
+    def array(self):
+        """The letters as a (read only) rows by columns array of bytes."""
+        if self._array is None:
+            self._array = _encode(self._records,
+                                  self.get_alignment_length())
+        return self._array
+
+    def get_alignment_length(self):
+        """Return the length of the alignment (the number of columns)."""
+        if self._array is not None:
+            return self._array.shape[1]
+        elif self._records:
+            return len(self._records[0])
+        return 0
+
+    def _from_array(self, records, array, alphabet=None, annotations=None):
+        """Make a new alignment from records and their array (PRIVATE)."""
+        if alphabet is None:
+            alphabet = self._alphabet
+        align = ArrayAlignment(records, alphabet, annotations)
+        align._array = array
+        return align
+
+    def __getitem__(self, index):
+        """Access part of the alignment.
+
+        This works like MultipleSeqAlignment indexing, giving a SeqRecord
+        for a single row, a string for a single column, or another
+        ArrayAlignment (sharing the array).  The columns can also be
+        picked by a list (or array) of column indices, in any order and
+        with repeats, as for a bootstrap resample:
+
+        >>> from Bio.Seq import Seq
+        >>> from Bio.SeqRecord import SeqRecord
+        >>> align = ArrayAlignment([SeqRecord(Seq("ACGT"), id="a"),
+        ...                         SeqRecord(Seq("AC-T"), id="b")])
+        >>> print(align[:, [3, 0, 0, 2]])
+        Alphabet() alignment with 2 rows and 4 columns
+        TAAG a
+        TAA- b
+        """
+        if isinstance(index, int):
+            return self._records[index]
+        elif isinstance(index, slice):
+            return self._from_array(self._records[index], self.array[index])
+        elif len(index) != 2:
+            raise TypeError("Invalid index type.")
+
+        row_index, col_index = index
+        if not isinstance(col_index, (int, slice)):
+            cols = numpy.asarray(col_index, numpy.intp)
+            if isinstance(row_index, int):
+                return _take_columns(self._records[row_index], cols.tolist(),
+                                     self.array[row_index, cols])
+            array = self.array[row_index][:, cols]
+            records = [_take_columns(record, cols.tolist(), codes)
+                       for record, codes in zip(self._records[row_index],
+                                                array)]
+            return self._from_array(records, array)
+        if isinstance(row_index, int):
+            return self._records[row_index][col_index]
+        elif isinstance(col_index, int):
+            return _decode(self.array[row_index, col_index])
+        else:
+            return self._from_array(
+                [rec[col_index] for rec in self._records[row_index]],
+                self.array[row_index, col_index])
+
+    def __add__(self, other):
+        """Combines two alignments with the same number of rows by adding them.
+
+        See the MultipleSeqAlignment addition for details.  Adding two
+        ArrayAlignments joins their arrays too.
+        """
+        combined = MultipleSeqAlignment.__add__(self, other)
+        if isinstance(other, ArrayAlignment):
+            return self._from_array(
+                list(combined), numpy.hstack([self.array, other.array]),
+                combined._alphabet, combined.annotations)
+        return ArrayAlignment(combined)
+
+    def column(self, col):
+        """Return a column as an array of letter codes (a view, not a copy)."""
+        return self.array[:, col]
+
+    def column_counts(self, letters=None, weights=None):
+        """Count how often each letter occurs in each column.
+
+        Arguments:
+         - letters - The letters to count (a string), by default all of
+                     those in the alignment, in sorted order.
+         - weights - Optional weight for each row, to sum instead of
+                     counting the rows.
+
+        Returns the letters, and an array of counts with a row for each
+        letter and a column for each column of the alignment.
+
+        >>> from Bio.Seq import Seq
+        >>> from Bio.SeqRecord import SeqRecord
+        >>> align = ArrayAlignment([SeqRecord(Seq("AC-G"), id="a"),
+        ...                         SeqRecord(Seq("AT-G"), id="b"),
+        ...                         SeqRecord(Seq("CT-G"), id="c")])
+        >>> letters, counts = align.column_counts()
+        >>> print(letters)
+        -ACGT
+        >>> print(counts)
+        [[0 0 3 0]
+         [2 0 0 0]
+         [1 1 0 0]
+         [0 0 0 3]
+         [0 2 0 0]]
+        >>> letters, counts = align.column_counts("AT", [0.5, 1, 2])
+        >>> counts.tolist()
+        [[1.5, 0.0, 0.0, 0.0], [0.0, 3.0, 0.0, 0.0]]
+        """
+        counts = _count_letters(self.array, weights)
+        if letters is None:
+            codes = numpy.flatnonzero(counts.any(axis=1))
+            letters = _decode(codes.astype(numpy.uint8))
+        else:
+            codes = numpy.frombuffer(_as_bytes(letters), numpy.uint8)
+        return letters, counts[codes]
+
+    def gap_fractions(self, gap_chars="-."):
+        """Return the fraction of each column which is gaps (as an array).
+
+        >>> from Bio.Seq import Seq
+        >>> from Bio.SeqRecord import SeqRecord
+        >>> align = ArrayAlignment([SeqRecord(Seq("AC-G"), id="a"),
+        ...                         SeqRecord(Seq("A.-G"), id="b"),
+        ...                         SeqRecord(Seq("CT-G"), id="c"),
+        ...                         SeqRecord(Seq("CT-."), id="d")])
+        >>> align.gap_fractions().tolist()
+        [0.0, 0.25, 1.0, 0.25]
+        """
+        is_gap = numpy.zeros(256, bool)
+        is_gap[numpy.frombuffer(_as_bytes(gap_chars), numpy.uint8)] = True
+        if not len(self):
+            return numpy.zeros(self.get_alignment_length())
+        return is_gap[self.array].mean(axis=0)
+
+    def consensus(self, threshold=.7, ambiguous="X", require_multiple=False,
+                  gap_chars="-."):
+        """Return a simple consensus of the alignment as a string.
+
+        This is the same consensus as the dumb_consensus method of
+        Bio.Align.AlignInfo.SummaryInfo, worked out for all the columns
+        at once.  For each column, ignoring gaps, if the most common
+        letter is the only one with that count, and makes up at least
+        threshold of the column, it goes into the consensus, otherwise
+        the ambiguous character does.  With require_multiple, columns
+        with just one letter are also ambiguous.
+
+        >>> from Bio.Seq import Seq
+        >>> from Bio.SeqRecord import SeqRecord
+        >>> align = ArrayAlignment([SeqRecord(Seq("AC-GT"), id="a"),
+        ...                         SeqRecord(Seq("AT-GA"), id="b"),
+        ...                         SeqRecord(Seq("CT-GC"), id="c")])
+        >>> print(align.consensus())
+        XXXGX
+        >>> print(align.consensus(threshold=0.6, ambiguous="N"))
+        ATNGN
+        """
+        counts = _count_letters(self.array)
+        counts[numpy.frombuffer(_as_bytes(gap_chars), numpy.uint8)] = 0
+        cols = counts.shape[1]
+        best = counts.argmax(axis=0)
+        top = counts[best, numpy.arange(cols)]
+        total = counts.sum(axis=0)
+        use = (top > 0) & ((counts == top).sum(axis=0) == 1)
+        use[use] &= top[use] / total[use].astype(float) >= threshold
+        if require_multiple:
+            use &= total != 1
+        if len(ambiguous) == 1:
+            codes = numpy.where(use, best, ord(ambiguous))
+            return _decode(codes.astype(numpy.uint8))
+        return "".join(chr(code) if used else ambiguous
+                       for code, used in zip(best, use))
+
+
+if __name__ == "__main__":
+    from Bio._utils import run_doctest
+    run_doctest()
@@ -0,0 +1,94 @@
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""KD tree for nearest neighbor and radius searches on NumPy arrays.
+
+Unlike Bio.KDTree.KDTree, which keeps the results of the last search in
+the tree, the queries of ArrayKDTree return their results as NumPy arrays
+and leave the tree unchanged. Many points can be queried in one call, the
+C code runs without holding the GIL, and the same tree can be searched
+from several threads at once.
+
+    >>> import numpy
+    >>> from Bio.KDTree import ArrayKDTree
+    >>> coords = numpy.array([[0.0, 0.0], [1.0, 0.0], [0.0, 2.0], [3.0, 3.0]])
+    >>> tree = ArrayKDTree(coords)
+    >>> distances, indices = tree.query_knn([[0.1, 0.1], [3.0, 2.0]], 2)
+    >>> print(indices)
+    [[0 1]
+     [3 1]]
+    >>> indptr, indices = tree.query_radius([[0.0, 0.0], [10.0, 10.0]], 1.5)
+    >>> print(indptr)
+    [0 2 2]
+    >>> print(indices)
+    [0 1]
+"""
+
+import numpy
+
+from Bio.KDTree import _CArrayKDTree
+
+
+class ArrayKDTree(object):
+    """KD tree over the rows of an NxD array of coordinates.
+
+    The coordinates are copied when the tree is built, so later changes
+    to the array do not affect the tree.
+    """
+
+    def __init__(self, coords, bucket_size=10):
+        """Build the tree.
+
+        o coords - NxD array of N points of dimensionality D
+        o bucket_size - maximal number of points in a leaf of the tree
+        """
+        coords = numpy.asarray(coords, float)
+        if coords.ndim != 2:
+            raise ValueError("Expected a NxD array of coordinates")
+        self.n, self.dim = coords.shape
+        self._tree = _CArrayKDTree.KDTree(coords, bucket_size)
+
+    def __len__(self):
+        return self.n
+
+    def _get_points(self, points):
+        points = numpy.asarray(points, float)
+        if points.ndim == 1:
+            points = points.reshape((1, -1))
+        if points.ndim != 2 or points.shape[1] != self.dim:
+            raise ValueError("Expected a Mx%i array of points" % self.dim)
+        return points
+
+    def query_knn(self, points, k):
+        """Find the k nearest neighbors of each point.
+
+        Return two Mxk arrays, with the distances and the indices of the
+        neighbors of each point, nearest first (points at the same distance
+        are ordered by index). If the tree holds fewer than k points, the
+        missing neighbors have an infinite distance and index -1.
+
+        o points - MxD array of query points (a single point may be
+        given as a one dimensional array)
+        o k - int>0
+        """
+        points = self._get_points(points)
+        return self._tree.query_knn(points, k)
+
+    def query_radius(self, points, radius, return_distance=False):
+        """Find the neighbors within radius of each point.
+
+        Return the results in compressed sparse row format, as the arrays
+        (indptr, indices): the neighbors of points[k] are the points with
+        indices[indptr[k]:indptr[k+1]], in ascending order. With
+        return_distance, their distances are returned as a third array.
+
+        o points - MxD array of query points (a single point may be
+        given as a one dimensional array)
+        o radius - float>=0
+        o return_distance - boolean
+        """
+        points = self._get_points(points)
+        indptr, indices, distances = self._tree.query_radius(points, radius)
+        if return_distance:
+            return indptr, indices, distances
+        return indptr, indices
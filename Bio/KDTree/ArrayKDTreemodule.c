@@ -0,0 +1,727 @@
+#include <Python.h>
+#define NPY_NO_DEPRECATED_API NPY_1_7_API_VERSION
+#include <numpy/arrayobject.h>
+#include <math.h>
+#include <stdlib.h>
+
+
+/* Must define Py_TYPE for Python 2.5 or older */
+#ifndef Py_TYPE
+#  define Py_TYPE(o) ((o)->ob_type)
+#endif
+
+/* Must define PyVarObject_HEAD_INIT for Python 2.5 or older */
+#ifndef PyVarObject_HEAD_INIT
+#define PyVarObject_HEAD_INIT(type, size)       \
+        PyObject_HEAD_INIT(type) size,
+#endif
+
+
+/* The tree is built once, when the object is created, and is never changed
+ * afterwards. The queries only read from it, and keep their results in
+ * memory of their own, so they can run without holding the GIL, and several
+ * threads can query the same tree at the same time.
+ */
+
+typedef struct {
+    npy_intp start;     /* first point of the node, in tree order */
+    npy_intp end;       /* one past the last point of the node */
+    npy_intp left;      /* child nodes, or -1 for a leaf */
+    npy_intp right;
+} Node;
+
+typedef struct {
+    npy_intp index;
+    double distance;    /* squared distance while searching */
+} Hit;
+
+typedef struct {
+    Hit* hits;
+    npy_intp size;
+    npy_intp capacity;
+} HitList;
+
+typedef struct {
+    PyObject_HEAD
+    npy_intp n;
+    int dim;
+    npy_intp bucket_size;
+    double* data;       /* the points in tree order, n x dim */
+    npy_intp* index;    /* original index of each point in data */
+    Node* nodes;
+    double* bounds;     /* per node, lower then upper corner of its box */
+    npy_intp nnodes;
+    npy_intp capacity;
+} PyTree;
+
+
+/* ========================================================================== */
+/* -- Building the tree ----------------------------------------------------- */
+/* ========================================================================== */
+
+static npy_intp
+add_node(PyTree* self, npy_intp start, npy_intp end)
+{
+    Node* node;
+    if (self->nnodes == self->capacity)
+    {
+        npy_intp capacity = 2 * self->capacity;
+        Node* nodes;
+        double* bounds;
+        nodes = realloc(self->nodes, capacity * sizeof(Node));
+        if (!nodes) return -1;
+        self->nodes = nodes;
+        bounds = realloc(self->bounds, capacity * 2 * self->dim * sizeof(double));
+        if (!bounds) return -1;
+        self->bounds = bounds;
+        self->capacity = capacity;
+    }
+    node = &self->nodes[self->nnodes];
+    node->start = start;
+    node->end = end;
+    node->left = -1;
+    node->right = -1;
+    return self->nnodes++;
+}
+
+static void
+set_bounds(PyTree* self, const double* points, npy_intp node)
+{
+    const int dim = self->dim;
+    double* lower = self->bounds + 2 * dim * node;
+    double* upper = lower + dim;
+    npy_intp i;
+    int d;
+
+    for (d = 0; d < dim; d++)
+    {
+        lower[d] = HUGE_VAL;
+        upper[d] = -HUGE_VAL;
+    }
+    for (i = self->nodes[node].start; i < self->nodes[node].end; i++)
+    {
+        const double* point = points + self->index[i] * dim;
+        for (d = 0; d < dim; d++)
+        {
+            if (point[d] < lower[d]) lower[d] = point[d];
+            if (point[d] > upper[d]) upper[d] = point[d];
+        }
+    }
+}
+
+/* Reorder index[start:end] so that index[k] is the point with the k-th
+ * smallest coordinate d, with no larger ones before it and no smaller ones
+ * after it.
+ */
+static void
+select_point(const double* points, npy_intp* index, int dim, int d,
+             npy_intp start, npy_intp end, npy_intp k)
+{
+    npy_intp lo = start;
+    npy_intp hi = end - 1;
+
+    while (lo < hi)
+    {
+        const double pivot = points[index[lo + (hi - lo) / 2] * dim + d];
+        npy_intp i = lo;
+        npy_intp j = hi;
+        while (i <= j)
+        {
+            while (points[index[i] * dim + d] < pivot) i++;
+            while (points[index[j] * dim + d] > pivot) j--;
+            if (i <= j)
+            {
+                npy_intp t = index[i];
+                index[i] = index[j];
+                index[j] = t;
+                i++;
+                j--;
+            }
+        }
+        if (k <= j) hi = j;
+        else if (k >= i) lo = i;
+        else break;
+    }
+}
+
+static int
+build(PyTree* self, const double* points, npy_intp node)
+{
+    const int dim = self->dim;
+    const npy_intp start = self->nodes[node].start;
+    const npy_intp end = self->nodes[node].end;
+    const double* lower;
+    const double* upper;
+    npy_intp mid, left, right;
+    double extent = 0.0;
+    int d, split = 0;
+
+    set_bounds(self, points, node);
+    if (end - start <= self->bucket_size) return 1;
+
+    /* split the widest side of the box at the median point */
+    lower = self->bounds + 2 * dim * node;
+    upper = lower + dim;
+    for (d = 0; d < dim; d++)
+    {
+        if (upper[d] - lower[d] > extent)
+        {
+            extent = upper[d] - lower[d];
+            split = d;
+        }
+    }
+    if (extent == 0.0) return 1;  /* all points are the same */
+
+    mid = start + (end - start) / 2;
+    select_point(points, self->index, dim, split, start, end, mid);
+    left = add_node(self, start, mid);
+    if (left < 0) return 0;
+    right = add_node(self, mid, end);
+    if (right < 0) return 0;
+    self->nodes[node].left = left;
+    self->nodes[node].right = right;
+    return build(self, points, left) && build(self, points, right);
+}
+
+
+/* ========================================================================== */
+/* -- Searching the tree ---------------------------------------------------- */
+/* ========================================================================== */
+
+/* squared distance from a point to the nearest point of a node's box */
+static double
+near_distance(const PyTree* self, npy_intp node, const double* point)
+{
+    const int dim = self->dim;
+    const double* lower = self->bounds + 2 * dim * node;
+    const double* upper = lower + dim;
+    double distance = 0.0;
+    int d;
+
+    for (d = 0; d < dim; d++)
+    {
+        double diff = 0.0;
+        if (point[d] < lower[d]) diff = lower[d] - point[d];
+        else if (point[d] > upper[d]) diff = point[d] - upper[d];
+        distance += diff * diff;
+    }
+    return distance;
+}
+
+static double
+point_distance(const PyTree* self, npy_intp i, const double* point)
+{
+    const int dim = self->dim;
+    const double* p = self->data + i * dim;
+    double distance = 0.0;
+    int d;
+
+    for (d = 0; d < dim; d++)
+    {
+        double diff = p[d] - point[d];
+        distance += diff * diff;
+    }
+    return distance;
+}
+
+static int
+compare_index(const void* a, const void* b)
+{
+    const npy_intp i = ((const Hit*)a)->index;
+    const npy_intp j = ((const Hit*)b)->index;
+    return (i > j) - (i < j);
+}
+
+/* order by distance, then by index */
+static int
+hit_less(const Hit* a, const Hit* b)
+{
+    if (a->distance < b->distance) return 1;
+    if (a->distance > b->distance) return 0;
+    return a->index < b->index;
+}
+
+static int
+compare_hit(const void* a, const void* b)
+{
+    return hit_less(a, b) ? -1 : (hit_less(b, a) ? 1 : 0);
+}
+
+static int
+add_hit(HitList* list, npy_intp index, double distance)
+{
+    if (list->size == list->capacity)
+    {
+        npy_intp capacity = 2 * list->capacity + 64;
+        Hit* hits = realloc(list->hits, capacity * sizeof(Hit));
+        if (!hits) return 0;
+        list->hits = hits;
+        list->capacity = capacity;
+    }
+    list->hits[list->size].index = index;
+    list->hits[list->size].distance = distance;
+    list->size++;
+    return 1;
+}
+
+static int
+search_radius(const PyTree* self, npy_intp node, const double* point,
+              double radius_sq, HitList* list)
+{
+    const Node* p = &self->nodes[node];
+    npy_intp i;
+
+    if (near_distance(self, node, point) > radius_sq) return 1;
+    if (p->left >= 0)
+    {
+        return search_radius(self, p->left, point, radius_sq, list)
+            && search_radius(self, p->right, point, radius_sq, list);
+    }
+    for (i = p->start; i < p->end; i++)
+    {
+        double distance = point_distance(self, i, point);
+        if (distance <= radius_sq)
+        {
+            if (!add_hit(list, self->index[i], distance)) return 0;
+        }
+    }
+    return 1;
+}
+
+/* The k nearest points found so far are kept in a max-heap, with the
+ * farthest one at the top.
+ */
+static void
+push_hit(Hit* heap, npy_intp k, npy_intp* count, const Hit* hit)
+{
+    npy_intp i, child;
+
+    if (*count < k)
+    {
+        i = (*count)++;
+        while (i > 0 && hit_less(&heap[(i - 1) / 2], hit))
+        {
+            heap[i] = heap[(i - 1) / 2];
+            i = (i - 1) / 2;
+        }
+        heap[i] = *hit;
+        return;
+    }
+    if (!hit_less(hit, &heap[0])) return;
+    i = 0;
+    while ((child = 2 * i + 1) < k)
+    {
+        if (child + 1 < k && hit_less(&heap[child], &heap[child + 1])) child++;
+        if (!hit_less(hit, &heap[child])) break;
+        heap[i] = heap[child];
+        i = child;
+    }
+    heap[i] = *hit;
+}
+
+static void
+search_knn(const PyTree* self, npy_intp node, double node_distance,
+           const double* point, Hit* heap, npy_intp k, npy_intp* count)
+{
+    const Node* p = &self->nodes[node];
+    npy_intp i;
+
+    if (*count == k && node_distance > heap[0].distance) return;
+    if (p->left >= 0)
+    {
+        double left = near_distance(self, p->left, point);
+        double right = near_distance(self, p->right, point);
+        if (left <= right)
+        {
+            search_knn(self, p->left, left, point, heap, k, count);
+            search_knn(self, p->right, right, point, heap, k, count);
+        }
+        else
+        {
+            search_knn(self, p->right, right, point, heap, k, count);
+            search_knn(self, p->left, left, point, heap, k, count);
+        }
+        return;
+    }
+    for (i = p->start; i < p->end; i++)
+    {
+        Hit hit;
+        hit.distance = point_distance(self, i, point);
+        hit.index = self->index[i];
+        push_hit(heap, k, count, &hit);
+    }
+}
+
+
+/* ========================================================================== */
+/* -- The Python type ------------------------------------------------------- */
+/* ========================================================================== */
+
+static PyArrayObject*
+get_points(PyObject* obj, int dim)
+{
+    PyArrayObject* array;
+
+    array = (PyArrayObject*) PyArray_FROMANY(obj, NPY_DOUBLE, 2, 2,
+                                             NPY_ARRAY_IN_ARRAY);
+    if (!array) return NULL;
+    if (PyArray_DIM(array, 1) != dim)
+    {
+        PyErr_Format(PyExc_ValueError,
+                     "Expected points with %d coordinates.", dim);
+        Py_DECREF(array);
+        return NULL;
+    }
+    return array;
+}
+
+static void
+PyTree_dealloc(PyTree* self)
+{
+    free(self->data);
+    free(self->index);
+    free(self->nodes);
+    free(self->bounds);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static PyObject*
+PyTree_new(PyTypeObject* type, PyObject* args, PyObject* kwds)
+{
+    PyObject* obj;
+    PyArrayObject* array;
+    PyTree* self;
+    const double* points;
+    npy_intp bucket_size = 1;
+    npy_intp i, n;
+    int d, dim, ok;
+    static char* kwlist[] = {"data", "bucket_size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|n", kwlist,
+                                     &obj, &bucket_size))
+        return NULL;
+    if (bucket_size < 1)
+    {
+        PyErr_SetString(PyExc_ValueError, "Bucket size should be positive.");
+        return NULL;
+    }
+    array = (PyArrayObject*) PyArray_FROMANY(obj, NPY_DOUBLE, 2, 2,
+                                             NPY_ARRAY_IN_ARRAY);
+    if (!array) return NULL;
+    n = PyArray_DIM(array, 0);
+    dim = (int) PyArray_DIM(array, 1);
+    if (dim < 1)
+    {
+        PyErr_SetString(PyExc_ValueError, "Points should have coordinates.");
+        Py_DECREF(array);
+        return NULL;
+    }
+
+    self = (PyTree*) type->tp_alloc(type, 0);
+    if (!self)
+    {
+        Py_DECREF(array);
+        return NULL;
+    }
+    self->n = n;
+    self->dim = dim;
+    self->bucket_size = bucket_size;
+    self->capacity = 16;
+    self->data = malloc((n > 0 ? n : 1) * dim * sizeof(double));
+    self->index = malloc((n > 0 ? n : 1) * sizeof(npy_intp));
+    self->nodes = malloc(self->capacity * sizeof(Node));
+    self->bounds = malloc(self->capacity * 2 * dim * sizeof(double));
+    if (!self->data || !self->index || !self->nodes || !self->bounds)
+    {
+        Py_DECREF(array);
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+
+    points = (const double*) PyArray_DATA(array);
+    for (i = 0; i < n; i++) self->index[i] = i;
+    add_node(self, 0, n);
+    Py_BEGIN_ALLOW_THREADS
+    ok = build(self, points, 0);
+    if (ok)
+    {
+        /* keep the points of each node together in memory */
+        for (i = 0; i < n; i++)
+        {
+            const double* point = points + self->index[i] * dim;
+            for (d = 0; d < dim; d++) self->data[i * dim + d] = point[d];
+        }
+    }
+    Py_END_ALLOW_THREADS
+    Py_DECREF(array);
+    if (!ok)
+    {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+    return (PyObject*) self;
+}
+
+static char PyTree_query_radius__doc__[] =
+"query_radius(points, radius) -> (indptr, indices, distances)\n"
+"\n"
+"Find the points of the tree within radius of each query point. The hits\n"
+"of query point k are indices[indptr[k]:indptr[k+1]], in ascending order,\n"
+"at the corresponding distances.\n";
+
+static PyObject*
+PyTree_query_radius(PyTree* self, PyObject* args)
+{
+    PyObject* obj;
+    PyArrayObject* array;
+    PyArrayObject* indptr;
+    PyArrayObject* indices = NULL;
+    PyArrayObject* distances = NULL;
+    const double* points;
+    npy_intp* offsets;
+    double radius, radius_sq;
+    HitList list = {NULL, 0, 0};
+    npy_intp i, m, start;
+    int ok = 1;
+
+    if (!PyArg_ParseTuple(args, "Od:query_radius", &obj, &radius))
+        return NULL;
+    if (radius < 0)
+    {
+        PyErr_SetString(PyExc_ValueError, "Radius should not be negative.");
+        return NULL;
+    }
+    array = get_points(obj, self->dim);
+    if (!array) return NULL;
+    m = PyArray_DIM(array, 0) + 1;
+    indptr = (PyArrayObject*) PyArray_SimpleNew(1, &m, NPY_INTP);
+    if (!indptr)
+    {
+        Py_DECREF(array);
+        return NULL;
+    }
+    m--;
+    points = (const double*) PyArray_DATA(array);
+    offsets = (npy_intp*) PyArray_DATA(indptr);
+    radius_sq = radius * radius;
+
+    Py_BEGIN_ALLOW_THREADS
+    offsets[0] = 0;
+    for (i = 0; i < m; i++)
+    {
+        start = list.size;
+        ok = search_radius(self, 0, points + i * self->dim, radius_sq, &list);
+        if (!ok) break;
+        if (list.size > start)
+            qsort(list.hits + start, list.size - start, sizeof(Hit),
+                  compare_index);
+        offsets[i + 1] = list.size;
+    }
+    Py_END_ALLOW_THREADS
+    Py_DECREF(array);
+
+    if (ok)
+    {
+        indices = (PyArrayObject*) PyArray_SimpleNew(1, &list.size, NPY_INTP);
+        distances = (PyArrayObject*) PyArray_SimpleNew(1, &list.size,
+                                                       NPY_DOUBLE);
+    }
+    if (!indices || !distances)
+    {
+        Py_XDECREF(indices);
+        Py_XDECREF(distances);
+        Py_DECREF(indptr);
+        free(list.hits);
+        if (!ok) return PyErr_NoMemory();
+        return NULL;
+    }
+    for (i = 0; i < list.size; i++)
+    {
+        ((npy_intp*) PyArray_DATA(indices))[i] = list.hits[i].index;
+        ((double*) PyArray_DATA(distances))[i] = sqrt(list.hits[i].distance);
+    }
+    free(list.hits);
+    return Py_BuildValue("NNN", indptr, indices, distances);
+}
+
+static char PyTree_query_knn__doc__[] =
+"query_knn(points, k) -> (distances, indices)\n"
+"\n"
+"Find the k points of the tree nearest to each query point, sorted by\n"
+"distance. If the tree has fewer than k points, the rows are padded with\n"
+"infinite distances and indices of -1.\n";
+
+static PyObject*
+PyTree_query_knn(PyTree* self, PyObject* args)
+{
+    PyObject* obj;
+    PyArrayObject* array;
+    PyArrayObject* distances;
+    PyArrayObject* indices;
+    const double* points;
+    double* distance;
+    npy_intp* index;
+    npy_intp dims[2];
+    npy_intp i, j, k, m, count;
+    Hit* heap;
+
+    if (!PyArg_ParseTuple(args, "On:query_knn", &obj, &k))
+        return NULL;
+    if (k < 1)
+    {
+        PyErr_SetString(PyExc_ValueError, "k should be positive.");
+        return NULL;
+    }
+    array = get_points(obj, self->dim);
+    if (!array) return NULL;
+    m = PyArray_DIM(array, 0);
+    dims[0] = m;
+    dims[1] = k;
+    distances = (PyArrayObject*) PyArray_SimpleNew(2, dims, NPY_DOUBLE);
+    indices = (PyArrayObject*) PyArray_SimpleNew(2, dims, NPY_INTP);
+    heap = malloc(k * sizeof(Hit));
+    if (!distances || !indices || !heap)
+    {
+        Py_DECREF(array);
+        Py_XDECREF(distances);
+        Py_XDECREF(indices);
+        free(heap);
+        if (!heap) return PyErr_NoMemory();
+        return NULL;
+    }
+    points = (const double*) PyArray_DATA(array);
+    distance = (double*) PyArray_DATA(distances);
+    index = (npy_intp*) PyArray_DATA(indices);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < m; i++)
+    {
+        const double* point = points + i * self->dim;
+        count = 0;
+        search_knn(self, 0, near_distance(self, 0, point), point,
+                   heap, k, &count);
+        qsort(heap, count, sizeof(Hit), compare_hit);
+        for (j = 0; j < count; j++)
+        {
+            distance[i * k + j] = sqrt(heap[j].distance);
+            index[i * k + j] = heap[j].index;
+        }
+        for (; j < k; j++)
+        {
+            distance[i * k + j] = HUGE_VAL;
+            index[i * k + j] = -1;
+        }
+    }
+    Py_END_ALLOW_THREADS
+    Py_DECREF(array);
+    free(heap);
+    return Py_BuildValue("NN", distances, indices);
+}
+
+static PyMethodDef PyTree_methods[] = {
+    {"query_radius", (PyCFunction)PyTree_query_radius, METH_VARARGS, PyTree_query_radius__doc__},
+    {"query_knn", (PyCFunction)PyTree_query_knn, METH_VARARGS, PyTree_query_knn__doc__},
+    {NULL}  /* Sentinel */
+};
+
+static char PyTree_doc[] =
+"KDTree(data, bucket_size=1)\n"
+"\n"
+"C KD tree over the rows of a two dimensional array. The tree cannot be\n"
+"changed once it is built, and may be queried from several threads.\n";
+
+static PyTypeObject PyTreeType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "C array KDTree",            /*tp_name*/
+    sizeof(PyTree),              /*tp_basicsize*/
+    0,                           /*tp_itemsize*/
+    (destructor)PyTree_dealloc,  /*tp_dealloc*/
+    0,                           /*tp_print*/
+    0,                           /*tp_getattr*/
+    0,                           /*tp_setattr*/
+    0,                           /*tp_compare*/
+    0,                           /*tp_repr*/
+    0,                           /*tp_as_number*/
+    0,                           /*tp_as_sequence*/
+    0,                           /*tp_as_mapping*/
+    0,                           /*tp_hash */
+    0,                           /*tp_call*/
+    0,                           /*tp_str*/
+    0,                           /*tp_getattro*/
+    0,                           /*tp_setattro*/
+    0,                           /*tp_as_buffer*/
+    Py_TPFLAGS_DEFAULT,          /*tp_flags*/
+    PyTree_doc,                  /* tp_doc */
+    0,                           /* tp_traverse */
+    0,                           /* tp_clear */
+    0,                           /* tp_richcompare */
+    0,                           /* tp_weaklistoffset */
+    0,                           /* tp_iter */
+    0,                           /* tp_iternext */
+    PyTree_methods,              /* tp_methods */
+    NULL,                        /* tp_members */
+    0,                           /* tp_getset */
+    0,                           /* tp_base */
+    0,                           /* tp_dict */
+    0,                           /* tp_descr_get */
+    0,                           /* tp_descr_set */
+    0,                           /* tp_dictoffset */
+    0,                           /* tp_init */
+    0,                           /* tp_alloc */
+    PyTree_new,                  /* tp_new */
+};
+
+/* ========================================================================== */
+/* -- Initialization -------------------------------------------------------- */
+/* ========================================================================== */
+
+#if PY_MAJOR_VERSION >= 3
+
+static struct PyModuleDef moduledef = {
+        PyModuleDef_HEAD_INIT,
+        "_CArrayKDTree",
+        NULL,
+        -1,
+        NULL,
+        NULL,
+        NULL,
+        NULL,
+        NULL
+};
+
+PyObject *
+PyInit__CArrayKDTree(void)
+
+#else
+
+void
+init_CArrayKDTree(void)
+#endif
+{
+  PyObject *module;
+
+  import_array();
+
+  if (PyType_Ready(&PyTreeType) < 0)
+#if PY_MAJOR_VERSION >= 3
+      return NULL;
+#else
+      return;
+#endif
+
+#if PY_MAJOR_VERSION >= 3
+  module = PyModule_Create(&moduledef);
+  if (module==NULL) return NULL;
+#else
+  module = Py_InitModule("_CArrayKDTree", NULL);
+  if (module==NULL) return;
+#endif
+
+  Py_INCREF(&PyTreeType);
+  PyModule_AddObject(module, "KDTree", (PyObject*) &PyTreeType);
+
+  if (PyErr_Occurred()) Py_FatalError("can't initialize module _CArrayKDTree");
+#if PY_MAJOR_VERSION >= 3
+  return module;
+#endif
+}
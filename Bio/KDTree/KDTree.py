@@ -15,7 +15,10 @@ Otfried Schwarzkopf). Author: Thomas Hamelryck.
 
 from __future__ import print_function
 
-from numpy import sum, sqrt, array
+from itertools import chain
+from operator import attrgetter
+
+from numpy import sum, sqrt, fromiter
 from numpy.random import random
 
 from Bio.KDTree import _CKDTree
@@ -208,8 +211,10 @@ class KDTree(object):
         the indices of the point pairs, where N
         is the number of neighbor pairs.
         """
-        a = array([[neighbor.index1, neighbor.index2] for neighbor in self.neighbors])
-        return a
+        n = len(self.neighbors)
+        pair = attrgetter("index1", "index2")
+        a = fromiter(chain.from_iterable(map(pair, self.neighbors)), int, 2 * n)
+        return a.reshape((n, 2))
 
     def all_get_radii(self):
         """Return All Fixed Neighbor Search results.
@@ -13,3 +13,4 @@ Otfried Schwarzkopf).
 """
 
 from .KDTree import KDTree
+from .ArrayKDTree import ArrayKDTree
@@ -9,7 +9,7 @@ import numpy
 import warnings
 import copy
 
-from Bio.PDB.Entity import DisorderedEntityWrapper
+from Bio.PDB.Entity import DisorderedEntityWrapper, _changed
 from Bio.PDB.PDBExceptions import PDBConstructionWarning
 from Bio.PDB.Vector import Vector
 from Bio.Data import IUPACData
@@ -51,6 +51,10 @@ class Atom(object):
         self.level="A"
         # Reference to the residue
         self.parent=None
+        # Row of the coordinate array shared by the atoms of the Model,
+        # and the Model (or other entity) holding that array
+        self._coord_row=None
+        self._coord_owner=None
         # the atomic data
         self.name=name      # eg. CA, spaces are removed from atom name
         self.fullname=fullname  # e.g. " CA ", spaces included
@@ -107,8 +111,31 @@ class Atom(object):
         else:
             return float('NaN')
 
+    def _get_coord(self):
+        return self._coord
+
+    def _set_coord(self, coord):
+        self._coord=coord
+        # the Model's shared array must be made again
+        if self._coord_owner is not None:
+            self._coord_owner._coord_array=None
+        _changed(self.parent)
+
+    coord=property(_get_coord, _set_coord, doc="""Atomic coordinates (x,y,z).
+
+        Once the atom is part of a Model, this is a row of an array holding
+        the coordinates of all the atoms of the Model (see Entity).""")
+
     # Special methods
 
+    def __setstate__(self, state):
+        if "coord" in state:
+            # pickled before coord was a property
+            state["_coord"]=state.pop("coord")
+        state.setdefault("_coord_row", None)
+        state.setdefault("_coord_owner", None)
+        self.__dict__.update(state)
+
     def __repr__(self):
         "Print Atom object as <Atom atom_name>."
         return "<Atom %s>" % self.get_id()
@@ -292,6 +319,8 @@ class Atom(object):
         # Do a shallow copy then explicitly copy what needs to be deeper.
         shallow = copy.copy(self)
         shallow.detach_parent()
+        shallow._coord_row=None
+        shallow._coord_owner=None
         shallow.set_coord(copy.copy(self.get_coord()))
         shallow.xtra = self.xtra.copy()
         return shallow
@@ -333,4 +362,5 @@ class DisorderedAtom(DisorderedEntityWrapper):
         if occupancy>self.last_occupancy:
             self.last_occupancy=occupancy
             self.disordered_select(altloc)
+        _changed(residue)
 
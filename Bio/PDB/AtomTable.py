@@ -0,0 +1,538 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Columnar table of the atoms in a PDB or mmCIF file, parsed with NumPy.
+
+The fixed-width columns of all the ATOM and HETATM records are sliced
+and converted in bulk, giving one NumPy array per field instead of one
+Atom object (and one small coordinate array) per atom:
+
+    >>> from Bio.PDB.PDBParser import PDBParser
+    >>> table = PDBParser().get_atom_table("PDB/1A8O.pdb")
+    >>> len(table)
+    644
+    >>> table.coord.shape
+    (644, 3)
+    >>> print(table.name[0] + " " + table.resname[0] + " " + table.chain_id[0])
+    N MSE A
+
+A Structure can be built on top of the table later, with
+PDBParser.build_structure; the coordinates of its atoms are then views
+into the table's coordinate array.
+
+The _atom_site loop of an mmCIF file is read the same way when its values
+line up in columns, as they do in the files of the PDB:
+
+    >>> from Bio.PDB.MMCIFParser import MMCIFParser
+    >>> table = MMCIFParser().get_atom_table("PDB/1LCD.cif")
+    >>> len(table), len(table.models)
+    (3384, 3)
+    >>> print(table.name[0] + " " + table.resname[0] + " " + table.chain_id[0])
+    O5' DA A
+"""
+
+import numpy
+
+from Bio._py3k import range
+
+from Bio.PDB.PDBExceptions import PDBConstructionException
+from Bio.PDB.MMCIF2Dict import _split_values, _unquote
+
+
+# Width to which the ATOM and HETATM records are padded (or truncated);
+# every field read by the parser lies within the first 80 columns
+_WIDTH = 80
+
+_ATOM_RECORDS = frozenset(["ATOM  ", "HETATM"])
+
+# Characters which int() might accept; a field containing any other
+# character is invalid without needing to be checked
+_INT_CHARS = numpy.zeros(256, bool)
+_INT_CHARS[numpy.frombuffer(b"0123456789+-_ \t\n\r\x0b\x0c\x00", numpy.uint8)] = True
+
+
+def _as_matrix(lines):
+    """Return the lines as an unsigned byte matrix, one row per line.
+
+    Short lines are padded with null characters, so fields past the end of
+    a line come out just as short as slicing the line would make them.
+    Characters that don't fit in a byte are replaced by '?'.
+    """
+    lengths = numpy.fromiter(map(len, lines), int, len(lines))
+    # Nearly all the records usually have the same length, so they can be
+    # joined as they are; the rest are padded one by one
+    width = numpy.bincount(lengths).argmax()
+    usual = lengths == width
+    chars = numpy.zeros((len(lines), max(width, _WIDTH)), numpy.uint8)
+    if usual.all():
+        chars[:, :width] = _to_bytes(lines).reshape(len(lines), width)
+    else:
+        rows = numpy.flatnonzero(usual)
+        chars[rows, :width] = _to_bytes([lines[i] for i in rows]).reshape(len(rows), width)
+        rows = numpy.flatnonzero(~usual)
+        chars[rows, :_WIDTH] = _to_bytes([lines[i][:_WIDTH].ljust(_WIDTH, "\0")
+                                          for i in rows]).reshape(len(rows), _WIDTH)
+    return chars[:, :_WIDTH]
+
+
+def _to_bytes(lines):
+    """Join the lines into an array of single bytes."""
+    text = "".join(lines)
+    if not isinstance(text, bytes):
+        text = text.encode("latin-1", "replace")
+    return numpy.frombuffer(text, numpy.uint8)
+
+
+def _field(chars, start, end):
+    """Return columns start:end of each row as an array of byte strings."""
+    field = numpy.ascontiguousarray(chars[:, start:end])
+    return field.view("S%i" % (end - start)).reshape(len(chars))
+
+
+def _unique(chars, start, end):
+    """Return the distinct values of a field, and the index of each row's.
+
+    Fields of up to eight characters are compared as 64-bit integers,
+    which is much quicker than sorting the strings.
+    """
+    if end - start > 8:
+        values, inverse = numpy.unique(_field(chars, start, end),
+                                       return_inverse=True)
+        return values.tolist(), inverse.reshape(len(chars))
+    if end - start == 1:
+        codes = chars[:, start]
+        present = numpy.flatnonzero(numpy.bincount(codes, minlength=256))
+        lookup = numpy.zeros(256, int)
+        lookup[present] = numpy.arange(len(present))
+        values = present.astype(numpy.uint8).view("S1")
+        return values.tolist(), lookup[codes]
+    keys = numpy.zeros((len(chars), 8), numpy.uint8)
+    keys[:, :end - start] = chars[:, start:end]
+    keys = keys.view(numpy.uint64).reshape(len(chars))
+    values, inverse = numpy.unique(keys, return_inverse=True)
+    return values.view("S8").tolist(), inverse.reshape(len(chars))
+
+
+def _by_value(chars, start, end, function, dtype):
+    """Apply function to each distinct value of a field, and expand back.
+
+    Atom names, residue numbers and so on repeat a lot, so each is
+    converted once rather than once per atom.
+    """
+    values, inverse = _unique(chars, start, end)
+    return numpy.array([function(value) for value in values], dtype)[inverse]
+
+
+def _to_float(chars, start, end, numbers, missing=None):
+    """Convert a field to floats, checking each value only if one is bad.
+
+    Values which can't be converted become NaN if missing is None, or else
+    raise a PDBConstructionException with the given message and the number
+    of the offending line.
+    """
+    try:
+        return _field(chars, start, end).astype(float)
+    except ValueError:
+        pass
+    values, inverse = _unique(chars, start, end)
+    converted = numpy.empty(len(values))
+    bad = numpy.zeros(len(values), bool)
+    for i, text in enumerate(values):
+        try:
+            converted[i] = float(text)
+        except ValueError:
+            converted[i] = numpy.nan
+            bad[i] = True
+    if missing is not None and bad.any():
+        row = numpy.flatnonzero(bad[inverse])[0]
+        raise PDBConstructionException("%s at line %i." % (missing, numbers[row]))
+    return converted[inverse]
+
+
+def _to_int(chars, start, end):
+    """Convert a field to integers, with zero for invalid values."""
+    try:
+        return _field(chars, start, end).astype(int)
+    except ValueError:
+        pass
+    values = numpy.zeros(len(chars), int)
+    rows = _INT_CHARS[chars[:, start:end]].all(axis=1)
+    if rows.any():
+        values[rows] = _by_value(chars[rows], start, end, _int_or_zero, int)
+    return values
+
+
+def _int_or_zero(text):
+    try:
+        return int(text)
+    except ValueError:
+        return 0
+
+
+def _decode(value):
+    """Turn a byte string back into the text read from the file."""
+    if isinstance(value, str):
+        # Python 2
+        return value
+    return value.decode("latin-1")
+
+
+def _atom_name(fullname):
+    """Strip the spaces from an atom name, unless it has internal spaces."""
+    fullname = _decode(fullname)
+    split_list = fullname.split()
+    if len(split_list) != 1:
+        # atom name has internal spaces, e.g. " N B ", so
+        # we do not strip spaces
+        return fullname
+    # atom name is like " CA ", so we can strip spaces
+    return split_list[0]
+
+
+def _cif_value(value):
+    """Turn a padded, possibly quoted mmCIF value into its text."""
+    return _unquote(_decode(value).strip())
+
+
+def _cif_altloc(value):
+    altloc = _cif_value(value)
+    if altloc in (".", "?"):
+        return " "
+    return altloc
+
+
+def _cif_residue_id(value):
+    """Split an mmCIF sequence number into its integer and insertion code."""
+    resseq = _cif_value(value)
+    try:
+        if resseq[-1:].isalpha():
+            return int(resseq[:-1]), resseq[-1]
+        return int(resseq), " "
+    except ValueError:
+        raise PDBConstructionException("Invalid residue number %r" % resseq)
+
+
+def _cif_model(value):
+    try:
+        return int(_cif_value(value))
+    except ValueError:
+        raise PDBConstructionException("Invalid model number")
+
+
+def _cif_matrix(lines, count):
+    """Return the values of an mmCIF loop as a byte matrix, and its columns.
+
+    When each line holds one row of the loop, and the values line up in
+    columns of their own (as they do in the files of the PDB), the lines
+    are simply stacked. Otherwise the values are split into tokens and
+    laid out in columns, which is slower. Either way, quoted values keep
+    their quotes, and each column is given by its (start, end) span.
+    """
+    if lines and not any(isinstance(line, tuple) for line in lines):
+        chars = _as_block(lines)
+        filled = chars != 32
+        used = numpy.concatenate(([False], filled.any(axis=0), [False]))
+        edges = numpy.diff(used.astype(int))
+        spans = list(zip(numpy.flatnonzero(edges == 1).tolist(),
+                         numpy.flatnonzero(edges == -1).tolist()))
+        if len(spans) == count and all(_is_token(filled[:, start:end])
+                                       for (start, end) in spans):
+            return chars, spans
+    tokens = _split_values(lines, raw=True)
+    if len(tokens) % count:
+        raise PDBConstructionException("Incomplete row in mmCIF loop")
+    blocks = [_as_block(tokens[i::count]) for i in range(count)]
+    ends = numpy.cumsum([block.shape[1] for block in blocks]).tolist()
+    spans = list(zip([0] + ends[:-1], ends))
+    return numpy.hstack(blocks), spans
+
+
+def _as_block(lines):
+    """Stack the lines into a byte matrix, padded with spaces."""
+    width = max(max(map(len, lines)), 1)
+    chars = _to_bytes([line.ljust(width) for line in lines]).reshape(len(lines), width)
+    chars = chars.copy()
+    # tabs, line feeds and carriage returns
+    chars[(chars == 9) | (chars == 10) | (chars == 13)] = 32
+    return chars
+
+
+def _is_token(filled):
+    """Check that each row of a column holds a single value."""
+    count = filled.sum(axis=1)
+    first = filled.argmax(axis=1)
+    last = filled.shape[1] - filled[:, ::-1].argmax(axis=1)
+    return bool(((count > 0) & (count == last - first)).all())
+
+
+class AtomTable(object):
+    """The atoms of a PDB file, one NumPy array per column.
+
+    Per-atom columns, all of the same length and in file order:
+
+     - coord - N x 3 float32 array of coordinates
+     - serial_number - integer array (0 where missing or invalid)
+     - name, fullname - atom names, without and with their spaces
+     - altloc, resname, chain_id, icode, segid, element - string arrays
+     - resseq - integer array of residue sequence numbers
+     - hetero_flag - " " for ATOM, "W" for water and "H" for other HETATM
+     - occupancy, bfactor - float arrays, NaN where missing or invalid
+     - anisou - N x 6 float32 array of anisotropic B factors (NaN where
+       there was no ANISOU record), or None if the file had none
+     - model - index of each atom's model in the models list
+     - line - line number of each atom in the file
+
+    models is a list of (line number, MODEL record, first atom index)
+    tuples, with None for the record of a model which was started without
+    a MODEL line.  For an mmCIF file, the model number takes the place of
+    the MODEL record, there are no segids and the names of the atoms are
+    not padded, and water is flagged like any other HETATM.  The standard
+    deviations in SIGUIJ and SIGATM records, which are rare, are kept in
+    the siguij and sigatm dictionaries, keyed by atom index.
+    """
+
+    def __init__(self):
+        self.coord = numpy.zeros((0, 3), "f")
+        self.serial_number = numpy.zeros(0, int)
+        self.name = numpy.zeros(0, "U")
+        self.fullname = numpy.zeros(0, "U")
+        self.altloc = numpy.zeros(0, "U")
+        self.resname = numpy.zeros(0, "U")
+        self.chain_id = numpy.zeros(0, "U")
+        self.resseq = numpy.zeros(0, int)
+        self.icode = numpy.zeros(0, "U")
+        self.hetero_flag = numpy.zeros(0, "U")
+        self.segid = numpy.zeros(0, "U")
+        self.element = numpy.zeros(0, "U")
+        self.occupancy = numpy.zeros(0)
+        self.bfactor = numpy.zeros(0)
+        self.anisou = None
+        self.siguij = {}
+        self.sigatm = {}
+        self.model = numpy.zeros(0, int)
+        self.line = numpy.zeros(0, int)
+        self.models = []
+        self.header = None
+        self.trailer = []
+
+    def __len__(self):
+        return len(self.coord)
+
+    @classmethod
+    def from_pdb_lines(cls, lines, line_counter=0):
+        """Read the atomic data of a PDB file into a new AtomTable.
+
+        Arguments:
+         - lines - the lines of the file, from the first ATOM, HETATM or
+           MODEL record on
+         - line_counter - the number of header lines before them
+
+        The lines from the first END or CONECT record on are kept as the
+        table's trailer.  Invalid coordinates raise a
+        PDBConstructionException, as the PDBParser always did.
+        """
+        table = cls()
+        record_types = [line[0:6] for line in lines]
+        # The atomic data ends at the first END or CONECT record
+        end = len(lines)
+        for record_type in ("END   ", "CONECT"):
+            try:
+                end = min(end, record_types.index(record_type))
+            except ValueError:
+                pass
+        table.trailer = lines[end:]
+        atom_index = [i for i in range(end) if record_types[i] in _ATOM_RECORDS]
+        numbers = numpy.array(atom_index, int) + line_counter + 1
+        # The other records, with the number of atoms before each of them
+        others = numpy.ones(end, bool)
+        others[atom_index] = False
+        others = numpy.flatnonzero(others)
+        counts = numpy.searchsorted(atom_index, others)
+
+        anisou_lines = []
+        anisou_atoms = []
+        models = table.models
+        model_open = False
+        seen = 0
+        for i, count in zip(others.tolist(), counts.tolist()):
+            if count > seen and not model_open:
+                # Start a model - there was no explicit MODEL record
+                models.append((int(numbers[seen]), None, seen))
+                model_open = True
+            seen = count
+            line = lines[i]
+            record_type = record_types[i]
+            if record_type == "ANISOU":
+                anisou_lines.append(line)
+                anisou_atoms.append(count - 1)
+            elif record_type == "MODEL ":
+                models.append((line_counter + i + 1, line, count))
+                model_open = True
+            elif record_type == "ENDMDL":
+                model_open = False
+            elif record_type == "SIGUIJ":
+                # standard deviation of anisotropic B factor
+                siguij = [float(x) for x in (line[28:35], line[35:42], line[42:49],
+                                             line[49:56], line[56:63], line[63:70])]
+                # U sigma's are scaled by 10^4
+                table.siguij[count - 1] = \
+                    (numpy.array(siguij, "f") / 10000.0).astype("f")
+            elif record_type == "SIGATM":
+                # standard deviation of atomic positions
+                sigatm = [float(x) for x in (line[30:38], line[38:45], line[46:54],
+                                             line[54:60], line[60:66])]
+                table.sigatm[count - 1] = numpy.array(sigatm, "f")
+        if len(atom_index) > seen and not model_open:
+            models.append((int(numbers[seen]), None, seen))
+        if not atom_index:
+            return table
+
+        table.line = numbers
+        table.model = numpy.searchsorted([start for (_, _, start) in models],
+                                         numpy.arange(len(numbers)),
+                                         "right") - 1
+        chars = _as_matrix([lines[i] for i in atom_index])
+        del atom_index
+
+        message = "Invalid or missing coordinate(s)"
+        table.coord = numpy.column_stack(
+            [_to_float(chars, start, start + 8, numbers, message)
+             for start in (30, 38, 46)]).astype("f")
+        table.occupancy = _to_float(chars, 54, 60, numbers)
+        table.bfactor = _to_float(chars, 60, 66, numbers)
+        table.serial_number = _to_int(chars, 6, 11)
+
+        table.fullname = _by_value(chars, 12, 16, _decode, "U4")
+        table.name = _by_value(chars, 12, 16, _atom_name, "U4")
+        table.altloc = _by_value(chars, 16, 17, _decode, "U1")
+        table.resname = _by_value(chars, 17, 20, _decode, "U3")
+        table.chain_id = _by_value(chars, 21, 22, _decode, "U1")
+        # sequence identifier
+        table.resseq = _by_value(chars, 22, 26,
+                                 lambda resseq: int(resseq.split()[0]), int)
+        # insertion code
+        table.icode = _by_value(chars, 26, 27, _decode, "U1")
+        table.segid = _by_value(chars, 72, 76, _decode, "U4")
+        table.element = _by_value(chars, 76, 78,
+                                  lambda element: _decode(element).strip(), "U2")
+        # hetero atom flag
+        hetero = _field(chars, 0, 6) == b"HETATM"
+        resname = _field(chars, 17, 20)
+        water = (resname == b"HOH") | (resname == b"WAT")
+        table.hetero_flag = numpy.where(hetero, numpy.where(water, "W", "H"), " ")
+
+        if anisou_lines:
+            chars = _as_matrix(anisou_lines)
+            anisou = numpy.column_stack([_field(chars, start, end).astype(float)
+                                         for (start, end) in ((28, 35), (35, 42),
+                                                              (43, 49), (49, 56),
+                                                              (56, 63), (63, 70))])
+            # U's are scaled by 10^4
+            anisou = (anisou.astype("f") / 10000.0).astype("f")
+            atoms = numpy.array(anisou_atoms)
+            table.anisou = numpy.empty((len(numbers), 6), "f")
+            table.anisou.fill(numpy.nan)
+            table.anisou[atoms[atoms >= 0]] = anisou[atoms >= 0]
+        return table
+
+    @classmethod
+    def from_mmcif_loop(cls, tags, lines, numbers=None):
+        """Read the _atom_site loop of an mmCIF file into a new AtomTable.
+
+        Arguments:
+         - tags - the tags of the loop, e.g. "_atom_site.Cartn_x"
+         - lines - the lines with the values of the loop, unsplit (as read
+           by Bio.PDB.MMCIF2Dict._read_categories)
+         - numbers - the line numbers of the lines (optional)
+
+        The residue number is taken from auth_seq_id if present, and the
+        chain from label_asym_id, as the MMCIFParser always did.
+        """
+        table = cls()
+        if not lines:
+            return table
+        chars, spans = _cif_matrix(lines, len(tags))
+        columns = dict(zip(tags, spans))
+        if numbers is None or len(numbers) != len(chars):
+            # the rows don't match the lines
+            numbers = [0] * len(chars)
+        numbers = numpy.array(numbers, int)
+        table.line = numbers
+
+        def column(name):
+            return columns.get("_atom_site." + name)
+
+        message = "Invalid or missing coordinate(s)"
+        table.coord = numpy.column_stack(
+            [_to_float(chars, start, end, numbers, message)
+             for (start, end) in (column("Cartn_x"), column("Cartn_y"),
+                                  column("Cartn_z"))]).astype("f")
+        table.occupancy = _to_float(chars, column("occupancy")[0],
+                                    column("occupancy")[1], numbers)
+        table.bfactor = _to_float(chars, column("B_iso_or_equiv")[0],
+                                  column("B_iso_or_equiv")[1], numbers)
+        if column("id") is not None:
+            table.serial_number = _to_int(chars, *column("id"))
+        else:
+            table.serial_number = numpy.zeros(len(chars), int)
+
+        table.name = _by_value(chars, *column("label_atom_id"),
+                               function=_cif_value, dtype="U")
+        table.fullname = table.name
+        table.altloc = _by_value(chars, *column("label_alt_id"),
+                                 function=_cif_altloc, dtype="U")
+        table.resname = _by_value(chars, *column("label_comp_id"),
+                                  function=_cif_value, dtype="U")
+        table.chain_id = _by_value(chars, *column("label_asym_id"),
+                                   function=_cif_value, dtype="U")
+        seq_id = column("auth_seq_id") or column("label_seq_id")
+        values, inverse = _unique(chars, *seq_id)
+        residue_ids = [_cif_residue_id(value) for value in values]
+        table.resseq = numpy.array([resseq for (resseq, _) in residue_ids],
+                                   int)[inverse]
+        table.icode = numpy.array([icode for (_, icode) in residue_ids],
+                                  "U")[inverse]
+        table.hetero_flag = _by_value(
+            chars, *column("group_PDB"),
+            function=lambda value: "H" if _cif_value(value) == "HETATM" else " ",
+            dtype="U1")
+        table.segid = numpy.empty(len(chars), "U1")
+        table.segid.fill(" ")
+        if column("type_symbol") is not None:
+            table.element = _by_value(chars, *column("type_symbol"),
+                                      function=_cif_value, dtype="U")
+        else:
+            table.element = numpy.zeros(len(chars), "U1")
+
+        if column("pdbx_PDB_model_num") is not None:
+            serials = _by_value(chars, *column("pdbx_PDB_model_num"),
+                                function=_cif_model, dtype=int)
+            starts = numpy.flatnonzero(numpy.diff(serials)) + 1
+            starts = [0] + starts.tolist()
+            table.models = [(int(numbers[start]), int(serials[start]), start)
+                            for start in starts]
+            table.model = numpy.repeat(numpy.arange(len(starts)),
+                                       numpy.diff(starts + [len(chars)]))
+        else:
+            table.models = [(int(numbers[0]), None, 0)]
+            table.model = numpy.zeros(len(chars), int)
+
+        anisou = [column("aniso_U[%s]" % ij) for ij in
+                  ("1][1", "1][2", "1][3", "2][2", "2][3", "3][3")]
+        if None not in anisou:
+            table.anisou = numpy.column_stack(
+                [_to_float(chars, start, end, numbers)
+                 for (start, end) in anisou]).astype("f")
+        return table
+
+    def get_model_slice(self, index):
+        """Return the slice of atom indices in the model with this index."""
+        start = self.models[index][2]
+        if index + 1 < len(self.models):
+            end = self.models[index + 1][2]
+        else:
+            end = len(self)
+        return slice(start, end)
+
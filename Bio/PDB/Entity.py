@@ -5,19 +5,132 @@
 
 from copy import copy
 
+import numpy
+
 from Bio.PDB.PDBExceptions import PDBConstructionException
 
 """Base class for Residue, Chain, Model and Structure classes.
 
 It is a simple container class, with list and dictionary like properties.
+
+The coordinates of the atoms in a Model are kept in one N x 3 array, which
+the Model makes when it is first needed (and again after atoms are added,
+removed or given new coordinate arrays); each Atom's coord is then a row
+of it, so that transforming or extracting the coordinates of a whole
+entity is a single NumPy operation.  An atom's coord is a row of only one
+such array at a time, so if the atom is also in another Model (e.g. a
+residue added to a second Model without being detached from the first),
+making that Model's array drops the first Model's array.
 """
 
 
+def _changed(entity):
+    """Drop the coordinate array of the Model above an entity (PRIVATE).
+
+    Called whenever atoms are added or removed, or an atom is given a new
+    coordinate array, so the Model's array is made again when next needed.
+    """
+    while entity is not None:
+        if isinstance(entity, Entity):
+            entity._coord_array = None
+            if entity.level == "M":
+                break
+        entity = entity.parent
+
+
+def _coord_owner(entity):
+    """Return the Model above an entity, or its topmost parent (PRIVATE)."""
+    while entity.level != "M" and entity.parent is not None:
+        entity = entity.parent
+    return entity
+
+
+def _unpack_atoms(entity):
+    """Return all the atoms in an entity, including alternative locations (PRIVATE)."""
+    level = entity.level
+    if level == "A":
+        return [entity]
+    if level == "R":
+        return entity.get_unpacked_list()
+    atoms = []
+    for child in entity.child_list:
+        if level == "C" and child.is_disordered() == 2:
+            # point mutation - all the residues are kept
+            for residue in child.disordered_get_list():
+                atoms.extend(residue.get_unpacked_list())
+        else:
+            atoms.extend(_unpack_atoms(child))
+    return atoms
+
+
+def _atom_rows(atom_list):
+    """Group atoms by the coordinate array they share (PRIVATE).
+
+    Returns a list of (owner, array, rows, positions) tuples, where owner
+    is the Model (or other topmost entity) holding the array, rows are the
+    indices of the atoms in the array and positions their indices in
+    atom_list, and a list of the positions of any atoms not in an entity
+    (which have no shared array).
+    """
+    groups = {}
+    by_parent = {}
+    loose = []
+    for position, atom in enumerate(atom_list):
+        if atom.is_disordered() == 2:
+            # as for all other methods, use the selected atom
+            atom = atom.disordered_get()
+        parent = atom.parent
+        if parent is None:
+            loose.append(position)
+            continue
+        group = by_parent.get(id(parent))
+        if group is None:
+            owner = _coord_owner(parent)
+            group = groups.get(id(owner))
+            if group is None:
+                group = groups[id(owner)] = (owner, owner._get_coord_array(),
+                                             [], [])
+            by_parent[id(parent)] = group
+        if atom._coord_owner is not group[0]:
+            # its row is in the array of another Model which also has it
+            # (or it isn't listed by its residue), so there is none here
+            loose.append(position)
+            continue
+        group[2].append(atom._coord_row)
+        group[3].append(position)
+    return [(owner, array, numpy.array(rows, int), positions)
+            for (owner, array, rows, positions) in groups.values()], loose
+
+
+def _transform_rows(owner, rows, rot, tran):
+    """Move some of the atoms of a Model, into a new coordinate array (PRIVATE).
+
+    The Model's old array is left unchanged, so coordinates returned
+    earlier by Atom.get_coord() keep their values, just as when each atom
+    was given a new array of its own.  The new array has the precision of
+    the result, as Atom.transform gives.  Returns the new array.
+    """
+    array = owner._get_coord_array()
+    coords = numpy.dot(array[rows], rot) + tran
+    array = array.astype(numpy.result_type(array, coords))
+    array[rows] = coords
+    owner._coord_array = array
+    for row, atom in enumerate(owner._coord_atoms):
+        atom._coord = array[row]
+    return array
+
+
 class Entity(object):
     """
     Basic container object. Structure, Model, Chain and Residue
     are subclasses of Entity. It deals with storage and lookup.
     """
+    # Shared coordinates of the atoms (see _get_coord_array)
+    _coord_array = None
+    _coord_atoms = None
+    _coord_masses = None
+    _coord_rows = None
+
     def __init__(self, id):
         self.id=id
         self.full_id=None
@@ -50,6 +163,57 @@ class Entity(object):
         for child in self.child_list:
             yield child
 
+    def __getstate__(self):
+        # The atoms' coordinates are pickled separately, so they won't be
+        # rows of the unpickled array; it is made again when needed
+        state = self.__dict__.copy()
+        state["_coord_array"] = None
+        state["_coord_rows"] = None
+        return state
+
+    # Private methods
+
+    def _get_coord_array(self):
+        """Return the array holding the coordinates of all the atoms (PRIVATE).
+
+        This is only called on a Model, or an entity which isn't part of one.
+        The array is made from the atoms' coordinates the first time, after
+        which each atom's coord is a row of it, its _coord_row the index of
+        that row and its _coord_owner this entity.  The array of any other
+        entity which owned one of the atoms is dropped, as its row of that
+        array is no longer the atom's coord.
+        """
+        array = self._coord_array
+        if array is None:
+            atoms = _unpack_atoms(self)
+            if atoms:
+                array = numpy.concatenate([atom._coord for atom in atoms])
+            else:
+                array = numpy.zeros(0, "f")
+            array = array.reshape(len(atoms), 3)
+            for row, atom in enumerate(atoms):
+                owner = atom._coord_owner
+                if owner is not self and owner is not None:
+                    owner._coord_array = None
+                atom._coord = array[row]
+                atom._coord_row = row
+                atom._coord_owner = self
+            self._coord_array = array
+            self._coord_atoms = atoms
+            self._coord_masses = None
+        return array
+
+    def _get_coord_rows(self):
+        """Return the shared coordinate array and the rows of this entity's atoms (PRIVATE)."""
+        owner = _coord_owner(self)
+        array = owner._get_coord_array()
+        if owner is self:
+            return array, slice(None)
+        if self._coord_rows is None or self._coord_rows[0] is not array:
+            rows = numpy.array([atom._coord_row for atom in _unpack_atoms(self)], int)
+            self._coord_rows = (array, rows)
+        return self._coord_rows
+
     # Public methods
 
     def get_level(self):
@@ -77,6 +241,7 @@ class Entity(object):
         child.detach_parent()
         del self.child_dict[id]
         self.child_list.remove(child)
+        _changed(self)
 
     def add(self, entity):
         "Add a child to the Entity."
@@ -87,6 +252,7 @@ class Entity(object):
         entity.set_parent(self)
         self.child_list.append(entity)
         self.child_dict[entity_id]=entity
+        _changed(self)
 
     def insert(self, pos, entity):
         "Add a child to the Entity at a specified position."
@@ -97,6 +263,7 @@ class Entity(object):
         entity.set_parent(self)
         self.child_list[pos:pos] = [entity]
         self.child_dict[entity_id]=entity
+        _changed(self)
 
     def get_iterator(self):
         "Return iterator over children."
@@ -165,9 +332,67 @@ class Entity(object):
 
         @param tran: the translation vector
         @type tran: size 3 Numeric array
+
+        All the atoms are moved in one go, including every alternative
+        location of disordered atoms and residues.
+        """
+        if self.level == "S":
+            for model in self.get_list():
+                model.transform(rot, tran)
+            return
+        rows = self._get_coord_rows()[1]
+        owner = _coord_owner(self)
+        array = _transform_rows(owner, rows, rot, tran)
+        if owner is not self:
+            self._coord_rows = (array, rows)
+
+    def get_coords(self):
+        """Return the coordinates of all the atoms as an N x 3 array.
+
+        The atoms are in the order of the entity's (unpacked) lists,
+        including every alternative location of disordered atoms and
+        residues.  The array is a copy.
+        """
+        if self.level == "S":
+            coords = [model.get_coords() for model in self.get_list()]
+            if not coords:
+                return numpy.zeros((0, 3), "f")
+            return numpy.concatenate(coords)
+        array, rows = self._get_coord_rows()
+        return array[rows].copy()
+
+    def center_of_mass(self, geometric=False):
+        """Return the center of mass of the atoms, as a size 3 array.
+
+        If geometric is True, all the atoms are given the same weight,
+        giving their centroid.  Otherwise every atom must have a known
+        element, or a ValueError is raised.
         """
-        for o in self.get_list():
-            o.transform(rot, tran)
+        if self.level == "S":
+            entities = self.get_list()
+        else:
+            entities = [self]
+        coords = []
+        masses = []
+        for entity in entities:
+            array, rows = entity._get_coord_rows()
+            coords.append(array[rows])
+            owner = _coord_owner(entity)
+            if owner._coord_masses is None:
+                owner._coord_masses = numpy.array([atom.mass for atom in
+                                                   owner._coord_atoms], float)
+            masses.append(owner._coord_masses[rows])
+        if not sum(len(c) for c in coords):
+            raise ValueError("%r has no atoms" % self)
+        coords = numpy.concatenate(coords)
+        if geometric:
+            return coords.mean(axis=0)
+        masses = numpy.concatenate(masses)
+        if numpy.isnan(masses).any():
+            raise ValueError("Some atoms have an unknown element, so the "
+                             "center of mass can't be calculated; use "
+                             "geometric=True for the centroid instead.")
+        return numpy.dot(masses, coords) / masses.sum()
 
     def copy(self):
         shallow = copy(self)
@@ -175,6 +400,8 @@ class Entity(object):
         shallow.child_list = []
         shallow.child_dict = {}
         shallow.xtra = copy(self.xtra)
+        shallow._coord_array = None
+        shallow._coord_rows = None
 
         shallow.detach_parent()
 
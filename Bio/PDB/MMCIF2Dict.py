@@ -7,61 +7,164 @@
 
 from __future__ import print_function
 
+import re
+
 from Bio._py3k import input as _input
 
-import shlex
 
 class MMCIF2Dict(dict):
 
-    def __init__(self, filename):
+    def __init__(self, filename, categories=None):
+        """Read the data items of an mmCIF file into the dictionary.
+
+        Single data items map their tag to a string, and the tags of loops
+        map to lists of strings. If categories is given (e.g. ["_atom_site",
+        "_cell"]), only the data items in those categories are read, along
+        with the name of the data block under "data_"; the rest of the file
+        is skipped without being split into tokens.
+        """
         with open(filename) as handle:
-            loop_flag = False
-            key = None
-            tokens = self._tokenize(handle)
-            token = next(tokens)
-            self[token[0:5]]=token[5:]
-            for token in tokens:
-                if token=="loop_":
-                    loop_flag = True
-                    keys = []
-                    i = 0
-                    n = 0
-                    continue
-                elif loop_flag:
-                    if token.startswith("_"):
-                        if i > 0:
-                            loop_flag = False
-                        else:
-                            self[token] = []
-                            keys.append(token)
-                            n += 1
-                            continue
-                    else:
-                        self[keys[i%n]].append(token)
-                        i+=1
-                        continue
-                if key is None:
-                    key = token
+            for key, value in _read_categories(handle, categories):
+                if isinstance(key, list):
+                    # loop - split the values, and deal them out to the tags
+                    tokens = _split_values(value[0])
+                    n = len(key)
+                    for i, tag in enumerate(key):
+                        self[tag] = tokens[i::n]
                 else:
-                    self[key] = token
-                    key = None
+                    self[key] = value
+
+
+# A quoted token ends at a matching quote followed by white space;
+# a # outside a token starts a comment
+_token = re.compile(r"""('.*?'|".*?")(?=\s|$)|(#.*)|(\S+)""")
+
+_reserved = ("loop_", "data_", "save_", "global_", "stop_")
+
+
+def _unquote(token):
+    if len(token) > 1 and token[0] in "'\"" and token[-1] == token[0]:
+        return token[1:-1]
+    return token
+
+
+def _split_line(line, raw=False):
+    """Split a line that may hold quoted tokens or comments (PRIVATE)."""
+    tokens = []
+    for match in _token.finditer(line):
+        if match.lastindex == 1:
+            token = match.group(1)
+            tokens.append(token if raw else token[1:-1])
+        elif match.lastindex == 3:
+            tokens.append(match.group(3))
+    return tokens
+
+
+def _split_values(lines, raw=False):
+    """Split the lines of values of a loop into tokens (PRIVATE).
 
-    def _tokenize(self, handle):
-        for line in handle:
-            if line.startswith("#"):
+    Lines given as one-element tuples are text fields, which are a token
+    each. Runs of lines without quotes or comments, which is nearly all
+    of them, are split together. With raw, quoted tokens keep their quotes,
+    and text fields are quoted too.
+    """
+    tokens = []
+    plain = []
+    for line in lines:
+        if isinstance(line, tuple):
+            tokens.extend(" ".join(plain).split())
+            plain = []
+            tokens.append("'%s'" % line[0] if raw else line[0])
+        elif "'" in line or '"' in line or "#" in line:
+            tokens.extend(" ".join(plain).split())
+            plain = []
+            tokens.extend(_split_line(line, raw))
+        else:
+            plain.append(line)
+    tokens.extend(" ".join(plain).split())
+    return tokens
+
+
+def _read_categories(handle, categories=None):
+    """Read the data items of an mmCIF file, skipping unwanted ones (PRIVATE).
+
+    Yields ("data_", block name) for the data block, (tag, value) for a
+    single data item, and (tags, (lines, numbers)) for a loop, where lines
+    are the lines of the loop's values, unsplit, and numbers their line
+    numbers in the file. Text fields among them are one-element tuples.
+
+    If categories is given, only the items and loops in those categories
+    are returned.
+    """
+    if categories is not None:
+        categories = set("_" + category.lstrip("_") for category in categories)
+
+    def wanted(tag):
+        return categories is None or tag.split(".", 1)[0] in categories
+
+    numbered = enumerate(handle, 1)
+    tags = None         # tags of the loop being read
+    lines = None        # lines of its values, if wanted; None while
+    numbers = None      # reading the tags
+    keep = False        # whether the values being read are wanted
+    pending = None      # tag of a single item waiting for its value
+    for number, line in numbered:
+        if line[:1] in " \t":
+            line = line.lstrip()
+        first = line[:1]
+        if first in "#\r\n":
+            # comment or blank line (or an empty last line)
+            continue
+        if first == ";":
+            # text field, up to the next line starting with a semicolon
+            value = line[1:].strip()
+            for _, line in numbered:
+                if line.startswith(";"):
+                    break
+                value += line.strip()
+            value = (value,)
+        elif first == "_":
+            if tags is not None and lines is None:
+                tags.append(line.split(None, 1)[0])
                 continue
-            elif line.startswith(";"):
-                token = line[1:].strip()
-                for line in handle:
-                    line = line.strip()
-                    if line==';':
-                        break
-                    token += line
-                yield token
-            else:
-                tokens = shlex.split(line)
-                for token in tokens:
-                    yield token
+            if tags is not None and keep:
+                yield tags, (lines, numbers)
+            tags = None
+            parts = line.split(None, 1)
+            pending = parts[0] if wanted(parts[0]) else None
+            if pending is None or len(parts) == 1:
+                continue
+            value = parts[1]
+        elif line.startswith(_reserved):
+            if tags is not None and keep:
+                yield tags, (lines, numbers)
+            tags = None
+            pending = None
+            if line.startswith("loop_"):
+                tags = []
+                lines = None
+                keep = False
+            elif line.startswith("data_"):
+                yield "data_", line.split()[0][5:]
+            continue
+        else:
+            value = line
+        # a value, or the values of a loop
+        if tags is not None:
+            if lines is None:
+                keep = bool(tags) and wanted(tags[0])
+                lines = []
+                numbers = []
+            if keep:
+                lines.append(value)
+                numbers.append(number)
+        elif pending is not None:
+            if not isinstance(value, tuple):
+                value = _split_values([value]) or [None]
+            yield pending, value[0]
+            pending = None
+    if tags is not None and keep:
+        yield tags, (lines, numbers)
 
 
 if __name__=="__main__":
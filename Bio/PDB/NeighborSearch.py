@@ -7,12 +7,14 @@
 
 from __future__ import print_function
 
+from itertools import product
+
 import numpy
 
-from Bio.KDTree import KDTree
+from Bio.KDTree import ArrayKDTree
 
 from Bio.PDB.PDBExceptions import PDBException
-from Bio.PDB.Selection import unfold_entities, entity_levels, uniqueify
+from Bio.PDB.Selection import unfold_entities, entity_levels
 
 
 class NeighborSearch(object):
@@ -25,7 +27,8 @@ class NeighborSearch(object):
     2. To find all atoms/residues/chains/models/structures that are within
     a fixed radius of each other.
 
-    NeighborSearch makes use of the Bio.KDTree C++ module, so it's fast.
+    NeighborSearch makes use of the Bio.KDTree ArrayKDTree C module, which
+    searches for the neighbors of many centers in one call, so it's fast.
     """
     def __init__(self, atom_list, bucket_size=10):
         """
@@ -41,28 +44,78 @@ class NeighborSearch(object):
         self.coords=numpy.array(coord_list).astype("f")
         assert(bucket_size>1)
         assert(self.coords.shape[1]==3)
-        self.kdt=KDTree(3, bucket_size)
-        self.kdt.set_coords(self.coords)
+        self.kdt=ArrayKDTree(self.coords, bucket_size)
 
     # Private
 
-    def _get_unique_parent_pairs(self, pair_list):
-        # translate a list of (entity, entity) tuples to
-        # a list of (parent entity, parent entity) tuples,
-        # thereby removing duplicate (parent entity, parent entity)
-        # pairs.
-        # o pair_list - a list of (entity, entity) tuples
-        parent_pair_list=[]
-        for (e1, e2) in pair_list:
-            p1=e1.get_parent()
-            p2=e2.get_parent()
-            if p1==p2:
-                continue
-            elif p1<p2:
-                parent_pair_list.append((p1, p2))
-            else:
-                parent_pair_list.append((p2, p1))
-        return uniqueify(parent_pair_list)
+    def _get_parent_index(self, level):
+        # Return the entities at the given level that contain the atoms,
+        # in order of first appearance, and an array that maps each atom
+        # index to the index of its entity in that list.
+        # o level - char (A, R, C, M, S)
+        if level=="A":
+            return self.atom_list, numpy.arange(len(self.atom_list))
+        steps=entity_levels.index(level)
+        entity_list=[]
+        entity_index={}
+        parent_index=numpy.empty(len(self.atom_list), int)
+        for i, a in enumerate(self.atom_list):
+            e=a
+            for step in range(steps):
+                e=e.get_parent()
+            try:
+                parent_index[i]=entity_index[e]
+            except KeyError:
+                parent_index[i]=entity_index[e]=len(entity_list)
+                entity_list.append(e)
+        return entity_list, parent_index
+
+    def _get_parent_pairs(self, pairs, level):
+        # Translate an Nx2 array of atom index pairs to the entities at
+        # the given level, and an Mx2 array of unique (i, j) entity index
+        # pairs with i<j, sorted. Pairs within the same entity are dropped.
+        entity_list, parent_index=self._get_parent_index(level)
+        pairs=parent_index[pairs]
+        pairs=pairs[pairs[:, 0]!=pairs[:, 1]]
+        pairs.sort(axis=1)
+        n=max(len(entity_list), 1)
+        keys=numpy.unique(pairs[:, 0]*n+pairs[:, 1])
+        return entity_list, numpy.column_stack((keys//n, keys%n))
+
+    def _get_all_pairs(self, radius, cell=None):
+        # Return an Nx2 array with the indices (i, j) of all atom pairs
+        # within radius, with i<j. With a unit cell, atoms are also paired
+        # through the lattice images of the other atoms.
+        indptr, indices=self.search_batch(self.coords, radius, cell)
+        rows=numpy.repeat(numpy.arange(len(self.coords)), numpy.diff(indptr))
+        keep=rows<indices
+        return numpy.column_stack((rows[keep], indices[keep]))
+
+    def _get_shifts(self, centers, radius, cell):
+        # Yield (center mask, translation) pairs. The atoms within radius
+        # of the translated centers are within radius of a lattice image
+        # of the original centers, and together the translations cover
+        # every lattice image that can be reached.
+        if cell is None:
+            yield slice(None), numpy.zeros(3)
+            return
+        if len(self.coords)==0 or len(centers)==0:
+            return
+        vectors=_get_cell_vectors(cell)
+        inverse=numpy.linalg.inv(vectors)
+        # how far radius reaches along each fractional axis
+        reach=radius*numpy.sqrt((inverse**2).sum(axis=0))
+        atom_fractions=numpy.dot(self.coords, inverse)
+        center_fractions=numpy.dot(centers, inverse)
+        lower=numpy.ceil(center_fractions-atom_fractions.max(axis=0)-reach)
+        upper=numpy.floor(center_fractions-atom_fractions.min(axis=0)+reach)
+        lower=lower.astype(int)
+        upper=upper.astype(int)
+        ranges=[range(lower[:, i].min(), upper[:, i].max()+1) for i in range(3)]
+        for shift in product(*ranges):
+            mask=(lower<=shift).all(axis=1) & (upper>=shift).all(axis=1)
+            if mask.any():
+                yield mask, numpy.dot(shift, vectors)
 
     # Public
 
@@ -81,18 +134,54 @@ class NeighborSearch(object):
         """
         if not level in entity_levels:
             raise PDBException("%s: Unknown level" % level)
-        self.kdt.search(center, radius)
-        indices=self.kdt.get_indices()
-        n_atom_list=[]
+        indices=self.kdt.query_radius(center, radius)[1]
         atom_list=self.atom_list
-        for i in indices:
-            a=atom_list[i]
-            n_atom_list.append(a)
+        n_atom_list=[atom_list[i] for i in indices]
         if level=="A":
             return n_atom_list
         else:
             return unfold_entities(n_atom_list, level)
 
+    def search_batch(self, centers, radius, cell=None):
+        """Neighbor search for many centers at once.
+
+        Return the atoms within radius of each center as a pair of
+        integer arrays (indptr, indices) in compressed sparse row
+        format: the atoms near centers[k] are the ones in atom_list
+        at indices[indptr[k]:indptr[k+1]], in ascending order.
+
+        If a unit cell is given, the atoms are taken to repeat on its
+        crystal lattice, and an atom is also found when one of its
+        lattice images is within radius of a center. Only the lattice
+        translations are applied, not the space group symmetry
+        operators, so atom_list should hold the whole unit cell contents.
+
+        o centers - Mx3 array of coordinates
+        o radius - float
+        o cell - unit cell, either the lengths and angles (a, b, c,
+        alpha, beta, gamma) as in the CRYST1 record, or a 3x3 array
+        with the lattice vectors as rows (optional)
+        """
+        centers=numpy.asarray(centers, float).reshape((-1, 3))
+        if cell is None:
+            return self.kdt.query_radius(centers, radius)
+        row_list=[numpy.zeros(0, int)]
+        index_list=[numpy.zeros(0, int)]
+        for mask, translation in self._get_shifts(centers, radius, cell):
+            rows=numpy.arange(len(centers))[mask]
+            indptr, indices=self.kdt.query_radius(centers[mask]-translation,
+                                                  radius)
+            row_list.append(numpy.repeat(rows, numpy.diff(indptr)))
+            index_list.append(indices)
+        n=max(len(self.coords), 1)
+        # sorts the hits by center and atom, and merges the atoms found
+        # through more than one lattice image
+        keys=numpy.unique(numpy.concatenate(row_list)*n
+                          +numpy.concatenate(index_list))
+        counts=numpy.bincount(keys//n, minlength=len(centers))
+        indptr=numpy.concatenate(([0], numpy.cumsum(counts)))
+        return indptr, keys%n
+
     def search_all(self, radius, level="A"):
         """All neighbor search.
 
@@ -104,22 +193,56 @@ class NeighborSearch(object):
         """
         if not level in entity_levels:
             raise PDBException("%s: Unknown level" % level)
-        self.kdt.all_search(radius)
-        indices=self.kdt.all_get_indices()
-        atom_list=self.atom_list
-        atom_pair_list=[]
-        for i1, i2 in indices:
-            a1=atom_list[i1]
-            a2=atom_list[i2]
-            atom_pair_list.append((a1, a2))
+        pairs=self._get_all_pairs(radius)
         if level=="A":
             # return atoms
-            return atom_pair_list
-        next_level_pair_list=atom_pair_list
-        for l in ["R", "C", "M", "S"]:
-            next_level_pair_list=self._get_unique_parent_pairs(next_level_pair_list)
-            if level==l:
-                return next_level_pair_list
+            atom_list=self.atom_list
+            return [(atom_list[i1], atom_list[i2]) for i1, i2 in pairs]
+        entity_list, pairs=self._get_parent_pairs(pairs, level)
+        return [(entity_list[i1], entity_list[i2]) for i1, i2 in pairs]
+
+    def contact_map(self, radius, level="R", cell=None):
+        """Contact map between the entities at the given level.
+
+        Return a list with the atoms/residues/chains/models/structures
+        that hold the atoms, in order of first appearance, and a square
+        boolean array that is True where two of them have at least one
+        pair of atoms within radius. An entity is not reported in contact
+        with itself. The cell argument works as in search_batch.
+
+        o radius - float
+        o level - char (A, R, C, M, S)
+        o cell - unit cell (optional)
+        """
+        if not level in entity_levels:
+            raise PDBException("%s: Unknown level" % level)
+        pairs=self._get_all_pairs(radius, cell)
+        entity_list, pairs=self._get_parent_pairs(pairs, level)
+        n=len(entity_list)
+        contacts=numpy.zeros((n, n), bool)
+        contacts[pairs[:, 0], pairs[:, 1]]=True
+        contacts[pairs[:, 1], pairs[:, 0]]=True
+        return entity_list, contacts
+
+
+def _get_cell_vectors(cell):
+    # Return the lattice vectors of a unit cell as the rows of a 3x3
+    # array, using the PDB convention of a along x and b in the xy plane.
+    cell=numpy.asarray(cell, float)
+    if cell.shape==(3, 3):
+        return cell
+    if cell.shape!=(6,):
+        raise PDBException("Expected (a, b, c, alpha, beta, gamma) "
+                           "or a 3x3 array of lattice vectors")
+    a, b, c=cell[:3]
+    cos_alpha, cos_beta, cos_gamma=numpy.cos(numpy.radians(cell[3:]))
+    sin_gamma=numpy.sin(numpy.radians(cell[5]))
+    cx=c*cos_beta
+    cy=c*(cos_alpha-cos_beta*cos_gamma)/sin_gamma
+    cz=numpy.sqrt(c*c-cx*cx-cy*cy)
+    return numpy.array([[a, 0, 0],
+                        [b*cos_gamma, b*sin_gamma, 0],
+                        [cx, cy, cz]])
 
 if __name__=="__main__":
 
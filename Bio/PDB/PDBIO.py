@@ -69,8 +69,12 @@ class PDBIO(object):
     # private mathods
 
     def _get_atom_line(self, atom, hetfield, segid, atom_number, resname,
-                       resseq, icode, chain_id, charge="  "):
-        """Returns an ATOM PDB string (PRIVATE)."""
+                       resseq, icode, chain_id, charge="  ", coord=None):
+        """Returns an ATOM PDB string (PRIVATE).
+
+        The atom's coordinates may be given as a list, to save getting them
+        from the atom.
+        """
         if hetfield!=" ":
             record_type="HETATM"
         else:
@@ -84,7 +88,9 @@ class PDBIO(object):
             element = "  "
         name=atom.get_fullname()
         altloc=atom.get_altloc()
-        x, y, z=atom.get_coord()
+        if coord is None:
+            coord=atom.get_coord()
+        x, y, z=coord
         bfactor=atom.get_bfactor()
         occupancy=atom.get_occupancy()
         try:
@@ -184,6 +190,8 @@ class PDBIO(object):
             # for this model
             model_residues_written=0
             atom_number=1
+            # all the coordinates of the model, as Python floats
+            coords=model._get_coord_array().tolist()
             if model_flag:
                 fp.write("MODEL      %s\n" % model.serial_num)
             for chain in model.get_list():
@@ -204,8 +212,13 @@ class PDBIO(object):
                         if select.accept_atom(atom):
                             chain_residues_written=1
                             model_residues_written=1
+                            if atom._coord_owner is model:
+                                coord=coords[atom._coord_row]
+                            else:
+                                # a row of another Model's array
+                                coord=None
                             s=get_atom_line(atom, hetfield, segid, atom_number, resname,
-                                resseq, icode, chain_id)
+                                resseq, icode, chain_id, coord=coord)
                             fp.write(s)
                             atom_number=atom_number+1
                 if chain_residues_written:
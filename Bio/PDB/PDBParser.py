@@ -21,6 +21,8 @@ from Bio.File import as_handle
 from Bio.PDB.PDBExceptions import PDBConstructionException
 from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
+from Bio.PDB.AtomTable import AtomTable
+
 from Bio.PDB.StructureBuilder import StructureBuilder
 from Bio.PDB.parse_pdb_header import _parse_pdb_header_list
 
@@ -91,6 +93,46 @@ class PDBParser(object):
 
         return structure
 
+    def get_atom_table(self, file):
+        """Return the atoms in a PDB file as an AtomTable.
+
+        This is much faster than get_structure for big files, as no Atom,
+        Residue or Chain objects are made: each field of the ATOM and HETATM
+        records is read into a NumPy array.  A Structure can be built from
+        the table later with build_structure.
+
+        Arguments:
+        o file - name of the PDB file OR an open filehandle
+        """
+        self.header = None
+        self.trailer = None
+        self.line_counter = 0
+        with as_handle(file) as handle:
+            self.header, coords_trailer = self._get_header(handle.readlines())
+        table = self._read_atom_table(coords_trailer)
+        self.trailer = table.trailer
+        return table
+
+    def build_structure(self, id, table):
+        """Build a Structure from an AtomTable made by get_atom_table.
+
+        The coordinates of the atoms are views into table.coord, so the
+        Structure and the table share them - until a Model makes its own
+        coordinate array, e.g. when it is first transformed.
+
+        Arguments:
+        o id - string, the id that will be used for the structure
+        o table - AtomTable
+        """
+        with warnings.catch_warnings():
+            if self.QUIET:
+                warnings.filterwarnings("ignore", category=PDBConstructionWarning)
+            self.structure_builder.init_structure(id)
+            self._build_structure(table)
+            self.structure_builder.set_header(table.header)
+            structure = self.structure_builder.get_structure()
+        return structure
+
     def get_header(self):
         "Return the header."
         return self.header
@@ -127,79 +169,87 @@ class PDBParser(object):
 
     def _parse_coordinates(self, coords_trailer):
         "Parse the atomic data in the PDB file."
-        local_line_counter = 0
+        table = self._read_atom_table(coords_trailer)
+        self._build_structure(table)
+        return table.trailer
+
+    def _read_atom_table(self, coords_trailer):
+        "Read the atomic data into an AtomTable, and move past it."
+        table = AtomTable.from_pdb_lines(coords_trailer, self.line_counter)
+        table.header = self.header
+        self.line_counter += len(coords_trailer) - len(table.trailer)
+        return table
+
+    def _build_structure(self, table):
+        "Pass the atoms in an AtomTable to the StructureBuilder."
         structure_builder = self.structure_builder
-        current_model_id = 0
-        # Flag we have an open model
-        model_open = 0
-        current_chain_id = None
+        set_line_counter = structure_builder.set_line_counter
+        init_atom = structure_builder.init_atom
+        # Python lists are much faster to index than arrays
+        line_counters = table.line.tolist()
+        serial_numbers = table.serial_number.tolist()
+        names = table.name.tolist()
+        fullnames = table.fullname.tolist()
+        altlocs = table.altloc.tolist()
+        resnames = table.resname.tolist()
+        chainids = table.chain_id.tolist()
+        resseqs = table.resseq.tolist()
+        icodes = table.icode.tolist()
+        hetero_flags = table.hetero_flag.tolist()
+        occupancies = table.occupancy.tolist()
+        bfactors = table.bfactor.tolist()
+        segids = table.segid.tolist()
+        elements = table.element.tolist()
+        # Each atom's coordinates are a view into the table's array
+        coords = table.coord
+        anisou = table.anisou
+        if anisou is not None:
+            has_anisou = (~numpy.isnan(anisou[:, 0])).tolist()
+        siguij = table.siguij
+        sigatm = table.sigatm
         current_segid = None
-        current_residue_id = None
-        current_resname = None
-        for i in range(0, len(coords_trailer)):
-            line = coords_trailer[i]
-            record_type = line[0:6]
-            global_line_counter = self.line_counter + local_line_counter + 1
-            structure_builder.set_line_counter(global_line_counter)
-            if record_type == "ATOM  " or record_type == "HETATM":
+        for current_model_id in range(len(table.models)):
+            global_line_counter, model_line, _ = table.models[current_model_id]
+            set_line_counter(global_line_counter)
+            if model_line is None:
                 # Initialize the Model - there was no explicit MODEL record
-                if not model_open:
-                    structure_builder.init_model(current_model_id)
-                    current_model_id += 1
-                    model_open = 1
-                fullname = line[12:16]
-                # get rid of whitespace in atom names
-                split_list = fullname.split()
-                if len(split_list) != 1:
-                    # atom name has internal spaces, e.g. " N B ", so
-                    # we do not strip spaces
-                    name = fullname
-                else:
-                    # atom name is like " CA ", so we can strip spaces
-                    name = split_list[0]
-                altloc = line[16]
-                resname = line[17:20]
-                chainid = line[21]
+                structure_builder.init_model(current_model_id)
+            elif isinstance(model_line, int):
+                # The model number of an mmCIF file
+                structure_builder.init_model(current_model_id, model_line)
+            else:
                 try:
-                    serial_number = int(line[6:11])
+                    serial_num = int(model_line[10:14])
                 except:
-                    serial_number = 0
-                resseq = int(line[22:26].split()[0])  # sequence identifier
-                icode = line[26]  # insertion code
-                if record_type == "HETATM":  # hetero atom flag
-                    if resname == "HOH" or resname == "WAT":
-                        hetero_flag = "W"
-                    else:
-                        hetero_flag = "H"
-                else:
-                    hetero_flag = " "
+                    self._handle_PDB_exception("Invalid or missing model serial number",
+                                               global_line_counter)
+                    serial_num = 0
+                structure_builder.init_model(current_model_id, serial_num)
+            current_chain_id = None
+            current_residue_id = None
+            current_resname = None
+            atoms = table.get_model_slice(current_model_id)
+            for i in range(atoms.start, atoms.stop):
+                global_line_counter = line_counters[i]
+                set_line_counter(global_line_counter)
+                resname = resnames[i]
+                chainid = chainids[i]
+                resseq = resseqs[i]
+                icode = icodes[i]
+                hetero_flag = hetero_flags[i]
                 residue_id = (hetero_flag, resseq, icode)
-                # atomic coordinates
-                try:
-                    x = float(line[30:38])
-                    y = float(line[38:46])
-                    z = float(line[46:54])
-                except:
-                    # Should we allow parsing to continue in permissive mode?
-                    # If so, what coordinates should we default to?  Easier to abort!
-                    raise PDBConstructionException("Invalid or missing coordinate(s) at line %i."
-                                                   % global_line_counter)
-                coord = numpy.array((x, y, z), "f")
                 # occupancy & B factor
-                try:
-                    occupancy = float(line[54:60])
-                except:
+                occupancy = occupancies[i]
+                if occupancy != occupancy:
                     self._handle_PDB_exception("Invalid or missing occupancy",
                                                global_line_counter)
                     occupancy = None # Rather than arbitrary zero or one
-                try:
-                    bfactor = float(line[60:66])
-                except:
+                bfactor = bfactors[i]
+                if bfactor != bfactor:
                     self._handle_PDB_exception("Invalid or missing B factor",
                                                global_line_counter)
                     bfactor = 0.0  # The PDB use a default of zero if the data is missing
-                segid = line[72:76]
-                element = line[76:78].strip()
+                segid = segids[i]
                 if current_segid != segid:
                     current_segid = segid
                     structure_builder.init_seg(current_segid)
@@ -221,53 +271,17 @@ class PDBParser(object):
                         self._handle_PDB_exception(message, global_line_counter)
                 # init atom
                 try:
-                    structure_builder.init_atom(name, coord, bfactor, occupancy, altloc,
-                                                fullname, serial_number, element)
+                    init_atom(names[i], coords[i], bfactor, occupancy, altlocs[i],
+                              fullnames[i], serial_numbers[i], elements[i])
                 except PDBConstructionException as message:
                     self._handle_PDB_exception(message, global_line_counter)
-            elif record_type == "ANISOU":
-                anisou = [float(x) for x in (line[28:35], line[35:42], line[43:49],
-                                             line[49:56], line[56:63], line[63:70])]
-                # U's are scaled by 10^4
-                anisou_array = (numpy.array(anisou, "f") / 10000.0).astype("f")
-                structure_builder.set_anisou(anisou_array)
-            elif record_type == "MODEL ":
-                try:
-                    serial_num = int(line[10:14])
-                except:
-                    self._handle_PDB_exception("Invalid or missing model serial number",
-                                               global_line_counter)
-                    serial_num = 0
-                structure_builder.init_model(current_model_id, serial_num)
-                current_model_id += 1
-                model_open = 1
-                current_chain_id = None
-                current_residue_id = None
-            elif record_type == "END   " or record_type == "CONECT":
-                # End of atomic data, return the trailer
-                self.line_counter += local_line_counter
-                return coords_trailer[local_line_counter:]
-            elif record_type == "ENDMDL":
-                model_open = 0
-                current_chain_id = None
-                current_residue_id = None
-            elif record_type == "SIGUIJ":
-                # standard deviation of anisotropic B factor
-                siguij = [float(x) for x in (line[28:35], line[35:42], line[42:49],
-                                             line[49:56], line[56:63], line[63:70])]
-                # U sigma's are scaled by 10^4
-                siguij_array = (numpy.array(siguij, "f") / 10000.0).astype("f")
-                structure_builder.set_siguij(siguij_array)
-            elif record_type == "SIGATM":
-                # standard deviation of atomic positions
-                sigatm = [float(x) for x in (line[30:38], line[38:45], line[46:54],
-                                             line[54:60], line[60:66])]
-                sigatm_array = numpy.array(sigatm, "f")
-                structure_builder.set_sigatm(sigatm_array)
-            local_line_counter += 1
-        # EOF (does not end in END or CONECT)
-        self.line_counter = self.line_counter + local_line_counter
-        return []
+                # any ANISOU, SIGUIJ and SIGATM records after the atom
+                if anisou is not None and has_anisou[i]:
+                    structure_builder.set_anisou(anisou[i])
+                if i in siguij:
+                    structure_builder.set_siguij(siguij[i])
+                if i in sigatm:
+                    structure_builder.set_sigatm(sigatm[i])
 
     def _handle_PDB_exception(self, message, line_counter):
         """
@@ -0,0 +1,260 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Read the models of a multi-model PDB file one at a time.
+
+An NMR ensemble or a series of snapshots from a simulation is one PDB
+file with many MODEL ... ENDMDL blocks, all with the same atoms.  The
+PDBParser builds Atom, Residue and Chain objects for every model and
+needs the whole file in memory; a PDBTrajectory instead finds where each
+model starts in one pass through the file, reads the atoms of the first
+model as the topology (an AtomTable), and then reads the coordinates of
+any model as an Nx3 array when it is asked for:
+
+    >>> from Bio.PDB.PDBTrajectory import PDBTrajectory
+    >>> trajectory = PDBTrajectory("PDB/1MOT.pdb")
+    >>> len(trajectory), trajectory.n_atoms
+    (20, 408)
+    >>> print(trajectory.topology.name[0] + " " + trajectory.topology.resname[0])
+    N ALA
+    >>> trajectory[3].shape
+    (408, 3)
+    >>> trajectory[0:20:5].shape
+    (4, 408, 3)
+
+Iterating over the trajectory reads the models in turn, keeping just one
+in memory at a time.
+"""
+
+import copy
+import re
+
+import numpy
+
+from Bio._py3k import range
+
+from Bio.PDB.AtomTable import AtomTable, _ATOM_RECORDS, _as_matrix, _to_float
+from Bio.PDB.PDBExceptions import PDBConstructionException
+from Bio.PDB.PDBParser import PDBParser
+from Bio.PDB.parse_pdb_header import _parse_pdb_header_list
+
+
+# MODEL and ENDMDL records, and the END or CONECT record ending the
+# atomic data, with or without anything after the record name
+_MODEL_RECORDS = re.compile(br"^(?:MODEL|ENDMDL|END|CONECT)(?=\s|$)", re.M)
+_FIRST_ATOM = re.compile(br"^(?:ATOM  |HETATM)", re.M)
+
+# Columns of the atom and residue names, chain and residue number, which
+# must be the same in every model
+_ATOM_IDS = slice(12, 27)
+
+
+def _scan(handle, pattern, chunk_size=1 << 22):
+    """Find the lines of a binary file starting with pattern (PRIVATE).
+
+    Yield the offset, the line number and the matched text of each line,
+    reading the file a chunk at a time.
+    """
+    base = 0
+    number = 1
+    rest = b""
+    while True:
+        chunk = handle.read(chunk_size)
+        data = rest + chunk
+        if chunk:
+            # only whole lines
+            end = data.rfind(b"\n") + 1
+        else:
+            end = len(data)
+        done = 0
+        for match in pattern.finditer(data, 0, end):
+            number += data.count(b"\n", done, match.start())
+            done = match.start()
+            yield base + done, number, match.group()
+        number += data.count(b"\n", done, end)
+        rest = data[end:]
+        base += end
+        if not chunk:
+            break
+
+
+def _split_lines(text):
+    """Split a block of the file into its lines (PRIVATE)."""
+    if not isinstance(text, str):
+        # Python 3
+        text = text.decode("latin-1")
+    return text.split("\n")
+
+
+class PDBTrajectory(object):
+    """The models of a PDB file, as coordinate arrays sharing one topology.
+
+    Attributes:
+     - topology - AtomTable of the atoms of the first model, with the
+       header of the file
+     - n_atoms - the number of atoms in each model
+
+    Indexing with an integer returns the coordinates of that model as an
+    Nx3 float32 array, and with a slice a KxNx3 array of the coordinates
+    of K models (as used by Bio.PDB.Superimposer.rms_matrix).  Every model
+    must have the same ATOM and HETATM records (the same atom and residue
+    names, chains and residue numbers), in the same order, or a
+    PDBConstructionException is raised when it is read.  As in the
+    PDBParser, atoms outside of a MODEL ... ENDMDL block start a model of
+    their own, so a file without MODEL records has a single model.
+    """
+
+    def __init__(self, filename):
+        """Find the models in the file and read the first one.
+
+        Arguments:
+         - filename - name of the PDB file (which stays open only while
+           models are being read)
+        """
+        self.filename = filename
+        # (offset, end offset, line number) of each model
+        self._models = []
+        with open(filename, "rb") as handle:
+            records = list(_scan(handle, _MODEL_RECORDS))
+            stop = handle.tell()
+            # As in the PDBParser, a model starts at a MODEL record, or at
+            # an atom outside of any MODEL ... ENDMDL block
+            model = None
+            gap = (0, 1)
+            for offset, number, record in records:
+                if record.startswith(b"MODEL"):
+                    if model is not None:
+                        self._models.append((model[0], offset, model[1]))
+                    elif gap is not None:
+                        self._add_implicit_model(handle, gap, offset)
+                    model = (offset, number)
+                    gap = None
+                elif record == b"ENDMDL":
+                    if model is not None:
+                        self._models.append((model[0], offset, model[1]))
+                    elif gap is not None:
+                        self._add_implicit_model(handle, gap, offset)
+                    model = None
+                    gap = (offset, number)
+                else:
+                    # END or CONECT
+                    stop = offset
+                    break
+            if model is not None:
+                self._models.append((model[0], stop, model[1]))
+            elif gap is not None:
+                self._add_implicit_model(handle, gap, stop)
+
+            self._atom_ids = None
+            if self._models:
+                offset, end, number = self._models[0]
+                handle.seek(0)
+                header = _split_lines(handle.read(offset))[:-1]
+                lines = _split_lines(handle.read(end - offset))
+                self.topology = AtomTable.from_pdb_lines(lines, number - 1)
+                atoms = [line for line in lines if line[0:6] in _ATOM_RECORDS]
+                if atoms:
+                    self._atom_ids = _as_matrix(atoms)[:, _ATOM_IDS].copy()
+            else:
+                handle.seek(0)
+                header = _split_lines(handle.read())
+                self.topology = AtomTable()
+        self.topology.header = _parse_pdb_header_list(header)
+        self.topology.trailer = []
+        self.n_atoms = len(self.topology)
+
+    def __len__(self):
+        """Return the number of models."""
+        return len(self._models)
+
+    def __getitem__(self, index):
+        """Return the coordinates of a model, or of a slice of models."""
+        if isinstance(index, slice):
+            indices = range(*index.indices(len(self)))
+            coords = numpy.empty((len(indices), self.n_atoms, 3), "f")
+            with open(self.filename, "rb") as handle:
+                for i, k in enumerate(indices):
+                    coords[i] = self._read_coord(handle, k)[1]
+            return coords
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Model index out of range")
+        with open(self.filename, "rb") as handle:
+            return self._read_coord(handle, index)[1]
+
+    def __iter__(self):
+        """Iterate over the coordinates of the models, reading one at a time."""
+        with open(self.filename, "rb") as handle:
+            for index in range(len(self)):
+                yield self._read_coord(handle, index)[1]
+
+    def get_structure(self, id, index=0):
+        """Build a Structure with the atoms of the topology in one model.
+
+        Arguments:
+         - id - string, the id that will be used for the structure
+         - index - the index of the model in the file
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Model index out of range")
+        with open(self.filename, "rb") as handle:
+            record, coord = self._read_coord(handle, index)
+        table = copy.copy(self.topology)
+        table.coord = coord
+        table.models = [(self._models[index][2], record, 0)]
+        return PDBParser().build_structure(id, table)
+
+    def _add_implicit_model(self, handle, gap, end):
+        """Add a model for any atoms outside a MODEL record's block (PRIVATE).
+
+        Arguments:
+         - handle - the open file
+         - gap - the offset and line number where the region starts
+         - end - the offset where the region ends
+        """
+        offset, number = gap
+        handle.seek(offset)
+        text = handle.read(end - offset)
+        match = _FIRST_ATOM.search(text)
+        if match is not None:
+            number += text.count(b"\n", 0, match.start())
+            self._models.append((offset + match.start(), end, number))
+
+    def _read_coord(self, handle, index):
+        """Read the coordinates of a model from the open file (PRIVATE).
+
+        Return the MODEL record (None if there was none) and the Nx3
+        array of coordinates.
+        """
+        offset, end, number = self._models[index]
+        handle.seek(offset)
+        lines = _split_lines(handle.read(end - offset))
+        rows = [i for (i, line) in enumerate(lines)
+                if line[0:6] in _ATOM_RECORDS]
+        if len(rows) != self.n_atoms:
+            raise PDBConstructionException(
+                "Model at line %i has %i atoms instead of %i."
+                % (number, len(rows), self.n_atoms))
+        if lines[0][0:6] == "MODEL ":
+            record = lines[0]
+        else:
+            record = None
+        if not rows:
+            return record, numpy.zeros((0, 3), "f")
+        chars = _as_matrix([lines[i] for i in rows])
+        numbers = numpy.array(rows) + number
+        differ = (chars[:, _ATOM_IDS] != self._atom_ids).any(axis=1)
+        if differ.any():
+            raise PDBConstructionException(
+                "Atom at line %i is not the same as in the first model."
+                % numbers[numpy.flatnonzero(differ)[0]])
+        message = "Invalid or missing coordinate(s)"
+        coord = numpy.column_stack(
+            [_to_float(chars, start, start + 8, numbers, message)
+             for start in (30, 38, 46)]).astype("f")
+        return record, coord
@@ -5,7 +5,7 @@
 
 # My Stuff
 from Bio.PDB.PDBExceptions import PDBConstructionException
-from Bio.PDB.Entity import Entity, DisorderedEntityWrapper
+from Bio.PDB.Entity import Entity, DisorderedEntityWrapper, _changed
 
 
 """Residue class, used by Structure objects."""
@@ -84,6 +84,7 @@ class Residue(Entity):
 
     def sort(self):
         self.child_list.sort(self._sort)
+        _changed(self)
 
     def flag_disordered(self):
         "Set the disordered flag."
@@ -160,3 +161,4 @@ class DisorderedResidue(DisorderedEntityWrapper):
         assert(not self.disordered_has_id(resname))
         self[resname]=residue
         self.disordered_select(resname)
+        _changed(chain)
@@ -9,8 +9,10 @@ from __future__ import print_function
 
 import itertools
 
+import numpy
+
 from Bio.PDB.Atom import Atom
-from Bio.PDB.Entity import Entity
+from Bio.PDB.Entity import Entity, _atom_rows
 from Bio.PDB.PDBExceptions import PDBException
 
 
@@ -78,6 +80,24 @@ def unfold_entities(entity_list, target_level):
     return list(entity_list)
 
 
+def get_coords(atom_list):
+    """Return the coordinates of a list of atoms as an N x 3 array.
+
+    The coordinates are taken from the arrays shared by the atoms of each
+    Model (see Entity), a whole Model at a time rather than atom by atom.
+    """
+    coords = numpy.zeros((len(atom_list), 3))
+    groups, loose = _atom_rows(atom_list)
+    if groups:
+        coords = coords.astype(numpy.result_type(*[array for (_, array, _, _)
+                                                   in groups]))
+    for _, array, rows, positions in groups:
+        coords[positions] = array[rows]
+    for position in loose:
+        coords[position] = atom_list[position].get_coord()
+    return coords
+
+
 def _test():
     """Run the Bio.PDB.Selection module's doctests (PRIVATE)."""
     import doctest
@@ -3,14 +3,16 @@
 # license.  Please see the LICENSE file that should have been included
 # as part of this package.
 
-"""Superimpose two structures."""
+"""Superimpose two structures, or find the RMSD between many."""
 
 from __future__ import print_function
 
 import numpy
 
 from Bio.SVDSuperimposer import SVDSuperimposer
+from Bio.PDB.Entity import Entity, _atom_rows, _transform_rows
 from Bio.PDB.PDBExceptions import PDBException
+from Bio.PDB.Selection import get_coords
 
 
 class Superimposer(object):
@@ -33,12 +35,8 @@ class Superimposer(object):
         """
         if not (len(fixed)==len(moving)):
             raise PDBException("Fixed and moving atom lists differ in size")
-        l=len(fixed)
-        fixed_coord=numpy.zeros((l, 3))
-        moving_coord=numpy.zeros((l, 3))
-        for i in range(0, len(fixed)):
-            fixed_coord[i]=fixed[i].get_coord()
-            moving_coord[i]=moving[i].get_coord()
+        fixed_coord=get_coords(fixed).astype(float)
+        moving_coord=get_coords(moving).astype(float)
         sup=SVDSuperimposer()
         sup.set(fixed_coord, moving_coord)
         sup.run()
@@ -47,15 +45,267 @@ class Superimposer(object):
 
     def apply(self, atom_list):
         """
-        Rotate/translate a list of atoms.
+        Rotate/translate a list of atoms, or all the atoms of an Entity.
+
+        The atoms of each Model are moved together, into a new shared
+        coordinate array (see Entity).
         """
         if self.rotran is None:
             raise PDBException("No transformation has been calculated yet")
         rot, tran=self.rotran
         rot=rot.astype('f')
         tran=tran.astype('f')
-        for atom in atom_list:
-            atom.transform(rot, tran)
+        if isinstance(atom_list, Entity):
+            atom_list.transform(rot, tran)
+            return
+        groups, loose=_atom_rows(atom_list)
+        for owner, array, rows, positions in groups:
+            _transform_rows(owner, rows, rot, tran)
+        for position in loose:
+            atom_list[position].transform(rot, tran)
+
+
+def rms_matrix(coords, processes=None, tile_size=256, out=None):
+    """Return the RMSD after optimal superposition of every pair of frames.
+
+    The frames are given as a KxNx3 array, e.g. the coordinates of the
+    same N atoms in K models of an NMR structure or frames of a
+    trajectory. The RMSDs are found from the cross-covariance matrices
+    with the quaternion characteristic polynomial method of Theobald
+    (Acta Cryst. A61:478-480, 2005), which gives the same RMSD as
+    SVDSuperimposer without calculating the rotations. For degenerate
+    pairs (e.g. collinear atoms, or just two atoms), where that method
+    loses precision, the eigenvalues of the 4x4 key matrices are found
+    with numpy.linalg.eigvalsh instead. Both find the RMSD from the
+    difference of two nearly equal sums for (nearly) identical frames,
+    so the RMSDs of pairs which fit within about 1e-4 of the size of the
+    frames are calculated from the superimposed coordinates, as in
+    SVDSuperimposer. The pairs are
+    handled in tiles of tile_size x tile_size frames at a time, which
+    can be shared out over several processes (using the multiprocessing
+    module).
+
+    The result is a one dimensional array of length K*(K-1)/2 with the
+    lower triangle of the distance matrix, row by row, i.e. the RMSDs of
+    frames (1, 0), (2, 0), (2, 1), (3, 0)... This is the distance matrix
+    format that Bio.Cluster accepts (e.g. for treecluster or kmedoids).
+    The RMSD of frames i and j, with i > j, is at position
+    i*(i-1)/2 + j.
+
+    o coords - KxNx3 array of coordinates
+    o processes - number of processes to use (default one)
+    o tile_size - number of frames in each tile
+    o out - array of length K*(K-1)/2 to store the RMSDs in (e.g. a
+    numpy.memmap for very many frames), by default a new array
+    """
+    coords = numpy.asarray(coords, float)
+    if coords.ndim != 3 or coords.shape[2] != 3:
+        raise ValueError("Expected a KxNx3 array of coordinates")
+    if tile_size < 1:
+        raise ValueError("tile_size must be at least 1")
+    k = len(coords)
+    size = k * (k - 1) // 2
+    if out is None:
+        out = numpy.empty(size)
+    elif out.shape != (size,):
+        raise ValueError("Expected out to be an array of length %i" % size)
+    tiles = [(i, j) for i in range(0, k, tile_size)
+             for j in range(0, i + 1, tile_size)]
+    if not processes or processes < 2 or len(tiles) < 2:
+        _init_rms_worker(coords, tile_size)
+        try:
+            for tile in tiles:
+                _store_rms_tile(out, _rms_worker_tile(tile))
+        finally:
+            _rms_worker.clear()
+        return out
+
+    from multiprocessing import Pool
+    pool = Pool(processes, _init_rms_worker, (coords, tile_size))
+    try:
+        # store each tile as soon as it is done
+        for result in pool.imap_unordered(_rms_worker_tile, tiles):
+            _store_rms_tile(out, result)
+    finally:
+        pool.terminate()
+        pool.join()
+    return out
+
+
+# The polynomial is evaluated with a rounding error of about the machine
+# precision times e0**4, which moves the root by that over its slope.  If
+# this is more than _DEGENERATE times e0**4 over the slope and e0 minus
+# the root (i.e. a relative error in the RMSD of more than about 1e-9),
+# _qcp_rms uses the key matrix instead.
+_DEGENERATE = 1e-7
+
+# e0 minus the root has a rounding error of about the machine precision
+# times e0, so an RMSD found from it is off by up to about the square root
+# of that over n (e.g. 1e-8 instead of 0 for identical frames).  Pairs
+# where e0 minus the root is below _CLOSE times e0 are superimposed, to
+# find their RMSD from the coordinates instead.
+_CLOSE = 1e-8
+
+# The most coordinates held at once while superimposing close pairs
+_CLOSE_BLOCK = 1 << 20
+
+# Centered coordinates and their sums of squares, set up in each process
+# that calculates RMSDs for rms_matrix
+_rms_worker = {}
+
+
+def _init_rms_worker(coords, tile_size):
+    """Set up a process for rms_matrix (PRIVATE)."""
+    coords = coords - coords.mean(axis=1)[:, None, :]
+    _rms_worker["coords"] = coords
+    _rms_worker["squares"] = (coords * coords).sum(axis=(1, 2))
+    _rms_worker["tile_size"] = tile_size
+
+
+def _rms_worker_tile(tile):
+    """Calculate the RMSDs of a tile of frames in a process (PRIVATE).
+
+    Return the first frame of the rows and columns, and the RMSDs.
+    """
+    i, j = tile
+    size = _rms_worker["tile_size"]
+    coords = _rms_worker["coords"]
+    squares = _rms_worker["squares"]
+    a = coords[i:i + size]
+    b = coords[j:j + size]
+    n = coords.shape[1]
+    # all the 3x3 cross-covariance matrices in one matrix product
+    r = numpy.dot(a.transpose(0, 2, 1).reshape(-1, n),
+                  b.transpose(1, 0, 2).reshape(n, -1))
+    r = r.reshape(len(a), 3, len(b), 3).transpose(0, 2, 1, 3).reshape(-1, 3, 3)
+    e0 = 0.5 * (squares[i:i + size, None] + squares[None, j:j + size])
+    e0 = e0.ravel()
+    rms = _qcp_rms(r, e0, n)
+    close = numpy.flatnonzero(0.5 * n * rms * rms <= _CLOSE * e0)
+    step = max(1, _CLOSE_BLOCK // max(n, 1))
+    for start in range(0, len(close), step):
+        pairs = close[start:start + step]
+        rows, columns = divmod(pairs, len(b))
+        rms[pairs] = _superimposed_rms(a[rows], b[columns], r[pairs])
+    return i, j, rms.reshape(len(a), len(b))
+
+
+def _store_rms_tile(out, result):
+    """Copy the lower triangle part of a tile into a condensed matrix (PRIVATE).
+    """
+    i, j, rms = result
+    for row in range(len(rms)):
+        k = i + row
+        columns = min(len(rms[row]), k - j)
+        if columns > 0:
+            start = k * (k - 1) // 2 + j
+            out[start:start + columns] = rms[row, :columns]
+
+
+def _qcp_rms(r, e0, n, precision=1e-11, iterations=50):
+    """Find the minimal RMSDs for many cross-covariance matrices (PRIVATE).
+
+    The largest eigenvalue of the key matrix of each pair is found by
+    Newton's method from the characteristic polynomial (Theobald 2005,
+    with the coefficients from Liu et al. 2010), starting at e0, half
+    the sum of the squares of the centered coordinates.  Pairs for which
+    this is not accurate (see _DEGENERATE) are done with eigvalsh.
+
+    o r - Mx3x3 array of cross-covariance matrices
+    o e0 - array of M upper bounds of the eigenvalues
+    o n - number of atoms
+    """
+    sxx, sxy, sxz = r[:, 0, 0], r[:, 0, 1], r[:, 0, 2]
+    syx, syy, syz = r[:, 1, 0], r[:, 1, 1], r[:, 1, 2]
+    szx, szy, szz = r[:, 2, 0], r[:, 2, 1], r[:, 2, 2]
+    sxx2, syy2, szz2 = sxx * sxx, syy * syy, szz * szz
+    sxy2, syz2, sxz2 = sxy * sxy, syz * syz, sxz * sxz
+    syx2, szy2, szx2 = syx * syx, szy * szy, szx * szx
+    syzszymsyyszz2 = 2.0 * (syz * szy - syy * szz)
+    sxx2syy2szz2syz2szy2 = syy2 + szz2 - sxx2 + syz2 + szy2
+    c2 = -2.0 * (sxx2 + syy2 + szz2 + sxy2 + syx2 + sxz2 + szx2 + syz2 + szy2)
+    c1 = 8.0 * (sxx * syz * szy + syy * szx * sxz + szz * sxy * syx -
+                sxx * syy * szz - syz * szx * sxy - szy * syx * sxz)
+    sxzpszx, syzpszy, sxypsyx = sxz + szx, syz + szy, sxy + syx
+    syzmszy, sxzmszx, sxymsyx = syz - szy, sxz - szx, sxy - syx
+    sxxpsyy, sxxmsyy = sxx + syy, sxx - syy
+    sxy2sxz2syx2szx2 = sxy2 + sxz2 - syx2 - szx2
+    c0 = (sxy2sxz2syx2szx2 * sxy2sxz2syx2szx2 +
+          (sxx2syy2szz2syz2szy2 + syzszymsyyszz2) *
+          (sxx2syy2szz2syz2szy2 - syzszymsyyszz2) +
+          (-sxzpszx * syzmszy + sxymsyx * (sxxmsyy - szz)) *
+          (-sxzmszx * syzpszy + sxymsyx * (sxxmsyy + szz)) +
+          (-sxzpszx * syzpszy - sxypsyx * (sxxpsyy - szz)) *
+          (-sxzmszx * syzmszy - sxypsyx * (sxxpsyy + szz)) +
+          (sxypsyx * syzpszy + sxzpszx * (sxxmsyy + szz)) *
+          (-sxymsyx * syzmszy + sxzpszx * (sxxpsyy + szz)) +
+          (sxypsyx * syzmszy + sxzmszx * (sxxmsyy - szz)) *
+          (-sxymsyx * syzpszy + sxzmszx * (sxxpsyy - szz)))
+    eigenvalue = e0.copy()
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        for i in range(iterations):
+            x2 = eigenvalue * eigenvalue
+            b = (x2 + c2) * eigenvalue
+            a = b + c1
+            delta = (a * eigenvalue + c0) / (2.0 * x2 * eigenvalue + b + a)
+            # e.g. all atoms at the same place
+            delta[~numpy.isfinite(delta)] = 0.0
+            eigenvalue -= delta
+            converged = numpy.abs(delta) <= precision * numpy.abs(eigenvalue)
+            if converged.all():
+                break
+    # Near a double root (e.g. for collinear atoms, which fit as well
+    # after any rotation about their line) Newton's method converges
+    # slowly, and the polynomial can't be evaluated accurately enough to
+    # find the root precisely, so use the key matrices themselves
+    slope = (4.0 * eigenvalue * eigenvalue + 2.0 * c2) * eigenvalue + c1
+    scale = e0 * e0
+    redo = ~converged | (numpy.abs(slope * (e0 - eigenvalue)) <=
+                         _DEGENERATE * scale * scale)
+    if redo.any():
+        eigenvalue[redo] = numpy.linalg.eigvalsh(_key_matrices(r[redo]))[:, -1]
+    return numpy.sqrt(numpy.abs(2.0 * (e0 - eigenvalue) / n))
+
+
+def _superimposed_rms(a, b, r):
+    """Find the RMSDs by superimposing pairs of centered frames (PRIVATE).
+
+    The rotations are found from the singular value decompositions of the
+    cross-covariance matrices, as in SVDSuperimposer.
+
+    o a, b - MxNx3 arrays of the centered coordinates of the frames
+    o r - Mx3x3 array of their cross-covariance matrices
+    """
+    u, s, vt = numpy.linalg.svd(r)
+    # a rotation, not a reflection
+    sign = numpy.sign(numpy.linalg.det(u) * numpy.linalg.det(vt))
+    u[:, :, 2] *= sign[:, None]
+    rotation = numpy.einsum("kij,kjl->kil", u, vt)
+    diff = numpy.einsum("kni,kij->knj", a, rotation) - b
+    return numpy.sqrt((diff * diff).sum(axis=2).mean(axis=1))
+
+
+def _key_matrices(r):
+    """Return the 4x4 key matrices for many cross-covariance matrices (PRIVATE).
+
+    The largest eigenvalue of the key matrix of a pair of frames gives
+    their minimal RMSD, as in _qcp_rms.
+    """
+    sxx, sxy, sxz = r[:, 0, 0], r[:, 0, 1], r[:, 0, 2]
+    syx, syy, syz = r[:, 1, 0], r[:, 1, 1], r[:, 1, 2]
+    szx, szy, szz = r[:, 2, 0], r[:, 2, 1], r[:, 2, 2]
+    k = numpy.empty((len(r), 4, 4))
+    k[:, 0, 0] = sxx + syy + szz
+    k[:, 1, 1] = sxx - syy - szz
+    k[:, 2, 2] = -sxx + syy - szz
+    k[:, 3, 3] = -sxx - syy + szz
+    k[:, 0, 1] = k[:, 1, 0] = syz - szy
+    k[:, 0, 2] = k[:, 2, 0] = szx - sxz
+    k[:, 0, 3] = k[:, 3, 0] = sxy - syx
+    k[:, 1, 2] = k[:, 2, 1] = sxy + syx
+    k[:, 1, 3] = k[:, 3, 1] = szx + sxz
+    k[:, 2, 3] = k[:, 3, 2] = syz + szy
+    return k
 
 
 if __name__=="__main__":
@@ -21,6 +21,9 @@ except:
     # Not compiled I guess
     pass
 
+# Read the models of a multi-model PDB file one at a time
+from .PDBTrajectory import PDBTrajectory
+
 # Download from the PDB
 from .PDBList import PDBList
 
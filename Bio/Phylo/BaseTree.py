@@ -15,6 +15,7 @@ from Bio._py3k import filter
 from Bio._py3k import basestring
 from Bio._py3k import unicode
 
+import array
 import collections
 import copy
 import itertools
@@ -36,25 +37,32 @@ def _level_traverse(root, get_children):
 
 
 def _preorder_traverse(root, get_children):
-    """Traverse a tree in depth-first pre-order (parent before children)."""
-    def dfs(elem):
-        yield elem
-        for v in get_children(elem):
-            for u in dfs(v):
-                yield u
-    for elem in dfs(root):
-        yield elem
+    """Traverse a tree in depth-first pre-order (parent before children).
+
+    An explicit stack of child iterators is used instead of recursion, so
+    deep (e.g. caterpillar) trees don't hit the recursion limit, and each
+    element is yielded in constant time.
+    """
+    yield root
+    stack = [iter(get_children(root))]
+    while stack:
+        for elem in stack[-1]:
+            yield elem
+            stack.append(iter(get_children(elem)))
+            break
+        else:
+            stack.pop()
 
 
 def _postorder_traverse(root, get_children):
     """Traverse a tree in depth-first post-order (children before parent)."""
-    def dfs(elem):
-        for v in get_children(elem):
-            for u in dfs(v):
-                yield u
-        yield elem
-    for elem in dfs(root):
-        yield elem
+    stack = [(root, iter(get_children(root)))]
+    while stack:
+        for elem in stack[-1][1]:
+            stack.append((elem, iter(get_children(elem))))
+            break
+        else:
+            yield stack.pop()[0]
 
 
 def _sorted_attrs(elem):
@@ -364,24 +372,40 @@ class TreeMixin(object):
             given target, but excluding the root clade.
         """
         # Only one path will work -- ignore weights and visits
-        path = []
         match = _combine_matchers(target, kwargs, True)
+        if match(self.root):
+            return []
+        # Depth-first search, keeping the clades above the current one
+        path = []
+        stack = [iter(self.root)]
+        while stack:
+            for child in stack[-1]:
+                if match(child):
+                    path.append(child)
+                    return path
+                if not child.is_terminal():
+                    path.append(child)
+                    stack.append(iter(child))
+                    break
+            else:
+                stack.pop()
+                if path:
+                    path.pop()
+        return None
 
-        def check_in_path(v):
-            if match(v):
-                path.append(v)
-                return True
-            elif v.is_terminal():
-                return False
-            for child in v:
-                if check_in_path(child):
-                    path.append(v)
-                    return True
-            return False
+    def _get_paths(self, targets):
+        """List the paths to several targets (PRIVATE).
 
-        if not check_in_path(self.root):
-            return None
-        return path[-2::-1]
+        Raises a ValueError if any target is not in this tree.
+        """
+        paths = []
+        for target in targets:
+            path = self.get_path(target)
+            if path is None:
+                raise ValueError("target %s is not in this tree"
+                                 % repr(target))
+            paths.append(path)
+        return paths
 
     def get_nonterminals(self, order='preorder'):
         """Get a list of all of this tree's nonterminal (internal) nodes."""
@@ -411,12 +435,7 @@ class TreeMixin(object):
         - If 1 target is given, returns the target
         - If any target is not found in this tree, raises a ValueError
         """
-        paths = [self.get_path(t)
-                 for t in _combine_args(targets, *more_targets)]
-        # Validation -- otherwise izip throws a spooky error below
-        for p, t in zip(paths, targets):
-            if p is None:
-                raise ValueError("target %s is not in this tree" % repr(t))
+        paths = self._get_paths(_combine_args(targets, *more_targets))
         mrca = self.root
         for level in zip(*paths):
             ref = level[0]
@@ -451,26 +470,45 @@ class TreeMixin(object):
         else:
             depth_of = lambda c: c.branch_length or 0
         depths = {}
-
-        def update_depths(node, curr_depth):
+        # Fill in the clades in preorder, without recursion
+        stack = [(self.root, self.root.branch_length or 0)]
+        while stack:
+            node, curr_depth = stack.pop()
             depths[node] = curr_depth
-            for child in node.clades:
-                new_depth = curr_depth + depth_of(child)
-                update_depths(child, new_depth)
-
-        update_depths(self.root, self.root.branch_length or 0)
+            for child in reversed(node.clades):
+                stack.append((child, curr_depth + depth_of(child)))
         return depths
 
     def distance(self, target1, target2=None):
         """Calculate the sum of the branch lengths between two targets.
 
         If only one target is specified, the other is the root of this tree.
+
+        For many distances in the same tree, use `build_index` instead.
         """
         if target2 is None:
             return sum(n.branch_length for n in self.get_path(target1)
                        if n.branch_length is not None)
-        mrca = self.common_ancestor(target1, target2)
-        return mrca.distance(target1) + mrca.distance(target2)
+        path1, path2 = self._get_paths([target1, target2])
+        # Skip the clades above the common ancestor
+        shared = 0
+        for clade1, clade2 in zip(path1, path2):
+            if clade1 is not clade2:
+                break
+            shared += 1
+        return (sum(n.branch_length for n in path1[shared:]
+                    if n.branch_length is not None) +
+                sum(n.branch_length for n in path2[shared:]
+                    if n.branch_length is not None))
+
+    def build_index(self):
+        """Index the clades of this tree for fast repeated queries.
+
+        The index is a snapshot: it must be rebuilt if the tree is changed.
+
+        :returns: a `TreeIndex` of the clades below this root.
+        """
+        return TreeIndex(self)
 
     def is_bifurcating(self):
         """Return True if tree downstream of node is strictly bifurcating.
@@ -1060,6 +1098,201 @@ class Clade(TreeElement, TreeMixin):
     color = property(_get_color, _set_color, doc="Branch color.")
 
 
+def _range_minima(values):
+    """Build a sparse table of minima over ranges of values (PRIVATE).
+
+    Row k holds the minimum of ``values[i:i + 2**k]`` at position i, so
+    the minimum of any range is the smaller of two overlapping entries
+    from one row. NumPy is used if it is installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is None:
+        rows = [array.array('l', values)]
+    else:
+        rows = [numpy.array(values, numpy.intp)]
+    width = 1
+    while 2 * width <= len(values):
+        prev = rows[-1]
+        if numpy is None:
+            rows.append(array.array('l', map(min, prev[:-width],
+                                             prev[width:])))
+        else:
+            rows.append(numpy.minimum(prev[:-width], prev[width:]))
+        width *= 2
+    return rows
+
+
+class TreeIndex(object):
+    """A frozen index of a tree's clades, for fast repeated queries.
+
+    The clades are numbered in preorder, and each one's parent and
+    distance from the root are stored. Common ancestors are found with an
+    Euler tour of the tree: between the first visits to two clades, the
+    tour passes only through their common ancestor and its descendants,
+    and the common ancestor has the lowest preorder number of these. The
+    minimum over any part of the tour is looked up in constant time from
+    a sparse table.
+
+    Building the index takes O(n log n) time for n clades. Afterwards,
+    `common_ancestor` and `distance` take constant time for a pair of
+    clades, and `get_path` and `parent` don't search the tree. The index
+    isn't updated if the tree changes, so build a new one after changing
+    the tree.
+
+    Targets are given as for the `TreeMixin` methods, e.g. as a clade or
+    a name. Clades and names are looked up directly; other targets are
+    matched against each clade in preorder.
+
+    Example:
+
+        >>> from Bio.Phylo.BaseTree import Tree, Clade
+        >>> tree = Tree(Clade(clades=[
+        ...     Clade(0.5, clades=[Clade(0.25, 'A'), Clade(1.0, 'B')]),
+        ...     Clade(2.0, 'C')]))
+        >>> index = tree.build_index()
+        >>> index.common_ancestor('A', 'B') is tree.root[0]
+        True
+        >>> index.distance('A', 'C')
+        2.75
+
+    :Parameters:
+        tree : Tree or Clade
+            The tree to index; only the clades below its root are used.
+    """
+    def __init__(self, tree):
+        root = tree.root
+        self.clades = clades = [root]
+        self._parents = parents = [None]
+        self._depths = depths = [0]
+        self._first = first = [0]
+        tour = [0]
+        # Number the clades in preorder, noting each visit in the tour
+        stack = [(0, iter(root.clades))]
+        while stack:
+            for child in stack[-1][1]:
+                parent = stack[-1][0]
+                index = len(clades)
+                clades.append(child)
+                parents.append(parent)
+                depths.append(depths[parent] + (child.branch_length or 0))
+                first.append(len(tour))
+                tour.append(index)
+                stack.append((index, iter(child.clades)))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    tour.append(stack[-1][0])
+        self._positions = dict((id(clade), index)
+                               for index, clade in enumerate(clades))
+        self._names = None
+        self._table = _range_minima(tour)
+
+    def __len__(self):
+        """Number of indexed clades, including the root."""
+        return len(self.clades)
+
+    def __contains__(self, clade):
+        """True if the given clade is in the index."""
+        return id(clade) in self._positions
+
+    def _find(self, target, kwargs=None):
+        """Get the preorder number of the first matching clade (PRIVATE).
+
+        Raises a ValueError if no clade matches.
+        """
+        if not kwargs:
+            if isinstance(target, TreeElement):
+                if id(target) in self._positions:
+                    return self._positions[id(target)]
+                raise ValueError("target %s is not in this tree"
+                                 % repr(target))
+            if isinstance(target, basestring):
+                if self._names is None:
+                    # Names as compared by _string_matcher
+                    self._names = {}
+                    for index, clade in enumerate(self.clades):
+                        self._names.setdefault(unicode(clade), index)
+                if target in self._names:
+                    return self._names[target]
+                raise ValueError("target %s is not in this tree"
+                                 % repr(target))
+        match = _combine_matchers(target, kwargs or {}, True)
+        for index, clade in enumerate(self.clades):
+            if match(clade):
+                return index
+        raise ValueError("target %s is not in this tree"
+                         % repr(target or kwargs))
+
+    def _ancestor(self, index1, index2):
+        """Get the common ancestor of two clades by number (PRIVATE)."""
+        start, end = self._first[index1], self._first[index2]
+        if start > end:
+            start, end = end, start
+        # the largest power of two in the range, as len(bin(x)) - 2 is
+        # x.bit_length(), which Python 2.6 lacks
+        level = len(bin(end - start + 1)) - 3
+        row = self._table[level]
+        return int(min(row[start], row[end + 1 - (1 << level)]))
+
+    def parent(self, target):
+        """Get the parent of the target clade, or None for the root."""
+        parent = self._parents[self._find(target)]
+        if parent is None:
+            return None
+        return self.clades[parent]
+
+    def get_path(self, target=None, **kwargs):
+        """List the clades directly between the root and the given target.
+
+        :returns: list of all clade objects along this path, ending with the
+            given target, but excluding the root clade, or None if the
+            target isn't found (as for `TreeMixin.get_path`).
+        """
+        try:
+            index = self._find(target, kwargs)
+        except ValueError:
+            return None
+        path = []
+        while index:
+            path.append(self.clades[index])
+            index = self._parents[index]
+        path.reverse()
+        return path
+
+    def common_ancestor(self, targets, *more_targets):
+        """Most recent common ancestor (clade) of all the given targets.
+
+        As for `TreeMixin.common_ancestor`, the root is returned if no
+        target is given, and a ValueError is raised if any target is not
+        found.
+        """
+        mrca = None
+        for target in _combine_args(targets, *more_targets):
+            index = self._find(target)
+            if mrca is None:
+                mrca = index
+            else:
+                mrca = self._ancestor(mrca, index)
+        return self.clades[mrca or 0]
+
+    def distance(self, target1, target2=None):
+        """Calculate the sum of the branch lengths between two targets.
+
+        If only one target is specified, the other is the root of the tree.
+        """
+        index1 = self._find(target1)
+        if target2 is None:
+            return self._depths[index1]
+        index2 = self._find(target2)
+        mrca = self._ancestor(index1, index2)
+        return (self._depths[index1] + self._depths[index2]
+                - 2 * self._depths[mrca])
+
+
 class BranchColor(object):
     """Indicates the color of a clade when rendered graphically.
 
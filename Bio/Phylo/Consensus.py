@@ -8,6 +8,10 @@
 This module contains a ``_BitString`` class to assist the consensus tree
 searching and some common consensus algorithms such as strict, majority rule and
 adam consensus.
+
+Internally, the consensus methods hold each clade as a Python integer with a
+bit set for each of its terminals, in the same order as the characters of the
+equivalent ``_BitString`` (so the first terminal is the highest bit).
 """
 from __future__ import division
 
@@ -218,50 +222,134 @@ class _BitString(str):
 
 
 
+def _count_bits(bits):
+    """Return the number of terminals in an integer clade bitset (PRIVATE)."""
+    return bin(bits).count('1')
+
+
+def _bit_indices(bits, size):
+    """Return the terminal indices in an integer clade bitset (PRIVATE).
+
+    Like _BitString.index_one, for a bitset of the given number of
+    terminals.
+    """
+    indices = []
+    while bits:
+        lowest = bits & -bits
+        # len(bin(x)) - 2 is x.bit_length(), which Python 2.6 lacks
+        indices.append(size + 2 - len(bin(lowest)))
+        bits ^= lowest
+    indices.reverse()
+    return indices
+
+
+def _name_bits(term_names):
+    """Return a dict of each terminal name to its bit (PRIVATE)."""
+    size = len(term_names)
+    return dict((name, 1 << (size - 1 - i))
+                for i, name in enumerate(term_names))
+
+
+def _clade_bits(tree, name_bits):
+    """Return a list of each nonterminal clade and its bitset (PRIVATE).
+
+    The clades are listed in preorder (the order of find_clades), and the
+    bitsets are worked out going back through that list, so each clade's
+    descendants are done first.  Terminal names not in name_bits are left
+    out.  The tree can also be a clade.
+    """
+    # preorder, as find_clades but without its overheads
+    clades = []
+    stack = [tree.root]
+    while stack:
+        clade = stack.pop()
+        clades.append(clade)
+        stack.extend(reversed(clade.clades))
+    bits = {}
+    for clade in reversed(clades):
+        if clade.clades:
+            clade_bits = 0
+            for child in clade.clades:
+                clade_bits |= bits[child]
+            bits[clade] = clade_bits
+        else:
+            bits[clade] = name_bits.get(clade.name, 0)
+    return [(clade, bits[clade]) for clade in clades if clade.clades]
+
+
+def _count_clade_bits(trees):
+    """Count distinct clades in the trees as integer bitsets (PRIVATE).
+
+    The bits for the terminals are in the order of the terminals of the
+    first tree.  Returns those terminals, and a dict of each clade's bitset
+    to a tuple of its count of occurrences and sum of branch length.  Only
+    one tree is looked at a time, so the trees can be an iterator.
+    """
+    terms = None
+    counts = {}
+    for tree in trees:
+        if terms is None:
+            terms = tree.get_terminals()
+            name_bits = _name_bits([term.name for term in terms])
+            all_bits = (1 << len(terms)) - 1
+        clade_bits = _clade_bits(tree, name_bits)
+        # the root should have all the terminals
+        if not clade_bits or clade_bits[0][1] != all_bits:
+            raise ValueError('Taxons in provided trees should be consistent')
+        for clade, bits in clade_bits:
+            if bits in counts:
+                count, sum_bl = counts[bits]
+                counts[bits] = (count + 1, sum_bl + (clade.branch_length or 0))
+            else:
+                counts[bits] = (1, clade.branch_length or 0)
+    return terms, counts
+
+
 def strict_consensus(trees):
     """Search strict consensus tree from multiple trees.
 
     :Parameters:
         trees: list
-            list of trees to produce consensus tree.
+            list (or iterator) of trees to produce consensus tree.
     """
-    terms = trees[0].get_terminals()
-    bitstr_counts = _count_clades(trees)
-    # Store bitstrs for strict clades
-    strict_bitstrs = [bitstr for bitstr, t in bitstr_counts.items()
-                      if t[0] == len(trees)]
-    strict_bitstrs.sort(key=lambda bitstr: bitstr.count('1'), reverse=True)
+    terms, bit_counts = _count_clade_bits(trees)
+    # every tree has the root clade
+    tree_count = bit_counts.get((1 << len(terms)) - 1, (0, 0))[0]
+    # Store bitsets for strict clades
+    strict_bitsets = [bits for bits, t in bit_counts.items()
+                      if t[0] == tree_count]
+    strict_bitsets.sort(key=_count_bits, reverse=True)
     # Create root
     root = BaseTree.Clade()
-    if strict_bitstrs[0].count('1') == len(terms):
+    if _count_bits(strict_bitsets[0]) == len(terms):
         root.clades.extend(terms)
     else:
         raise ValueError('Taxons in provided trees should be consistent')
-    # make a bitstr to clades dict and store root clade
-    bitstr_clades = {strict_bitstrs[0]: root}
+    # make a bitset to clades dict and store root clade
+    bits_clades = {strict_bitsets[0]: root}
     # create inner clades
-    for bitstr in strict_bitstrs[1:]:
-        clade_terms = [terms[i] for i in bitstr.index_one()]
+    for bits in strict_bitsets[1:]:
+        clade_terms = [terms[i] for i in _bit_indices(bits, len(terms))]
         clade = BaseTree.Clade()
         clade.clades.extend(clade_terms)
-        for bs, c in bitstr_clades.items():
+        for bs, c in bits_clades.items():
             # check if it should be the parent of current clade
-            if bs.contains(bitstr):
-                # remove old bitstring
-                del bitstr_clades[bs]
+            if bs & bits == bits:
+                # remove old bitset
+                del bits_clades[bs]
                 # update clade childs
                 new_childs = [child for child in c.clades
                               if child not in clade_terms]
                 c.clades = new_childs
                 # set current clade as child of c
                 c.clades.append(clade)
-                # update bitstring
-                bs = bs ^ bitstr
+                # update bitset
+                bs = bs ^ bits
                 # update clade
-                bitstr_clades[bs] = c
+                bits_clades[bs] = c
                 break
         # put new clade
-        bitstr_clades[bitstr] = clade
+        bits_clades[bits] = clade
     return BaseTree.Tree(root=root)
 
 
@@ -277,85 +365,85 @@ def majority_consensus(trees, cutoff=0):
 
     :Parameters:
         trees: list
-            list of trees to produce consensus tree.
+            list (or iterator) of trees to produce consensus tree.
     """
-    terms = trees[0].get_terminals()
-    bitstr_counts = _count_clades(trees)
-    # Sort bitstrs by descending #occurrences, then #tips, then tip order
-    bitstrs = sorted(bitstr_counts.keys(),
-                     key=lambda bitstr: (bitstr_counts[bitstr][0],
-                                         bitstr.count('1'),
-                                         str(bitstr)),
+    terms, bit_counts = _count_clade_bits(trees)
+    size = len(terms)
+    # every tree has the root clade
+    tree_count = bit_counts.get((1 << size) - 1, (0, 0))[0]
+    # Sort bitsets by descending #occurrences, then #tips, then tip order
+    bitsets = sorted(bit_counts.keys(),
+                     key=lambda bits: (bit_counts[bits][0],
+                                       _count_bits(bits),
+                                       bits),
                      reverse=True)
     root = BaseTree.Clade()
-    if bitstrs[0].count('1') == len(terms):
+    if _count_bits(bitsets[0]) == size:
         root.clades.extend(terms)
     else:
         raise ValueError('Taxons in provided trees should be consistent')
-    # Make a bitstr-to-clades dict and store root clade
-    bitstr_clades = {bitstrs[0]: root}
+    # Make a bitset-to-clades dict and store root clade
+    bits_clades = {bitsets[0]: root}
     # create inner clades
-    for bitstr in bitstrs[1:]:
+    for bits in bitsets[1:]:
         # apply majority rule
-        count_in_trees, branch_length_sum = bitstr_counts[bitstr]
-        confidence = 100.0 * count_in_trees / len(trees)
+        count_in_trees, branch_length_sum = bit_counts[bits]
+        confidence = 100.0 * count_in_trees / tree_count
         if confidence < cutoff * 100.0:
             break
-        clade_terms = [terms[i] for i in bitstr.index_one()]
+        clade_terms = [terms[i] for i in _bit_indices(bits, size)]
         clade = BaseTree.Clade()
         clade.clades.extend(clade_terms)
         clade.confidence = confidence
         clade.branch_length = branch_length_sum / count_in_trees
-        bsckeys = sorted(bitstr_clades, key=lambda bs: bs.count('1'),
-                         reverse=True)
+        bsckeys = sorted(bits_clades, key=_count_bits, reverse=True)
 
         # check if current clade is compatible with previous clades and
         # record it's possible parent and child clades.
         compatible = True
-        parent_bitstr = None
-        child_bitstrs = [] # multiple independent childs
+        parent_bits = None
+        child_bitsets = [] # multiple independent childs
         for bs in bsckeys:
-            if not bs.iscompatible(bitstr):
+            common = bs & bits
+            if common and common != bits and common != bs:
                 compatible = False
                 break
             # assign the closest ancestor as its parent
             # as bsckeys is sorted, it should be the last one
-            if bs.contains(bitstr):
-                parent_bitstr = bs
+            if common == bits:
+                parent_bits = bs
             # assign the closest descendant as its child
             # the largest and independent clades
-            if (bitstr.contains(bs) and bs != bitstr and
-                all(c.independent(bs) for c in child_bitstrs)):
-                child_bitstrs.append(bs)
+            if (common == bs and bs != bits and
+                all(not c & bs for c in child_bitsets)):
+                child_bitsets.append(bs)
         if not compatible:
             continue
 
-        if parent_bitstr:
-            # insert current clade; remove old bitstring
-            parent_clade = bitstr_clades.pop(parent_bitstr)
+        if parent_bits:
+            # insert current clade; remove old bitset
+            parent_clade = bits_clades.pop(parent_bits)
             # update parent clade childs
             parent_clade.clades = [c for c in parent_clade.clades
                                    if c not in clade_terms]
             # set current clade as child of parent_clade
             parent_clade.clades.append(clade)
-            # update bitstring
-            # parent = parent ^ bitstr
             # update clade
-            bitstr_clades[parent_bitstr] = parent_clade
+            bits_clades[parent_bits] = parent_clade
 
-        if child_bitstrs:
+        if child_bitsets:
             remove_list = []
-            for c in child_bitstrs:
-                remove_list.extend(c.index_one())
-                child_clade = bitstr_clades[c]
+            for c in child_bitsets:
+                remove_list.extend(_bit_indices(c, size))
+                child_clade = bits_clades[c]
                 parent_clade.clades.remove(child_clade)
                 clade.clades.append(child_clade)
             remove_terms = [terms[i] for i in remove_list]
             clade.clades = [c for c in clade.clades if c not in remove_terms]
         # put new clade
-        bitstr_clades[bitstr] = clade
-        if ((len(bitstr_clades) == len(terms) - 1) or
-            (len(bitstr_clades) == len(terms) - 2 and len(root.clades) == 3)):
+        bits_clades[bits] = clade
+        if ((len(bits_clades) == size - 1) or
+            (len(bits_clades) == size - 2 and len(root.clades) == 3)):
             break
     return BaseTree.Tree(root=root)
 
@@ -379,40 +467,44 @@ def _part(clades):
     if len(terms) == 1 or len(terms) == 2:
         new_clade = clades[0]
     else:
-        bitstrs = set([_BitString('1' * len(terms))])
+        name_bits = _name_bits(term_names)
+        bitstrs = set([(1 << len(terms)) - 1])
         for clade in clades:
+            child_bits = dict(_clade_bits(clade, name_bits))
             for child in clade.clades:
-                bitstr = _clade_to_bitstr(child, term_names)
+                # terminals are not in child_bits
+                bitstr = child_bits.get(child, name_bits.get(child.name, 0))
                 to_remove = set()
                 to_add = set()
                 for bs in bitstrs:
+                    common = bs & bitstr
                     if bs == bitstr:
                         continue
-                    elif bs.contains(bitstr):
+                    elif common == bitstr:
                         to_add.add(bitstr)
                         to_add.add(bs ^ bitstr)
                         to_remove.add(bs)
-                    elif bitstr.contains(bs):
+                    elif common == bs:
                         to_add.add(bs ^ bitstr)
-                    elif not bs.independent(bitstr):
-                        to_add.add(bs & bitstr)
-                        to_add.add(bs & bitstr ^ bitstr)
-                        to_add.add(bs & bitstr ^ bs)
+                    elif common:
+                        to_add.add(common)
+                        to_add.add(common ^ bitstr)
+                        to_add.add(common ^ bs)
                         to_remove.add(bs)
                 #bitstrs = bitstrs | to_add
                 bitstrs ^= to_remove
                 if to_add:
-                    for ta in sorted(to_add, key=lambda bs: bs.count('1')):
+                    for ta in sorted(to_add, key=_count_bits):
                         independent = True
                         for bs in bitstrs:
-                            if not ta.independent(bs):
+                            if ta & bs:
                                 independent = False
                                 break
                         if independent:
                             bitstrs.add(ta)
         new_clade = BaseTree.Clade()
         for bitstr in sorted(bitstrs):
-            indices = bitstr.index_one()
+            indices = _bit_indices(bitstr, len(terms))
             if len(indices) == 1:
                 new_clade.clades.append(terms[indices[0]])
             elif len(indices) == 2:
@@ -460,21 +552,16 @@ def _count_clades(trees):
     """Count distinct clades (different sets of terminal names) in the trees.
 
     Return a dict of bitstring (representing clade) and a tuple of its count of
-    occurrences and sum of branch length for that clade.
+    occurrences and sum of branch length for that clade.  The trees can be
+    an iterator, and only one tree is looked at a time, so the memory needed
+    depends on the number of distinct clades rather than of trees.
     """
-    bitstrs = {}
-    for tree in trees:
-        clade_bitstrs = _tree_to_bitstrs(tree)
-        for clade in tree.find_clades(terminal=False):
-            bitstr = clade_bitstrs[clade]
-            if bitstr in bitstrs:
-                count, sum_bl = bitstrs[bitstr]
-                count += 1
-                sum_bl += clade.branch_length or 0
-                bitstrs[bitstr] = (count, sum_bl)
-            else:
-                bitstrs[bitstr] = (1, clade.branch_length or 0)
-    return bitstrs
+    terms, bit_counts = _count_clade_bits(trees)
+    if terms is None:
+        return {}
+    size = len(terms)
+    return dict((_BitString(bin(bits)[2:].zfill(size)), counts)
+                for bits, counts in bit_counts.items())
 
 
 def get_support(target_tree, trees):
@@ -484,22 +571,24 @@ def get_support(target_tree, trees):
     :Parameters:
         target_tree: Tree
         trees: list
-            list of trees calculate branch support.
+            list (or iterator) of trees calculate branch support.
     """
     term_names = sorted(term.name
                         for term in target_tree.find_clades(terminal=True))
+    name_bits = _name_bits(term_names)
     bitstrs = {}
-    size = len(trees)
-    for clade in target_tree.find_clades(terminal=False):
-        bitstr = _clade_to_bitstr(clade, term_names)
-        bitstrs[bitstr] = (clade, 0)
+    size = 0
+    for clade, bits in _clade_bits(target_tree, name_bits):
+        bitstrs[bits] = (clade, 0)
     for tree in trees:
-        for clade in tree.find_clades(terminal=False):
-            bitstr = _clade_to_bitstr(clade, term_names)
-            if bitstr in bitstrs:
-                c, t = bitstrs[bitstr]
-                c.confidence = (t + 1) * 100.0 / size
-                bitstrs[bitstr] = (c, t + 1)
+        size += 1
+        for clade, bits in _clade_bits(tree, name_bits):
+            if bits in bitstrs:
+                c, t = bitstrs[bits]
+                bitstrs[bits] = (c, t + 1)
+    for c, t in bitstrs.values():
+        if t:
+            c.confidence = t * 100.0 / size
     return target_tree
 
 
@@ -507,6 +596,10 @@ def bootstrap(msa, times):
     """yield a series of bootstrap replicates from a multiple sequence
     alignment object
 
+    If NumPy is installed, each replicate is an ArrayAlignment (see the
+    Bio.Align.ArrayAlign module), picking all its columns from the array
+    of letters at once, rather than joining up each column in turn.
+
     :Parameters:
         msa: MultipleSeqAlignment
             multiple sequence alignment to generate replicates.
@@ -515,23 +608,22 @@ def bootstrap(msa, times):
     """
 
     length = len(msa[0])
+    array_msa = _array_alignment(msa)
     i = 0
     while i < times:
         i += 1
-        item = None
-        for j in range(length):
-            col = random.randint(0, length - 1)
-            if not item:
-                item = msa[:,col:col + 1]
-            else:
-                item += msa[:,col:col + 1]
-        yield item
+        yield _resample(msa, array_msa, _bootstrap_columns(length))
 
 
-def bootstrap_trees(msa, times, tree_constructor):
+def bootstrap_trees(msa, times, tree_constructor, processes=None):
     """Yield a series of bootstrap replicate trees from a multiple sequence
     alignment.
 
+    The trees can be built in several processes at once (using the
+    multiprocessing module), in which case the tree constructor must
+    be picklable.  The replicates are drawn in this process, so the
+    trees are the same as with one process.
+
     :Parameters:
         msa: MultipleSeqAlignment
             multiple sequence alignment to generate replicates.
@@ -539,18 +631,43 @@ def bootstrap_trees(msa, times, tree_constructor):
             number of bootstrap times.
         tree_constructor: TreeConstructor
             tree constructor to be used to build trees.
+        processes: int
+            number of processes to build the trees in (default one).
     """
 
-    msas = bootstrap(msa, times)
-    for aln in msas:
-        tree = tree_constructor.build_tree(aln)
-        yield tree
-
+    if not processes or processes < 2:
+        msas = bootstrap(msa, times)
+        for aln in msas:
+            tree = tree_constructor.build_tree(aln)
+            yield tree
+        return
 
-def bootstrap_consensus(msa, times, tree_constructor, consensus):
+    from multiprocessing import Pool
+    length = len(msa[0])
+    pool = Pool(processes, _init_bootstrap_worker, (msa, tree_constructor))
+    try:
+        done = 0
+        while done < times:
+            # only send the column numbers, a few replicates per process
+            # at a time
+            batch = [_bootstrap_columns(length)
+                     for i in range(min(times - done, 4 * processes))]
+            done += len(batch)
+            for tree in pool.map(_bootstrap_worker_tree, batch):
+                yield tree
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def bootstrap_consensus(msa, times, tree_constructor, consensus,
+                        processes=None):
     """get the consensus tree of a series of bootstrap trees for
     a multiple sequence alignment
 
+    With strict_consensus or majority_consensus, the clades are counted
+    as each tree is built, without keeping all the trees.
+
     :Parameters:
         msa: MultipleSeqAlignment
             Multiple sequence alignment to generate replicates.
@@ -561,12 +678,74 @@ def bootstrap_consensus(msa, times, tree_constructor, consensus):
         consensus: function
             Consensus method in this module: `strict_consensus`,
             `majority_consensus`, `adam_consensus`.
+        processes: int
+            Number of processes to build the trees in (default one).
     """
-    trees = bootstrap_trees(msa, times, tree_constructor)
-    tree = consensus(list(trees))
+    trees = bootstrap_trees(msa, times, tree_constructor, processes)
+    if consensus not in (strict_consensus, majority_consensus):
+        trees = list(trees)
+    tree = consensus(trees)
     return tree
 
 
+def _bootstrap_columns(length):
+    """Pick the columns for a bootstrap replicate (PRIVATE)."""
+    return [random.randint(0, length - 1) for j in range(length)]
+
+
+def _array_alignment(msa):
+    """Return the alignment as an ArrayAlignment, or None (PRIVATE).
+
+    None is returned if NumPy is not installed, or the letters are not
+    single bytes.
+    """
+    try:
+        from Bio.Align.ArrayAlign import ArrayAlignment
+    except ImportError:
+        return None
+    array_msa = ArrayAlignment(msa)
+    try:
+        array_msa.array
+    except ValueError:
+        return None
+    return array_msa
+
+
+def _resample(msa, array_msa, cols):
+    """Make a bootstrap replicate from a list of column numbers (PRIVATE).
+
+    The columns are picked from array_msa (see _array_alignment) if given,
+    and otherwise joined up from msa one by one.
+    """
+    if array_msa is not None:
+        return array_msa[:, cols]
+    item = None
+    for col in cols:
+        if not item:
+            item = msa[:, col:col + 1]
+        else:
+            item += msa[:, col:col + 1]
+    return item
+
+
+# The alignment and tree constructor in each bootstrap_trees process
+_bootstrap_worker = {}
+
+
+def _init_bootstrap_worker(msa, tree_constructor):
+    """Set up a process for bootstrap_trees (PRIVATE)."""
+    _bootstrap_worker["msa"] = msa
+    _bootstrap_worker["array_msa"] = _array_alignment(msa)
+    _bootstrap_worker["tree_constructor"] = tree_constructor
+
+
+def _bootstrap_worker_tree(cols):
+    """Build the tree for a bootstrap replicate in a process (PRIVATE)."""
+    aln = _resample(_bootstrap_worker["msa"], _bootstrap_worker["array_msa"],
+                    cols)
+    return _bootstrap_worker["tree_constructor"].build_tree(aln)
+
+
 def _clade_to_bitstr(clade, tree_term_names):
     """Create a BitString representing a clade, given ordered tree taxon names.
     """
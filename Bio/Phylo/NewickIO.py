@@ -13,6 +13,7 @@ __docformat__ = "restructuredtext en"
 
 import re
 from Bio._py3k import StringIO
+from Bio._py3k import basestring
 
 from Bio.Phylo import Newick
 
@@ -26,10 +27,10 @@ tokens = [
     (r"\(",                         'open parens'),
     (r"\)",                         'close parens'),
     (r"[^\s\(\)\[\]\'\:\;\,]+",     'unquoted node label'),
-    (r"\:[0-9]*\.?[0-9]+([eE][+-]?[0-9]+)?", 'edge length'),
+    (r"\:[0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?", 'edge length'),
     (r"\,",                         'comma'),
-    (r"\[(\\.|[^\]])*\]",           'comment'),
-    (r"\'(\\.|[^\'])*\'",           'quoted node label'),
+    (r"\[(?:\\.|[^\]])*\]",         'comment'),
+    (r"\'(?:\\.|[^\'])*\'",         'quoted node label'),
     (r"\;",                         'semicolon'),
     (r"\n",                         'newline'),
 ]
@@ -59,11 +60,18 @@ def write(trees, handle, plain=False, **kwargs):
 # ---------------------------------------------------------
 # Input
 
+# Text that float() might accept, starting with a digit, sign, point, or the
+# first letter of inf or nan -- anything else is rejected without raising
+_numeric_start = re.compile(r"\s*[-+.\dIiNn]")
+
+
 def _parse_confidence(text):
     if text.isdigit():
         return int(text)
         # NB: Could make this more consistent by treating as a percentage
         # return int(text) / 100.
+    if not _numeric_start.match(text):
+        return None
     try:
         return float(text)
         # NB: This should be in [0.0, 1.0], but who knows what people will do
@@ -96,12 +104,22 @@ class Parser(object):
         handle = StringIO(treetext)
         return cls(handle)
 
-    def parse(self, values_are_confidence=False, comments_are_confidence=False, rooted=False):
-        """Parse the text stream this object was initialized with."""
+    def parse(self, values_are_confidence=False, comments_are_confidence=False,
+              rooted=False, branch_lengths_only=False):
+        """Parse the text stream this object was initialized with.
+
+        Trees are read and yielded one at a time, so a long series of trees
+        (e.g. samples from an MCMC run) doesn't have to fit in memory.
+
+        If branch_lengths_only is True, only the topology, labels and branch
+        lengths are read, which is faster: comments are skipped, and labels
+        aren't converted to confidence values.
+        """
         self.values_are_confidence = values_are_confidence
         self.comments_are_confidence = comments_are_confidence
         self.rooted = rooted
-        buf = ''
+        self.branch_lengths_only = branch_lengths_only
+        lines = []
         unicodeChecked = False
         unicodeLines = ("\xef", "\xff", "\xfe", "\x00")
         for line in self.handle:
@@ -113,78 +131,94 @@ class Parser(object):
                                       "unicode byte order marks.  You must convert it to "
                                       "ASCII before it can be parsed.")
                 unicodeChecked = True
-            buf += line.rstrip()
-            if buf.endswith(';'):
-                yield self._parse_tree(buf)
-                buf = ''
-        if buf:
+            line = line.rstrip()
+            if line:
+                lines.append(line)
+                if line.endswith(';'):
+                    yield self._parse_tree(''.join(lines))
+                    lines = []
+        if lines:
             # Last tree is missing a terminal ';' character -- that's OK
-            yield self._parse_tree(buf)
+            yield self._parse_tree(''.join(lines))
 
     def _parse_tree(self, text):
-        """Parses the text representation into an Tree object."""
-        tokens = re.finditer(tokenizer, text.strip())
+        """Parses the text representation into an Tree object.
+
+        The clades above the current one are kept on a stack, rather than
+        parsing nested clades recursively, so there is no limit on the depth
+        of the tree.
+        """
+        tokens = tokenizer.findall(text.strip())
 
         new_clade = self.new_clade
+        process_clade = self.process_clade
+        values_are_confidence = self.values_are_confidence
+        comments_are_confidence = self.comments_are_confidence
+        plain = self.branch_lengths_only
         root_clade = new_clade()
 
         current_clade = root_clade
-        entering_branch_length = False
+        parents = []
+        end = None
 
         lp_count = 0
         rp_count = 0
-        for match in tokens:
-            token = match.group()
+        for index, token in enumerate(tokens):
+            first = token[0]
 
-            if token.startswith("'"):
-                # quoted label; add characters to clade name
-                current_clade.name = token[1:-1]
-
-            elif token.startswith('['):
-                # comment
-                current_clade.comment = token[1:-1]
-                if self.comments_are_confidence:
-                    # Try to use this comment as a numeric support value
-                    current_clade.confidence = _parse_confidence(current_clade.comment)
-
-            elif token == '(':
-                # start a new clade, which is a child of the current clade
-                current_clade = new_clade(current_clade)
-                entering_branch_length = False
-                lp_count += 1
+            if first == ':':
+                # branch length or confidence
+                value = float(token[1:])
+                if values_are_confidence and not plain:
+                    current_clade.confidence = value
+                else:
+                    current_clade.branch_length = value
 
-            elif token == ',':
+            elif first == ',':
                 # if the current clade is the root, then the external parentheses are missing
                 # and a new root should be created
-                if current_clade is root_clade:
+                if not parents:
                     root_clade = new_clade()
-                    current_clade.parent = root_clade
+                    root_clade.clades.append(current_clade)
+                    parents.append(root_clade)
+                if not plain:
+                    process_clade(current_clade)
                 # start a new child clade at the same level as the current clade
-                parent = self.process_clade(current_clade)
-                current_clade = new_clade(parent)
-                entering_branch_length = False
+                current_clade = new_clade(parents[-1])
 
-            elif token == ')':
+            elif first == '(':
+                # start a new clade, which is a child of the current clade
+                parents.append(current_clade)
+                current_clade = new_clade(current_clade)
+                lp_count += 1
+
+            elif first == ')':
                 # done adding children for this parent clade
-                parent = self.process_clade(current_clade)
-                if not parent:
+                if not plain:
+                    process_clade(current_clade)
+                if not parents:
                     raise NewickError('Parenthesis mismatch.')
-                current_clade = parent
-                entering_branch_length = False
+                current_clade = parents.pop()
                 rp_count += 1
 
-            elif token == ';':
-                break
+            elif first == "'":
+                # quoted label; add characters to clade name
+                current_clade.name = token[1:-1]
 
-            elif token.startswith(':'):
-                # branch length or confidence
-                value = float(token[1:])
-                if self.values_are_confidence:
-                    current_clade.confidence = value
-                else:
-                    current_clade.branch_length = value
+            elif first == '[':
+                # comment
+                if plain:
+                    continue
+                current_clade.comment = token[1:-1]
+                if comments_are_confidence:
+                    # Try to use this comment as a numeric support value
+                    current_clade.confidence = _parse_confidence(current_clade.comment)
+
+            elif first == ';':
+                end = index + 1
+                break
 
-            elif token == '\n':
+            elif first == '\n':
                 pass
 
             else:
@@ -195,28 +229,28 @@ class Parser(object):
             raise NewickError('Number of open/close parentheses do not match.')
 
         # if ; token broke out of for loop, there should be no remaining tokens
-        try:
-            next_token = next(tokens)
+        if end is not None and end < len(tokens):
             raise NewickError('Text after semicolon in Newick tree: %s'
-                              % next_token.group())
-        except StopIteration:
-            pass
+                              % tokens[end])
 
-        self.process_clade(current_clade)
-        self.process_clade(root_clade)
+        if not plain:
+            process_clade(current_clade)
+            process_clade(root_clade)
         return Newick.Tree(root=root_clade, rooted=self.rooted)
 
     def new_clade(self, parent=None):
-        """Returns a new Newick.Clade, optionally with a temporary reference
-        to its parent clade."""
+        """Returns a new Newick.Clade, added to the children of the parent
+        clade if one is given."""
         clade = Newick.Clade()
-        if parent:
-            clade.parent = parent
+        if parent is not None:
+            parent.clades.append(clade)
         return clade
 
     def process_clade(self, clade):
-        """Final processing of a parsed clade. Removes the node's parent and
-        returns it."""
+        """Final processing of a parsed clade, once all its children and
+        labels have been read: a numeric name is taken as the confidence
+        value, unless confidences are read from branch values or comments.
+        """
         if (clade.name and not (self.values_are_confidence or
                                 self.comments_are_confidence)
             and clade.confidence is None):
@@ -224,12 +258,6 @@ class Parser(object):
             if not clade.confidence is None:
                 clade.name = None
 
-        if hasattr(clade, 'parent'):
-            parent = clade.parent
-            parent.clades.append(clade)
-            del clade.parent
-            return parent
-
 
 # ---------------------------------------------------------
 # Output
@@ -260,21 +288,41 @@ class Writer(object):
                 confidence_as_branch_length, branch_length_only, max_confidence,
                 format_confidence, format_branch_length)
 
-        def newickize(clade):
-            """Convert a node tree to a Newick tree string, recursively."""
-            label = clade.name or ''
-            if label:
-                unquoted_label = re.match(token_dict['unquoted node label'], label)
-                if (not unquoted_label) or (unquoted_label.end() < len(label)):
-                    label = "'%s'" % label.replace('\\', '\\\\').replace("'", "\\'")
-
-            if clade.is_terminal():    # terminal
-                return (label
-                        + make_info_string(clade, terminal=True))
-            else:
-                subtrees = (newickize(sub) for sub in clade)
-                return '(%s)%s' % (','.join(subtrees),
-                        label + make_info_string(clade))
+        unquoted_label = token_dict['unquoted node label'].match
+
+        def newickize(root):
+            """Convert a node tree to a Newick tree string.
+
+            The parts of the string are collected in a single list, with a
+            stack of the clades and separators still to be written instead
+            of recursion, so deep trees can be written too.
+            """
+            parts = []
+            stack = [root]
+            while stack:
+                clade = stack.pop()
+                if isinstance(clade, basestring):
+                    # comma, or the end of a clade's subtrees
+                    parts.append(clade)
+                    continue
+                label = clade.name or ''
+                if label:
+                    unquoted = unquoted_label(label)
+                    if (not unquoted) or (unquoted.end() < len(label)):
+                        label = "'%s'" % label.replace('\\', '\\\\').replace("'", "\\'")
+
+                if clade.is_terminal():    # terminal
+                    parts.append(label
+                                 + make_info_string(clade, terminal=True))
+                else:
+                    parts.append('(')
+                    stack.append(')' + label + make_info_string(clade))
+                    subclades = clade.clades
+                    for sub in subclades[:0:-1]:
+                        stack.append(sub)
+                        stack.append(',')
+                    stack.append(subclades[0])
+            return ''.join(parts)
 
         # Convert each tree to a string
         for tree in self.trees:
@@ -81,15 +81,19 @@ def read(file):
     return Parser(file).read()
 
 
-def parse(file):
+def parse(file, branch_lengths_only=False):
     """Iterate over the phylogenetic trees in a phyloXML file.
 
     This ignores any additional data stored at the top level, but may be more
     memory-efficient than the `read` function.
 
+    If branch_lengths_only is True, only the topology, names and branch
+    lengths of each tree are loaded, skipping taxonomies, sequences and other
+    annotations.
+
     :returns: a generator of `Bio.Phylo.PhyloXML.Phylogeny` objects.
     """
-    return Parser(file).parse()
+    return Parser(file).parse(branch_lengths_only=branch_lengths_only)
 
 
 def write(obj, file, encoding='utf-8', indent=True):
@@ -315,12 +319,24 @@ class Parser(object):
                     self.root.clear()
         return phyloxml
 
-    def parse(self):
-        """Parse the phyloXML file incrementally and return each phylogeny."""
+    def parse(self, branch_lengths_only=False):
+        """Parse the phyloXML file incrementally and return each phylogeny.
+
+        Each phylogeny is dropped from the XML document once it has been
+        read, so only the current one is kept in memory.
+
+        If branch_lengths_only is True, only the topology, names and branch
+        lengths of the clades are read (with the phylogeny's attributes and
+        name), which is faster and uses less memory.
+        """
         phytag = _ns('phylogeny')
         for event, elem in self.context:
             if event == 'start' and elem.tag == phytag:
-                yield self._parse_phylogeny(elem)
+                if branch_lengths_only:
+                    yield self._parse_outline(elem)
+                else:
+                    yield self._parse_phylogeny(elem)
+                self.root.clear()
 
     # Special parsing cases -- incremental, using self.context
 
@@ -381,17 +397,28 @@ class Parser(object):
                                              ['branch_length', 'name', 'node_id', 'width'])
 
     def _parse_clade(self, parent):
-        """Parse a Clade node and its children, recursively."""
+        """Parse a Clade node and its children.
+
+        The clades being parsed are kept on a stack, each with the tags open
+        directly below it, so that nested clades don't need recursion.
+        """
         clade = PX.Clade(**parent.attrib)
         if clade.branch_length is not None:
             clade.branch_length = float(clade.branch_length)
+        root = clade
         # NB: Only evaluate nodes at the current level
         tag_stack = []
+        stack = []
         for event, elem in self.context:
             namespace, tag = _split_namespace(elem.tag)
             if event == 'start':
                 if tag == 'clade':
-                    clade.clades.append(self._parse_clade(elem))
+                    subclade = PX.Clade(**elem.attrib)
+                    if subclade.branch_length is not None:
+                        subclade.branch_length = float(subclade.branch_length)
+                    clade.clades.append(subclade)
+                    stack.append((clade, tag_stack))
+                    clade, tag_stack = subclade, []
                     continue
                 if tag == 'taxonomy':
                     clade.taxonomies.append(self._parse_taxonomy(elem))
@@ -404,7 +431,10 @@ class Parser(object):
             if event == 'end':
                 if tag == 'clade':
                     elem.clear()
-                    break
+                    if not stack:
+                        break
+                    clade, tag_stack = stack.pop()
+                    continue
                 if tag != tag_stack[-1]:
                     continue
                 tag_stack.pop()
@@ -433,7 +463,64 @@ class Parser(object):
                     elem.clear()
                 else:
                     raise PhyloXMLError('Misidentified tag: ' + tag)
-        return clade
+        return root
+
+    def _parse_outline(self, parent):
+        """Parse only the topology, names and branch lengths of a phylogeny.
+
+        All other elements are skipped, and each element is cleared as soon
+        as it ends, so that large annotations (e.g. sequences) don't build
+        up in memory while the phylogeny is read.
+        """
+        phylogeny = PX.Phylogeny(**_dict_str2bool(parent.attrib,
+                                                   ['rooted', 'rerootable']))
+        clade_tag = _ns('clade')
+        name_tag = _ns('name')
+        branch_length_tag = _ns('branch_length')
+        # Open clades, and the number of open elements above each one
+        clades = []
+        clade_depths = [0]
+        depth = 0
+        for event, elem in self.context:
+            tag = elem.tag
+            if event == 'start':
+                depth += 1
+                if tag == clade_tag:
+                    clade = PX.Clade(elem.get('branch_length'))
+                    if clade.branch_length is not None:
+                        clade.branch_length = float(clade.branch_length)
+                    if clades:
+                        clades[-1].clades.append(clade)
+                    else:
+                        assert phylogeny.root is None, \
+                                "Phylogeny object should only have 1 clade"
+                        phylogeny.root = clade
+                    clades.append(clade)
+                    clade_depths.append(depth)
+                continue
+            if depth == 0:
+                # End of the phylogeny
+                parent.clear()
+                break
+            if tag == clade_tag:
+                clades.pop()
+                clade_depths.pop()
+            elif depth == clade_depths[-1] + 1:
+                # Direct child of the current clade, or of the phylogeny
+                if tag == name_tag:
+                    if clades:
+                        clades[-1].name = _collapse_wspace(elem.text)
+                    else:
+                        phylogeny.name = _collapse_wspace(elem.text)
+                elif tag == branch_length_tag and clades:
+                    if clades[-1].branch_length is not None:
+                        raise PhyloXMLError(
+                                'Attribute branch_length was already set '
+                                'for this Clade.')
+                    clades[-1].branch_length = _float(elem.text)
+            elem.clear()
+            depth -= 1
+        return phylogeny
 
     def _parse_sequence(self, parent):
         sequence = PX.Sequence(**parent.attrib)
@@ -17,6 +17,53 @@ from Bio import _py3k
 def _is_numeric(x):
     return _py3k._is_int_or_long(x) or isinstance(x, (float, complex))
 
+
+def _score_columns(task):
+    """Sum the scores of every pair of sequences over some columns (PRIVATE).
+
+    Used by DistanceCalculator, possibly in another process.  The task is
+    a tuple of the letter codes (a NumPy array with a row per sequence
+    and a column per alignment column, holding small integers), the
+    scores for each pair of letter codes (None to count identical
+    letters), a boolean array of which letter codes are scored (gaps are
+    not), and the NumPy type to add up in.
+
+    Returns an array with the total score for each pair of sequences, and
+    (when scoring) an array with the total score of the first sequence of
+    each pair against itself, over the columns where both are scored.
+    The columns are done a few at a time, so that each letter can be
+    compared to all the others with a single matrix product.
+    """
+    import numpy
+    codes, scores, valid, dtype = task
+    count, length = codes.shape
+    if scores is None:
+        size = int(codes.max()) + 1
+    else:
+        size = len(scores)
+        scores = scores.astype(dtype)
+        self_scores = scores.diagonal() * valid
+    letters = numpy.arange(size)[:, None]
+    total = numpy.zeros((count, count))
+    max_total = None if scores is None else numpy.zeros((count, count))
+    step = max(1, 2 ** 22 // (count * size))
+    for start in range(0, length, step):
+        block = codes[:, start:start + step]
+        # one-hot encoding, a row per sequence and a column per letter
+        # code and alignment column
+        found = (block[:, None, :] == letters).astype(dtype)
+        found = found.reshape(count, -1)
+        if scores is None:
+            total += numpy.dot(found, found.T)
+            continue
+        # the score of each letter code against each sequence letter
+        against = scores[:, block].transpose(1, 0, 2).reshape(count, -1)
+        total += numpy.dot(found, against.T)
+        scored = valid[block].astype(dtype)
+        max_total += numpy.dot(self_scores[block], scored.T)
+    return total, max_total
+
+
 class _Matrix(object):
     """A base class for distance matrix or scoring matrix that accepts
     a list of names and a lower triangular matrix.
@@ -85,14 +132,7 @@ class _Matrix(object):
     def __init__(self, names, matrix=None):
         """Initialize matrix by a list of names and a list of
         lower triangular matrix data"""
-        # check names
-        if isinstance(names, list) and all(isinstance(s, str) for s in names):
-            if len(set(names)) == len(names):
-                self.names = names
-            else:
-                raise ValueError("Duplicate names found")
-        else:
-            raise TypeError("'names' should be a list of strings")
+        self._set_names(names)
 
         # check matrix
         if matrix is None:
@@ -117,6 +157,16 @@ class _Matrix(object):
             else:
                 raise TypeError("'matrix' should be a list of numerical lists")
 
+    def _set_names(self, names):
+        """Check and set the list of names (PRIVATE)."""
+        if isinstance(names, list) and all(isinstance(s, str) for s in names):
+            if len(set(names)) == len(names):
+                self.names = names
+            else:
+                raise ValueError("Duplicate names found")
+        else:
+            raise TypeError("'names' should be a list of strings")
+
     def __getitem__(self, item):
         """Access value(s) by the index(s) or name(s).
         For a _Matrix object 'dm':
@@ -140,7 +190,7 @@ class _Matrix(object):
             # check index
             if index > len(self) - 1:
                 raise IndexError("Index out of range.")
-            return [self.matrix[index][i] for i in range(0, index)] + [self.matrix[i][index] for i in range(index, len(self))]
+            return self._get_row(index)
         # Handle double indexing
         elif len(item) == 2:
             row_index = None
@@ -160,9 +210,9 @@ class _Matrix(object):
             if row_index > len(self) - 1 or col_index > len(self) - 1:
                 raise IndexError("Index out of range.")
             if row_index > col_index:
-                return self.matrix[row_index][col_index]
+                return self._get_value(row_index, col_index)
             else:
-                return self.matrix[col_index][row_index]
+                return self._get_value(col_index, row_index)
         else:
             raise TypeError("Invalid index type.")
 
@@ -191,10 +241,7 @@ class _Matrix(object):
             # check and assign value
             if isinstance(value, list) and all(_is_numeric(n) for n in value):
                 if len(value) == len(self):
-                    for i in range(0, index):
-                        self.matrix[index][i] = value[i]
-                    for i in range(index, len(self)):
-                        self.matrix[i][index] = value[i]
+                    self._set_row(index, value)
                 else:
                     raise ValueError("Value not the same size.")
             else:
@@ -220,9 +267,9 @@ class _Matrix(object):
             # check and assign value
             if _is_numeric(value):
                 if row_index > col_index:
-                    self.matrix[row_index][col_index] = value
+                    self._set_value(row_index, col_index, value)
                 else:
-                    self.matrix[col_index][row_index] = value
+                    self._set_value(col_index, row_index, value)
             else:
                 raise TypeError("Invalid value type.")
         else:
@@ -238,9 +285,7 @@ class _Matrix(object):
         else:
             raise TypeError("Invalid index type.")
         # remove distances related to index
-        for i in range(index + 1, len(self)):
-            del self.matrix[i][index]
-        del self.matrix[index]
+        self._delete(index)
         # remove name
         del self.names[index]
 
@@ -262,9 +307,7 @@ class _Matrix(object):
             # insert name
             self.names.insert(index, name)
             # insert elements of 0, to be assigned
-            self.matrix.insert(index, [0] * index)
-            for i in range(index, len(self)):
-                self.matrix[i].insert(index, 0)
+            self._insert(index)
             # assign value
             self[index] = value
         else:
@@ -273,6 +316,46 @@ class _Matrix(object):
     def __len__(self):
         """Matrix length"""
         return len(self.names)
+
+    # The values are stored and changed by these methods, the row index
+    # always being at least the column index.
+
+    def _get_row(self, index):
+        """Return the values from 'index' to all the others (PRIVATE)."""
+        return [self.matrix[index][i] for i in range(0, index)] + [self.matrix[i][index] for i in range(index, len(self))]
+
+    def _get_value(self, row_index, col_index):
+        """Return a single value (PRIVATE)."""
+        return self.matrix[row_index][col_index]
+
+    def _set_row(self, index, value):
+        """Set the values from 'index' to all the others (PRIVATE)."""
+        for i in range(0, index):
+            self.matrix[index][i] = value[i]
+        for i in range(index, len(self)):
+            self.matrix[i][index] = value[i]
+
+    def _set_value(self, row_index, col_index, value):
+        """Set a single value (PRIVATE)."""
+        self.matrix[row_index][col_index] = value
+
+    def _delete(self, index):
+        """Remove the values from 'index' to all the others (PRIVATE).
+
+        This is called before the name is removed.
+        """
+        for i in range(index + 1, len(self)):
+            del self.matrix[i][index]
+        del self.matrix[index]
+
+    def _insert(self, index):
+        """Add zero values from a new 'index' to all the others (PRIVATE).
+
+        This is called after the name is added.
+        """
+        self.matrix.insert(index, [0] * index)
+        for i in range(index, len(self)):
+            self.matrix[i].insert(index, 0)
     
     def __repr__(self):
         return self.__class__.__name__ \
@@ -308,6 +391,230 @@ class _DistanceMatrix(_Matrix):
             self.matrix[i][i] = 0
 
 
+class _CondensedDistanceMatrix(_DistanceMatrix):
+    """Distance matrix holding its values in a NumPy array.
+
+    This works like a _DistanceMatrix, but rather than a nested list the
+    values below the diagonal are held in a single (condensed) NumPy
+    array of floats, row by row, so the value between 'i' and 'j' (for
+    i > j) is at index i * (i - 1) / 2 + j.  This needs much less memory
+    for large matrices, and is what the DistanceCalculator returns when
+    NumPy is installed.
+
+    The matrix attribute gives the values as a new lower triangular
+    nested list.  Setting a value in one of its rows sets it in the
+    matrix as well (the diagonal is always zero), but adding or removing
+    rows or values does not.
+
+    >>> from Bio.Phylo.TreeConstruction import _CondensedDistanceMatrix
+    >>> dm = _CondensedDistanceMatrix(['Alpha', 'Beta', 'Gamma'], [1, 2, 3])
+    >>> dm
+    _CondensedDistanceMatrix(names=['Alpha', 'Beta', 'Gamma'], matrix=[[0], [1.0, 0], [2.0, 3.0, 0]])
+    >>> dm['Gamma']
+    [2.0, 3.0, 0]
+    >>> dm['Alpha', 'Beta'] = 4
+    >>> dm.matrix[2][1] = 5
+    >>> dm['Gamma', 'Beta']
+    5.0
+    >>> del dm['Gamma']
+    >>> dm.condensed.tolist()
+    [4.0]
+    """
+
+    def __init__(self, names, condensed=None):
+        """Initialize by a list of names and the condensed values
+
+        If the values are not given, they are all zero.
+        """
+        import numpy
+        self._set_names(names)
+        size = len(names) * (len(names) - 1) // 2
+        if condensed is None:
+            self.condensed = numpy.zeros(size)
+        else:
+            self.condensed = numpy.array(condensed, float).ravel()
+            if len(self.condensed) != size:
+                raise ValueError("'names' and 'condensed' should be the "
+                                 "same size")
+
+    @property
+    def matrix(self):
+        """Lower triangular nested list of the values.
+
+        Values set in the rows of the list are set in the matrix too.
+        """
+        condensed = self.condensed.tolist()
+        return [_CondensedRow(self, i,
+                              condensed[i * (i - 1) // 2:i * (i + 1) // 2] + [0])
+                for i in range(len(self))]
+
+    def _set_zero_diagonal(self):
+        """The diagonal is not stored (PRIVATE)."""
+        pass
+
+    def _column_positions(self, index):
+        """Return the array positions of values from 'index' to the
+        following rows (PRIVATE)."""
+        import numpy
+        rows = numpy.arange(index + 1, len(self))
+        return rows * (rows - 1) // 2 + index
+
+    def _get_row(self, index):
+        start = index * (index - 1) // 2
+        return (self.condensed[start:start + index].tolist() + [0]
+                + self.condensed[self._column_positions(index)].tolist())
+
+    def _get_value(self, row_index, col_index):
+        if row_index == col_index:
+            return 0
+        return float(self.condensed[row_index * (row_index - 1) // 2
+                                    + col_index])
+
+    def _set_row(self, index, value):
+        start = index * (index - 1) // 2
+        self.condensed[start:start + index] = value[:index]
+        self.condensed[self._column_positions(index)] = value[index + 1:]
+
+    def _set_value(self, row_index, col_index, value):
+        if row_index != col_index:
+            self.condensed[row_index * (row_index - 1) // 2
+                           + col_index] = value
+
+    def _delete(self, index):
+        import numpy
+        start = index * (index - 1) // 2
+        positions = numpy.concatenate([numpy.arange(start, start + index),
+                                       self._column_positions(index)])
+        self.condensed = numpy.delete(self.condensed, positions)
+
+    def _insert(self, index):
+        import numpy
+        # the names already include the new one, so the old rows from
+        # 'index' onwards are now one further down
+        rows = numpy.arange(index, len(self) - 1)
+        positions = numpy.concatenate([
+            numpy.repeat(index * (index - 1) // 2, index),
+            rows * (rows - 1) // 2 + index])
+        self.condensed = numpy.insert(self.condensed, positions, 0)
+
+
+class _CondensedRow(list):
+    """A row of the matrix attribute of a _CondensedDistanceMatrix (PRIVATE).
+
+    Setting values in the row sets them in the condensed array as well,
+    so that code changing dm.matrix[i][j] works as for a _DistanceMatrix.
+    """
+
+    def __init__(self, distance_matrix, index, values):
+        list.__init__(self, values)
+        self._distance_matrix = distance_matrix
+        self._index = index
+
+    def __setitem__(self, key, value):
+        values = list(self)
+        values[key] = value
+        if len(values) != len(self):
+            raise ValueError("Can't change the length of a row of the "
+                             "matrix")
+        if values[-1] != 0:
+            raise ValueError("The diagonal of the matrix is always zero")
+        list.__setitem__(self, key, value)
+        start = self._index * (self._index - 1) // 2
+        self._distance_matrix.condensed[start:start + self._index] = \
+            values[:-1]
+
+    def __setslice__(self, i, j, value):
+        # Python 2 only
+        self.__setitem__(slice(i, j), value)
+
+
+def _distance_array(distance_matrix):
+    """Return a _DistanceMatrix as a square NumPy array (PRIVATE).
+
+    Returns None if NumPy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    size = len(distance_matrix)
+    if isinstance(distance_matrix, _CondensedDistanceMatrix):
+        condensed = distance_matrix.condensed
+    else:
+        condensed = numpy.fromiter(
+            itertools.chain.from_iterable(row[:-1]
+                                          for row in distance_matrix.matrix),
+            float, size * (size - 1) // 2)
+    distances = numpy.zeros((size, size))
+    for i in range(1, size):
+        start = i * (i - 1) // 2
+        distances[i, :i] = condensed[start:start + i]
+        distances[:i, i] = condensed[start:start + i]
+    return distances
+
+
+class _ArrayMerger(object):
+    """Distances between clusters which are being joined (PRIVATE).
+
+    Used by the DistanceTreeConstructor.  Each cluster keeps the row and
+    column (its slot) of the square array of distances it started with,
+    while its index in the list of current clusters goes down as earlier
+    clusters are joined.  Used slots are filled with infinity, as is the
+    diagonal, and the smallest distance in each row is kept up to date.
+
+    Attributes:
+     - distances - The square array of distances.
+     - slots - List of the slot of each current cluster.
+     - position - Array of the index of the cluster in each slot (or -1).
+     - row_min - Array of the smallest distance in each row.
+    """
+
+    def __init__(self, distances):
+        import numpy
+        numpy.fill_diagonal(distances, numpy.inf)
+        self.distances = distances
+        self.slots = list(range(len(distances)))
+        self.position = numpy.arange(len(distances))
+        self.row_min = distances.min(axis=1)
+        self._row_arg = distances.argmin(axis=1)
+
+    def merge(self, index1, index2, new):
+        """Replace the clusters at index1 and index2 by a new cluster.
+
+        The new cluster takes the slot and index of the cluster at index2,
+        with the given array of distances to the other slots.
+        """
+        import numpy
+        slot1 = self.slots[index1]
+        slot2 = self.slots[index2]
+        new[self.position < 0] = numpy.inf
+        new[[slot1, slot2]] = numpy.inf
+        self.distances[slot1, :] = numpy.inf
+        self.distances[:, slot1] = numpy.inf
+        self.distances[slot2, :] = new
+        self.distances[:, slot2] = new
+
+        # the smallest distances, looking again through the rows where
+        # it was to either of the old clusters, unless the new one is
+        # closer
+        closer = new < self.row_min
+        self.row_min[closer] = new[closer]
+        self._row_arg[closer] = slot2
+        stale = ((self._row_arg == slot1) | (self._row_arg == slot2)) \
+                & ~closer & (self.position >= 0)
+        stale[slot1] = False
+        stale[slot2] = True
+        rows = numpy.flatnonzero(stale)
+        block = self.distances[rows]
+        self.row_min[rows] = block.min(axis=1)
+        self._row_arg[rows] = block.argmin(axis=1)
+        self.row_min[slot1] = numpy.inf
+
+        self.position[slot1] = -1
+        self.position[self.position > index1] -= 1
+        del self.slots[index1]
+
+
 class DistanceCalculator(object):
     """Class to calculate the distance matrix from a DNA or Protein
     Multiple Sequence Alignment(MSA) and the given name of the
@@ -388,8 +695,15 @@ class DistanceCalculator(object):
 
     models = ['identity'] + dna_models + protein_models
 
-    def __init__(self, model='identity'):
-        """Initialize with a distance model"""
+    def __init__(self, model='identity', processes=None):
+        """Initialize with a distance model
+
+        If NumPy is installed, all of the pairwise distances are calculated
+        together, a block of alignment columns at a time.  These blocks
+        can be shared out between several processes (using the
+        multiprocessing module) by setting processes to more than one.
+        """
+        self.processes = processes
 
         if model == 'identity':
             self.scoring_matrix = None
@@ -450,11 +764,107 @@ class DistanceCalculator(object):
             raise TypeError("Must provide a MultipleSeqAlignment object.")
 
         names = [s.id for s in msa]
+        distances = self._get_distances(msa)
+        if distances is not None:
+            return _CondensedDistanceMatrix(names, distances)
         dm = _DistanceMatrix(names)
         for seq1, seq2 in itertools.combinations(msa, 2):
             dm[seq1.id, seq2.id] = self._pairwise(seq1, seq2)
         return dm
 
+    def _get_distances(self, msa):
+        """Calculate all the pairwise distances using NumPy (PRIVATE).
+
+        Returns the distances as a condensed NumPy array (see the
+        _CondensedDistanceMatrix class), or None
+        if NumPy is not available (or the sequences are not all single
+        byte letters), in which case _pairwise should be used instead.
+        The distances are the same as those from _pairwise.
+        """
+        try:
+            import numpy
+        except ImportError:
+            return None
+        if len(msa) < 2:
+            return None
+        rows = [str(record.seq) for record in msa]
+        data = _py3k._as_bytes("".join(rows))
+        if len(data) != len(rows) * msa.get_alignment_length():
+            return None
+        array = numpy.frombuffer(data, numpy.uint8).reshape(len(rows), -1)
+        # number the letters used from zero
+        present = numpy.flatnonzero(numpy.bincount(array.ravel(),
+                                                   minlength=256))
+        lookup = numpy.zeros(256, numpy.uint8)
+        lookup[present] = numpy.arange(len(present))
+        codes = lookup[array]
+        letters = [chr(code) for code in present]
+
+        if self.scoring_matrix:
+            skip_letters = ['-', '*']
+            valid = numpy.array([letter not in skip_letters
+                                 for letter in letters])
+            known = [letter in self.scoring_matrix.names
+                     for letter in letters]
+            # any unknown letter compared to another sequence is an error,
+            # (anything but a gap in another sequence in the same column)
+            bad = numpy.array([ok and not k for ok, k in zip(valid, known)])
+            if bad.any():
+                compared = valid[codes].sum(axis=0) > 1
+                problems = numpy.argwhere(bad[codes] & compared)
+                if len(problems):
+                    row, col = problems[0]
+                    raise ValueError("Bad alphabet '%s' in sequence '%s' at "
+                                     "position '%s'" % (rows[row][col],
+                                                        msa[int(row)].id, col))
+            scores = numpy.zeros((len(letters), len(letters)))
+            for i, letter1 in enumerate(letters):
+                for j, letter2 in enumerate(letters):
+                    if valid[i] and valid[j] and known[i] and known[j]:
+                        scores[i, j] = self.scoring_matrix[letter1, letter2]
+            limit = numpy.abs(scores).max()
+            whole = (scores == numpy.round(scores)).all()
+        else:
+            scores = valid = None
+            limit = 1
+            whole = True
+        # With small enough whole number scores, single precision sums
+        # are exact
+        if whole and limit * codes.shape[1] < 2 ** 24:
+            dtype = numpy.float32
+        else:
+            dtype = numpy.float64
+
+        # share out the columns, one block per process
+        step = max(1, -(-codes.shape[1] // (self.processes or 1)))
+        tasks = [(codes[:, start:start + step], scores, valid, dtype)
+                 for start in range(0, codes.shape[1], step)]
+        if self.processes and self.processes > 1 and len(tasks) > 1:
+            from multiprocessing import Pool
+            pool = Pool(self.processes)
+            try:
+                results = pool.map(_score_columns, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_score_columns(task) for task in tasks]
+        score = sum(result[0] for result in results)
+        if self.scoring_matrix:
+            max_score = sum(result[1] for result in results)
+            max_score = numpy.maximum(max_score, max_score.T)
+        else:
+            max_score = numpy.empty_like(score)
+            max_score.fill(codes.shape[1])
+        lower = numpy.tril_indices(len(rows), -1)
+        if not max_score[lower].all():
+            raise ZeroDivisionError("No positions to compare in some pairs "
+                                    "of sequences")
+        max_score[numpy.diag_indices(len(rows))] = 1
+        distances = 1 - score / max_score
+        return numpy.concatenate([distances[i, :i]
+                                  for i in range(len(rows))])
+
     def _build_protein_matrix(self, subsmat):
         """Convert matrix from SubsMat format to _Matrix object"""
         protein_matrix = _Matrix(self.protein_alphabet)
@@ -558,6 +968,10 @@ class DistanceTreeConstructor(TreeConstructor):
         if not isinstance(distance_matrix, _DistanceMatrix):
             raise TypeError("Must provide a _DistanceMatrix object.")
 
+        distances = _distance_array(distance_matrix)
+        if distances is not None:
+            return self._upgma_array(distance_matrix.names, distances)
+
         # make a copy of the distance matrix to be used
         dm = copy.deepcopy(distance_matrix)
         # init terminal clades
@@ -621,6 +1035,10 @@ class DistanceTreeConstructor(TreeConstructor):
         if not isinstance(distance_matrix, _DistanceMatrix):
             raise TypeError("Must provide a _DistanceMatrix object.")
 
+        distances = _distance_array(distance_matrix)
+        if distances is not None:
+            return self._nj_array(distance_matrix.names, distances)
+
         # make a copy of the distance matrix to be used
         dm = copy.deepcopy(distance_matrix)
         # init terminal clades
@@ -691,6 +1109,200 @@ class DistanceTreeConstructor(TreeConstructor):
 
         return BaseTree.Tree(root, rooted=False)
 
+    def _upgma_array(self, names, distances):
+        """Construct an UPGMA tree from a square array of distances (PRIVATE).
+
+        This gives the same tree as the upgma method does without NumPy,
+        joining the same pairs (with ties broken the same way).  Rather
+        than searching all the distances for the smallest each time, the
+        smallest distance in each row is kept up to date.
+        """
+        import numpy
+        clades = [BaseTree.Clade(None, name) for name in names]
+        merger = _ArrayMerger(distances)
+        # height of each internal clade (by slot), see _height_of
+        heights = {}
+        inner_count = 0
+        while len(clades) > 1:
+            min_dist = merger.row_min.min()
+            # the last of the closest pairs (in the order of the rows and
+            # then columns of the lower triangular matrix)
+            best = None
+            for slot in numpy.flatnonzero(merger.row_min == min_dist):
+                cols = merger.position[merger.distances[slot] == min_dist]
+                cols = cols[(cols >= 0) & (cols < merger.position[slot])]
+                if len(cols):
+                    pair = (merger.position[slot], cols.max())
+                    if best is None or pair > best:
+                        best = pair
+            min_i, min_j = int(best[0]), int(best[1])
+            min_dist = float(min_dist)
+
+            # create clade
+            clade1 = clades[min_i]
+            clade2 = clades[min_j]
+            inner_count += 1
+            inner_clade = BaseTree.Clade(None, "Inner" + str(inner_count))
+            inner_clade.clades.append(clade1)
+            inner_clade.clades.append(clade2)
+            #assign branch length
+            slot1 = merger.slots[min_i]
+            slot2 = merger.slots[min_j]
+            if clade1.is_terminal():
+                clade1.branch_length = min_dist * 1.0 / 2
+                height1 = clade1.branch_length
+            else:
+                height1 = heights.pop(slot1)
+                clade1.branch_length = min_dist * 1.0 / 2 - height1
+            if clade2.is_terminal():
+                clade2.branch_length = min_dist * 1.0 / 2
+                height2 = clade2.branch_length
+            else:
+                height2 = heights.pop(slot2)
+                clade2.branch_length = min_dist * 1.0 / 2 - height2
+            heights[slot2] = max(height1, height2)
+
+            # update node list
+            clades[min_j] = inner_clade
+            del clades[min_i]
+
+            # set the distances of new node at the index of min_j
+            merger.merge(min_i, min_j, (merger.distances[slot1]
+                                        + merger.distances[slot2]) * 1.0 / 2)
+        inner_clade.branch_length = 0
+        return BaseTree.Tree(inner_clade)
+
+    def _nj_array(self, names, distances):
+        """Construct a Neighbor Joining tree from a square array (PRIVATE).
+
+        This gives the same tree as the nj method does without NumPy.  The
+        sum of the distances in each row is updated after each join rather
+        than worked out again, and rows are only searched if a lower bound
+        on their values could beat the best pair found so far.  The few
+        pairs which come close are then checked with the row sums worked
+        out in full, so rounding cannot change which pair is joined.
+        """
+        import numpy
+        clades = [BaseTree.Clade(None, name) for name in names]
+        # the sum of the distances in each row (minus infinity once used)
+        row_sums = distances.sum(axis=1)
+        merger = _ArrayMerger(distances)
+        distances = merger.distances
+        # the smallest of distances[row] - node_dist in each row when it
+        # was last searched, and how far node_dist could have gone up by
+        # then and since (as in RapidNJ), giving a lower bound for rows
+        # which have not been searched again
+        row_terms = numpy.empty(len(distances))
+        row_terms.fill(-numpy.inf)
+        row_drift = numpy.zeros(len(distances))
+        row_best = numpy.empty(len(distances))
+        drift = 0.0
+        node_dist = None
+        inner_count = 0
+        while len(clades) > 2:
+            old_dist = node_dist
+            node_dist = row_sums / (len(clades) - 2)
+            if old_dist is not None:
+                others = merger.position >= 0
+                others[slot2] = False
+                drift += max(0.0, (node_dist[others] - old_dist[others]).max())
+                # allow for the distances to the new node
+                row_terms = numpy.minimum(row_terms, distances[:, slot2]
+                                          - node_dist[slot2]
+                                          + (drift - row_drift))
+            bounds = row_terms - (drift - row_drift) - node_dist
+            # allow for rounding in the row sums
+            tol = 1e-9 * (1 + numpy.abs(node_dist[merger.slots]).max())
+            # find the rows which could hold the minimum distance pair,
+            # searching the most promising rows first (in growing chunks)
+            order = numpy.argsort(bounds)
+            min_dist = numpy.inf
+            start, size = 0, 16
+            while (start < len(clades)
+                   and bounds[order[start]] <= min_dist + tol):
+                chunk = order[start:start + size]
+                values = distances[chunk]
+                values -= node_dist
+                row_terms[chunk] = values.min(axis=1)
+                row_drift[chunk] = drift
+                row_best[chunk] = row_terms[chunk] - node_dist[chunk]
+                min_dist = min(min_dist, row_best[chunk].min())
+                start, size = start + size, size * 2
+            rows = order[:start]
+            rows = rows[row_best[rows] <= min_dist + tol]
+            # work out the candidates again just as the nj method does
+            # without NumPy (adding up each row in order), so the same
+            # pair is picked (the first one, in the order of the rows
+            # and then columns of the lower triangular matrix)
+            block = distances[rows][:, merger.slots]
+            row_pos = merger.position[rows]
+            near = block - (node_dist[merger.slots] + node_dist[rows, None])
+            near = near <= min_dist + tol
+            block[numpy.arange(len(rows)), row_pos] = 0
+            exact_dist = numpy.zeros(len(distances))
+            exact_dist[rows] = (numpy.cumsum(block, axis=1)[:, -1]
+                               / (len(clades) - 2))
+            pos_i, pos_j = numpy.nonzero(near)
+            pos_i = row_pos[pos_i]
+            pos_i, pos_j = pos_i[pos_i > pos_j], pos_j[pos_i > pos_j]
+            slots = numpy.array(merger.slots)
+            slots_i, slots_j = slots[pos_i], slots[pos_j]
+            values = (distances[slots_i, slots_j] - exact_dist[slots_i]
+                      - exact_dist[slots_j])
+            first = numpy.lexsort((pos_j, pos_i, values))[0]
+            if (pos_i[first], pos_j[first]) == (1, 0):
+                min_i, min_j = 0, 1
+            else:
+                min_i, min_j = int(pos_i[first]), int(pos_j[first])
+
+            # create clade
+            clade1 = clades[min_i]
+            clade2 = clades[min_j]
+            inner_count += 1
+            inner_clade = BaseTree.Clade(None, "Inner" + str(inner_count))
+            inner_clade.clades.append(clade1)
+            inner_clade.clades.append(clade2)
+            #assign branch length
+            slot1 = merger.slots[min_i]
+            slot2 = merger.slots[min_j]
+            dist = float(distances[slot1, slot2])
+            clade1.branch_length = (dist + float(exact_dist[slot1])
+                                    - float(exact_dist[slot2])) / 2.0
+            clade2.branch_length = dist - clade1.branch_length
+
+            # update node list
+            clades[min_j] = inner_clade
+            del clades[min_i]
+
+            # set the distances of new node at the index of min_j, and
+            # update the row sums to match
+            new = (distances[slot1] + distances[slot2] - dist) / 2.0
+            others = merger.position >= 0
+            others[[slot1, slot2]] = False
+            row_sums[others] += (new[others] - distances[slot1, others]
+                                 - distances[slot2, others])
+            row_sums[slot2] = new[others].sum()
+            row_sums[slot1] = -numpy.inf
+            row_terms[slot1] = numpy.inf
+            row_terms[slot2] = -numpy.inf
+            merger.merge(min_i, min_j, new)
+
+        # set the last clade as one of the child of the inner_clade
+        root = None
+        last_dist = float(distances[merger.slots[1], merger.slots[0]])
+        if clades[0] == inner_clade:
+            clades[0].branch_length = 0
+            clades[1].branch_length = last_dist
+            clades[0].clades.append(clades[1])
+            root = clades[0]
+        else:
+            clades[0].branch_length = last_dist
+            clades[1].branch_length = 0
+            clades[1].clades.append(clades[0])
+            root = clades[1]
+
+        return BaseTree.Tree(root, rooted=False)
+
     def _height_of(self, clade):
         """calculate height of the clade -- the longest path to one of
         the terminals"""
@@ -754,14 +1366,30 @@ class NNITreeSearcher(TreeSearcher):
         """Search the best parsimony tree by using the NNI(Nearest
         Neighbor Interchanges) algorithm"""
         best_tree = starting_tree
+        fitch = None
         while True:
             best_score = self.scorer.get_score(best_tree, alignment)
             temp = best_score
-            for t in self._get_neighbors(best_tree):
-                score = self.scorer.get_score(t, alignment)
-                if score < best_score:
-                    best_score = score
-                    best_tree = t
+            if fitch is None and isinstance(self.scorer, ParsimonyScorer) \
+                    and not self.scorer.matrix:
+                # the scorer has sorted the alignment to match the tree
+                fitch = self.scorer._fitch_patterns(alignment)
+            if fitch:
+                # score each neighbor by only working out the states
+                # again above the change, and copy the better ones
+                tree = best_tree
+                scores = self.scorer._fitch_scores(tree, *fitch)
+                for path in self._nni_moves(tree):
+                    score = self.scorer._fitch_rescore(scores, path, fitch[1])
+                    if score < best_score:
+                        best_score = score
+                        best_tree = copy.deepcopy(tree)
+            else:
+                for t in self._get_neighbors(best_tree):
+                    score = self.scorer.get_score(t, alignment)
+                    if score < best_score:
+                        best_score = score
+                        best_tree = t
             # stop if no smaller score exist
             if best_score >= temp:
                 break
@@ -770,17 +1398,28 @@ class NNITreeSearcher(TreeSearcher):
     def _get_neighbors(self, tree):
         """Get all neighbor trees of the given tree(currently only
          for binary rooted tree)"""
+        return [copy.deepcopy(tree) for changed in self._nni_moves(tree)]
+
+    def _nni_moves(self, tree):
+        """Make each of the NNI changes to the tree in turn (PRIVATE).
+
+        This is a generator, which changes the tree in place before each
+        value it yields, and changes it back afterwards.  Each value is the
+        list of clades whose descendants changed, from the lowest up to the
+        root.  The tree is only as it was once the generator is finished.
+        """
         # make child to parent dict
         parents = {}
         for clade in tree.find_clades():
-            if clade != tree.root:
-                node_path = tree.get_path(clade)
-                # cannot get the parent if the parent is root. Bug?
-                if len(node_path) == 1:
-                    parents[clade] = tree.root
-                else:
-                    parents[clade] = node_path[-2]
-        neighbors = []
+            for child in clade.clades:
+                parents[child] = clade
+
+        def path_up(clade):
+            path = [clade]
+            while path[-1] in parents:
+                path.append(parents[path[-1]])
+            return path
+
         root_childs = []
         for clade in tree.get_nonterminals(order="level"):
             if clade == tree.root:
@@ -799,15 +1438,13 @@ class NNITreeSearcher(TreeSearcher):
                     del right.clades[1]
                     left.clades.append(right_right)
                     right.clades.append(left_right)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield [left, right, clade]
                     # neighbor 2 (left_left + right_left)
                     del left.clades[1]
                     del right.clades[0]
                     left.clades.append(right_left)
                     right.clades.append(right_right)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield [left, right, clade]
                     # change back (left_left + left_right)
                     del left.clades[1]
                     del right.clades[0]
@@ -829,15 +1466,13 @@ class NNITreeSearcher(TreeSearcher):
                     del clade.clades[1]
                     parent.clades.append(right)
                     clade.clades.append(sister)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield path_up(clade)
                     # neighbor 2 (parent + left)
                     del parent.clades[1]
                     del clade.clades[0]
                     parent.clades.append(left)
                     clade.clades.append(right)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield path_up(clade)
                     # change back (parent + sister)
                     del parent.clades[1]
                     del clade.clades[0]
@@ -850,21 +1485,18 @@ class NNITreeSearcher(TreeSearcher):
                     del clade.clades[1]
                     parent.clades.insert(0, right)
                     clade.clades.append(sister)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield path_up(clade)
                     # neighbor 2 (parent + left)
                     del parent.clades[0]
                     del clade.clades[0]
                     parent.clades.insert(0, left)
                     clade.clades.append(right)
-                    temp_tree = copy.deepcopy(tree)
-                    neighbors.append(temp_tree)
+                    yield path_up(clade)
                     # change back (parent + sister)
                     del parent.clades[0]
                     del clade.clades[0]
                     parent.clades.insert(0, sister)
                     clade.clades.insert(0, left)
-        return neighbors
 
 ######################### Parsimony Classes ##########################
 
@@ -900,6 +1532,10 @@ class ParsimonyScorer(Scorer):
         alignment.sort()
         if not all([t.name == a.id for t, a in zip(terms, alignment)]):
             raise ValueError("Taxon names of the input tree should be the same with the alignment.")
+        if not self.matrix:
+            fitch = self._fitch_patterns(alignment)
+            if fitch:
+                return self._fitch_scores(tree, *fitch)[tree.root][1]
         #term_align = dict(zip(terms, alignment))
         score = 0
         for i in range(len(alignment[0])):
@@ -962,6 +1598,93 @@ class ParsimonyScorer(Scorer):
             score = score + score_i
         return score
 
+    def _fitch_patterns(self, alignment):
+        """Encode the variable columns of the alignment as bitmasks (PRIVATE).
+
+        Each different letter is given a bit, and identical columns are
+        only kept once, so the Fitch algorithm can be run on all of them
+        at once.  Returns a tuple of an array of the bitmasks (with a row
+        for each sequence and a column for each distinct column pattern)
+        and an array of how many times each pattern occurs, or None if
+        NumPy is not installed (or the letters are not single bytes, or
+        there are more than 64 different letters).
+        """
+        try:
+            import numpy
+        except ImportError:
+            return None
+        rows = [str(record.seq) for record in alignment]
+        data = _py3k._as_bytes("".join(rows))
+        if len(data) != len(rows) * alignment.get_alignment_length():
+            return None
+        codes = numpy.frombuffer(data, numpy.uint8).reshape(len(rows), -1)
+        # skip non-informative columns
+        codes = codes[:, (codes != codes[0]).any(axis=0)]
+        letters, codes = numpy.unique(codes, return_inverse=True)
+        if len(letters) > 64:
+            return None
+        for dtype in (numpy.uint8, numpy.uint16, numpy.uint32, numpy.uint64):
+            if len(letters) <= numpy.iinfo(dtype).bits:
+                break
+        bits = numpy.uint64(1) << numpy.arange(len(letters),
+                                               dtype=numpy.uint64)
+        masks = bits.astype(dtype)[codes].reshape(len(rows), -1)
+        if not masks.shape[1]:
+            return masks, numpy.zeros(0, int)
+        # sort the columns and keep the first of each run of equal ones
+        # (numpy.unique can only do this itself from NumPy 1.13)
+        masks = masks[:, numpy.lexsort(masks[::-1])]
+        first = numpy.ones(masks.shape[1], bool)
+        first[1:] = (masks[:, 1:] != masks[:, :-1]).any(axis=0)
+        starts = numpy.flatnonzero(first)
+        counts = numpy.diff(numpy.append(starts, masks.shape[1]))
+        return numpy.ascontiguousarray(masks[:, starts]), counts
+
+    def _fitch_scores(self, tree, patterns, weights):
+        """Run the Fitch algorithm on all the column patterns (PRIVATE).
+
+        Returns a dictionary giving each clade's states (an array of
+        bitmasks) and the parsimony score of the clade's subtree.  The
+        rows of patterns are for the terminals sorted by name.
+        """
+        terms = tree.get_terminals()
+        terms.sort(key=lambda term: term.name)
+        scores = dict((term, (states, 0))
+                      for term, states in zip(terms, patterns))
+        for clade in tree.get_nonterminals(order="postorder"):
+            scores[clade] = _fitch_join(scores[clade.clades[0]],
+                                        scores[clade.clades[1]], weights)
+        return scores
+
+    def _fitch_rescore(self, scores, path, weights):
+        """Return the parsimony score after the tree has been changed (PRIVATE).
+
+        The scores are those from _fitch_scores before the change, and
+        path lists the clades whose descendants have changed, from the
+        lowest one up to the root.  The scores are not updated.
+        """
+        changed = {}
+        for clade in path:
+            left, right = clade.clades[:2]
+            changed[clade] = _fitch_join(changed.get(left) or scores[left],
+                                         changed.get(right) or scores[right],
+                                         weights)
+        return changed[path[-1]][1]
+
+
+def _fitch_join(left, right, weights):
+    """Fitch states and score of a clade from those of its children (PRIVATE).
+
+    The states are arrays of bitmasks for each column pattern, and the
+    weights are how many times each pattern occurs.
+    """
+    left_states, left_score = left
+    right_states, right_score = right
+    states = left_states & right_states
+    empty = states == 0
+    states[empty] = left_states[empty] | right_states[empty]
+    return states, left_score + right_score + int(weights[empty].sum())
+
 
 class ParsimonyTreeConstructor(TreeConstructor):
     """Parsimony tree constructor.
@@ -17,11 +17,14 @@ __docformat__ = "epytext en"  # Don't just use plain text in epydoc API pages!
 
 import string  # for maketrans only
 import array
+import bisect
+import re
 import sys
 import warnings
 
 from Bio._py3k import range
 from Bio._py3k import basestring
+from Bio._py3k import _as_bytes, _as_string
 
 from Bio import Alphabet
 from Bio.Alphabet import IUPAC
@@ -1464,6 +1467,464 @@ class UnknownSeq(Seq):
             return Seq("", s.alphabet)
 
 
+#UCSC 2bit style packing, four bases per byte with the first base in the
+#most significant bits, using T=0, C=1, A=2, G=3.
+_twobit_letters = "TCAG"
+_twobit_byte_table = ["".join(_twobit_letters[(b >> shift) & 3]
+                              for shift in (6, 4, 2, 0))
+                      for b in range(256)]
+
+
+def _unpack_twobit(data, skip, length):
+    """Decode 2-bit packed bytes into a string of letters (PRIVATE).
+
+    Arguments:
+     - data - bytes (or anything bytearray accepts) holding the packed bases
+     - skip - number of bases to ignore at the start of the first byte
+     - length - number of bases to return
+
+    Returns an upper case string made of the letters T, C, A and G.
+    """
+    table = _twobit_byte_table
+    return "".join([table[b] for b in bytearray(data)])[skip:skip + length]
+
+
+_twobit_pack_table = dict((letters, b) for (b, letters)
+                          in enumerate(_twobit_byte_table))
+
+
+def _pack_twobit(data):
+    """Encode a nucleotide string using 2 bits per base (PRIVATE).
+
+    Returns a tuple of the packed bytes, and lists of (start, length) tuples
+    for the blocks of N characters and the soft-masked (lower case) blocks.
+    Only the letters A, C, G, T and N (in either case) can be packed.
+
+    >>> packed, n_blocks, mask_blocks = _pack_twobit("NNCGAGTCaga")
+    >>> packed == b"\\x07\\xb1\\xb8"
+    True
+    >>> n_blocks, mask_blocks
+    ([(0, 2)], [(8, 3)])
+    """
+    upper = data.upper()
+    n_blocks = [(m.start(), m.end() - m.start())
+                for m in re.finditer("N+", upper)]
+    mask_blocks = [(m.start(), m.end() - m.start())
+                   for m in re.finditer("[a-z]+", data)]
+    codes = upper.replace("N", "T")
+    bad = re.search("[^TCAG]", codes)
+    if bad:
+        raise ValueError("Can't pack %r using 2 bits per base"
+                         % bad.group())
+    codes += "T" * (-len(codes) % 4)
+    table = _twobit_pack_table
+    packed = bytearray([table[codes[i:i + 4]]
+                        for i in range(0, len(codes), 4)])
+    return bytes(packed), n_blocks, mask_blocks
+
+
+def _apply_blocks(text, start, starts, ends, function):
+    """Apply function to parts of text covered by sorted blocks (PRIVATE).
+
+    The text covers positions start to start+len(text) of the full sequence,
+    while starts and ends hold the (sorted, non-overlapping) block boundaries
+    in full sequence coordinates. Used for N and soft-mask blocks.
+    """
+    end = start + len(text)
+    i = bisect.bisect_right(ends, start)
+    while i < len(starts) and starts[i] < end:
+        s = max(starts[i], start) - start
+        e = min(ends[i], end) - start
+        text = text[:s] + function(text[s:e]) + text[e:]
+        i += 1
+    return text
+
+
+class MmapSeq(Seq):
+    """A read-only sequence object backed by a memory mapped file.
+
+    This is intended for chromosome scale sequences, where holding a full
+    python string for every sequence (in every process) is wasteful. The
+    sequence is only decoded as needed, so slicing gives another MmapSeq
+    sharing the same memory map, and only the region of interest is read:
+
+    >>> from Bio.Seq import MmapSeq
+    >>> from Bio.Alphabet import generic_dna
+    >>> my_seq = MmapSeq(b"NNNNACGTTGCAATGGCCATTGTAATGGGCCGCTGAAAGGGTGCCCGATAG",
+    ...                  generic_dna)
+    >>> my_seq
+    MmapSeq('NNNNACGTTGCAATGGCCATTGTAATGGGCCGCTGAAAGGGTGCCCGATAG', DNAAlphabet())
+    >>> len(my_seq)
+    51
+    >>> my_seq[12:]
+    MmapSeq('ATGGCCATTGTAATGGGCCGCTGAAAGGGTGCCCGATAG', DNAAlphabet())
+    >>> my_seq[12:].translate()
+    Seq('MAIVMGR*KGAR*', HasStopCodon(ExtendedIUPACProtein(), '*'))
+    >>> my_seq.find("ATG")
+    12
+    >>> my_seq.count("G")
+    16
+
+    Normally you would give a filename (or a binary file handle), and the
+    file is memory mapped read only. Since the operating system shares its
+    page cache, many processes can then use the same sequence file without
+    each holding its own copy. A "plain" file just holds the sequence
+    letters, e.g. a single line FASTA body or a raw sequence dump, starting
+    at the given offset.
+
+    The file can also hold 2-bit packed nucleotides (four bases per byte,
+    the first base in the most significant bits, using T=0, C=1, A=2, G=3
+    as in the UCSC .2bit format). In this case the length must be given,
+    along with any blocks of N characters and soft-masked (lower case)
+    regions as lists of (start, length) tuples:
+
+    >>> packed = MmapSeq(b"\\x07\\xb1\\xb8", generic_dna, length=11, packed=True,
+    ...                  n_blocks=[(0, 2)], mask_blocks=[(8, 3)])
+    >>> print(packed)
+    NNCGAGTCaga
+    >>> print(packed[3:10].reverse_complement())
+    ctGACTC
+
+    Note that slicing with a step, and methods returning a new modified
+    sequence (like complement or translate) give an ordinary Seq object
+    holding the decoded region.
+    """
+    #Size of the blocks decoded at a time when searching the sequence
+    _chunk_size = 2 ** 20
+
+    def __init__(self, source, alphabet=Alphabet.generic_alphabet, offset=0,
+                 length=None, packed=False, n_blocks=None, mask_blocks=None):
+        """Create a new MmapSeq object.
+
+        Arguments:
+         - source - Filename, binary file handle (opened for reading), or an
+           existing buffer object like an mmap or bytes string.  On Python 2,
+           where a bytes string is a str, give a filename as unicode.
+         - alphabet - Optional argument, an Alphabet object from Bio.Alphabet
+         - offset - Offset in bytes of the start of the sequence data.
+         - length - Sequence length. Defaults to the rest of the file for
+           plain sequences, and is required for packed sequences.
+         - packed - Boolean, is the data 2-bit packed?
+         - n_blocks - Packed sequences only, list of (start, length) tuples
+           giving regions of N characters.
+         - mask_blocks - Packed sequences only, list of (start, length)
+           tuples giving soft-masked (lower case) regions.
+        """
+        self._filename = None
+        if isinstance(source, (bytes, bytearray)):
+            #In memory data
+            pass
+        elif isinstance(source, basestring):
+            self._filename = source
+            source = self._map_file(source)
+        elif hasattr(source, "fileno"):
+            self._filename = getattr(source, "name", None)
+            source = self._map_file(source)
+        self._setup(source, alphabet, offset, length, packed,
+                    n_blocks, mask_blocks)
+
+    def _setup(self, source, alphabet, offset, length, packed,
+               n_blocks, mask_blocks):
+        """Check the arguments and record the buffer details (PRIVATE)."""
+        offset = int(offset)
+        if offset < 0 or offset > len(source):
+            raise ValueError("Offset %i outside the data" % offset)
+        if length is None:
+            if packed:
+                raise ValueError("Length is required for packed sequences")
+            length = len(source) - offset
+        length = int(length)
+        if packed:
+            max_length = 4 * (len(source) - offset)
+        else:
+            max_length = len(source) - offset
+        if length < 0 or length > max_length:
+            raise ValueError("Length %i does not fit in the data" % length)
+        if not packed and (n_blocks or mask_blocks):
+            raise ValueError("N and mask blocks only apply to packed data")
+        self.alphabet = alphabet
+        self._buffer = source
+        self._offset = offset
+        self._packed = bool(packed)
+        self._n_starts, self._n_ends = self._sorted_blocks(n_blocks)
+        self._mask_starts, self._mask_ends = self._sorted_blocks(mask_blocks)
+        #The region of the full sequence this object covers, which
+        #lets slices share the buffer and block lists:
+        self._start = 0
+        self._length = length
+
+    @staticmethod
+    def _map_file(source):
+        """Memory map a filename or handle read only (PRIVATE)."""
+        import mmap
+        if isinstance(source, basestring):
+            handle = open(source, "rb")
+        else:
+            handle = source
+        try:
+            handle.seek(0, 2)
+            if not handle.tell():
+                #Can't mmap an empty file
+                return b""
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            if handle is not source:
+                handle.close()
+
+    @staticmethod
+    def _sorted_blocks(blocks):
+        """Turn (start, length) tuples into sorted start and end lists (PRIVATE)."""
+        if not blocks:
+            return [], []
+        blocks = sorted((int(s), int(s) + int(l)) for s, l in blocks if l)
+        return [s for s, e in blocks], [e for s, e in blocks]
+
+    def __getstate__(self):
+        """Pickle support, the memory map is re-opened from the filename."""
+        if self._filename is None:
+            #Buffer is in memory (e.g. bytes), so include it
+            if not isinstance(self._buffer, bytes):
+                raise TypeError("Can't pickle MmapSeq without a filename")
+            return self.__dict__
+        state = self.__dict__.copy()
+        del state["_buffer"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "_buffer" not in state:
+            self._buffer = self._map_file(self._filename)
+
+    def _view(self, start, end):
+        """New MmapSeq for the given region of this sequence (PRIVATE)."""
+        answer = self.__class__.__new__(self.__class__)
+        answer.__dict__.update(self.__dict__)
+        answer._start = self._start + start
+        answer._length = end - start
+        return answer
+
+    def _get_region(self, start, end):
+        """Decode the given region of this sequence as a string (PRIVATE).
+
+        The start and end must be valid (non-negative) coordinates within
+        this sequence.
+        """
+        if end <= start:
+            return ""
+        start += self._start
+        end += self._start
+        if not self._packed:
+            return _as_string(self._buffer[self._offset + start:
+                                           self._offset + end])
+        data = self._buffer[self._offset + start // 4:
+                            self._offset + (end + 3) // 4]
+        text = _unpack_twobit(data, start % 4, end - start)
+        if self._n_starts:
+            text = _apply_blocks(text, start, self._n_starts, self._n_ends,
+                                 lambda s: "N" * len(s))
+        if self._mask_starts:
+            text = _apply_blocks(text, start, self._mask_starts,
+                                 self._mask_ends, lambda s: s.lower())
+        return text
+
+    def __len__(self):
+        """Returns the length of the sequence, use len(my_seq)."""
+        return self._length
+
+    def __str__(self):
+        """Returns the full sequence as a python string (decoding it all)."""
+        return self._get_region(0, self._length)
+
+    def __repr__(self):
+        """Returns a (truncated) representation of the sequence for debugging."""
+        if self._length > 60:
+            return "%s('%s...%s', %s)" % (self.__class__.__name__,
+                                          self._get_region(0, 54),
+                                          self._get_region(self._length - 3,
+                                                           self._length),
+                                          repr(self.alphabet))
+        else:
+            return "%s(%s, %s)" % (self.__class__.__name__,
+                                   repr(str(self)),
+                                   repr(self.alphabet))
+
+    def __add__(self, other):
+        #Offload to the base class...
+        return Seq(str(self), self.alphabet) + other
+
+    def __radd__(self, other):
+        #Offload to the base class...
+        return other + Seq(str(self), self.alphabet)
+
+    def __getitem__(self, index):
+        """Get a letter or subsequence, only decoding what is needed.
+
+        Simple slices (without a step) give another MmapSeq object sharing
+        the same memory map, while slices with a step give a Seq object.
+        """
+        if isinstance(index, int):
+            if index < 0:
+                index += self._length
+            if index < 0 or index >= self._length:
+                raise IndexError("index out of range")
+            return self._get_region(index, index + 1)
+        start, end, step = index.indices(self._length)
+        if step == 1:
+            return self._view(start, max(start, end))
+        positions = range(start, end, step)
+        if not positions:
+            return Seq("", self.alphabet)
+        low = min(positions[0], positions[-1])
+        high = max(positions[0], positions[-1]) + 1
+        text = self._get_region(low, high)
+        return Seq(text[positions[0] - low::step], self.alphabet)
+
+    def _search_bounds(self, sub, start, end):
+        """Check alphabet and normalise arguments for searching (PRIVATE)."""
+        sub_str = self._get_seq_str_and_check_alphabet(sub)
+        start, end = slice(start, end).indices(self._length)[:2]
+        return sub_str, start, end
+
+    def count(self, sub, start=0, end=sys.maxsize):
+        """Non-overlapping count method, like that of a python string.
+
+        This behaves like the Seq object method of the same name, but
+        decodes the sequence in blocks rather than all at once.
+        """
+        sub_str, start, end = self._search_bounds(sub, start, end)
+        if not sub_str:
+            return str(self).count(sub_str, start, end)
+        size = len(sub_str)
+        total = 0
+        pos = start
+        while pos < end:
+            stop = min(end, pos + self._chunk_size)
+            #Include enough overlap to see any match starting before stop
+            text = self._get_region(pos, min(end, stop + size - 1))
+            if size == 1:
+                total += text.count(sub_str)
+                pos = stop
+            else:
+                #Splitting is greedy like count, and tells us where
+                #the last match ended (it may run past stop)
+                pieces = text.split(sub_str)
+                total += len(pieces) - 1
+                pos = max(stop, pos + len(text) - len(pieces[-1]))
+        return total
+
+    def find(self, sub, start=0, end=sys.maxsize):
+        """Find method, like that of a python string.
+
+        This behaves like the Seq object method of the same name, but
+        decodes the sequence in blocks rather than all at once.
+        """
+        sub_str, start, end = self._search_bounds(sub, start, end)
+        if not sub_str:
+            return str(self).find(sub_str, start, end)
+        if not self._packed:
+            offset = self._offset + self._start
+            index = self._buffer.find(_as_bytes(sub_str),
+                                      offset + start, offset + end)
+            if index == -1:
+                return -1
+            return index - offset
+        size = len(sub_str)
+        pos = start
+        while pos < end:
+            stop = min(end, pos + self._chunk_size)
+            text = self._get_region(pos, min(end, stop + size - 1))
+            index = text.find(sub_str)
+            if index != -1:
+                return pos + index
+            pos = stop
+        return -1
+
+    def rfind(self, sub, start=0, end=sys.maxsize):
+        """Find from right method, like that of a python string.
+
+        This behaves like the Seq object method of the same name, but
+        decodes the sequence in blocks rather than all at once.
+        """
+        sub_str, start, end = self._search_bounds(sub, start, end)
+        if not sub_str:
+            return str(self).rfind(sub_str, start, end)
+        if not self._packed:
+            offset = self._offset + self._start
+            index = self._buffer.rfind(_as_bytes(sub_str),
+                                       offset + start, offset + end)
+            if index == -1:
+                return -1
+            return index - offset
+        size = len(sub_str)
+        pos = end
+        while pos > start:
+            low = max(start, pos - self._chunk_size - size + 1)
+            text = self._get_region(low, pos)
+            index = text.rfind(sub_str)
+            if index != -1:
+                return low + index
+            if low == start:
+                break
+            pos = low + size - 1
+        return -1
+
+    def __contains__(self, char):
+        """Implements the 'in' keyword, like a python string."""
+        return self.find(char) != -1
+
+    def complement(self):
+        """Returns the complement sequence as a new Seq object."""
+        #Offload to the base class (decoding the sequence once)
+        return Seq(str(self), self.alphabet).complement()
+
+
+class PackedSeq(MmapSeq):
+    """A read-only nucleotide sequence stored using 2 bits per base.
+
+    This holds the sequence in memory as a quarter of the size of a normal
+    Seq object, plus lists of any blocks of N characters and soft-masked
+    (lower case) regions, as used in the UCSC .2bit format:
+
+    >>> from Bio.Seq import PackedSeq
+    >>> from Bio.Alphabet import generic_dna
+    >>> my_seq = PackedSeq("NNNNNNACGTTGCAATGGCCATTGTaatgggccgctgaNNN",
+    ...                    generic_dna)
+    >>> my_seq
+    PackedSeq('NNNNNNACGTTGCAATGGCCATTGTaatgggccgctgaNNN', DNAAlphabet())
+    >>> my_seq[14:26]
+    PackedSeq('ATGGCCATTGTa', DNAAlphabet())
+    >>> my_seq[14:].translate()
+    Seq('MAIVMGR*X', HasStopCodon(ExtendedIUPACProtein(), '*'))
+
+    Only the letters A, C, G, T and N (in upper or lower case) can be
+    stored, anything else is an error:
+
+    >>> PackedSeq("ACGTRY")
+    Traceback (most recent call last):
+       ...
+    ValueError: Can't pack 'R' using 2 bits per base
+
+    Slicing gives another PackedSeq sharing the same packed data, and
+    searching with the count, find and rfind methods decodes the sequence
+    in blocks. Like the MmapSeq object this is based on, methods giving a
+    new modified sequence return an ordinary Seq object.
+    """
+    def __init__(self, data, alphabet=Alphabet.generic_alphabet):
+        """Create a new PackedSeq object from a string.
+
+        Arguments:
+         - data - Sequence, required (string)
+         - alphabet - Optional argument, an Alphabet object from Bio.Alphabet
+        """
+        if not isinstance(data, basestring):
+            raise TypeError("The sequence data given to a PackedSeq object "
+                            "should be a string (not another Seq object etc)")
+        packed, n_blocks, mask_blocks = _pack_twobit(data)
+        self._filename = None
+        self._setup(packed, alphabet, 0, len(data), True,
+                    n_blocks, mask_blocks)
+
+
 class MutableSeq(object):
     """An editable sequence object (with an alphabet).
 
@@ -369,6 +369,7 @@ from Bio.Alphabet import single_letter_alphabet
 from Bio.Seq import Seq, UnknownSeq
 from Bio.SeqRecord import SeqRecord
 from Bio.SeqIO.Interfaces import SequentialSequenceWriter
+from itertools import islice
 from math import log
 import warnings
 from Bio import BiopythonWarning, BiopythonParserWarning
@@ -954,7 +955,6 @@ def FastqGeneralIterator(handle):
 
         #Return the record and then continue...
         yield (title_line, seq_string, quality_string)
-    raise StopIteration
 
 
 def FastqPhredIterator(handle, alphabet=single_letter_alphabet, title2ids=None):
@@ -1020,6 +1020,18 @@ def FastqPhredIterator(handle, alphabet=single_letter_alphabet, title2ids=None):
     >>> print(record.letter_annotations["phred_quality"])
     [26, 26, 26, 26, 26, 26, 26, 26, 26, 26, 26, 24, 26, 22, 26, 26, 13, 22, 26, 18, 24, 18, 18, 18, 18]
 
+    """
+    make_record = _fastq_phred_record_maker(alphabet, title2ids)
+    for title_line, seq_string, quality_string in FastqGeneralIterator(handle):
+        yield make_record(title_line, seq_string, quality_string)
+
+
+def _fastq_phred_record_maker(alphabet, title2ids):
+    """Return a function turning FASTQ entries into SeqRecord objects (PRIVATE).
+
+    The function takes the title line, sequence string and quality string
+    (as from FastqGeneralIterator), and returns a SeqRecord with the PHRED
+    qualities decoded using the Sanger offset.
     """
     assert SANGER_SCORE_OFFSET == ord("!")
     #Originally, I used a list expression for each record:
@@ -1030,7 +1042,8 @@ def FastqPhredIterator(handle, alphabet=single_letter_alphabet, title2ids=None):
     q_mapping = dict()
     for letter in range(0, 255):
         q_mapping[chr(letter)] = letter - SANGER_SCORE_OFFSET
-    for title_line, seq_string, quality_string in FastqGeneralIterator(handle):
+
+    def make_record(title_line, seq_string, quality_string):
         if title2ids:
             id, name, descr = title2ids(title_line)
         else:
@@ -1049,7 +1062,8 @@ def FastqPhredIterator(handle, alphabet=single_letter_alphabet, title2ids=None):
         #record.letter_annotations["phred_quality"] = qualities
         dict.__setitem__(record._per_letter_annotations,
                          "phred_quality", qualities)
-        yield record
+        return record
+    return make_record
 
 
 def FastqSolexaIterator(handle, alphabet=single_letter_alphabet, title2ids=None):
@@ -1795,6 +1809,270 @@ def PairedFastaQualIterator(fasta_handle, qual_handle, alphabet=single_letter_al
     #Done
 
 
+def _fastq_mate_id(title):
+    """Return the part of a FASTQ title line naming the read pair (PRIVATE).
+
+    This is the first word of the title, without any /1 or /2 suffix (as
+    used in older Illumina FASTQ files), e.g.
+
+    >>> print(_fastq_mate_id("HWI-ST1:8:FC:1:1101:1234:2000/2"))
+    HWI-ST1:8:FC:1:1101:1234:2000
+    >>> print(_fastq_mate_id("HWI-ST1:8:FC:1:1101:1234:2000 1:N:0:ATCACG"))
+    HWI-ST1:8:FC:1:1101:1234:2000
+    """
+    name = title.split(None, 1)[0] if title else title
+    if name[-2:] in ("/1", "/2"):
+        return name[:-2]
+    return name
+
+
+def _fastq_batches(handle, batch_size, make_record=None):
+    """Generator of batches of FASTQ entries from a handle (PRIVATE).
+
+    Yields tuples of two lists, the title lines, and either (title, sequence,
+    quality) string tuples as from FastqGeneralIterator, or the result of
+    calling make_record with those strings.
+    """
+    entries = FastqGeneralIterator(handle)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            break
+        titles = [entry[0] for entry in batch]
+        if make_record is not None:
+            batch = [make_record(*entry) for entry in batch]
+        yield titles, batch
+
+
+def _threaded(iterator, queue_size=4):
+    """Run an iterator in a background thread (PRIVATE).
+
+    The values are passed back via a queue of the given size, which allows
+    the reading (and decoding) of two files to overlap. Any exception in the
+    background thread is raised again in the caller.
+    """
+    import threading
+    try:
+        from queue import Queue, Full
+    except ImportError:
+        #Python 2
+        from Queue import Queue, Full
+    done = object()
+    values = Queue(queue_size)
+    stop = threading.Event()
+
+    def worker():
+        try:
+            for value in iterator:
+                while not stop.is_set():
+                    try:
+                        values.put((value, None), timeout=0.1)
+                        break
+                    except Full:
+                        pass
+                if stop.is_set():
+                    return
+            values.put((done, None))
+        except Exception as err:
+            values.put((done, err))
+
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            value, err = values.get()
+            if value is done:
+                if err is not None:
+                    raise err
+                break
+            yield value
+    finally:
+        #In case the caller stopped early
+        stop.set()
+
+
+def PairedFastqGeneralIterator(handle1, handle2=None, check_ids=True,
+                               threads=False, batch_size=1000):
+    """Iterate over paired-end FASTQ files as pairs of string tuples.
+
+     - handle1 - input file with the first reads of each pair (R1), or
+                 an interleaved FASTQ file if handle2 is omitted.
+     - handle2 - optional input file with the second reads (R2).
+     - check_ids - should the mates be checked to have the same name?
+                   This compares the first word of the title lines,
+                   ignoring any /1 and /2 suffix.
+     - threads - should each file be read in its own thread?
+     - batch_size - number of reads taken from each file at a time.
+
+    Like FastqGeneralIterator, this does not decode the qualities, and yields
+    pairs of (title, sequence, quality) tuples of strings. e.g.
+
+    >>> with open("Quality/example.fastq") as handle:
+    ...     for first, second in PairedFastqGeneralIterator(handle,
+    ...                                                     check_ids=False):
+    ...         print("%s %s" % (first[0], second[0]))
+    ...
+    Traceback (most recent call last):
+    ...
+    ValueError: Interleaved FASTQ file has an odd number of entries.
+
+    Each file is read in batches, and with the threads option the reading of
+    the two files (including any decompression) can overlap.
+    """
+    if handle2 is None:
+        #Interleaved FASTQ, simply take pairs of entries
+        entries = FastqGeneralIterator(handle1)
+        for first in entries:
+            try:
+                second = next(entries)
+            except StopIteration:
+                raise ValueError("Interleaved FASTQ file has an odd number "
+                                 "of entries.")
+            if check_ids and \
+                    _fastq_mate_id(first[0]) != _fastq_mate_id(second[0]):
+                raise ValueError("Interleaved FASTQ entries do not match "
+                                 "(%s vs %s)." % (first[0], second[0]))
+            yield first, second
+        return
+    for titles, first, second in _paired_fastq_batches(handle1, handle2,
+                                                       check_ids, threads,
+                                                       batch_size):
+        for pair in zip(first, second):
+            yield pair
+
+
+def _paired_fastq_batches(handle1, handle2, check_ids, threads, batch_size,
+                          make_record=None):
+    """Generator of matched batches from two FASTQ files (PRIVATE).
+
+    Yields tuples of the titles from the first file, and the two lists of
+    entries (see the _fastq_batches function).
+    """
+    batches1 = _fastq_batches(handle1, batch_size, make_record)
+    batches2 = _fastq_batches(handle2, batch_size, make_record)
+    if threads:
+        batches1 = _threaded(batches1)
+        batches2 = _threaded(batches2)
+    #Using (Python 3 style) zip wouldn't load everything into memory,
+    #but also would not catch any extra records found in only one file.
+    while True:
+        try:
+            titles1, first = next(batches1)
+        except StopIteration:
+            titles1, first = [], []
+        try:
+            titles2, second = next(batches2)
+        except StopIteration:
+            titles2, second = [], []
+        if len(first) < len(second):
+            raise ValueError("Second FASTQ file has more entries than the "
+                             "first.")
+        if len(first) > len(second):
+            raise ValueError("First FASTQ file has more entries than the "
+                             "second.")
+        if not first:
+            break
+        if check_ids:
+            for title1, title2 in zip(titles1, titles2):
+                if _fastq_mate_id(title1) != _fastq_mate_id(title2):
+                    raise ValueError("Paired FASTQ entries do not match "
+                                     "(%s vs %s)." % (title1, title2))
+        yield titles1, first, second
+
+
+def PairedFastqIterator(handle1, handle2=None,
+                        alphabet=single_letter_alphabet, title2ids=None,
+                        check_ids=True, threads=False, batch_size=1000):
+    """Iterate over paired-end (Sanger style) FASTQ files as SeqRecord pairs.
+
+     - handle1 - input file with the first reads of each pair (R1), or
+                 an interleaved FASTQ file if handle2 is omitted.
+     - handle2 - optional input file with the second reads (R2).
+     - alphabet - optional alphabet
+     - title2ids - optional function to split the title lines, as for the
+                   FastqPhredIterator.
+     - check_ids - should the mates be checked to have the same name?
+                   This is done on the title lines before any SeqRecord
+                   objects are made, comparing the first word and ignoring
+                   any /1 and /2 suffix.
+     - threads - should each file be read and decoded in its own thread?
+     - batch_size - number of reads taken from each file at a time.
+
+    Unlike using zip with two calls to Bio.SeqIO.parse, this checks the
+    read names match, and that both files have the same number of reads.
+    For example, using the same file as both halves of the pairs:
+
+    >>> with open("Quality/example.fastq") as r1:
+    ...     with open("Quality/example.fastq") as r2:
+    ...         for first, second in PairedFastqIterator(r1, r2):
+    ...             print("%s %s" % (first.id, second.id))
+    ...
+    EAS54_6_R1_2_1_413_324 EAS54_6_R1_2_1_413_324
+    EAS54_6_R1_2_1_540_792 EAS54_6_R1_2_1_540_792
+    EAS54_6_R1_2_1_443_348 EAS54_6_R1_2_1_443_348
+
+    See also the write_paired_fastq function, which can write the pairs
+    to two files, or interleaved in a single file.
+    """
+    make_record = _fastq_phred_record_maker(alphabet, title2ids)
+    if handle2 is None:
+        for first, second in PairedFastqGeneralIterator(handle1, None,
+                                                        check_ids):
+            yield make_record(*first), make_record(*second)
+        return
+    for titles, first, second in _paired_fastq_batches(handle1, handle2,
+                                                       check_ids, threads,
+                                                       batch_size,
+                                                       make_record):
+        for pair in zip(first, second):
+            yield pair
+
+
+def write_paired_fastq(pairs, handle1, handle2=None):
+    """Write pairs of SeqRecord objects as (Sanger style) FASTQ.
+
+     - pairs - iterable of (first, second) SeqRecord tuples, e.g. from
+               the PairedFastqIterator.
+     - handle1 - output handle for the first reads of each pair, or for
+                 both reads (interleaved) if handle2 is omitted.
+     - handle2 - optional output handle for the second reads.
+
+    Returns the number of pairs written. For example, to interleave two
+    FASTQ files:
+
+    >>> try:
+    ...     from StringIO import StringIO # Python 2
+    ... except ImportError:
+    ...     from io import StringIO # Python 3
+    ...
+    >>> out_handle = StringIO()
+    >>> with open("Quality/example.fastq") as r1:
+    ...     with open("Quality/example.fastq") as r2:
+    ...         write_paired_fastq(PairedFastqIterator(r1, r2), out_handle)
+    ...
+    3
+    >>> print(out_handle.getvalue().count("@EAS54_6_R1_2_1_540_792"))
+    2
+    """
+    writer1 = FastqPhredWriter(handle1)
+    writer1.write_header()
+    if handle2 is None:
+        writer2 = writer1
+    else:
+        writer2 = FastqPhredWriter(handle2)
+        writer2.write_header()
+    count = 0
+    for first, second in pairs:
+        writer1.write_record(first)
+        writer2.write_record(second)
+        count += 1
+    writer1.write_footer()
+    if handle2 is not None:
+        writer2.write_footer()
+    return count
+
+
 if __name__ == "__main__":
     from Bio._utils import run_doctest
     run_doctest(verbose=0)
@@ -239,6 +239,8 @@ from Bio.SeqIO.Interfaces import SequenceWriter
 from Bio import Alphabet
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
+import array
+import itertools
 import struct
 import sys
 import re
@@ -251,6 +253,9 @@ _srt = b".srt"
 _mft = b".mft"
 _flag = b"\xff"
 
+#The fixed part of each read header, see _sff_read_seq_record
+_read_header_struct = struct.Struct(">2HI4H")
+
 
 def _sff_file_header(handle):
     """Read in an SFF file header (PRIVATE).
@@ -564,8 +569,14 @@ _valid_UAN_read_name = re.compile(r'^[a-zA-Z0-9]{14}$')
 
 
 def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
-                         key_sequence, alphabet, trim=False):
-    """Parse the next read in the file, return data as a SeqRecord (PRIVATE)."""
+                         key_sequence, alphabet, trim=False,
+                         flow_arrays=False):
+    """Parse the next read in the file, return data as a SeqRecord (PRIVATE).
+
+    If flow_arrays is True, the flow values and flow index are decoded
+    directly from the bytes read into array objects (from the standard
+    library array module), rather than as tuples of integers.
+    """
     #Now on to the reads...
     #the read header format (fixed part):
     #read_header_length     H
@@ -576,14 +587,13 @@ def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
     #clip_adapter_left      H
     #clip_adapter_right     H
     #[rest of read header depends on the name length etc]
-    read_header_fmt = '>2HI4H'
-    read_header_size = struct.calcsize(read_header_fmt)
-    read_flow_fmt = ">%iH" % number_of_flows_per_read
-    read_flow_size = struct.calcsize(read_flow_fmt)
+    read_header_size = _read_header_struct.size
+    #NOTE - assuming flowgram_format==1, which means struct type H
+    read_flow_size = 2 * number_of_flows_per_read
 
     read_header_length, name_length, seq_len, clip_qual_left, \
         clip_qual_right, clip_adapter_left, clip_adapter_right \
-        = struct.unpack(read_header_fmt, handle.read(read_header_size))
+        = _read_header_struct.unpack(handle.read(read_header_size))
     if clip_qual_left:
         clip_qual_left -= 1  # python counting
     if clip_adapter_left:
@@ -601,12 +611,10 @@ def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
                       "byte padding region contained data" % padding,
                       BiopythonParserWarning)
     #now the flowgram values, flowgram index, bases and qualities
-    #NOTE - assuming flowgram_format==1, which means struct type H
     flow_values = handle.read(read_flow_size)  # unpack later if needed
-    temp_fmt = ">%iB" % seq_len  # used for flow index and quals
     flow_index = handle.read(seq_len)  # unpack later if needed
     seq = _bytes_to_string(handle.read(seq_len))  # TODO - Use bytes in Seq?
-    quals = list(struct.unpack(temp_fmt, handle.read(seq_len)))
+    quals = list(bytearray(handle.read(seq_len)))
     #now any padding...
     padding = (read_flow_size + seq_len * 3) % 8
     if padding:
@@ -617,7 +625,41 @@ def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
             warnings.warn("Your SFF file is invalid, post quality %i "
                           "byte padding region contained data" % padding,
                           BiopythonParserWarning)
-    #Follow Roche and apply most aggressive of qual and adapter clipping.
+    if trim:
+        #Don't need the flow information, so don't decode it
+        flow_values = flow_index = None
+    elif flow_arrays:
+        flow_values = _sff_flow_array(flow_values)
+        flow_index = array.array("B", flow_index)
+    else:
+        flow_values = struct.unpack(">%iH" % number_of_flows_per_read,
+                                    flow_values)
+        flow_index = tuple(bytearray(flow_index))
+    return _sff_make_record(name, seq, quals, clip_qual_left,
+                            clip_qual_right, clip_adapter_left,
+                            clip_adapter_right, flow_values, flow_index,
+                            flow_chars, key_sequence, alphabet, trim)
+
+
+def _sff_flow_array(data):
+    """Decode big endian flowgram values as an unsigned short array (PRIVATE).
+
+    >>> print(list(_sff_flow_array(b"\\x00\\x53\\x00\\x01\\x01\\x02")))
+    [83, 1, 258]
+    """
+    values = array.array("H", data)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def _sff_clip_positions(seq_len, clip_qual_left, clip_qual_right,
+                        clip_adapter_left, clip_adapter_right):
+    """Combine the SFF clipping values into a left and right clip (PRIVATE).
+
+    Follows Roche and applies the most aggressive of the quality and adapter
+    clipping. The left values should already be in python counting.
+    """
     #Note Roche seems to ignore adapter clip fields when writing SFF,
     #and uses just the quality clipping values for any clipping.
     clip_left = max(clip_qual_left, clip_adapter_left)
@@ -632,6 +674,17 @@ def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
         clip_right = clip_adapter_right
     else:
         clip_right = seq_len
+    return clip_left, clip_right
+
+
+def _sff_make_record(name, seq, quals, clip_qual_left, clip_qual_right,
+                     clip_adapter_left, clip_adapter_right, flow_values,
+                     flow_index, flow_chars, key_sequence, alphabet, trim):
+    """Build a SeqRecord from the decoded values of an SFF read (PRIVATE)."""
+    clip_left, clip_right = _sff_clip_positions(len(seq), clip_qual_left,
+                                                clip_qual_right,
+                                                clip_adapter_left,
+                                                clip_adapter_right)
     #Now build a SeqRecord
     if trim:
         if clip_left >= clip_right:
@@ -658,8 +711,8 @@ def _sff_read_seq_record(handle, number_of_flows_per_read, flow_chars,
             seq = seq[:clip_left].lower() + \
                 seq[clip_left:clip_right].upper() + \
                 seq[clip_right:].lower()
-        annotations = {"flow_values": struct.unpack(read_flow_fmt, flow_values),
-                       "flow_index": struct.unpack(temp_fmt, flow_index),
+        annotations = {"flow_values": flow_values,
+                       "flow_index": flow_index,
                        "flow_chars": flow_chars,
                        "flow_key": key_sequence,
                        "clip_qual_left": clip_qual_left,
@@ -806,13 +859,18 @@ class _AddTellHandle(object):
 
 
 #This is a generator function!
-def SffIterator(handle, alphabet=Alphabet.generic_dna, trim=False):
+def SffIterator(handle, alphabet=Alphabet.generic_dna, trim=False,
+                flow_arrays=False):
     """Iterate over Standard Flowgram Format (SFF) reads (as SeqRecord objects).
 
     handle - input file, an SFF file, e.g. from Roche 454 sequencing.
              This must NOT be opened in universal read lines mode!
     alphabet - optional alphabet, defaults to generic DNA.
     trim - should the sequences be trimmed?
+    flow_arrays - should the flow values and flow index annotations be
+                  array objects (from the standard library array module)
+                  rather than tuples? These are decoded directly from the
+                  bytes read, and take much less memory.
 
     The resulting SeqRecord objects should match those from a paired FASTA
     and QUAL file converted from the SFF file using the Roche 454 tool
@@ -870,6 +928,18 @@ def SffIterator(handle, alphabet=Alphabet.generic_dna, trim=False):
     E3MFGYR02GPGB1 221
     E3MFGYR02F7Z7G 130
 
+    Or, with the flow information as compact arrays:
+
+    >>> with open("Roche/E3MFGYR02_random_10_reads.sff", "rb") as handle:
+    ...     record = next(SffIterator(handle, flow_arrays=True))
+    ...
+    >>> record.annotations["flow_values"][:5]
+    array('H', [84, 1, 123, 5, 8])
+    >>> record.annotations["flow_index"][:5]
+    array('B', [1, 2, 3, 2, 0])
+
+    See also the SffBatchIterator function for a faster bulk mode using
+    NumPy arrays.
     """
     if isinstance(Alphabet._get_base_alphabet(alphabet),
                   Alphabet.ProteinAlphabet):
@@ -885,27 +955,31 @@ def SffIterator(handle, alphabet=Alphabet.generic_dna, trim=False):
     header_length, index_offset, index_length, number_of_reads, \
         number_of_flows_per_read, flow_chars, key_sequence \
         = _sff_file_header(handle)
-    #Now on to the reads...
-    #the read header format (fixed part):
-    #read_header_length     H
-    #name_length            H
-    #seq_len                I
-    #clip_qual_left         H
-    #clip_qual_right        H
-    #clip_adapter_left      H
-    #clip_adapter_right     H
-    #[rest of read header depends on the name length etc]
-    read_header_fmt = '>2HI4H'
-    read_header_size = struct.calcsize(read_header_fmt)
-    read_flow_fmt = ">%iH" % number_of_flows_per_read
-    read_flow_size = struct.calcsize(read_flow_fmt)
-    assert 1 == struct.calcsize(">B")
-    assert 1 == struct.calcsize(">s")
-    assert 1 == struct.calcsize(">c")
-    assert read_header_size % 8 == 0  # Important for padding calc later!
-    #The spec allows for the index block to be before or even in the middle
-    #of the reads. We can check that if we keep track of our position
-    #in the file...
+    for read in _sff_reads(handle, number_of_reads, index_offset,
+                           index_length):
+        yield _sff_read_seq_record(handle,
+                                   number_of_flows_per_read,
+                                   flow_chars,
+                                   key_sequence,
+                                   alphabet,
+                                   trim,
+                                   flow_arrays)
+
+
+def _sff_reads(handle, number_of_reads, index_offset, index_length):
+    """Generator moving the handle to the start of each read in turn (PRIVATE).
+
+    Yields the number of each read (counting from zero), with the handle
+    positioned at the start of that read. The caller is expected to read
+    the record before asking for the next one.
+
+    The spec allows for the index block to be before or even in the middle
+    of the reads. We can check that if we keep track of our position in the
+    file, and skip over it. Once all the reads have been done, the end of
+    the file is checked (see the _check_eof function).
+    """
+    #Important for padding calculations:
+    assert _read_header_struct.size % 8 == 0
     for read in range(number_of_reads):
         if index_offset and handle.tell() == index_offset:
             offset = index_offset + index_length
@@ -916,12 +990,7 @@ def SffIterator(handle, alphabet=Alphabet.generic_dna, trim=False):
             #Now that we've done this, we don't need to do it again. Clear
             #the index_offset so we can skip extra handle.tell() calls:
             index_offset = 0
-        yield _sff_read_seq_record(handle,
-                                   number_of_flows_per_read,
-                                   flow_chars,
-                                   key_sequence,
-                                   alphabet,
-                                   trim)
+        yield read
     _check_eof(handle, index_offset, index_length)
 
 
@@ -997,6 +1066,220 @@ def _SffTrimIterator(handle, alphabet=Alphabet.generic_dna):
     return SffIterator(handle, alphabet, trim=True)
 
 
+class SffBatch(object):
+    """A batch of SFF reads held as columns of NumPy arrays.
+
+    Rather than building a SeqRecord for each read, a batch holds the values
+    for many reads at once, which is much faster and uses far less memory
+    for large SFF files (see the SffBatchIterator function). The attributes
+    are:
+
+     - names - list of read names (strings).
+     - flow_values - two dimensional array of the flowgram values, one row
+       per read (big endian unsigned shorts as in the SFF file).
+     - seq_lengths - array of the read lengths.
+     - offsets - array of where each read starts (plus the final end) in
+       the following per-base values, which are concatenated for all reads.
+     - bases - bytes string of the bases, as in the SFF file.
+     - flow_index - array of flowgram index values (unsigned bytes).
+     - quals - array of the PHRED quality scores (unsigned bytes).
+     - clip_qual_left, clip_qual_right, clip_adapter_left and
+       clip_adapter_right - arrays of the clipping values, using Python
+       counting (as in the SeqRecord annotations from SffIterator).
+     - flow_chars and flow_key - strings, as for SffIterator.
+
+    The clipping arrays can be modified in place (e.g. to trim a primer
+    from every read) before writing the batch with SffWriter.
+    """
+
+    def __init__(self, names, flow_values, seq_lengths, bases, flow_index,
+                 quals, clip_qual_left, clip_qual_right, clip_adapter_left,
+                 clip_adapter_right, flow_chars, flow_key):
+        import numpy
+        self.names = names
+        self.flow_values = flow_values
+        self.seq_lengths = numpy.asarray(seq_lengths, numpy.int64)
+        self.offsets = numpy.zeros(len(names) + 1, numpy.int64)
+        numpy.cumsum(self.seq_lengths, out=self.offsets[1:])
+        self.bases = bases
+        self.flow_index = flow_index
+        self.quals = quals
+        self.clip_qual_left = numpy.asarray(clip_qual_left, numpy.int64)
+        self.clip_qual_right = numpy.asarray(clip_qual_right, numpy.int64)
+        self.clip_adapter_left = numpy.asarray(clip_adapter_left, numpy.int64)
+        self.clip_adapter_right = numpy.asarray(clip_adapter_right,
+                                                numpy.int64)
+        self.flow_chars = flow_chars
+        self.flow_key = flow_key
+        if len(flow_values) != len(names) \
+                or self.offsets[-1] != len(bases) \
+                or len(bases) != len(flow_index) \
+                or len(bases) != len(quals):
+            raise ValueError("Inconsistent lengths for SFF batch values")
+
+    def __len__(self):
+        """Return the number of reads in the batch."""
+        return len(self.names)
+
+    def __repr__(self):
+        return "%s(<%i reads>)" % (self.__class__.__name__, len(self))
+
+    def clip_positions(self):
+        """Return arrays of the left and right clip positions for all reads.
+
+        This combines the quality and adapter clipping values in the same
+        way as SffIterator, applying the most aggressive clipping. Where the
+        clipping values overlap the read is clipped to nothing (the left
+        and right positions are equal), so right - left gives the trimmed
+        lengths.
+        """
+        import numpy
+        left = numpy.maximum(self.clip_qual_left, self.clip_adapter_left)
+        qual_right = self.clip_qual_right
+        adapter_right = self.clip_adapter_right
+        #Right clipping of zero means no clipping
+        right = numpy.where(qual_right > 0,
+                            numpy.where(adapter_right > 0,
+                                        numpy.minimum(qual_right,
+                                                      adapter_right),
+                                        qual_right),
+                            numpy.where(adapter_right > 0,
+                                        adapter_right,
+                                        self.seq_lengths))
+        right = numpy.minimum(right, self.seq_lengths)
+        left = numpy.minimum(left, right)
+        return left, right
+
+    def trimmed(self):
+        """Iterate over the trimmed reads as (name, bases, quals) tuples.
+
+        The bases are a bytes string (upper case), and the qualities a
+        NumPy array (a view into the quals attribute). This uses the clip
+        positions from the clip_positions method, and does not build any
+        SeqRecord objects.
+        """
+        left, right = self.clip_positions()
+        left = (self.offsets[:-1] + left).tolist()
+        right = (self.offsets[:-1] + right).tolist()
+        bases = self.bases
+        quals = self.quals
+        for name, start, end in zip(self.names, left, right):
+            yield name, bases[start:end].upper(), quals[start:end]
+
+    def records(self, alphabet=Alphabet.generic_dna, trim=False):
+        """Iterate over the reads as SeqRecord objects.
+
+        The records are as from SffIterator (with the same alphabet and trim
+        arguments), except the flow values and flow index annotations are
+        NumPy arrays (views into this batch).
+        """
+        offsets = self.offsets.tolist()
+        flow_values = self.flow_values
+        flow_index = self.flow_index
+        bases = self.bases
+        quals = self.quals
+        for i, (name, clip_qual_left, clip_qual_right, clip_adapter_left,
+                clip_adapter_right) in enumerate(zip(
+                    self.names, self.clip_qual_left.tolist(),
+                    self.clip_qual_right.tolist(),
+                    self.clip_adapter_left.tolist(),
+                    self.clip_adapter_right.tolist())):
+            start, end = offsets[i], offsets[i + 1]
+            yield _sff_make_record(name, _bytes_to_string(bases[start:end]),
+                                   quals[start:end].tolist(),
+                                   clip_qual_left, clip_qual_right,
+                                   clip_adapter_left, clip_adapter_right,
+                                   flow_values[i], flow_index[start:end],
+                                   self.flow_chars, self.flow_key,
+                                   alphabet, trim)
+
+
+#This is a generator function!
+def SffBatchIterator(handle, batch_size=10000):
+    """Iterate over Standard Flowgram Format (SFF) reads in batches (NumPy).
+
+    handle - input file, an SFF file, e.g. from Roche 454 sequencing.
+             This must NOT be opened in universal read lines mode!
+    batch_size - maximum number of reads in each batch.
+
+    Returns SffBatch objects holding the values for up to batch_size reads
+    as NumPy arrays, decoded straight from the bytes read from the file
+    without building any per-read SeqRecord objects. This is intended for
+    bulk processing of large SFF files, e.g.
+
+        with open("Roche/E3MFGYR02_random_10_reads.sff", "rb") as handle:
+            for batch in SffBatchIterator(handle, batch_size=4):
+                left, right = batch.clip_positions()
+                print("%i reads, %i trimmed bases" % (len(batch), sum(right - left)))
+
+    would give:
+
+        4 reads, 1112 trimmed bases
+        4 reads, 954 trimmed bases
+        2 reads, 351 trimmed bases
+
+    Each batch can be turned into SeqRecord objects if needed (see the
+    SffBatch records method), or written with SffWriter's write_batches
+    method. This requires NumPy.
+    """
+    try:
+        import numpy
+    except ImportError:
+        from Bio import MissingPythonDependencyError
+        raise MissingPythonDependencyError(
+            "Install NumPy if you want to use SffBatchIterator")
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least one")
+    try:
+        assert 0 == handle.tell(), "Not at start of file, offset %i" % handle.tell()
+    except AttributeError:
+        #Probably a network handle or something like that
+        handle = _AddTellHandle(handle)
+    header_length, index_offset, index_length, number_of_reads, \
+        number_of_flows_per_read, flow_chars, key_sequence \
+        = _sff_file_header(handle)
+    read_header_size = _read_header_struct.size
+    read_header_unpack = _read_header_struct.unpack_from
+    flow_size = 2 * number_of_flows_per_read
+    reads = _sff_reads(handle, number_of_reads, index_offset, index_length)
+    while True:
+        names = []
+        seq_lengths = []
+        clips = []
+        flow_values = []
+        per_base = ([], [], [])
+        for read in itertools.islice(reads, batch_size):
+            raw = _sff_read_raw_record(handle, number_of_flows_per_read)
+            read_header_length, name_length, seq_len, clip_qual_left, \
+                clip_qual_right, clip_adapter_left, clip_adapter_right \
+                = read_header_unpack(raw)
+            names.append(raw[read_header_size:read_header_size + name_length])
+            seq_lengths.append(seq_len)
+            clips.append((clip_qual_left, clip_qual_right,
+                          clip_adapter_left, clip_adapter_right))
+            start = read_header_length + flow_size
+            flow_values.append(raw[read_header_length:start])
+            for values in per_base:
+                values.append(raw[start:start + seq_len])
+                start += seq_len
+        if not names:
+            break
+        clips = numpy.array(clips, numpy.int64).reshape(-1, 4)
+        #Python counting for the left clip values (zero means no clipping)
+        for column in (0, 2):
+            clips[:, column] -= clips[:, column] > 0
+        flow_values = numpy.frombuffer(b"".join(flow_values), ">u2")
+        flow_index, bases, quals = [b"".join(values) for values in per_base]
+        yield SffBatch([_bytes_to_string(name) for name in names],
+                       flow_values.reshape(len(names),
+                                           number_of_flows_per_read),
+                       seq_lengths, bases,
+                       numpy.frombuffer(flow_index, numpy.uint8),
+                       numpy.frombuffer(quals, numpy.uint8),
+                       clips[:, 0], clips[:, 1], clips[:, 2], clips[:, 3],
+                       flow_chars, key_sequence)
+
+
 class SffWriter(SequenceWriter):
     """SFF file writer."""
 
@@ -1015,6 +1298,9 @@ class SffWriter(SequenceWriter):
             raise ValueError("SFF files must be opened in binary mode")
         self.handle = handle
         self._xml = xml
+        #Caches of precompiled struct formats, see write_record
+        self._read_headers = {}
+        self._read_bytes_structs = {}
         if index:
             self._index = []
         else:
@@ -1023,23 +1309,10 @@ class SffWriter(SequenceWriter):
     def write_file(self, records):
         """Use this to write an entire file containing the given records."""
         try:
-            self._number_of_reads = len(records)
+            number_of_reads = len(records)
         except TypeError:
-            self._number_of_reads = 0  # dummy value
-            if not hasattr(self.handle, "seek") \
-                    or not hasattr(self.handle, "tell"):
-                raise ValueError("A handle with a seek/tell methods is "
-                                 "required in order to record the total "
-                                 "record count in the file header (once it "
-                                 "is known at the end).")
-        if self._index is not None and \
-                not (hasattr(self.handle, "seek") and hasattr(self.handle, "tell")):
-            import warnings
-            warnings.warn("A handle with a seek/tell methods is required in "
-                          "order to record an SFF index.")
-            self._index = None
-        self._index_start = 0
-        self._index_length = 0
+            number_of_reads = None
+        self._start_file(number_of_reads)
         if not hasattr(records, "next"):
             records = iter(records)
         #Get the first record in order to find the flow information
@@ -1065,6 +1338,66 @@ class SffWriter(SequenceWriter):
         for record in records:
             self.write_record(record)
             count += 1
+        return self._end_file(count)
+
+    def write_batches(self, batches):
+        """Write an entire file containing the reads in the given batches.
+
+        This is a fast path for SffBatch objects (e.g. from the function
+        SffBatchIterator), where each batch of reads is packed in one go
+        using precompiled struct formats, without any SeqRecord objects.
+        Returns the number of reads written.
+        """
+        if isinstance(batches, (list, tuple)):
+            number_of_reads = sum(len(batch) for batch in batches)
+        else:
+            number_of_reads = None
+        self._start_file(number_of_reads)
+        batches = iter(batches)
+        for batch in batches:
+            if len(batch):
+                break
+        else:
+            raise ValueError("Must have at least one sequence")
+        self._key_sequence = _as_bytes(batch.flow_key)
+        self._flow_chars = _as_bytes(batch.flow_chars)
+        self._number_of_flows_per_read = len(self._flow_chars)
+        self.write_header()
+        count = self.write_batch(batch)
+        for batch in batches:
+            count += self.write_batch(batch)
+        return self._end_file(count)
+
+    def _start_file(self, number_of_reads):
+        """Check the handle and prepare to write the reads (PRIVATE).
+
+        The number_of_reads should be None if not known in advance, in
+        which case the header is updated once all the reads are written.
+        """
+        if number_of_reads is None:
+            self._number_of_reads = 0  # dummy value
+            if not hasattr(self.handle, "seek") \
+                    or not hasattr(self.handle, "tell"):
+                raise ValueError("A handle with a seek/tell methods is "
+                                 "required in order to record the total "
+                                 "record count in the file header (once it "
+                                 "is known at the end).")
+        else:
+            self._number_of_reads = number_of_reads
+        if self._index is not None and \
+                not (hasattr(self.handle, "seek") and hasattr(self.handle, "tell")):
+            import warnings
+            warnings.warn("A handle with a seek/tell methods is required in "
+                          "order to record an SFF index.")
+            self._index = None
+        self._index_start = 0
+        self._index_length = 0
+
+    def _end_file(self, count):
+        """Record the read count and any index once the reads are done (PRIVATE).
+
+        Returns the number of reads written.
+        """
         if self._number_of_reads == 0:
             #Must go back and record the record count...
             offset = self.handle.tell()
@@ -1181,6 +1514,9 @@ class SffWriter(SequenceWriter):
                              1,  # the only flowgram format code we support
                              self._flow_chars, self._key_sequence)
         self.handle.write(header + _null * padding)
+        #NOTE - assuming flowgram_format==1, which means struct type H
+        self._flow_struct = struct.Struct(">%iH"
+                                          % self._number_of_flows_per_read)
 
     def write_record(self, record):
         """Write a single additional record to the output file.
@@ -1231,20 +1567,7 @@ class SffWriter(SequenceWriter):
 
         #Capture information for index
         if self._index is not None:
-            offset = self.handle.tell()
-            #Check the position of the final record (before sort by name)
-            #Using a four-digit base 255 number, so the upper bound is
-            #254*(1)+254*(255)+254*(255**2)+254*(255**3) = 4228250624
-            #or equivalently it overflows at 255**4 = 4228250625
-            if offset > 4228250624:
-                import warnings
-                warnings.warn("Read %s has file offset %i, which is too large "
-                              "to store in the Roche SFF index structure. No "
-                              "index block will be recorded." % (name, offset))
-                #No point recoring the offsets now
-                self._index = None
-            else:
-                self._index.append((name, self.handle.tell()))
+            self._record_offset(name, self.handle.tell())
 
         #the read header format (fixed part):
         #read_header_length     H
@@ -1260,35 +1583,136 @@ class SffWriter(SequenceWriter):
         #flow index
         #sequence
         #padding
-        read_header_fmt = '>2HI4H%is' % name_len
-        if struct.calcsize(read_header_fmt) % 8 == 0:
-            padding = 0
-        else:
-            padding = 8 - (struct.calcsize(read_header_fmt) % 8)
-        read_header_length = struct.calcsize(read_header_fmt) + padding
-        assert read_header_length % 8 == 0
-        data = struct.pack(read_header_fmt,
-                           read_header_length,
-                           name_len, seq_len,
-                           clip_qual_left, clip_qual_right,
-                           clip_adapter_left, clip_adapter_right,
-                           name) + _null * padding
-        assert len(data) == read_header_length
+        read_header, read_header_length = self._read_header(name_len)
+        data = read_header.pack(read_header_length,
+                                name_len, seq_len,
+                                clip_qual_left, clip_qual_right,
+                                clip_adapter_left, clip_adapter_right,
+                                name)
         #now the flowgram values, flowgram index, bases and qualities
         #NOTE - assuming flowgram_format==1, which means struct type H
-        read_flow_fmt = ">%iH" % self._number_of_flows_per_read
-        read_flow_size = struct.calcsize(read_flow_fmt)
-        temp_fmt = ">%iB" % seq_len  # used for flow index and quals
-        data += struct.pack(read_flow_fmt, *flow_values) \
-            + struct.pack(temp_fmt, *flow_index) \
+        read_flow_size = self._flow_struct.size
+        read_bytes = self._read_bytes(seq_len)  # used for flow index and quals
+        data += self._flow_struct.pack(*flow_values) \
+            + read_bytes.pack(*flow_index) \
             + seq \
-            + struct.pack(temp_fmt, *quals)
+            + read_bytes.pack(*quals)
         #now any final padding...
         padding = (read_flow_size + seq_len * 3) % 8
         if padding:
             padding = 8 - padding
         self.handle.write(data + _null * padding)
 
+    def write_batch(self, batch):
+        """Write a batch of additional reads (an SffBatch) to the output file.
+
+        This assumes the header has been done. All the reads in the batch are
+        packed using precompiled struct formats and written in one go.
+        Returns the number of reads written.
+        """
+        try:
+            if self._key_sequence != _as_bytes(batch.flow_key) \
+                    or self._flow_chars != _as_bytes(batch.flow_chars):
+                raise ValueError("Records have inconsistent SFF flow data")
+        except AttributeError:
+            raise ValueError("Header not written yet?")
+        if batch.flow_values.shape != (len(batch),
+                                       self._number_of_flows_per_read):
+            raise ValueError("Wrong number of SFF flow values")
+        #Clipping, using one based counting for the left values
+        clips = []
+        for clip_name, clip_values, one_based in [
+                ("clip_qual_left", batch.clip_qual_left, True),
+                ("clip_qual_right", batch.clip_qual_right, False),
+                ("clip_adapter_left", batch.clip_adapter_left, True),
+                ("clip_adapter_right", batch.clip_adapter_right, False)]:
+            if len(clip_values) and clip_values.min() < 0:
+                raise ValueError("Negative SFF %s value" % clip_name)
+            if one_based:
+                clip_values = clip_values + (clip_values > 0)
+            clips.append(clip_values.tolist())
+        #The flow values as big endian unsigned shorts, and the per-base
+        #values as unsigned bytes, exactly as they are stored in the file:
+        flow_size = 2 * self._number_of_flows_per_read
+        flow_values = batch.flow_values.astype(">u2").tobytes()
+        flow_index = batch.flow_index.astype("u1").tobytes()
+        quals = batch.quals.astype("u1").tobytes()
+        bases = batch.bases.upper()
+        offsets = batch.offsets.tolist()
+        if self._index is not None:
+            offset = self.handle.tell()
+        data = []
+        for i, name in enumerate(batch.names):
+            name = _as_bytes(name)
+            name_len = len(name)
+            start, end = offsets[i], offsets[i + 1]
+            seq_len = end - start
+            read_header, read_header_length = self._read_header(name_len)
+            padding = (flow_size + seq_len * 3) % 8
+            if padding:
+                padding = 8 - padding
+            data.append(read_header.pack(read_header_length,
+                                         name_len, seq_len,
+                                         clips[0][i], clips[1][i],
+                                         clips[2][i], clips[3][i],
+                                         name))
+            data.append(flow_values[i * flow_size:(i + 1) * flow_size])
+            data.append(flow_index[start:end])
+            data.append(bases[start:end])
+            data.append(quals[start:end])
+            data.append(_null * padding)
+            if self._index is not None:
+                self._record_offset(name, offset)
+                offset += read_header_length + flow_size + seq_len * 3 \
+                    + padding
+        self.handle.write(b"".join(data))
+        return len(batch)
+
+    def _record_offset(self, name, offset):
+        """Capture the offset of a read for the index (PRIVATE)."""
+        #Check the position of the final record (before sort by name)
+        #Using a four-digit base 255 number, so the upper bound is
+        #254*(1)+254*(255)+254*(255**2)+254*(255**3) = 4228250624
+        #or equivalently it overflows at 255**4 = 4228250625
+        if offset > 4228250624:
+            import warnings
+            warnings.warn("Read %s has file offset %i, which is too large "
+                          "to store in the Roche SFF index structure. No "
+                          "index block will be recorded." % (name, offset))
+            #No point recoring the offsets now
+            self._index = None
+        else:
+            self._index.append((name, offset))
+
+    def _read_header(self, name_len):
+        """Precompiled struct and length for a read header (PRIVATE).
+
+        The struct includes the read name and the null padding needed to
+        make the header a multiple of eight bytes.
+        """
+        try:
+            return self._read_headers[name_len]
+        except KeyError:
+            pass
+        read_header_fmt = '>2HI4H%is' % name_len
+        if struct.calcsize(read_header_fmt) % 8 == 0:
+            padding = 0
+        else:
+            padding = 8 - (struct.calcsize(read_header_fmt) % 8)
+        read_header = struct.Struct(read_header_fmt + "%ix" % padding)
+        assert read_header.size % 8 == 0
+        self._read_headers[name_len] = read_header, read_header.size
+        return read_header, read_header.size
+
+    def _read_bytes(self, seq_len):
+        """Precompiled struct for the per-base values of a read (PRIVATE)."""
+        try:
+            return self._read_bytes_structs[seq_len]
+        except KeyError:
+            read_bytes = struct.Struct(">%iB" % seq_len)
+            self._read_bytes_structs[seq_len] = read_bytes
+            return read_bytes
+
 
 if __name__ == "__main__":
     print("Running quick self test")
@@ -0,0 +1,227 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Bio.SeqIO support for the UCSC "twobit" (.2bit) file format.
+
+You are expected to use this module via the Bio.SeqIO functions under
+the format name "twobit".
+
+The .2bit format from the UCSC Genome Browser team stores nucleotide
+sequences using two bits per base (four bases per byte), plus lists of
+blocks of N characters and of soft-masked (lower case) regions. It is
+commonly used for reference genomes, see:
+http://genome.ucsc.edu/FAQ/FAQformat.html#format7
+
+The file starts with a header giving the byte order, the number of
+sequences, and an index of the sequence names and their offsets within
+the file. Each sequence then has its own small header (length, N blocks
+and mask blocks) followed by the packed bases.
+
+When reading, the file is memory mapped (where possible) and each record's
+sequence is an MmapSeq object, so nothing is decoded until it is used, and
+slices only decode the region requested. Combined with Bio.SeqIO.index this
+gives cheap random access to regions of large genomes:
+
+>>> from Bio import SeqIO
+>>> genome = SeqIO.index("TwoBit/sequence.2bit", "twobit")
+>>> sorted(genome)
+['seq11111', 'seq222', 'seq3333']
+>>> record = genome["seq222"]
+>>> print(record.seq[100:150])
+CAGAACAAGACCCCGAACTCATTTTAGAACCCCTGAAACTACGTCCTGCT
+>>> len(record)
+1257
+
+Only the letters A, C, G, T and N (in upper or lower case) can be written.
+"""
+
+from __future__ import print_function
+
+import struct
+
+from Bio import Alphabet
+from Bio.Seq import MmapSeq, _pack_twobit
+from Bio.SeqRecord import SeqRecord
+from Bio.SeqIO.Interfaces import SequenceWriter
+
+from Bio._py3k import _bytes_to_string, _as_bytes
+
+_twobit_signature = 0x1A412743
+
+
+def _twobit_buffer(handle):
+    """Memory map the file behind a handle, or read it into memory (PRIVATE).
+
+    Returns the buffer and the filename (or None if not known).
+    """
+    try:
+        handle.fileno()
+    except Exception:
+        #e.g. BytesIO handle or BGZF reader
+        return handle.read(), None
+    return MmapSeq._map_file(handle), getattr(handle, "name", None)
+
+
+def _twobit_file_header(buffer):
+    """Parse the file header and sequence index (PRIVATE).
+
+    Returns the byte order (a struct format prefix), and a list of
+    (name, offset) tuples for the sequences in the file.
+    """
+    if len(buffer) < 16:
+        raise ValueError("File too short to be a .2bit file")
+    if struct.unpack_from("<I", buffer, 0)[0] == _twobit_signature:
+        byte_order = "<"
+    elif struct.unpack_from(">I", buffer, 0)[0] == _twobit_signature:
+        byte_order = ">"
+    else:
+        raise ValueError("Not a .2bit file, bad signature")
+    version, count, reserved = struct.unpack_from(byte_order + "3I",
+                                                  buffer, 4)
+    if version == 0:
+        #Original version uses 32 bit offsets
+        offset_format = byte_order + "I"
+    elif version == 1:
+        #Extension for files over 4GB using 64 bit offsets
+        offset_format = byte_order + "Q"
+    else:
+        raise ValueError("Unsupported .2bit version %i" % version)
+    offset_size = struct.calcsize(offset_format)
+    index = []
+    position = 16
+    for i in range(count):
+        name_size = struct.unpack_from("B", buffer, position)[0]
+        position += 1
+        name = _bytes_to_string(buffer[position:position + name_size])
+        position += name_size
+        offset = struct.unpack_from(offset_format, buffer, position)[0]
+        position += offset_size
+        index.append((name, offset))
+    return byte_order, index
+
+
+def _twobit_read_blocks(buffer, position, byte_order):
+    """Read a block count, starts and sizes (PRIVATE).
+
+    Returns a list of (start, length) tuples, and the new position.
+    """
+    count = struct.unpack_from(byte_order + "I", buffer, position)[0]
+    position += 4
+    block_format = byte_order + "%iI" % count
+    starts = struct.unpack_from(block_format, buffer, position)
+    position += 4 * count
+    sizes = struct.unpack_from(block_format, buffer, position)
+    position += 4 * count
+    return list(zip(starts, sizes)), position
+
+
+def _twobit_read_seq(buffer, offset, byte_order, alphabet):
+    """Load the sequence starting at the given offset as an MmapSeq (PRIVATE).
+
+    Returns the MmapSeq, and the offset of the end of the record.
+    """
+    length = struct.unpack_from(byte_order + "I", buffer, offset)[0]
+    n_blocks, position = _twobit_read_blocks(buffer, offset + 4, byte_order)
+    mask_blocks, position = _twobit_read_blocks(buffer, position, byte_order)
+    #Skip the reserved field
+    position += 4
+    seq = MmapSeq(buffer, alphabet, offset=position, length=length,
+                  packed=True, n_blocks=n_blocks, mask_blocks=mask_blocks)
+    return seq, position + (length + 3) // 4
+
+
+def TwoBitIterator(handle, alphabet=Alphabet.generic_dna):
+    """Iterate over the sequences in a .2bit file as SeqRecord objects.
+
+    handle - input file, in binary mode.
+    alphabet - optional alphabet, defaults to generic DNA.
+
+    Each record's sequence is an MmapSeq object holding the packed data,
+    only decoded on demand (and where the handle is a real file, it is
+    memory mapped rather than read into memory).
+
+    >>> from Bio.SeqIO.TwoBitIO import TwoBitIterator
+    >>> with open("TwoBit/sequence.2bit", "rb") as handle:
+    ...     for record in TwoBitIterator(handle):
+    ...         print("%s %i %s" % (record.id, len(record), record.seq[:10]))
+    seq11111 1247 GTCGCTTTAT
+    seq222 1257 TAATGCTCCC
+    seq3333 1331 ctccggccca
+    """
+    buffer, filename = _twobit_buffer(handle)
+    byte_order, index = _twobit_file_header(buffer)
+    for name, offset in index:
+        seq = _twobit_read_seq(buffer, offset, byte_order, alphabet)[0]
+        #Allows the sequence to be pickled (re-opening the file)
+        seq._filename = filename
+        yield SeqRecord(seq, id=name, name=name, description="")
+
+
+class TwoBitWriter(SequenceWriter):
+    """UCSC .2bit file writer."""
+
+    def __init__(self, handle):
+        """Creates the writer object.
+
+        handle - Output handle, in binary write mode.
+        """
+        if hasattr(handle, "mode") and "U" in handle.mode.upper():
+            raise ValueError(".2bit files must NOT be opened in universal new "
+                             "lines mode. Binary mode is required")
+        elif hasattr(handle, "mode") and "B" not in handle.mode.upper():
+            raise ValueError(".2bit files must be opened in binary mode")
+        self.handle = handle
+
+    def write_file(self, records):
+        """Use this to write an entire file containing the given records.
+
+        The file header includes an index of the record names and offsets,
+        so each sequence is packed (in memory) before anything is written.
+        """
+        packed = []
+        for record in records:
+            name = _as_bytes(record.id)
+            if not name or len(name) > 255:
+                raise ValueError("Record identifiers must be 1 to 255 "
+                                 "characters for .2bit files, not %r"
+                                 % record.id)
+            data = self._get_seq_string(record)
+            packed.append((name, len(data)) + _pack_twobit(data))
+        #Work out the offsets, which decides the version (and offset size)
+        for version, offset_format in ((0, "<I"), (1, "<Q")):
+            offset_size = struct.calcsize(offset_format)
+            offset = 16 + sum(1 + len(name) + offset_size
+                              for name, length, data, n_blocks, mask_blocks
+                              in packed)
+            offsets = []
+            for name, length, data, n_blocks, mask_blocks in packed:
+                offsets.append(offset)
+                offset += 16 + 8 * (len(n_blocks) + len(mask_blocks)) \
+                    + len(data)
+            if not offsets or offsets[-1] <= 0xFFFFFFFF:
+                break
+        handle = self.handle
+        handle.write(struct.pack("<4I", _twobit_signature, version,
+                                 len(packed), 0))
+        for (name, length, data, n_blocks, mask_blocks), offset \
+                in zip(packed, offsets):
+            handle.write(struct.pack("B", len(name)) + name +
+                         struct.pack(offset_format, offset))
+        for name, length, data, n_blocks, mask_blocks in packed:
+            handle.write(struct.pack("<I", length))
+            for blocks in (n_blocks, mask_blocks):
+                block_format = "<%iI" % len(blocks)
+                handle.write(struct.pack("<I", len(blocks)))
+                handle.write(struct.pack(block_format,
+                                         *[s for s, l in blocks]))
+                handle.write(struct.pack(block_format,
+                                         *[l for s, l in blocks]))
+            handle.write(struct.pack("<I", 0))
+            handle.write(data)
+        return len(packed)
+
+
+if __name__ == "__main__":
+    from Bio._utils import run_doctest
+    run_doctest(verbose=0)
@@ -282,6 +282,8 @@ names are also used in Bio.AlignIO and include the following:
  - sff     - Standard Flowgram Format (SFF), typical output from Roche 454.
  - sff-trim - Standard Flowgram Format (SFF) with given trimming applied.
  - swiss   - Plain text Swiss-Prot aka UniProt format.
+ - twobit  - The UCSC .2bit format, storing nucleotides using two bits per
+             base plus lists of N and soft-masked (lower case) regions.
  - tab     - Simple two column tab separated sequence files, where each
              line holds a record's identifier and sequence. For example,
              this is used as by Aligent's eArray software when saving
@@ -369,6 +371,7 @@ from . import SwissIO
 from . import TabIO
 from . import QualityIO  # FastQ and qual files
 from . import UniprotIO
+from . import TwoBitIO
 
 
 #Convention for format names is "mainname-subtype" in lower case.
@@ -407,6 +410,7 @@ _FormatToIterator = {"fasta": FastaIO.FastaIterator,
                      "seqxml": SeqXmlIO.SeqXmlIterator,
                      "abi": AbiIO.AbiIterator,
                      "abi-trim": AbiIO._AbiTrimIterator,
+                     "twobit": TwoBitIO.TwoBitIterator,
                      }
 
 _FormatToWriter = {"fasta": FastaIO.FastaWriter,
@@ -423,9 +427,10 @@ _FormatToWriter = {"fasta": FastaIO.FastaWriter,
                    "qual": QualityIO.QualPhredWriter,
                    "sff": SffIO.SffWriter,
                    "seqxml": SeqXmlIO.SeqXmlWriter,
+                   "twobit": TwoBitIO.TwoBitWriter,
                    }
 
-_BinaryFormats = ["sff", "sff-trim", "abi", "abi-trim"]
+_BinaryFormats = ["sff", "sff-trim", "abi", "abi-trim", "twobit"]
 
 
 def write(sequences, handle, format):
@@ -981,7 +986,7 @@ def convert(in_file, in_format, out_file, out_format, alphabet=None):
         in_mode = 'rU'
 
     #Don't open the output file until we've checked the input is OK?
-    if out_format in ["sff", "sff_trim"]:
+    if out_format in _BinaryFormats:
         out_mode = 'wb'
     else:
         out_mode = 'w'
@@ -32,6 +32,7 @@ from Bio._py3k import _bytes_to_string, _as_bytes
 from Bio import SeqIO
 from Bio import Alphabet
 from Bio import bgzf
+from Bio.SeqRecord import SeqRecord
 from Bio.File import _IndexedSeqFileProxy, _open_for_random_access
 
 
@@ -160,6 +161,43 @@ class SffTrimedRandomAccess(SffRandomAccess):
                                                 trim=True)
 
 
+class TwoBitRandomAccess(SeqFileRandomAccess):
+    """Random access to a UCSC .2bit file.
+
+    The file is memory mapped, and the header already includes an index
+    of the sequence names and offsets. Each record's sequence is an MmapSeq
+    object, so slicing it only decodes the region requested.
+    """
+    def __init__(self, filename, format, alphabet):
+        SeqFileRandomAccess.__init__(self, filename, format, alphabet)
+        if self._alphabet is None:
+            self._alphabet = Alphabet.generic_dna
+        self._filename = filename
+        self._buffer = SeqIO.TwoBitIO._twobit_buffer(self._handle)[0]
+        self._byte_order, index = \
+            SeqIO.TwoBitIO._twobit_file_header(self._buffer)
+        self._names = dict((offset, name) for name, offset in index)
+
+    def __iter__(self):
+        for name, offset in SeqIO.TwoBitIO._twobit_file_header(self._buffer)[1]:
+            yield name, offset, 0
+
+    def get(self, offset):
+        seq = SeqIO.TwoBitIO._twobit_read_seq(self._buffer, offset,
+                                              self._byte_order,
+                                              self._alphabet)[0]
+        #Allows the sequence to be pickled (re-opening the file)
+        seq._filename = self._filename
+        name = self._names[offset]
+        return SeqRecord(seq, id=name, name=name, description="")
+
+    def get_raw(self, offset):
+        end = SeqIO.TwoBitIO._twobit_read_seq(self._buffer, offset,
+                                              self._byte_order,
+                                              self._alphabet)[1]
+        return self._buffer[offset:end]
+
+
 ###################
 # Simple indexers #
 ###################
@@ -645,6 +683,7 @@ _FormatToRandomAccess = {"ace": SequentialSeqFileRandomAccess,
                          "sff-trim": SffTrimedRandomAccess,
                          "swiss": SwissRandomAccess,
                          "tab": TabRandomAccess,
+                         "twobit": TwoBitRandomAccess,
                          "qual": SequentialSeqFileRandomAccess,
                          "uniprot-xml": UniprotRandomAccess,
                          }
@@ -0,0 +1,408 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Streaming quality control statistics for sequencing reads (requires NumPy).
+
+The QCStats class collects the usual quality control statistics for a set
+of reads in a single pass, for example over the records from Bio.SeqIO:
+
+ - read length distribution,
+ - per-position PHRED quality distributions (if the records have them),
+ - per-position base composition,
+ - overall GC content and the distribution of per-read GC content,
+ - an estimate of the number of distinct reads (and thus duplication).
+
+All of these are held in arrays of a fixed size (positions beyond the
+max_length argument are pooled into the final position), so memory use does
+not grow with the number of reads. The records are processed in batches
+using NumPy, and the duplication estimate uses a HyperLogLog sketch of the
+read sequences.
+
+>>> from Bio import SeqIO
+>>> from Bio.SeqUtils.QualityControl import QCStats
+>>> stats = QCStats(max_length=500)
+>>> stats.update(SeqIO.parse("Roche/E3MFGYR02_random_10_reads.sff", "sff-trim"))
+10
+>>> print("%i reads, %i bases" % (stats.reads, stats.bases))
+10 reads, 2417 bases
+>>> print("Lengths %i to %i" % (stats.min_length, stats.max_read_length))
+Lengths 130 to 295
+>>> print("GC %0.1f%%" % stats.gc_content())
+GC 37.5%
+>>> print(", ".join("%0.1f" % q for q in stats.mean_quality()[:5]))
+32.8, 27.7, 25.3, 26.5, 25.8
+>>> print("%0.2f" % stats.duplicate_fraction())
+0.00
+
+Two QCStats objects (using the same settings) can be combined with the
+merge method (or the + operator), so that different parts of a large data
+set can be processed separately (e.g. in different processes, or on
+different machines) and the results combined. QCStats objects can be
+pickled, and the copy method returns a snapshot of the statistics so far.
+For example, using the multiprocessing module to process several files:
+
+    from multiprocessing import Pool
+
+    def qc(filename):
+        stats = QCStats()
+        stats.update(SeqIO.parse(filename, "fastq"))
+        return stats
+
+    pool = Pool()
+    stats = sum(pool.map(qc, filenames), QCStats())
+
+"""
+
+from __future__ import print_function
+
+import copy
+import hashlib
+import itertools
+import struct
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SeqUtils.QualityControl.")
+
+from Bio._py3k import _as_bytes
+
+#Base composition columns, any other letters are counted as N
+_bases = "ACGTN"
+_base_codes = numpy.empty(256, numpy.intp)
+_base_codes.fill(_bases.index("N"))
+for _i, _letter in enumerate(_bases):
+    _base_codes[ord(_letter)] = _i
+    _base_codes[ord(_letter.lower())] = _i
+#GC content counts the ambiguous S (G or C) as in Bio.SeqUtils.GC
+_gc_flags = numpy.zeros(256, numpy.int64)
+for _letter in "GCSgcs":
+    _gc_flags[ord(_letter)] = 1
+del _i, _letter
+
+
+try:
+    (0).bit_length
+except AttributeError:
+    #Python 2.6
+    def _bit_length(value):
+        """Number of bits in a non-negative integer, as int.bit_length (PRIVATE)."""
+        if not value:
+            return 0
+        return len(bin(value)) - 2
+else:
+    def _bit_length(value):
+        """Number of bits in a non-negative integer, as int.bit_length (PRIVATE)."""
+        return value.bit_length()
+
+
+def _hyperloglog_alpha(registers):
+    """Bias correction constant for a HyperLogLog sketch (PRIVATE)."""
+    if registers == 16:
+        return 0.673
+    elif registers == 32:
+        return 0.697
+    elif registers == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / registers)
+
+
+class QCStats(object):
+    """Mergeable quality control statistics for a set of reads.
+
+    Arguments:
+     - max_length - number of read positions to record statistics for,
+       any positions after this are pooled into the final position, and any
+       longer reads into the final bin of the length histogram.
+     - max_quality - highest PHRED quality score to record, any higher
+       values are pooled with this (default 93, as for Sanger FASTQ).
+     - precision - number of bits for the HyperLogLog sketch used to
+       estimate the number of distinct reads, using 2**precision bytes
+       with a typical relative error of 1.04 / sqrt(2**precision).
+     - batch_size - number of records processed together by update.
+
+    The read and base counts are available as the reads and bases
+    attributes, and the raw counts as the arrays length_counts,
+    quality_counts (position by quality), base_counts (position by base,
+    using the letters in ACGTN order) and gc_counts (reads by GC percentage).
+    """
+
+    def __init__(self, max_length=1000, max_quality=93, precision=14,
+                 batch_size=10000):
+        if max_length < 1:
+            raise ValueError("The max_length must be at least one")
+        if max_quality < 0:
+            raise ValueError("The max_quality can't be negative")
+        if not 4 <= precision <= 16:
+            raise ValueError("The precision should be from 4 to 16 bits")
+        self.max_length = max_length
+        self.max_quality = max_quality
+        self.precision = precision
+        self.batch_size = batch_size
+        self.reads = 0
+        self.bases = 0
+        self.quality_reads = 0
+        self.min_length = None
+        self.max_read_length = None
+        self.length_counts = numpy.zeros(max_length + 1, numpy.int64)
+        self.quality_counts = numpy.zeros((max_length, max_quality + 1),
+                                          numpy.int64)
+        self.base_counts = numpy.zeros((max_length, len(_bases)), numpy.int64)
+        self.gc_counts = numpy.zeros(101, numpy.int64)
+        self._gc_bases = 0
+        self._registers = numpy.zeros(2 ** precision, numpy.uint8)
+
+    def __repr__(self):
+        return "%s(max_length=%i, max_quality=%i, precision=%i) <%i reads>" \
+            % (self.__class__.__name__, self.max_length, self.max_quality,
+               self.precision, self.reads)
+
+    def update(self, records):
+        """Add the given SeqRecord objects (e.g. from Bio.SeqIO) to the stats.
+
+        Any PHRED qualities (the letter annotation phred_quality, as used
+        for FASTQ, SFF and ABI files) are included. Returns the number of
+        records added.
+        """
+        count = 0
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                break
+            self.update_batch([str(record.seq) for record in batch],
+                              [record.letter_annotations.get("phred_quality")
+                               for record in batch])
+            count += len(batch)
+        return count
+
+    def update_batch(self, sequences, qualities=None):
+        """Add a batch of reads to the stats.
+
+        Arguments:
+         - sequences - list of the read sequences as strings.
+         - qualities - optional list of the PHRED quality scores for each
+           read (a list of integers, or None if not available).
+        """
+        if not sequences:
+            return
+        if qualities is not None:
+            #Check these first, so the stats are not left half updated
+            if len(qualities) != len(sequences):
+                raise ValueError("Need qualities for each sequence (or None)")
+            for seq, q in zip(sequences, qualities):
+                if q is not None and len(q) != len(seq):
+                    raise ValueError("Quality scores and sequence lengths "
+                                     "differ")
+                if q and min(q) < 0:
+                    raise ValueError("Negative quality score")
+        max_length = self.max_length
+        lengths = numpy.array([len(seq) for seq in sequences], numpy.int64)
+        ends = numpy.cumsum(lengths)
+        starts = ends - lengths
+        total = int(ends[-1])
+        data = numpy.frombuffer(_as_bytes("".join(sequences)), numpy.uint8)
+        if len(data) != total:
+            raise ValueError("Sequences must be ASCII strings")
+        #Position of each base within its read, pooling any long reads
+        positions = numpy.arange(total) - numpy.repeat(starts, lengths)
+        numpy.minimum(positions, max_length - 1, out=positions)
+        #Lengths and base composition
+        self.length_counts += numpy.bincount(
+            numpy.minimum(lengths, max_length), minlength=max_length + 1)
+        self.base_counts += numpy.bincount(
+            positions * len(_bases) + _base_codes[data],
+            minlength=max_length * len(_bases)).reshape(max_length,
+                                                        len(_bases))
+        #GC content, per read using the cumulative sum
+        gc = numpy.zeros(total + 1, numpy.int64)
+        numpy.cumsum(_gc_flags[data], out=gc[1:])
+        gc = gc[ends] - gc[starts]
+        self._gc_bases += int(gc.sum())
+        non_empty = lengths > 0
+        percent = numpy.floor(100.0 * gc[non_empty] / lengths[non_empty]
+                              + 0.5).astype(numpy.intp)
+        self.gc_counts += numpy.bincount(percent, minlength=101)
+        #Qualities
+        if qualities is not None:
+            have = numpy.array([q is not None for q in qualities], bool)
+            quality_total = int(lengths[have].sum())
+            if quality_total:
+                values = numpy.fromiter(
+                    itertools.chain.from_iterable(q for q in qualities
+                                                  if q is not None),
+                    numpy.intp, quality_total)
+                numpy.minimum(values, self.max_quality, out=values)
+                columns = self.max_quality + 1
+                where = numpy.repeat(have, lengths)
+                self.quality_counts += numpy.bincount(
+                    positions[where] * columns + values,
+                    minlength=max_length * columns).reshape(max_length,
+                                                            columns)
+            self.quality_reads += int(have.sum())
+        #Distinct read sketch
+        self._add_to_sketch(sequences)
+        self.reads += len(sequences)
+        self.bases += total
+        if self.min_length is None:
+            self.min_length = int(lengths.min())
+            self.max_read_length = int(lengths.max())
+        else:
+            self.min_length = min(self.min_length, int(lengths.min()))
+            self.max_read_length = max(self.max_read_length,
+                                       int(lengths.max()))
+
+    def _add_to_sketch(self, sequences):
+        """Update the HyperLogLog registers for the sequences (PRIVATE).
+
+        Uses a 64 bit hash of the upper case sequence, which (unlike the
+        built in hash function) is the same in different processes.
+        """
+        precision = self.precision
+        shift = 64 - precision
+        mask = (1 << shift) - 1
+        index = []
+        rank = []
+        for seq in sequences:
+            value = struct.unpack(">Q", hashlib.md5(
+                _as_bytes(seq.upper())).digest()[:8])[0]
+            index.append(value >> shift)
+            rank.append(shift - _bit_length(value & mask) + 1)
+        numpy.maximum.at(self._registers, numpy.array(index, numpy.intp),
+                         numpy.array(rank, numpy.uint8))
+
+    def merge(self, other):
+        """Add the statistics from another QCStats object to this one.
+
+        Both must use the same max_length, max_quality and precision.
+        """
+        if not isinstance(other, QCStats):
+            raise TypeError("Can only merge with another QCStats object")
+        if (self.max_length, self.max_quality, self.precision) != \
+                (other.max_length, other.max_quality, other.precision):
+            raise ValueError("Can only merge QCStats objects with the same "
+                             "max_length, max_quality and precision")
+        self.reads += other.reads
+        self.bases += other.bases
+        self.quality_reads += other.quality_reads
+        for lengths in [other.min_length, other.max_read_length]:
+            if lengths is None:
+                continue
+            if self.min_length is None:
+                self.min_length = self.max_read_length = lengths
+            else:
+                self.min_length = min(self.min_length, lengths)
+                self.max_read_length = max(self.max_read_length, lengths)
+        self.length_counts += other.length_counts
+        self.quality_counts += other.quality_counts
+        self.base_counts += other.base_counts
+        self.gc_counts += other.gc_counts
+        self._gc_bases += other._gc_bases
+        numpy.maximum(self._registers, other._registers, out=self._registers)
+        return self
+
+    def __add__(self, other):
+        """Return a new QCStats object combining two others."""
+        return self.copy().merge(other)
+
+    def __radd__(self, other):
+        #Allows use of the sum function, which starts with zero
+        if other == 0:
+            return self.copy()
+        return NotImplemented
+
+    def copy(self):
+        """Return a snapshot of the statistics so far (as a new QCStats)."""
+        return copy.deepcopy(self)
+
+    def mean_length(self):
+        """Return the mean read length (zero if there are no reads)."""
+        if not self.reads:
+            return 0.0
+        return float(self.bases) / self.reads
+
+    def gc_content(self):
+        """Return the overall G+C content, as a percentage from 0 to 100.
+
+        This is calculated as for the Bio.SeqUtils.GC function, over all the
+        bases of all the reads.
+        """
+        if not self.bases:
+            return 0.0
+        return self._gc_bases * 100.0 / self.bases
+
+    def base_composition(self):
+        """Return a dictionary of per-position base frequencies.
+
+        The keys are the letters A, C, G, T and N (which also counts any
+        other letters), and the values are arrays of the fraction of the
+        reads with that letter at each position (NaN if no reads cover it).
+        """
+        totals = self.base_counts.sum(axis=1)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            fractions = self.base_counts / totals[:, numpy.newaxis].astype(float)
+        return dict((letter, fractions[:, i])
+                    for i, letter in enumerate(_bases))
+
+    def mean_quality(self):
+        """Return an array of the mean PHRED quality at each position.
+
+        Positions with no quality scores are NaN.
+        """
+        totals = self.quality_counts.sum(axis=1)
+        scores = numpy.arange(self.max_quality + 1)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return (self.quality_counts * scores).sum(axis=1) \
+                / totals.astype(float)
+
+    def quality_quantile(self, fraction):
+        """Return an array of a quantile of the PHRED quality at each position.
+
+        e.g. Using 0.5 gives the median, and 0.25 the lower quartile. This
+        gives the lowest quality score where at least the given fraction of
+        the scores at that position are at or below it. Positions with no
+        quality scores are NaN.
+        """
+        if not 0 <= fraction <= 1:
+            raise ValueError("Quantile fraction should be from 0 to 1")
+        cumulative = numpy.cumsum(self.quality_counts, axis=1)
+        totals = cumulative[:, -1]
+        answer = numpy.empty(self.max_length, float)
+        answer.fill(numpy.nan)
+        covered = totals > 0
+        reached = cumulative[covered] >= (fraction * totals[covered])[:, numpy.newaxis]
+        answer[covered] = reached.argmax(axis=1)
+        return answer
+
+    def distinct_reads(self):
+        """Return an estimate of the number of distinct read sequences.
+
+        This uses a HyperLogLog sketch, so is approximate (to within a few
+        percent with the default precision), ignoring case.
+        """
+        registers = len(self._registers)
+        estimate = _hyperloglog_alpha(registers) * registers ** 2 \
+            / numpy.power(2.0, -self._registers.astype(float)).sum()
+        zeros = int((self._registers == 0).sum())
+        if estimate <= 2.5 * registers and zeros:
+            #Small range correction, using linear counting
+            estimate = registers * numpy.log(float(registers) / zeros)
+        return min(float(estimate), float(self.reads))
+
+    def duplicate_fraction(self):
+        """Return an estimate of the fraction of duplicate reads.
+
+        This is one minus the estimated number of distinct reads divided by
+        the number of reads, so zero means no duplicates.
+        """
+        if not self.reads:
+            return 0.0
+        return max(0.0, 1.0 - self.distinct_reads() / self.reads)
+
+
+if __name__ == "__main__":
+    from Bio._utils import run_doctest
+    run_doctest()
@@ -9,7 +9,9 @@
  * Optimized C routines that complement pairwise2.py.
  */
 
+#define PY_SSIZE_T_CLEAN
 #include "Python.h"
+#include <math.h>
 
 
 #define _PRECISION 1000
@@ -558,6 +560,938 @@ cleanup_after_py_match_fn:
     return py_retval;
 }
 
+/* The linear space functions, see pairwise2.py for the algorithm
+ * documentation.
+ */
+
+#define NEG_INF (-HUGE_VAL)
+#define MAX2(a, b) (((a) > (b)) ? (a) : (b))
+
+/* The sequences and match function for one of the linear space
+ * functions, using the same shortcuts as _make_score_matrix_fast for
+ * strings and identity_match. */
+struct MatchScorer {
+    PyObject *py_sequenceA, *py_sequenceB, *py_match_fn;
+#if PY_MAJOR_VERSION >= 3
+    PyObject *py_bytesA, *py_bytesB;
+#endif
+    char *sequenceA, *sequenceB;
+    int use_sequence_cstring;
+    double match, mismatch;
+    int use_match_mismatch_scores;
+};
+
+static int MatchScorer_init(struct MatchScorer *ms, PyObject *py_sequenceA,
+                            PyObject *py_sequenceB, PyObject *py_match_fn)
+{
+    PyObject *py_match=NULL, *py_mismatch=NULL;
+
+    memset((void *)ms, 0, sizeof(struct MatchScorer));
+    if(!PySequence_Check(py_sequenceA) || !PySequence_Check(py_sequenceB)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "py_sequenceA and py_sequenceB should be sequences.");
+        return 0;
+    }
+    if(!PyCallable_Check(py_match_fn)) {
+        PyErr_SetString(PyExc_TypeError, "py_match_fn must be callable.");
+        return 0;
+    }
+    ms->py_sequenceA = py_sequenceA;
+    ms->py_sequenceB = py_sequenceB;
+    ms->py_match_fn = py_match_fn;
+#if PY_MAJOR_VERSION < 3
+    if(PyString_Check(py_sequenceA) && PyString_Check(py_sequenceB)) {
+        ms->sequenceA = PyString_AS_STRING(py_sequenceA);
+        ms->sequenceB = PyString_AS_STRING(py_sequenceB);
+        ms->use_sequence_cstring = 1;
+    }
+#else
+    ms->py_bytesA = _create_bytes_object(py_sequenceA);
+    ms->py_bytesB = _create_bytes_object(py_sequenceB);
+    if(ms->py_bytesA && ms->py_bytesB) {
+        ms->sequenceA = PyBytes_AS_STRING(ms->py_bytesA);
+        ms->sequenceB = PyBytes_AS_STRING(ms->py_bytesB);
+        ms->use_sequence_cstring = 1;
+    }
+#endif
+    if(!(py_match = PyObject_GetAttrString(py_match_fn, "match")))
+        goto cleanup_after_py_match_fn;
+    ms->match = PyFloat_AsDouble(py_match);
+    if(ms->match==-1.0 && PyErr_Occurred())
+        goto cleanup_after_py_match_fn;
+    if(!(py_mismatch = PyObject_GetAttrString(py_match_fn, "mismatch")))
+        goto cleanup_after_py_match_fn;
+    ms->mismatch = PyFloat_AsDouble(py_mismatch);
+    if(ms->mismatch==-1.0 && PyErr_Occurred())
+        goto cleanup_after_py_match_fn;
+    ms->use_match_mismatch_scores = 1;
+cleanup_after_py_match_fn:
+    if(PyErr_Occurred())
+        PyErr_Clear();
+    Py_XDECREF(py_match);
+    Py_XDECREF(py_mismatch);
+    return 1;
+}
+
+static void MatchScorer_free(struct MatchScorer *ms)
+{
+#if PY_MAJOR_VERSION >= 3
+    if(ms->py_bytesA && ms->py_bytesA != ms->py_sequenceA)
+        Py_DECREF(ms->py_bytesA);
+    if(ms->py_bytesB && ms->py_bytesB != ms->py_sequenceB)
+        Py_DECREF(ms->py_bytesB);
+#endif
+    memset((void *)ms, 0, sizeof(struct MatchScorer));
+}
+
+static double MatchScorer_score(struct MatchScorer *ms, int i, int j)
+{
+    return _get_match_score(ms->py_sequenceA, ms->py_sequenceB,
+                            ms->py_match_fn, i, j,
+                            ms->sequenceA, ms->sequenceB,
+                            ms->use_sequence_cstring,
+                            ms->match, ms->mismatch,
+                            ms->use_match_mismatch_scores);
+}
+
+static PyObject *_double_list(double *values, int n)
+{
+    int i;
+    PyObject *py_list, *py_value;
+
+    if(!(py_list = PyList_New(n)))
+        return NULL;
+    for(i=0; i<n; i++) {
+        if(!(py_value = PyFloat_FromDouble(values[i]))) {
+            Py_DECREF(py_list);
+            return NULL;
+        }
+        PyList_SET_ITEM(py_list, i, py_value);
+    }
+    return py_list;
+}
+
+static PyObject *cpairwise2__linear_score(PyObject *self, PyObject *args)
+{
+    int i, row, col, lo, hi, old_lo, old_hi;
+    PyObject *py_sequenceA, *py_sequenceB, *py_match_fn;
+    double open_A, extend_A, open_B, extend_B;
+    int penalize_extend_when_opening, penalize_end_gaps_A, penalize_end_gaps_B;
+    int align_globally, band_low, band_high;
+    struct MatchScorer scorer;
+    double first_A_gap, first_B_gap;
+    int lenA, lenB;
+    double *prev_score=NULL, *score_row=NULL, *col_cache_score=NULL, *swap;
+    int *prev_start=NULL, *start_row=NULL, *col_cache_start=NULL, *iswap;
+    double best_score = NEG_INF;
+    int best_end[2] = {0, 0}, best_start[3] = {0, 0, 0};
+    PyObject *py_retval = NULL;
+
+    if(!PyArg_ParseTuple(args, "OOOddddi(ii)iii", &py_sequenceA,
+                         &py_sequenceB, &py_match_fn, &open_A, &extend_A,
+                         &open_B, &extend_B, &penalize_extend_when_opening,
+                         &penalize_end_gaps_A, &penalize_end_gaps_B,
+                         &align_globally, &band_low, &band_high))
+        return NULL;
+    if(!MatchScorer_init(&scorer, py_sequenceA, py_sequenceB, py_match_fn))
+        return NULL;
+
+    first_A_gap = calc_affine_penalty(1, open_A, extend_A,
+                                      penalize_extend_when_opening);
+    first_B_gap = calc_affine_penalty(1, open_B, extend_B,
+                                      penalize_extend_when_opening);
+    lenA = PySequence_Length(py_sequenceA);
+    lenB = PySequence_Length(py_sequenceB);
+    if(lenA < 1 || lenB < 1) {
+        if(!PyErr_Occurred())
+            PyErr_SetString(PyExc_ValueError, "sequences should not be empty");
+        goto _cleanup_linear_score;
+    }
+
+    /* Keep the previous and current rows, and the column cache.  The
+       start of the best alignment to each cell is kept as three ints,
+       row, col and whether the first cell is included. */
+    prev_score = malloc(lenB*sizeof(*prev_score));
+    score_row = malloc(lenB*sizeof(*score_row));
+    col_cache_score = malloc(lenB*sizeof(*col_cache_score));
+    prev_start = malloc(3*lenB*sizeof(*prev_start));
+    start_row = malloc(3*lenB*sizeof(*start_row));
+    col_cache_start = malloc(3*lenB*sizeof(*col_cache_start));
+    if(!prev_score || !score_row || !col_cache_score ||
+       !prev_start || !start_row || !col_cache_start) {
+        PyErr_SetString(PyExc_MemoryError, "Out of memory");
+        goto _cleanup_linear_score;
+    }
+    for(i=0; i<lenB; i++)
+        prev_score[i] = score_row[i] = col_cache_score[i] = NEG_INF;
+    memset((void *)prev_start, 0, 3*lenB*sizeof(*prev_start));
+    memset((void *)start_row, 0, 3*lenB*sizeof(*start_row));
+    memset((void *)col_cache_start, 0, 3*lenB*sizeof(*col_cache_start));
+    /* The range of cells set in score_row, from two rows ago. */
+    old_lo = 0;
+    old_hi = lenB-1;
+
+    for(row=0; row<lenA; row++) {
+        double row_cache_score = NEG_INF;
+        int row_cache_start[3] = {0, 0, 0};
+
+        for(col=old_lo; col<=old_hi; col++)
+            score_row[col] = NEG_INF;
+        lo = MAX2(0, row+band_low);
+        hi = (row+band_high < lenB-1) ? row+band_high : lenB-1;
+        old_lo = lo;
+        old_hi = hi;
+
+        /* The top and left borders. */
+        for(col=lo; col<=hi && (row==0 || col==0); col++) {
+            double score = MatchScorer_score(&scorer, row, col);
+            if(score==-1.0 && PyErr_Occurred())
+                goto _cleanup_linear_score;
+            if(col==0 && penalize_end_gaps_B)
+                score += calc_affine_penalty(row, open_B, extend_B,
+                                             penalize_extend_when_opening);
+            else if(row==0 && penalize_end_gaps_A)
+                score += calc_affine_penalty(col, open_A, extend_A,
+                                             penalize_extend_when_opening);
+            score_row[col] = score;
+            start_row[3*col] = row;
+            start_row[3*col+1] = col;
+            start_row[3*col+2] = align_globally || score > 0;
+        }
+
+        for(col=MAX2(1, lo); row && col<=hi; col++) {
+            double nogap_score, row_score, col_score, best, score;
+            double open_score, extend_score;
+            int *start;
+
+            nogap_score = prev_score[col-1];
+            row_score = row_cache_score;
+            col_score = col_cache_score[col-1];
+            if(nogap_score >= row_score && nogap_score >= col_score) {
+                best = nogap_score;
+                start = &prev_start[3*(col-1)];
+            } else if(row_score >= col_score) {
+                best = row_score;
+                start = row_cache_start;
+            } else {
+                best = col_score;
+                start = &col_cache_start[3*(col-1)];
+            }
+            if(best != NEG_INF) {
+                score = MatchScorer_score(&scorer, row, col);
+                if(score==-1.0 && PyErr_Occurred())
+                    goto _cleanup_linear_score;
+                score += best;
+                if(!align_globally && score <= 0) {
+                    score_row[col] = 0;
+                    start_row[3*col] = row;
+                    start_row[3*col+1] = col;
+                    start_row[3*col+2] = 0;
+                } else {
+                    score_row[col] = score;
+                    memcpy(&start_row[3*col], start, 3*sizeof(int));
+                }
+            }
+
+            /* Update the cached column and row scores. */
+            open_score = nogap_score + first_B_gap;
+            extend_score = col_cache_score[col-1] + extend_B;
+            if(open_score >= extend_score) {
+                col_cache_score[col-1] = open_score;
+                memcpy(&col_cache_start[3*(col-1)], &prev_start[3*(col-1)],
+                       3*sizeof(int));
+            } else
+                col_cache_score[col-1] = extend_score;
+            open_score = nogap_score + first_A_gap;
+            extend_score = row_cache_score + extend_A;
+            if(open_score >= extend_score) {
+                row_cache_score = open_score;
+                memcpy(row_cache_start, &prev_start[3*(col-1)],
+                       3*sizeof(int));
+            } else
+                row_cache_score = extend_score;
+        }
+
+        /* Look for the best place to end. */
+        for(col=lo; col<=hi; col++) {
+            double score = score_row[col];
+            if(align_globally) {
+                if(col==lenB-1) {
+                    if(penalize_end_gaps_B)
+                        score += calc_affine_penalty(
+                            lenA-row-1, open_B, extend_B,
+                            penalize_extend_when_opening);
+                } else if(row!=lenA-1)
+                    continue;
+                else if(penalize_end_gaps_A)
+                    score += calc_affine_penalty(
+                        lenB-col-1, open_A, extend_A,
+                        penalize_extend_when_opening);
+            }
+            if(score > best_score) {
+                best_score = score;
+                best_end[0] = row;
+                best_end[1] = col;
+                memcpy(best_start, &start_row[3*col], 3*sizeof(int));
+            }
+        }
+
+        swap = prev_score;
+        prev_score = score_row;
+        score_row = swap;
+        iswap = prev_start;
+        prev_start = start_row;
+        start_row = iswap;
+        /* score_row now holds the row before, so clear its range. */
+        if(row) {
+            old_lo = MAX2(0, row-1+band_low);
+            old_hi = (row-1+band_high < lenB-1) ? row-1+band_high : lenB-1;
+        } else {
+            old_lo = 0;
+            old_hi = -1;
+        }
+    }
+
+    py_retval = Py_BuildValue("(d(ii)(iii))", best_score,
+                              best_end[0], best_end[1], best_start[0],
+                              best_start[1], best_start[2]);
+
+ _cleanup_linear_score:
+    MatchScorer_free(&scorer);
+    if(prev_score)
+        free(prev_score);
+    if(score_row)
+        free(score_row);
+    if(col_cache_score)
+        free(col_cache_score);
+    if(prev_start)
+        free(prev_start);
+    if(start_row)
+        free(start_row);
+    if(col_cache_start)
+        free(col_cache_start);
+    return py_retval;
+}
+
+static PyObject *cpairwise2__linear_rows(PyObject *self, PyObject *args)
+{
+    int i, j, lo, hi, old_lo, old_hi;
+    PyObject *py_sequenceA, *py_sequenceB, *py_match_fn;
+    double first_A, extend_A, first_B, extend_B, start_score;
+    int start, band_low, band_high;
+    struct MatchScorer scorer;
+    int lenA, lenB;
+    double *M=NULL, *X=NULL, *Y=NULL, *prev_M=NULL, *prev_X=NULL, *prev_Y=NULL;
+    double *swap;
+    PyObject *py_M=NULL, *py_X=NULL, *py_Y=NULL;
+    PyObject *py_retval = NULL;
+
+    if(!PyArg_ParseTuple(args, "OOOddddidii", &py_sequenceA, &py_sequenceB,
+                         &py_match_fn, &first_A, &extend_A, &first_B,
+                         &extend_B, &start, &start_score,
+                         &band_low, &band_high))
+        return NULL;
+    if(start < 0 || start > 2) {
+        PyErr_SetString(PyExc_ValueError, "start should be 0, 1 or 2");
+        return NULL;
+    }
+    if(!MatchScorer_init(&scorer, py_sequenceA, py_sequenceB, py_match_fn))
+        return NULL;
+    lenA = PySequence_Length(py_sequenceA);
+    lenB = PySequence_Length(py_sequenceB);
+    if(lenA < 0 || lenB < 0)
+        goto _cleanup_linear_rows;
+
+    M = malloc((lenB+1)*sizeof(*M));
+    X = malloc((lenB+1)*sizeof(*X));
+    Y = malloc((lenB+1)*sizeof(*Y));
+    prev_M = malloc((lenB+1)*sizeof(*prev_M));
+    prev_X = malloc((lenB+1)*sizeof(*prev_X));
+    prev_Y = malloc((lenB+1)*sizeof(*prev_Y));
+    if(!M || !X || !Y || !prev_M || !prev_X || !prev_Y) {
+        PyErr_SetString(PyExc_MemoryError, "Out of memory");
+        goto _cleanup_linear_rows;
+    }
+    for(j=0; j<=lenB; j++)
+        M[j] = X[j] = Y[j] = prev_M[j] = prev_X[j] = prev_Y[j] = NEG_INF;
+
+    /* The first row, where only gaps in sequenceA are possible. */
+    if(start == 0)
+        M[0] = start_score;
+    else if(start == 1)
+        X[0] = start_score;
+    else
+        Y[0] = start_score;
+    for(j=1; j<=lenB && j<=band_high; j++)
+        X[j] = MAX2(M[j-1] + first_A, X[j-1] + extend_A);
+    /* The range set in prev_M etc, which will be overwritten next. */
+    old_lo = 0;
+    old_hi = lenB;
+
+    for(i=1; i<=lenA; i++) {
+        swap = prev_M; prev_M = M; M = swap;
+        swap = prev_X; prev_X = X; X = swap;
+        swap = prev_Y; prev_Y = Y; Y = swap;
+        for(j=old_lo; j<=old_hi; j++)
+            M[j] = X[j] = Y[j] = NEG_INF;
+        lo = MAX2(0, i+band_low);
+        hi = (i+band_high < lenB) ? i+band_high : lenB;
+        old_lo = MAX2(0, i-1+band_low);
+        old_hi = (i-1+band_high < lenB) ? i-1+band_high : lenB;
+        if(lo == 0) {
+            Y[0] = MAX2(prev_M[0] + first_B, prev_Y[0] + extend_B);
+            lo = 1;
+        }
+        for(j=lo; j<=hi; j++) {
+            double best = MAX2(prev_M[j-1], prev_X[j-1]);
+            best = MAX2(best, prev_Y[j-1]);
+            if(best != NEG_INF) {
+                double score = MatchScorer_score(&scorer, i-1, j-1);
+                if(score==-1.0 && PyErr_Occurred())
+                    goto _cleanup_linear_rows;
+                M[j] = best + score;
+            }
+            X[j] = MAX2(M[j-1] + first_A, X[j-1] + extend_A);
+            Y[j] = MAX2(prev_M[j] + first_B, prev_Y[j] + extend_B);
+        }
+    }
+
+    if(!(py_M = _double_list(M, lenB+1)) || !(py_X = _double_list(X, lenB+1))
+       || !(py_Y = _double_list(Y, lenB+1)))
+        goto _cleanup_linear_rows;
+    py_retval = Py_BuildValue("(OOO)", py_M, py_X, py_Y);
+
+ _cleanup_linear_rows:
+    MatchScorer_free(&scorer);
+    Py_XDECREF(py_M);
+    Py_XDECREF(py_X);
+    Py_XDECREF(py_Y);
+    if(M)
+        free(M);
+    if(X)
+        free(X);
+    if(Y)
+        free(Y);
+    if(prev_M)
+        free(prev_M);
+    if(prev_X)
+        free(prev_X);
+    if(prev_Y)
+        free(prev_Y);
+    return py_retval;
+}
+
+static PyObject *cpairwise2__profile_score(PyObject *self, PyObject *args)
+{
+    int i, row, col, lo, hi, old_lo, old_hi;
+#if PY_MAJOR_VERSION >= 3
+    Py_buffer scores_view, codes_view;
+#endif
+    const char *scores_buffer, *codes_buffer;
+    Py_ssize_t scores_size, codes_size;
+    const double *scores;
+    const int *codes;
+    int lenA, lenB, num_codes;
+    double open_A, extend_A, open_B, extend_B;
+    int penalize_extend_when_opening, penalize_end_gaps_A, penalize_end_gaps_B;
+    int align_globally, band_low, band_high;
+    double first_A_gap, first_B_gap;
+    double *prev_score=NULL, *score_row=NULL, *col_cache_score=NULL, *swap;
+    double best_score = NEG_INF;
+
+    /* The scores and codes are arrays of doubles and ints. */
+#if PY_MAJOR_VERSION >= 3
+    if(!PyArg_ParseTuple(args, "y*y*iddddi(ii)iii",
+                         &scores_view, &codes_view, &lenA,
+#else
+    if(!PyArg_ParseTuple(args, "s#s#iddddi(ii)iii",
+                         &scores_buffer, &scores_size,
+                         &codes_buffer, &codes_size, &lenA,
+#endif
+                         &open_A, &extend_A, &open_B, &extend_B,
+                         &penalize_extend_when_opening,
+                         &penalize_end_gaps_A, &penalize_end_gaps_B,
+                         &align_globally, &band_low, &band_high))
+        return NULL;
+#if PY_MAJOR_VERSION >= 3
+    scores_buffer = (const char *)scores_view.buf;
+    scores_size = scores_view.len;
+    codes_buffer = (const char *)codes_view.buf;
+    codes_size = codes_view.len;
+#endif
+    scores = (const double *)scores_buffer;
+    codes = (const int *)codes_buffer;
+    lenB = (int)(codes_size / sizeof(int));
+    if(lenA < 1 || lenB < 1) {
+        PyErr_SetString(PyExc_ValueError, "sequences should not be empty");
+        goto _cleanup_profile_score;
+    }
+    num_codes = (int)(scores_size / sizeof(double) / lenA);
+    for(col=0; col<lenB; col++) {
+        if(codes[col] < 0 || codes[col] >= num_codes) {
+            PyErr_SetString(PyExc_ValueError, "residue code out of range");
+            goto _cleanup_profile_score;
+        }
+    }
+
+    first_A_gap = calc_affine_penalty(1, open_A, extend_A,
+                                      penalize_extend_when_opening);
+    first_B_gap = calc_affine_penalty(1, open_B, extend_B,
+                                      penalize_extend_when_opening);
+    prev_score = malloc(lenB*sizeof(*prev_score));
+    score_row = malloc(lenB*sizeof(*score_row));
+    col_cache_score = malloc(lenB*sizeof(*col_cache_score));
+    if(!prev_score || !score_row || !col_cache_score) {
+        PyErr_SetString(PyExc_MemoryError, "Out of memory");
+        goto _cleanup_profile_score;
+    }
+
+    /* This is _linear_score without keeping track of where the
+       alignments start, and with the match scores looked up in the
+       profile, so it doesn't need any Python objects. */
+    Py_BEGIN_ALLOW_THREADS
+    for(i=0; i<lenB; i++)
+        prev_score[i] = score_row[i] = col_cache_score[i] = NEG_INF;
+    old_lo = 0;
+    old_hi = -1;
+    for(row=0; row<lenA; row++) {
+        double row_cache_score = NEG_INF;
+
+        for(col=old_lo; col<=old_hi; col++)
+            score_row[col] = NEG_INF;
+        lo = MAX2(0, row+band_low);
+        hi = (row+band_high < lenB-1) ? row+band_high : lenB-1;
+
+        for(col=lo; col<=hi && (row==0 || col==0); col++) {
+            double score = scores[codes[col]*lenA + row];
+            if(col==0 && penalize_end_gaps_B)
+                score += calc_affine_penalty(row, open_B, extend_B,
+                                             penalize_extend_when_opening);
+            else if(row==0 && penalize_end_gaps_A)
+                score += calc_affine_penalty(col, open_A, extend_A,
+                                             penalize_extend_when_opening);
+            score_row[col] = score;
+        }
+
+        for(col=MAX2(1, lo); row && col<=hi; col++) {
+            double nogap_score = prev_score[col-1];
+            double best = MAX2(nogap_score, row_cache_score);
+            best = MAX2(best, col_cache_score[col-1]);
+            if(best != NEG_INF) {
+                double score = best + scores[codes[col]*lenA + row];
+                if(!align_globally && score <= 0)
+                    score = 0;
+                score_row[col] = score;
+            }
+            col_cache_score[col-1] = MAX2(nogap_score + first_B_gap,
+                                          col_cache_score[col-1] + extend_B);
+            row_cache_score = MAX2(nogap_score + first_A_gap,
+                                   row_cache_score + extend_A);
+        }
+
+        for(col=lo; col<=hi; col++) {
+            double score = score_row[col];
+            if(align_globally) {
+                if(col==lenB-1) {
+                    if(penalize_end_gaps_B)
+                        score += calc_affine_penalty(
+                            lenA-row-1, open_B, extend_B,
+                            penalize_extend_when_opening);
+                } else if(row!=lenA-1)
+                    continue;
+                else if(penalize_end_gaps_A)
+                    score += calc_affine_penalty(
+                        lenB-col-1, open_A, extend_A,
+                        penalize_extend_when_opening);
+            }
+            if(score > best_score)
+                best_score = score;
+        }
+
+        swap = prev_score;
+        prev_score = score_row;
+        score_row = swap;
+        if(row) {
+            old_lo = MAX2(0, row-1+band_low);
+            old_hi = (row-1+band_high < lenB-1) ? row-1+band_high : lenB-1;
+        } else {
+            old_lo = 0;
+            old_hi = -1;
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+ _cleanup_profile_score:
+    if(prev_score)
+        free(prev_score);
+    if(score_row)
+        free(score_row);
+    if(col_cache_score)
+        free(col_cache_score);
+#if PY_MAJOR_VERSION >= 3
+    PyBuffer_Release(&scores_view);
+    PyBuffer_Release(&codes_view);
+#endif
+    if(PyErr_Occurred())
+        return NULL;
+    return PyFloat_FromDouble(best_score);
+}
+
+/* The vectors for the striped algorithm, 16 signed 8 bit ints or 8
+ * signed 16 bit ints, with saturating addition.  These use SSE2 where
+ * it is available, or plain loops over the lanes otherwise. */
+#if defined(__SSE2__) || defined(_M_X64) || \
+    (defined(_M_IX86_FP) && _M_IX86_FP >= 2)
+#include <emmintrin.h>
+
+typedef __m128i striped8_vector;
+typedef __m128i striped16_vector;
+
+#define striped8_load(p) _mm_loadu_si128((const __m128i *)(p))
+#define striped16_load(p) _mm_loadu_si128((const __m128i *)(p))
+#define striped8_set1(x) _mm_set1_epi8((char)(x))
+#define striped16_set1(x) _mm_set1_epi16((short)(x))
+#define striped8_adds(a, b) _mm_adds_epi8(a, b)
+#define striped16_adds(a, b) _mm_adds_epi16(a, b)
+#define striped16_max(a, b) _mm_max_epi16(a, b)
+#define striped8_any_gt(a, b) _mm_movemask_epi8(_mm_cmpgt_epi8(a, b))
+#define striped16_any_gt(a, b) _mm_movemask_epi8(_mm_cmpgt_epi16(a, b))
+/* Move each lane up one, with the smallest value in the first lane. */
+#define striped8_shift(a) \
+    _mm_or_si128(_mm_slli_si128(a, 1), _mm_cvtsi32_si128(0x80))
+#define striped16_shift(a) \
+    _mm_or_si128(_mm_slli_si128(a, 2), _mm_cvtsi32_si128(0x8000))
+
+static __m128i striped8_max(__m128i a, __m128i b)
+{
+    /* SSE2 only has a maximum for unsigned 8 bit ints. */
+    __m128i mask = _mm_cmpgt_epi8(a, b);
+    return _mm_or_si128(_mm_and_si128(mask, a), _mm_andnot_si128(mask, b));
+}
+
+#else
+
+#define DEFINE_STRIPED_VECTOR(NAME, TYPE, LANES, TYPE_MIN, TYPE_MAX)       \
+typedef struct {                                                           \
+    TYPE lane[LANES];                                                      \
+} NAME##_vector;                                                           \
+                                                                           \
+static NAME##_vector NAME##_load(const TYPE *p)                            \
+{                                                                          \
+    NAME##_vector x;                                                       \
+    memcpy(x.lane, p, sizeof(x.lane));                                     \
+    return x;                                                              \
+}                                                                          \
+                                                                           \
+static NAME##_vector NAME##_set1(int value)                                \
+{                                                                          \
+    int l;                                                                 \
+    NAME##_vector x;                                                       \
+    for(l=0; l<LANES; l++)                                                 \
+        x.lane[l] = (TYPE)value;                                           \
+    return x;                                                              \
+}                                                                          \
+                                                                           \
+static NAME##_vector NAME##_adds(NAME##_vector a, NAME##_vector b)         \
+{                                                                          \
+    int l, sum;                                                            \
+    NAME##_vector x;                                                       \
+    for(l=0; l<LANES; l++) {                                               \
+        sum = a.lane[l] + b.lane[l];                                       \
+        x.lane[l] = (TYPE)((sum < TYPE_MIN) ? TYPE_MIN :                   \
+                           ((sum > TYPE_MAX) ? TYPE_MAX : sum));           \
+    }                                                                      \
+    return x;                                                              \
+}                                                                          \
+                                                                           \
+static NAME##_vector NAME##_max(NAME##_vector a, NAME##_vector b)          \
+{                                                                          \
+    int l;                                                                 \
+    NAME##_vector x;                                                       \
+    for(l=0; l<LANES; l++)                                                 \
+        x.lane[l] = (a.lane[l] > b.lane[l]) ? a.lane[l] : b.lane[l];       \
+    return x;                                                              \
+}                                                                          \
+                                                                           \
+static int NAME##_any_gt(NAME##_vector a, NAME##_vector b)                 \
+{                                                                          \
+    int l;                                                                 \
+    for(l=0; l<LANES; l++)                                                 \
+        if(a.lane[l] > b.lane[l])                                          \
+            return 1;                                                      \
+    return 0;                                                              \
+}                                                                          \
+                                                                           \
+static NAME##_vector NAME##_shift(NAME##_vector a)                         \
+{                                                                          \
+    int l;                                                                 \
+    NAME##_vector x;                                                       \
+    x.lane[0] = TYPE_MIN;                                                  \
+    for(l=1; l<LANES; l++)                                                 \
+        x.lane[l] = a.lane[l-1];                                           \
+    return x;                                                              \
+}
+
+DEFINE_STRIPED_VECTOR(striped8, signed char, 16, -128, 127)
+DEFINE_STRIPED_VECTOR(striped16, short, 8, -32768, 32767)
+
+#endif
+
+/* Farrar's striped Smith-Waterman, for the local alignment scores
+ * of align_many.  The query is split into LANES segments of seg_len
+ * residues, and residue i is stored in lane i / seg_len of vector
+ * i % seg_len, so the cells in each vector do not depend on each
+ * other and can be worked out together.  Unlike the usual
+ * Smith-Waterman this follows pairwise2 exactly: a gap is always
+ * followed by a pair (so there are no gap to gap transitions), and
+ * the cells in the first row and column are not clamped at zero.
+ *
+ * H is the score of the best alignment ending with the pair at a
+ * cell, E and F the best ending in a gap in the query or the target,
+ * and V the best of the three, which the next column follows on from.
+ * F only depends on H in the same column, so unlike in Farrar's paper
+ * the lazy F loop does not need to revisit H.
+ *
+ * The profile holds the seg_len * LANES scores for each residue code
+ * (with TYPE_MIN as padding), and border_A and border_B the end gap
+ * penalties for the first row and column.  Returns 0 and sets
+ * *best_score, 1 if the scores might have overflowed, or -1 if out of
+ * memory.
+ */
+#define DEFINE_STRIPED_SCORE(NAME, TYPE, LANES, TYPE_MIN, TYPE_MAX)        \
+static int NAME##_score(const TYPE *profile, int num_codes,                \
+                        const int *codes, int lenA, int lenB,              \
+                        int first_A, int extend_A, int first_B,            \
+                        int extend_B, const double *border_A,              \
+                        const double *border_B, double *best_score)        \
+{                                                                          \
+    int seg_len = (lenA + LANES - 1) / LANES;                              \
+    int size = seg_len * LANES;                                            \
+    int i, t, l, row, col, gap, max_score = TYPE_MIN;                      \
+    NAME##_vector *memory, *H, *H_prev, *E, *F, *V, *V_prev, *swap;        \
+    NAME##_vector h, e, diagonal, carry, best, zero, min;                  \
+    NAME##_vector first_A_v, extend_A_v, first_B_v, extend_B_v;            \
+    TYPE lanes[LANES], *cells, *gap_cells;                                 \
+    const TYPE *scores;                                                    \
+                                                                           \
+    for(i=0; i<num_codes*size; i++)                                        \
+        if(profile[i] > max_score)                                         \
+            max_score = profile[i];                                        \
+    memory = malloc(6*seg_len*sizeof(NAME##_vector));                      \
+    if(!memory)                                                            \
+        return -1;                                                         \
+    H = memory;                                                            \
+    H_prev = memory + seg_len;                                             \
+    E = memory + 2*seg_len;                                                \
+    F = memory + 3*seg_len;                                                \
+    V = memory + 4*seg_len;                                                \
+    V_prev = memory + 5*seg_len;                                           \
+    zero = NAME##_set1(0);                                                 \
+    min = NAME##_set1(TYPE_MIN);                                           \
+    first_A_v = NAME##_set1(MAX2(first_A, TYPE_MIN));                      \
+    extend_A_v = NAME##_set1(MAX2(extend_A, TYPE_MIN));                    \
+    first_B_v = NAME##_set1(MAX2(first_B, TYPE_MIN));                      \
+    extend_B_v = NAME##_set1(MAX2(extend_B, TYPE_MIN));                    \
+    best = min;                                                            \
+                                                                           \
+    for(col=0; col<lenB; col++) {                                          \
+        scores = profile + codes[col]*size;                                \
+        if(col == 0) {                                                     \
+            /* The first column only has the end gaps, and no gaps in  \
+               the query, so work down it in order. */                   \
+            for(t=0; t<seg_len; t++)                                       \
+                H[t] = E[t] = F[t] = V[t] = min;                           \
+            cells = (TYPE *)H;                                             \
+            gap_cells = (TYPE *)F;                                         \
+            gap = TYPE_MIN;                                                \
+            for(row=0; row<lenA; row++) {                                  \
+                i = (row % seg_len)*LANES + row / seg_len;                 \
+                cells[i] = (TYPE)MAX2(scores[i] + (int)border_B[row],      \
+                                      TYPE_MIN);                           \
+                gap_cells[i] = (TYPE)gap;                                  \
+                gap = MAX2(MAX2(cells[i] + first_B, gap + extend_B),       \
+                           TYPE_MIN);                                      \
+            }                                                              \
+            for(t=0; t<seg_len; t++) {                                     \
+                V[t] = NAME##_max(H[t], F[t]);                             \
+                best = NAME##_max(best, H[t]);                             \
+            }                                                              \
+        } else {                                                           \
+            /* A pair follows the best alignment to the previous row   \
+               and column, which for the first vector is in the        \
+               previous lane.  Gaps in the query follow a pair in the  \
+               previous column, and gaps in the target are done within \
+               each segment, then carried on into the next lane until  \
+               they stop making a difference. */                         \
+            diagonal = NAME##_shift(V_prev[seg_len-1]);                    \
+            carry = min;                                                   \
+            for(t=0; t<seg_len; t++) {                                     \
+                h = NAME##_max(NAME##_adds(                                \
+                        NAME##_load(scores + t*LANES), diagonal), zero);   \
+                if(t == 0) {                                               \
+                    /* The first row has just the end gaps. */            \
+                    memcpy(lanes, &h, sizeof(lanes));                      \
+                    lanes[0] = (TYPE)MAX2(scores[0] + (int)border_A[col], \
+                                          TYPE_MIN);                       \
+                    h = NAME##_load(lanes);                                \
+                }                                                          \
+                diagonal = V_prev[t];                                      \
+                e = NAME##_max(NAME##_adds(H_prev[t], first_A_v),          \
+                               NAME##_adds(E[t], extend_A_v));             \
+                H[t] = h;                                                  \
+                E[t] = e;                                                  \
+                F[t] = carry;                                              \
+                V[t] = NAME##_max(NAME##_max(h, e), carry);                \
+                best = NAME##_max(best, h);                                \
+                carry = NAME##_max(NAME##_adds(h, first_B_v),              \
+                                   NAME##_adds(carry, extend_B_v));        \
+            }                                                              \
+            carry = NAME##_shift(carry);                                   \
+            t = 0;                                                         \
+            while(NAME##_any_gt(carry, F[t])) {                            \
+                F[t] = NAME##_max(F[t], carry);                            \
+                V[t] = NAME##_max(V[t], carry);                            \
+                carry = NAME##_adds(carry, extend_B_v);                    \
+                if(++t == seg_len) {                                       \
+                    carry = NAME##_shift(carry);                           \
+                    t = 0;                                                 \
+                }                                                          \
+            }                                                              \
+        }                                                                  \
+        swap = H; H = H_prev; H_prev = swap;                               \
+        swap = V; V = V_prev; V_prev = swap;                               \
+    }                                                                      \
+                                                                           \
+    memcpy(lanes, &best, sizeof(lanes));                                   \
+    *best_score = lanes[0];                                                \
+    for(l=1; l<LANES; l++)                                                 \
+        if(lanes[l] > *best_score)                                         \
+            *best_score = lanes[l];                                        \
+    free(memory);                                                          \
+    /* Nothing can have saturated unless a score got close to the top. */ \
+    return (*best_score + max_score > TYPE_MAX) ? 1 : 0;                   \
+}
+
+DEFINE_STRIPED_SCORE(striped8, signed char, 16, -128, 127)
+DEFINE_STRIPED_SCORE(striped16, short, 8, -32768, 32767)
+
+static PyObject *cpairwise2__striped_score(PyObject *self, PyObject *args)
+{
+    int i, bits, lenA, lenB, num_codes, lanes, type_size, seg_len, result=0;
+#if PY_MAJOR_VERSION >= 3
+    Py_buffer profile_view, codes_view;
+#endif
+    const char *profile_buffer, *codes_buffer;
+    Py_ssize_t profile_size, codes_size;
+    const int *codes;
+    double open_A, extend_A, open_B, extend_B;
+    int penalize_extend_when_opening, penalize_end_gaps_A, penalize_end_gaps_B;
+    int first_A, first_B;
+    double *border_A=NULL, *border_B=NULL;
+    double best_score = 0;
+
+    /* The profile is an array of 8 or 16 bit ints, as made by
+       _QueryProfile.striped, and the codes an array of ints. */
+#if PY_MAJOR_VERSION >= 3
+    if(!PyArg_ParseTuple(args, "y*y*iiddddi(ii)",
+                         &profile_view, &codes_view, &lenA, &bits,
+#else
+    if(!PyArg_ParseTuple(args, "s#s#iiddddi(ii)",
+                         &profile_buffer, &profile_size,
+                         &codes_buffer, &codes_size, &lenA, &bits,
+#endif
+                         &open_A, &extend_A, &open_B, &extend_B,
+                         &penalize_extend_when_opening,
+                         &penalize_end_gaps_A, &penalize_end_gaps_B))
+        return NULL;
+#if PY_MAJOR_VERSION >= 3
+    profile_buffer = (const char *)profile_view.buf;
+    profile_size = profile_view.len;
+    codes_buffer = (const char *)codes_view.buf;
+    codes_size = codes_view.len;
+#endif
+    codes = (const int *)codes_buffer;
+    lenB = (int)(codes_size / sizeof(int));
+    if(bits == 8) {
+        lanes = 16;
+        type_size = sizeof(signed char);
+    } else if(bits == 16) {
+        lanes = 8;
+        type_size = sizeof(short);
+    } else {
+        PyErr_SetString(PyExc_ValueError, "bits should be 8 or 16");
+        goto _cleanup_striped_score;
+    }
+    if(lenA < 1 || lenB < 1) {
+        PyErr_SetString(PyExc_ValueError, "sequences should not be empty");
+        goto _cleanup_striped_score;
+    }
+    seg_len = (lenA + lanes - 1) / lanes;
+    num_codes = (int)(profile_size / type_size / (seg_len * lanes));
+    for(i=0; i<lenB; i++) {
+        if(codes[i] < 0 || codes[i] >= num_codes) {
+            PyErr_SetString(PyExc_ValueError, "residue code out of range");
+            goto _cleanup_striped_score;
+        }
+    }
+
+    first_A = (int)calc_affine_penalty(1, open_A, extend_A,
+                                       penalize_extend_when_opening);
+    first_B = (int)calc_affine_penalty(1, open_B, extend_B,
+                                       penalize_extend_when_opening);
+    border_A = malloc(lenB*sizeof(*border_A));
+    border_B = malloc(lenA*sizeof(*border_B));
+    if(!border_A || !border_B) {
+        PyErr_SetString(PyExc_MemoryError, "Out of memory");
+        goto _cleanup_striped_score;
+    }
+    for(i=0; i<lenB; i++)
+        border_A[i] = penalize_end_gaps_A ? calc_affine_penalty(
+            i, open_A, extend_A, penalize_extend_when_opening) : 0;
+    for(i=0; i<lenA; i++)
+        border_B[i] = penalize_end_gaps_B ? calc_affine_penalty(
+            i, open_B, extend_B, penalize_extend_when_opening) : 0;
+    /* Very long end gaps would overflow an int, but anything past
+       the smallest score is the same. */
+    for(i=0; i<lenB; i++)
+        border_A[i] = MAX2(border_A[i], -65536.0);
+    for(i=0; i<lenA; i++)
+        border_B[i] = MAX2(border_B[i], -65536.0);
+
+    Py_BEGIN_ALLOW_THREADS
+    if(bits == 8)
+        result = striped8_score(
+            (const signed char *)profile_buffer, num_codes, codes, lenA,
+            lenB, first_A, (int)extend_A, first_B, (int)extend_B,
+            border_A, border_B, &best_score);
+    else
+        result = striped16_score(
+            (const short *)profile_buffer, num_codes, codes, lenA,
+            lenB, first_A, (int)extend_A, first_B, (int)extend_B,
+            border_A, border_B, &best_score);
+    Py_END_ALLOW_THREADS
+    if(result < 0)
+        PyErr_SetString(PyExc_MemoryError, "Out of memory");
+
+ _cleanup_striped_score:
+    if(border_A)
+        free(border_A);
+    if(border_B)
+        free(border_B);
+#if PY_MAJOR_VERSION >= 3
+    PyBuffer_Release(&profile_view);
+    PyBuffer_Release(&codes_view);
+#endif
+    if(PyErr_Occurred())
+        return NULL;
+    if(result) {
+        /* The scores overflowed, try again with more bits. */
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    return PyFloat_FromDouble(best_score);
+}
+
 static PyObject *cpairwise2_rint(
     PyObject *self, PyObject *args, PyObject *keywds)
 {
@@ -583,6 +1517,14 @@ static PyObject *cpairwise2_rint(
 static PyMethodDef cpairwise2Methods[] = {
     {"_make_score_matrix_fast",
      (PyCFunction)cpairwise2__make_score_matrix_fast, METH_VARARGS, ""},
+    {"_linear_score",
+     (PyCFunction)cpairwise2__linear_score, METH_VARARGS, ""},
+    {"_linear_rows",
+     (PyCFunction)cpairwise2__linear_rows, METH_VARARGS, ""},
+    {"_profile_score",
+     (PyCFunction)cpairwise2__profile_score, METH_VARARGS, ""},
+    {"_striped_score",
+     (PyCFunction)cpairwise2__striped_score, METH_VARARGS, ""},
     {"rint", (PyCFunction)cpairwise2_rint, METH_VARARGS|METH_KEYWORDS, ""},
     {NULL, NULL, 0, NULL}
 };
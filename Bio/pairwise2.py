@@ -150,9 +150,25 @@ type help(pairwise2.align.localds) at the Python prompt.
 #   value of the function is the score.
 # - one_alignment_only: boolean
 #   Only recover one alignment.
+# - linear_memory: boolean
+#   Recover a single best alignment using memory proportional to the
+#   lengths of the sequences, rather than the full score and traceback
+#   matrices (Hirschberg's divide and conquer algorithm, extended to
+#   affine gaps by Myers and Miller).  This needs affine gap penalties
+#   (any of the x, s or d penalty codes).  Getting just the score
+#   (score_only) with affine gap penalties always uses linear memory.
+# - band: integer
+#   Only consider alignments which stay within this many diagonals of
+#   the ones through the first and the last residues of both sequences
+#   (banded dynamic programming).  The work done is proportional to
+#   the band width times the sequence length, and like linear_memory
+#   this returns a single best alignment.
 
 from __future__ import print_function
 
+from array import array
+from collections import deque
+
 MAX_ALIGNMENTS = 1000   # maximum alignments recovered in traceback
 
 
@@ -295,7 +311,9 @@ alignment occurs.
                 ('gap_char', '-'),
                 ('force_generic', 0),
                 ('score_only', 0),
-                ('one_alignment_only', 0)
+                ('one_alignment_only', 0),
+                ('linear_memory', 0),
+                ('band', None)
                 ]
             for name, default in default_params:
                 keywds[name] = keywds.get(name, default)
@@ -317,17 +335,86 @@ alignment occurs.
 align = align()
 
 
+class align_many(object):
+    """This class provides functions that align one query to many targets.
+
+    The functions are named, and take the same parameters, as those
+    in align, except that the second sequence is replaced by an
+    iterable of target sequences, and they return a generator giving
+    the result (a list of alignments, or the score) for each target
+    in turn.  The parameters are only decoded once, and with affine
+    gap penalties and score_only, the scores of the query against
+    each residue are only worked out once (a query profile).  Local
+    scores using small whole numbers (such as a substitution matrix
+    from Bio.SubsMat.MatrixInfo with whole number gap penalties) are
+    calculated with 8 or 16 bit integers using Farrar's striped
+    Smith-Waterman algorithm, which is a good deal faster again and
+    suits scanning a database of targets.  For example:
+
+    >>> from Bio import pairwise2
+    >>> from Bio.SubsMat import MatrixInfo as matlist
+    >>> targets = ["KEVLA", "EVL", "KQVIA", "WWW"]
+    >>> for score in pairwise2.align_many.localds("KEVLA", targets,
+    ...                                           matlist.blosum62, -10, -1,
+    ...                                           score_only=True):
+    ...     print("%0.1f" % score)
+    22.0
+    13.0
+    17.0
+    0.0
+
+    There is one extra keyword parameter, threads, the number of
+    threads to use.  This helps with score_only and affine gap
+    penalties (the C code releases the Python global interpreter lock
+    while aligning each target).  Up to a few times that many targets
+    are read ahead, and the results are still given in order.
+
+    """
+
+    class alignment_function(align.alignment_function):
+        """This class is callable and impersonates a batch alignment function.
+
+        The constructor takes the name of the function, as for
+        align.alignment_function.
+
+        """
+        def __init__(self, name):
+            align.alignment_function.__init__(self, name)
+            self.__doc__ = self.__doc__.replace(
+                "sequenceA, sequenceB", "query, targets", 1).replace(
+                "-> alignments", "-> generator", 1)
+
+        def __call__(self, query, targets, *args, **keywds):
+            threads = keywds.pop("threads", None)
+            keywds = self.decode(query, query, *args, **keywds)
+            del keywds["sequenceB"]
+            return _align_many(targets, threads, **keywds)
+
+    def __getattr__(self, attr):
+        return self.alignment_function(attr)
+align_many = align_many()
+
+
 def _align(sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
            penalize_extend_when_opening, penalize_end_gaps,
            align_globally, gap_char, force_generic, score_only,
-           one_alignment_only):
+           one_alignment_only, linear_memory, band):
     if not sequenceA or not sequenceB:
         return []
 
-    if (not force_generic) and isinstance(gap_A_fn, affine_penalty) \
-    and isinstance(gap_B_fn, affine_penalty):
+    affine = isinstance(gap_A_fn, affine_penalty) \
+        and isinstance(gap_B_fn, affine_penalty)
+    if (linear_memory or band is not None) and (force_generic or not affine):
+        raise ValueError("linear_memory and band need affine gap penalties")
+
+    if (not force_generic) and affine:
         open_A, extend_A = gap_A_fn.open, gap_A_fn.extend
         open_B, extend_B = gap_B_fn.open, gap_B_fn.extend
+        if score_only or linear_memory or band is not None:
+            return _align_linear(
+                sequenceA, sequenceB, match_fn, open_A, extend_A, open_B,
+                extend_B, penalize_extend_when_opening, penalize_end_gaps,
+                align_globally, gap_char, score_only, band)
         x = _make_score_matrix_fast(
             sequenceA, sequenceB, match_fn, open_A, extend_A, open_B, extend_B,
             penalize_extend_when_opening, penalize_end_gaps, align_globally,
@@ -372,6 +459,87 @@ def _align(sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
     return x
 
 
+def _align_many(targets, threads, sequenceA, match_fn, gap_A_fn, gap_B_fn,
+                penalize_extend_when_opening, penalize_end_gaps,
+                align_globally, gap_char, force_generic, score_only,
+                one_alignment_only, linear_memory, band):
+    # Align sequenceA against each of the targets, see align_many.
+    # Each target is turned into a task, which work does (in this
+    # thread, or in a thread pool).
+    if score_only and not force_generic and sequenceA \
+       and isinstance(gap_A_fn, affine_penalty) \
+       and isinstance(gap_B_fn, affine_penalty):
+        lenA = len(sequenceA)
+        profile = _QueryProfile(sequenceA, match_fn)
+        penalties = (gap_A_fn.open, gap_A_fn.extend, gap_B_fn.open,
+                     gap_B_fn.extend, penalize_extend_when_opening,
+                     penalize_end_gaps, align_globally)
+        # Whole number local alignment scores can use _striped_score.
+        use_striped = not align_globally and band is None and lenA > 1 \
+            and all(-32768 <= gap <= 0 and gap == int(gap)
+                    for gap in penalties[:4])
+
+        def tasks():
+            for target in targets:
+                if not target:
+                    yield None
+                    continue
+                codes = profile.encode(target)
+                striped = []
+                if use_striped and len(target) > 1:
+                    for bits in (8, 16):
+                        striped_scores = profile.striped(bits)
+                        if striped_scores is not None:
+                            striped.append((bits, striped_scores))
+                yield (profile.scores, codes, striped) + \
+                    _band_limits(lenA, len(target), band)
+
+        def work(task):
+            if task is None:
+                return []
+            scores, codes, striped, band_low, band_high = task
+            for bits, striped_scores in striped:
+                score = _striped_score(striped_scores, codes, lenA, bits,
+                                       *penalties[:6])
+                if score is not None:
+                    return score
+            return _profile_score(scores, codes, lenA, *(penalties +
+                                  (band_low, band_high)))
+    else:
+        keywds = dict(sequenceA=sequenceA, match_fn=match_fn,
+                      gap_A_fn=gap_A_fn, gap_B_fn=gap_B_fn,
+                      penalize_extend_when_opening=penalize_extend_when_opening,
+                      penalize_end_gaps=penalize_end_gaps,
+                      align_globally=align_globally, gap_char=gap_char,
+                      force_generic=force_generic, score_only=score_only,
+                      one_alignment_only=one_alignment_only,
+                      linear_memory=linear_memory, band=band)
+
+        def tasks():
+            return iter(targets)
+
+        def work(target):
+            return _align(sequenceB=target, **keywds)
+
+    if not threads:
+        for task in tasks():
+            yield work(task)
+        return
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(threads)
+    try:
+        # Keep a few tasks per thread queued up, in order.
+        pending = deque()
+        for task in tasks():
+            pending.append(pool.apply_async(work, (task,)))
+            if len(pending) >= 4 * threads:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+
+
 def _make_score_matrix_generic(
         sequenceA, sequenceB, match_fn, gap_A_fn, gap_B_fn,
         penalize_extend_when_opening, penalize_end_gaps, align_globally,
@@ -593,6 +761,496 @@ def _make_score_matrix_fast(
     return score_matrix, trace_matrix
 
 
+# The linear space functions below work on the same (affine gap)
+# scoring scheme as _make_score_matrix_fast, where an alignment is a
+# path of paired residues, with a gap in only one of the sequences
+# between two consecutive pairs.  In the core dynamic programming
+# (_linear_rows, _block_align and _hirschberg) a point (i, j) means
+# sequenceA[:i] and sequenceB[:j] have been aligned, and the path
+# reaching it is in one of three states: 0, the last step paired
+# sequenceA[i-1] with sequenceB[j-1]; 1, the last step was a gap in
+# sequenceA (skipping sequenceB[j-1]); or 2, the last step was a gap
+# in sequenceB (skipping sequenceA[i-1]).  Band limits restrict the
+# points to band_low <= j - i <= band_high.
+
+_NEG_INF = float("-inf")
+
+# Blocks of this many points or fewer are aligned directly, rather
+# than being divided further by _hirschberg.
+_BLOCK_SIZE = 100
+
+
+def _band_limits(lenA, lenB, band):
+    # Turn a band width into the lowest and highest diagonal (col-row)
+    # allowed.  The band is widened to take in the diagonals through
+    # both the first and last residues.
+    if band is None:
+        return -lenA, lenB
+    if band < 0:
+        raise ValueError("band should be a non-negative integer")
+    return min(0, lenB - lenA) - band, max(0, lenB - lenA) + band
+
+
+class _swapped_match:
+    # Wrap a match function to take the two residues the other way
+    # round, for aligning sequenceB against sequenceA.
+    def __init__(self, match_fn):
+        self.match_fn = match_fn
+
+    def __call__(self, charA, charB):
+        return self.match_fn(charB, charA)
+
+
+def _linear_score(sequenceA, sequenceB, match_fn, open_A, extend_A,
+                  open_B, extend_B, penalize_extend_when_opening,
+                  penalize_end_gaps, align_globally, band_low, band_high):
+    # Calculate the same scores as _make_score_matrix_fast, keeping
+    # only the previous row of the matrix and the column cache, and
+    # skipping cells outside the band.  As well as the best score,
+    # return the (row, col) it ends on, and where that alignment
+    # starts as (row, col, included).  For a local alignment the
+    # first cell is not included if the alignment starts afresh after
+    # it (the score there is 0 or less).
+    first_A_gap = calc_affine_penalty(1, open_A, extend_A,
+                                      penalize_extend_when_opening)
+    first_B_gap = calc_affine_penalty(1, open_B, extend_B,
+                                      penalize_extend_when_opening)
+    lenA, lenB = len(sequenceA), len(sequenceB)
+    prev_score, prev_start = [_NEG_INF] * lenB, [None] * lenB
+    col_cache_score, col_cache_start = [_NEG_INF] * lenB, [None] * lenB
+    best_score, best_end, best_start = _NEG_INF, None, None
+    for row in range(lenA):
+        score_row, start_row = [_NEG_INF] * lenB, [None] * lenB
+        lo, hi = max(0, row + band_low), min(lenB - 1, row + band_high)
+        # The top and left borders have no previously aligned
+        # characters, just the end gaps.
+        if row == 0:
+            border = range(lo, hi + 1)
+        elif lo == 0:
+            border = [0]
+        else:
+            border = []
+        for col in border:
+            score = match_fn(sequenceA[row], sequenceB[col])
+            if col == 0 and penalize_end_gaps[1]:
+                score += calc_affine_penalty(
+                    row, open_B, extend_B, penalize_extend_when_opening)
+            elif row == 0 and penalize_end_gaps[0]:
+                score += calc_affine_penalty(
+                    col, open_A, extend_A, penalize_extend_when_opening)
+            score_row[col] = score
+            start_row[col] = (row, col, align_globally or score > 0)
+        if row:
+            row_cache_score, row_cache_start = _NEG_INF, None
+            for col in range(max(1, lo), hi + 1):
+                nogap_score = prev_score[col - 1]
+                row_score = row_cache_score
+                col_score = col_cache_score[col - 1]
+                if nogap_score >= row_score and nogap_score >= col_score:
+                    best, start = nogap_score, prev_start[col - 1]
+                elif row_score >= col_score:
+                    best, start = row_score, row_cache_start
+                else:
+                    best, start = col_score, col_cache_start[col - 1]
+                if best != _NEG_INF:
+                    score = best + match_fn(sequenceA[row], sequenceB[col])
+                    if not align_globally and score <= 0:
+                        score, start = 0, (row, col, False)
+                    score_row[col], start_row[col] = score, start
+                # Update the caches, with a gap opened after the
+                # previous pair, or the cached gap extended.
+                open_score = nogap_score + first_B_gap
+                extend_score = col_cache_score[col - 1] + extend_B
+                if open_score >= extend_score:
+                    col_cache_score[col - 1] = open_score
+                    col_cache_start[col - 1] = prev_start[col - 1]
+                else:
+                    col_cache_score[col - 1] = extend_score
+                open_score = nogap_score + first_A_gap
+                extend_score = row_cache_score + extend_A
+                if open_score >= extend_score:
+                    row_cache_score = open_score
+                    row_cache_start = prev_start[col - 1]
+                else:
+                    row_cache_score = extend_score
+        # Look for the best place to end, the last column or row for
+        # a global alignment (penalizing end gaps if necessary), or
+        # anywhere for a local one.
+        if align_globally:
+            ends = [hi] if hi == lenB - 1 else []
+            if row == lenA - 1:
+                ends = range(lo, hi + 1)
+        else:
+            ends = range(lo, hi + 1)
+        for col in ends:
+            score = score_row[col]
+            if align_globally and col == lenB - 1:
+                if penalize_end_gaps[1]:
+                    score += calc_affine_penalty(
+                        lenA - row - 1, open_B, extend_B,
+                        penalize_extend_when_opening)
+            elif align_globally and penalize_end_gaps[0]:
+                score += calc_affine_penalty(
+                    lenB - col - 1, open_A, extend_A,
+                    penalize_extend_when_opening)
+            if score > best_score:
+                best_score, best_end = score, (row, col)
+                best_start = start_row[col]
+        prev_score, prev_start = score_row, start_row
+    return best_score, best_end, best_start
+
+
+def _linear_rows(sequenceA, sequenceB, match_fn, first_A, extend_A,
+                 first_B, extend_B, start, start_score, band_low, band_high):
+    # Fill in the dynamic programming rows for aligning all of
+    # sequenceA and sequenceB, starting at point (0, 0) in the given
+    # state and score, and return the scores of the three states along
+    # the last row as three lists.  Only one previous row is kept.
+    lenA, lenB = len(sequenceA), len(sequenceB)
+    M, X, Y = [_NEG_INF] * (lenB + 1), [_NEG_INF] * (lenB + 1), \
+        [_NEG_INF] * (lenB + 1)
+    (M, X, Y)[start][0] = start_score
+    for j in range(1, min(lenB, band_high) + 1):
+        X[j] = max(M[j - 1] + first_A, X[j - 1] + extend_A)
+    for i in range(1, lenA + 1):
+        prev_M, prev_Y = M, Y
+        prev_best = [max(scores) for scores in zip(M, X, Y)]
+        M, X, Y = [_NEG_INF] * (lenB + 1), [_NEG_INF] * (lenB + 1), \
+            [_NEG_INF] * (lenB + 1)
+        lo, hi = max(0, i + band_low), min(lenB, i + band_high)
+        if lo == 0:
+            Y[0] = max(prev_M[0] + first_B, prev_Y[0] + extend_B)
+            lo = 1
+        residue = sequenceA[i - 1]
+        for j in range(lo, hi + 1):
+            if prev_best[j - 1] != _NEG_INF:
+                M[j] = prev_best[j - 1] + match_fn(residue, sequenceB[j - 1])
+            X[j] = max(M[j - 1] + first_A, X[j - 1] + extend_A)
+            Y[j] = max(prev_M[j] + first_B, prev_Y[j] + extend_B)
+    return M, X, Y
+
+
+def _block_align(sequenceA, sequenceB, match_fn, gaps, a0, a1, b0, b1,
+                 start, end, band_low, band_high, pairs):
+    # Align the block from point (a0, b0) in state start to point
+    # (a1, b1) in state end with the full dynamic programming matrix,
+    # and add the pairs on the best path to the list pairs.
+    first_A, extend_A, first_B, extend_B = gaps
+    width = b1 - b0 + 1
+    matrix = []
+    for i in range(a0, a1 + 1):
+        M, X, Y = [_NEG_INF] * width, [_NEG_INF] * width, [_NEG_INF] * width
+        for j in range(max(b0, i + band_low), min(b1, i + band_high) + 1):
+            k = j - b0
+            if i == a0 and j == b0:
+                (M, X, Y)[start][0] = 0
+                continue
+            if i > a0 and j > b0:
+                best = max(state[k - 1] for state in matrix[-1])
+                if best != _NEG_INF:
+                    M[k] = best + match_fn(sequenceA[i - 1], sequenceB[j - 1])
+            if j > b0:
+                X[k] = max(M[k - 1] + first_A, X[k - 1] + extend_A)
+            if i > a0:
+                Y[k] = max(matrix[-1][0][k] + first_B,
+                           matrix[-1][2][k] + extend_B)
+        matrix.append((M, X, Y))
+    # Trace back from the end to the start.
+    found = []
+    i, j, state = a1, b1, end
+    while i > a0 or j > b0:
+        M, X, Y = matrix[i - a0]
+        k = j - b0
+        if state == 0:
+            found.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+            scores = [scores[k - 1] for scores in matrix[i - a0]]
+            state = scores.index(max(scores))
+        elif state == 1:
+            j -= 1
+            if M[k - 1] + first_A == X[k]:
+                state = 0
+        else:
+            i -= 1
+            if matrix[i - a0][0][k] + first_B == Y[k]:
+                state = 0
+    found.reverse()
+    pairs.extend(found)
+
+
+def _hirschberg(sequenceA, sequenceB, match_fn, gaps, a0, a1, b0, b1,
+                start, end, band_low, band_high, pairs):
+    # Add the pairs on the best path from point (a0, b0) in state
+    # start to point (a1, b1) in state end to the list pairs, in
+    # linear space.  This is Hirschberg's divide and conquer
+    # algorithm, as extended to affine gaps by Myers and Miller: find
+    # the best scores from the start to each point in the middle row,
+    # and from each point in the middle row to the end (by aligning
+    # the reversed sequences), pick the best point (and state) to
+    # cross the middle row, and recurse on the two halves.
+    if a1 - a0 < 2 or (a1 - a0 + 1) * (b1 - b0 + 1) <= _BLOCK_SIZE:
+        _block_align(sequenceA, sequenceB, match_fn, gaps, a0, a1, b0, b1,
+                     start, end, band_low, band_high, pairs)
+        return
+    first_A, extend_A, first_B, extend_B = gaps
+    mid = (a0 + a1) // 2
+    offset = b0 - a0
+    forward = _linear_rows(sequenceA[a0:mid], sequenceB[b0:b1], match_fn,
+                           first_A, extend_A, first_B, extend_B, start, 0,
+                           band_low - offset, band_high - offset)
+    # The reverse pass starts by making the last step into the end
+    # point, in the end state.
+    reverseA, reverseB = sequenceA[mid:a1][::-1], sequenceB[b0:b1][::-1]
+    offset = b1 - a1
+    low, high = offset - band_high, offset - band_low
+    if end == 0:
+        score = match_fn(sequenceA[a1 - 1], sequenceB[b1 - 1])
+        backward = _linear_rows(reverseA[1:], reverseB[1:], match_fn,
+                                first_A, extend_A, first_B, extend_B,
+                                0, score, low, high)
+        backward = [[_NEG_INF] + scores for scores in backward]
+    elif end == 1:
+        backward = _linear_rows(reverseA, reverseB[1:], match_fn,
+                                first_A, extend_A, first_B, extend_B,
+                                1, first_A, low - 1, high - 1)
+        backward = [[_NEG_INF] + scores for scores in backward]
+    else:
+        backward = _linear_rows(reverseA[1:], reverseB, match_fn,
+                                first_A, extend_A, first_B, extend_B,
+                                2, first_B, low + 1, high + 1)
+    # Join the two halves.  A gap continuing across the middle row
+    # was opened in both directions, so swap one open for an extend.
+    width = b1 - b0
+    best = None
+    for k in range(max(0, mid + band_low - b0),
+                   min(width, mid + band_high - b0) + 1):
+        M, X, Y = [scores[width - k] for scores in backward]
+        for score, state in (
+                (forward[0][k] + max(M, X, Y), 0),
+                (forward[1][k] + max(M, X - first_A + extend_A), 1),
+                (forward[2][k] + max(M, Y - first_B + extend_B), 2)):
+            if best is None or score > best[0]:
+                best = score, b0 + k, state
+    score, middle, state = best
+    _hirschberg(sequenceA, sequenceB, match_fn, gaps, a0, mid, b0, middle,
+                start, state, band_low, band_high, pairs)
+    _hirschberg(sequenceA, sequenceB, match_fn, gaps, mid, a1, middle, b1,
+                state, end, band_low, band_high, pairs)
+
+
+def _join(pieces):
+    # Concatenate a list of slices, preserving the sequence type
+    # without copying the growing result over and over.
+    while len(pieces) > 1:
+        joined = [pieces[i] + pieces[i + 1]
+                  for i in range(0, len(pieces) - 1, 2)]
+        if len(pieces) % 2:
+            joined.append(pieces[-1])
+        pieces = joined
+    return pieces[0]
+
+
+class _QueryProfile:
+    # The scores of each residue of the query against each different
+    # residue seen in the targets so far, used by align_many.  Targets
+    # are encoded as a list of codes, and the scores against the
+    # residue with code c start at scores[c * len(query)].  The scores
+    # array is replaced (rather than changed) when new residues are
+    # added, so it can be used by another thread.
+    def __init__(self, query, match_fn):
+        self.query = query
+        self.match_fn = match_fn
+        self.codes = {}
+        self.scores = array("d")
+        self._striped = {}
+
+    def encode(self, target):
+        codes = self.codes
+        try:
+            return array("i", [codes[residue] for residue in target])
+        except KeyError:
+            pass
+        scores = array("d", self.scores)
+        for residue in target:
+            if residue not in codes:
+                codes[residue] = len(codes)
+                scores.extend([self.match_fn(letter, residue)
+                               for letter in self.query])
+        self.scores = scores
+        self._striped = {}
+        return array("i", [codes[residue] for residue in target])
+
+    def striped(self, bits):
+        # The scores as 8 or 16 bit integers, for _striped_score, or
+        # None if they are not all whole numbers that fit.  Each
+        # residue has seg_len vectors of 128 bits, and residue row of
+        # the query is in lane row // seg_len of vector row % seg_len
+        # (the extra places at the end are filled with the lowest
+        # score).
+        try:
+            return self._striped[bits]
+        except KeyError:
+            pass
+        lenA, scores = len(self.query), self.scores
+        lanes = 128 // bits
+        seg_len = (lenA + lanes - 1) // lanes
+        low, high = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+        striped = None
+        if all(low <= score <= high and score == int(score)
+               for score in scores):
+            striped = array({8: "b", 16: "h"}[bits])
+            for start in range(0, len(scores), lenA):
+                for t in range(seg_len):
+                    for lane in range(lanes):
+                        row = lane * seg_len + t
+                        if row < lenA:
+                            striped.append(int(scores[start + row]))
+                        else:
+                            striped.append(low)
+        self._striped[bits] = striped
+        return striped
+
+
+def _profile_score(scores, codes, lenA, open_A, extend_A, open_B, extend_B,
+                   penalize_extend_when_opening, penalize_end_gaps,
+                   align_globally, band_low, band_high):
+    # Score the query behind a _QueryProfile against an encoded target,
+    # as _linear_score would (the C version of this does not need the
+    # Python global interpreter lock).
+    match_fn = lambda row, code: scores[code * lenA + row]
+    return _linear_score(range(lenA), codes, match_fn, open_A, extend_A,
+                         open_B, extend_B, penalize_extend_when_opening,
+                         penalize_end_gaps, align_globally, band_low,
+                         band_high)[0]
+
+
+def _striped_score(striped_scores, codes, lenA, bits, open_A, extend_A,
+                   open_B, extend_B, penalize_extend_when_opening,
+                   penalize_end_gaps):
+    # Score the query behind a _QueryProfile against an encoded target
+    # for a local alignment, as _profile_score would, given the
+    # _QueryProfile.striped scores.  The C version of this uses
+    # Farrar's striped algorithm on small integers, and returns None
+    # if they overflow.  This one works down whole columns at a time
+    # with NumPy instead, or returns None without NumPy.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    lanes = 128 // bits
+    seg_len = (lenA + lanes - 1) // lanes
+    scores = numpy.array(striped_scores, float).reshape(-1, seg_len, lanes)
+    scores = scores.transpose(0, 2, 1).reshape(len(scores), -1)[:, :lenA]
+    first_A = calc_affine_penalty(1, open_A, extend_A,
+                                  penalize_extend_when_opening)
+    first_B = calc_affine_penalty(1, open_B, extend_B,
+                                  penalize_extend_when_opening)
+    rows = numpy.arange(lenA)
+    border = numpy.zeros(lenA)
+    if penalize_end_gaps[1]:
+        border += [calc_affine_penalty(row, open_B, extend_B,
+                                       penalize_extend_when_opening)
+                   for row in rows]
+    # The best gap in sequenceB ending on each row follows the best of
+    # score[previous row] - previous row * extend_B.
+    gap_B_offset = first_B + (rows[1:] - 1) * extend_B
+    best_score = _NEG_INF
+    for col, code in enumerate(codes):
+        if col == 0:
+            score = scores[code] + border
+            gap_A = numpy.empty(lenA)
+            gap_A.fill(_NEG_INF)
+        else:
+            gap_A = numpy.maximum(prev_score + first_A, gap_A + extend_A)
+            score = scores[code].copy()
+            score[1:] = numpy.maximum(score[1:] + best[:-1], 0)
+            if penalize_end_gaps[0]:
+                score[0] += calc_affine_penalty(col, open_A, extend_A,
+                                                penalize_extend_when_opening)
+        gap_B = numpy.empty(lenA)
+        gap_B[0] = _NEG_INF
+        gap_B[1:] = numpy.maximum.accumulate(
+            score - rows * extend_B)[:-1] + gap_B_offset
+        best = numpy.maximum(numpy.maximum(score, gap_A), gap_B)
+        best_score = max(best_score, score.max())
+        prev_score = score
+    return float(best_score)
+
+
+def _align_linear(sequenceA, sequenceB, match_fn, open_A, extend_A,
+                  open_B, extend_B, penalize_extend_when_opening,
+                  penalize_end_gaps, align_globally, gap_char, score_only,
+                  band):
+    # Find the best score, or a single best alignment, in linear
+    # space.  Used for score_only with affine gap penalties, and for
+    # the linear_memory and band options.
+    lenA, lenB = len(sequenceA), len(sequenceB)
+    band_low, band_high = _band_limits(lenA, lenB, band)
+    if score_only:
+        if lenB > lenA:
+            # Only a row's worth of scores is kept, so put the
+            # shorter sequence across.
+            if not isinstance(match_fn, identity_match):
+                match_fn = _swapped_match(match_fn)
+            return _linear_score(
+                sequenceB, sequenceA, match_fn, open_B, extend_B,
+                open_A, extend_A, penalize_extend_when_opening,
+                penalize_end_gaps[::-1], align_globally,
+                -band_high, -band_low)[0]
+        return _linear_score(
+            sequenceA, sequenceB, match_fn, open_A, extend_A,
+            open_B, extend_B, penalize_extend_when_opening,
+            penalize_end_gaps, align_globally, band_low, band_high)[0]
+
+    score, (row, col), (start_row, start_col, included) = _linear_score(
+        sequenceA, sequenceB, match_fn, open_A, extend_A,
+        open_B, extend_B, penalize_extend_when_opening,
+        penalize_end_gaps, align_globally, band_low, band_high)
+    if not align_globally and score <= 0:
+        return []
+    gaps = (calc_affine_penalty(1, open_A, extend_A,
+                                penalize_extend_when_opening), extend_A,
+            calc_affine_penalty(1, open_B, extend_B,
+                                penalize_extend_when_opening), extend_B)
+    pairs = [(start_row, start_col)]
+    if (row, col) != (start_row, start_col):
+        _hirschberg(sequenceA, sequenceB, match_fn, gaps, start_row + 1,
+                    row + 1, start_col + 1, col + 1, 0, 0,
+                    band_low, band_high, pairs)
+
+    # Build the aligned sequences from slices (as _recover_alignments
+    # does), with each gap placed after the residue before it.
+    seqA, seqB = _lpad_until_equal(sequenceA[:start_row],
+                                   sequenceB[:start_col], gap_char)
+    begin = len(seqA)
+    piecesA, piecesB = [seqA], [seqB]
+    run_row, run_col = start_row, start_col
+    for (prev_row, prev_col), (next_row, next_col) in zip(pairs, pairs[1:]):
+        if next_row - prev_row == 1 and next_col - prev_col == 1:
+            continue
+        piecesA.append(sequenceA[run_row:prev_row])
+        piecesB.append(sequenceB[run_col:prev_col])
+        seqA, seqB = _pad_until_equal(sequenceA[prev_row:next_row],
+                                      sequenceB[prev_col:next_col], gap_char)
+        piecesA.append(seqA)
+        piecesB.append(seqB)
+        run_row, run_col = next_row, next_col
+    piecesA.append(sequenceA[run_row:row])
+    piecesB.append(sequenceB[run_col:col])
+    seqA, seqB = _pad_until_equal(sequenceA[row:], sequenceB[col:], gap_char)
+    piecesA.append(seqA)
+    piecesB.append(seqB)
+    seqA, seqB = _join(piecesA), _join(piecesB)
+    if align_globally:
+        return [(seqA, seqB, score, 0, len(seqA))]
+    if not included:
+        # The alignment starts with the pair after the first cell.
+        (prev_row, prev_col), (next_row, next_col) = pairs[:2]
+        begin += max(next_row - prev_row, next_col - prev_col)
+    end = len(seqA) - max(lenA - row, lenB - col) + 1
+    return [(seqA, seqB, score, begin, end)]
+
+
 def _recover_alignments(sequenceA, sequenceB, starts,
                         score_matrix, trace_matrix, align_globally,
                         gap_char, one_alignment_only):
@@ -879,6 +1537,8 @@ def format_alignment(align1, align2, score, begin, end):
 # then just ignore and use the pure python implementations.
 try:
     from .cpairwise2 import rint, _make_score_matrix_fast
+    from .cpairwise2 import _linear_score, _linear_rows, _profile_score
+    from .cpairwise2 import _striped_score
 except ImportError:
     pass
 
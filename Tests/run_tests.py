@@ -119,6 +119,7 @@ DOCTEST_MODULES = [
                    "Bio.SeqIO.PhdIO",
                    "Bio.SeqIO.QualityIO",
                    "Bio.SeqIO.SffIO",
+                   "Bio.SeqIO.TwoBitIO",
                    "Bio.SeqFeature",
                    "Bio.SeqRecord",
                    "Bio.SeqUtils",
@@ -132,9 +133,13 @@ DOCTEST_MODULES = [
 #Silently ignore any doctests for modules requiring numpy!
 if is_numpy():
     DOCTEST_MODULES.extend(["Bio.Affy.CelFile",
+                            "Bio.Align.ArrayAlign",
+                            "Bio.PDB.AtomTable",
+                            "Bio.PDB.PDBTrajectory",
                             "Bio.Statistics.lowess",
                             "Bio.PDB.Polypeptide",
-                            "Bio.PDB.Selection"
+                            "Bio.PDB.Selection",
+                            "Bio.SeqUtils.QualityControl",
                             ])
 
 
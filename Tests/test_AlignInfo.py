@@ -0,0 +1,103 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Tests for the summary statistics in Bio.Align.AlignInfo."""
+
+import unittest
+
+from Bio.Align import AlignInfo, MultipleSeqAlignment
+from Bio.Alphabet import Gapped, IUPAC
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+
+class TestSummaryInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.alpha = alpha = Gapped(IUPAC.unambiguous_dna, "-")
+        records = []
+        for text, weight in [("GTATC", 0.5), ("AT--C", 0.8), ("CTGTC", 1.0)]:
+            record = SeqRecord(Seq(text, alpha), id=text)
+            record.annotations["weight"] = weight
+            records.append(record)
+        self.align = MultipleSeqAlignment(records, alpha)
+
+    def test_consensus(self):
+        """Consensus with and without gaps."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        self.assertEqual(str(summary.dumb_consensus()), "XTXTC")
+        self.assertEqual(str(summary.dumb_consensus(0.5, "N")), "NTNTC")
+        self.assertEqual(str(summary.gap_consensus(0.5, "N")), "NTNTC")
+        self.assertEqual(str(summary.gap_consensus(0.9, "N")), "NTNNC")
+
+    def test_replacement_dictionary(self):
+        """Weighted replacements, as in the docstring example."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        rep_dict = summary.replacement_dictionary()
+        self.assertAlmostEqual(rep_dict["G", "A"], 0.4)
+        self.assertAlmostEqual(rep_dict["G", "C"], 0.5)
+        self.assertAlmostEqual(rep_dict["A", "C"], 0.8)
+        self.assertAlmostEqual(rep_dict["C", "C"], 0.4 + 0.5 + 0.8)
+        self.assertAlmostEqual(rep_dict["T", "T"], 0.4 + 0.5 + 0.8 + 0.5)
+        self.assertAlmostEqual(rep_dict["A", "G"], 0.5)
+        self.assertEqual(rep_dict["C", "A"], 0)
+        self.assertEqual(len(rep_dict), 16)
+
+    def test_pssm(self):
+        """Weighted position specific score matrix."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        pssm = summary.pos_specific_score_matrix()
+        self.assertEqual(pssm.get_residue(0), "X")
+        self.assertAlmostEqual(pssm[0]["G"], 0.5)
+        self.assertAlmostEqual(pssm[1]["T"], 2.3)
+        self.assertAlmostEqual(pssm[3]["T"], 1.5)
+        self.assertEqual(pssm[3]["A"], 0)
+
+    def test_information_content(self):
+        """Information content of columns."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        summary.information_content(chars_to_ignore=["-"])
+        self.assertAlmostEqual(summary.ic_vector[1], 2.0)
+        self.assertAlmostEqual(summary.ic_vector[4], 2.0)
+        self.assertAlmostEqual(summary.ic_vector[3], 2.0)
+
+    def test_changed_alignment(self):
+        """Counts are worked out again if rows are added."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        self.assertEqual(str(summary.dumb_consensus(0.5, "N")), "NTNTC")
+        self.align.append(SeqRecord(Seq("GTATC", self.alpha), id="extra"))
+        self.assertEqual(str(summary.dumb_consensus(0.5, "N")), "GTATC")
+
+    def test_sorted_alignment(self):
+        """Counts are worked out again if rows are sorted."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        summary.replacement_dictionary()
+        self.align.sort()
+        expected = AlignInfo.SummaryInfo(self.align).replacement_dictionary()
+        self.assertEqual(summary.replacement_dictionary(), expected)
+        self.assertAlmostEqual(expected["A", "G"], 0.4)
+
+    def test_changed_weight(self):
+        """Counts are worked out again if a weight is changed."""
+        summary = AlignInfo.SummaryInfo(self.align)
+        before = summary.information_content(chars_to_ignore=["-"])
+        self.align[0].annotations["weight"] = 4.0
+        expected = AlignInfo.SummaryInfo(self.align)
+        after = expected.information_content(chars_to_ignore=["-"])
+        self.assertNotAlmostEqual(before, after)
+        self.assertAlmostEqual(summary.information_content(chars_to_ignore=["-"]),
+                               after)
+        self.assertEqual(summary.ic_vector, expected.ic_vector)
+
+    def test_bad_letter(self):
+        """Letters missing from the alphabet are an error."""
+        self.align.append(SeqRecord(Seq("ATNTC", self.alpha), id="ambig"))
+        summary = AlignInfo.SummaryInfo(self.align)
+        self.assertRaises(ValueError, summary.replacement_dictionary)
+        self.assertRaises(ValueError, summary.pos_specific_score_matrix)
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
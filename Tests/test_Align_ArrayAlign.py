@@ -0,0 +1,153 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Tests for the Bio.Align.ArrayAlign module."""
+
+import unittest
+import warnings
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.Align.ArrayAlign.")
+
+from Bio import AlignIO
+from Bio import BiopythonDeprecationWarning
+from Bio.Align import AlignInfo, MultipleSeqAlignment
+from Bio.Align.ArrayAlign import ArrayAlignment
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from Bio._py3k import StringIO
+
+
+class TestArrayAlignment(unittest.TestCase):
+
+    def setUp(self):
+        self.aligns = [AlignIO.read("Clustalw/opuntia.aln", "clustal"),
+                       AlignIO.read("Clustalw/protein.aln", "clustal"),
+                       AlignIO.read("Clustalw/hedgehog.aln", "clustal")]
+
+    def compare(self, old, new):
+        self.assertTrue(isinstance(new, ArrayAlignment))
+        self.assertEqual(len(old), len(new))
+        self.assertEqual(old.get_alignment_length(),
+                         new.get_alignment_length())
+        self.assertEqual(new.array.shape,
+                         (len(old), old.get_alignment_length()))
+        for a, b, row in zip(old, new, new.array):
+            self.assertEqual(a.id, b.id)
+            self.assertEqual(str(a.seq), str(b.seq))
+            self.assertEqual(str(a.seq), row.tobytes().decode())
+        for col in range(old.get_alignment_length()):
+            self.assertEqual(old[:, col], new[:, col])
+
+    def test_slicing(self):
+        """Slice an ArrayAlignment like a MultipleSeqAlignment."""
+        for old in self.aligns:
+            new = ArrayAlignment(old)
+            self.assertEqual(new.annotations, old.annotations)
+            self.compare(old, new)
+            self.compare(old[1:], new[1:])
+            self.compare(old[::-2], new[::-2])
+            self.compare(old[:, 5:20], new[:, 5:20])
+            self.compare(old[2:4, ::3], new[2:4, ::3])
+            self.compare(old[:, :10] + old[:, -10:],
+                         new[:, :10] + new[:, -10:])
+            self.compare(old[:, :10] + old[:, -10:],
+                         new[:, :10] + old[:, -10:])
+            self.assertEqual(old[1, 3], new[1, 3])
+            self.assertEqual(old[1:3, 3], new[1:3, 3])
+            self.assertEqual(str(old[2, 3:9].seq), str(new[2, 3:9].seq))
+            self.assertEqual(old[:, 3], new.column(3).tobytes().decode())
+            self.compare(old[:, 7:8] + old[:, 2:3] + old[:, 7:8],
+                         new[:, [7, 2, 7]])
+            self.compare(old[1:3, 4:5] + old[1:3, -1:],
+                         new[1:3, numpy.array([4, -1])])
+            self.assertEqual(str(new[2, [5, 1]].seq), old[2, 5] + old[2, 1])
+            self.assertEqual(format(old, "fasta"), format(new, "fasta"))
+
+    def test_changes(self):
+        """Add rows to and sort an ArrayAlignment."""
+        old = self.aligns[0]
+        new = ArrayAlignment(old[:3])
+        self.assertEqual(new.array.shape, (3, 156))
+        new.extend(old[3:5])
+        new.append(old[5])
+        self.compare(old[:6], new)
+        old = old[:6]
+        old.sort(reverse=True)
+        new.sort(reverse=True)
+        self.compare(old, new)
+        self.assertRaises(ValueError, new.append, SeqRecord(Seq("ACGT")))
+        self.assertRaises(ValueError, new.array.__setitem__, (0, 0), 65)
+        empty = ArrayAlignment([])
+        self.assertEqual(empty.get_alignment_length(), 0)
+        self.assertEqual(empty.array.shape, (0, 0))
+        self.assertEqual(empty.consensus(), "")
+
+    def test_counts(self):
+        """Count letters in each column."""
+        for old in self.aligns:
+            new = ArrayAlignment(old)
+            letters, counts = new.column_counts()
+            self.assertEqual(letters, "".join(sorted(set(
+                "".join(str(record.seq) for record in old)))))
+            self.assertEqual(counts.shape, (len(letters), len(new[0])))
+            for col in range(new.get_alignment_length()):
+                column = old[:, col]
+                for letter, count in zip(letters, counts[:, col]):
+                    self.assertEqual(column.count(letter), count)
+            weights = numpy.arange(len(new)) + 0.5
+            letters, weighted = new.column_counts("-A", weights)
+            for col in range(new.get_alignment_length()):
+                column = old[:, col]
+                self.assertEqual(weighted[0, col], sum(
+                    weight for weight, letter in zip(weights, column)
+                    if letter == "-"))
+            fractions = new.gap_fractions("-")
+            for col in range(new.get_alignment_length()):
+                self.assertAlmostEqual(fractions[col],
+                                       old[:, col].count("-") / float(len(old)))
+
+    def test_consensus(self):
+        """Check the consensus matches AlignInfo."""
+        for old in self.aligns:
+            new = ArrayAlignment(old)
+            summary = AlignInfo.SummaryInfo(old)
+            for args in [(), (0.5, "N"), (0.9, "?", 1), (0.2, "", 1)]:
+                keywds = dict(zip(["threshold", "ambiguous",
+                                   "require_multiple"], args))
+                self.assertEqual(str(summary.dumb_consensus(**keywds)),
+                                 new.consensus(**keywds))
+
+    def test_align_info(self):
+        """Use AlignInfo with an ArrayAlignment."""
+        old = self.aligns[1]
+        new = ArrayAlignment(old)
+        old_info = AlignInfo.SummaryInfo(old)
+        new_info = AlignInfo.SummaryInfo(new)
+        self.assertEqual(str(old_info.dumb_consensus()),
+                         str(new_info.dumb_consensus()))
+        self.assertEqual(str(old_info.pos_specific_score_matrix()),
+                         str(new_info.pos_specific_score_matrix()))
+        self.assertEqual(old_info.replacement_dictionary(),
+                         new_info.replacement_dictionary())
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", BiopythonDeprecationWarning)
+            self.assertEqual(old.get_column(7), new.get_column(7))
+
+    def test_write(self):
+        """Write an ArrayAlignment with AlignIO."""
+        new = ArrayAlignment(self.aligns[0])
+        handle = StringIO()
+        AlignIO.write(new, handle, "clustal")
+        handle.seek(0)
+        self.compare(new, ArrayAlignment(AlignIO.read(handle, "clustal")))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
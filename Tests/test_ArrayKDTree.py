@@ -0,0 +1,116 @@
+# This code is part of the Biopython distribution and governed by its
+# license. Please see the LICENSE file that should have been included
+# as part of this package.
+
+"""Unit tests for the NumPy array based KD tree in Bio.KDTree."""
+import threading
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingExternalDependencyError
+    raise MissingExternalDependencyError(
+        "Install NumPy if you want to use Bio.KDTree.")
+
+try:
+    from Bio.KDTree import _CArrayKDTree
+except ImportError:
+    from Bio import MissingExternalDependencyError
+    raise MissingExternalDependencyError(
+        "C module in Bio.KDTree not compiled")
+
+from Bio.KDTree import ArrayKDTree
+
+
+class ArrayKDTreeTest(unittest.TestCase):
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        self.coords = random.random_sample((1000, 3))
+        # some points appear twice
+        self.coords[:100] = self.coords[500:600]
+        self.points = random.random_sample((50, 3))
+
+    def distances(self, point):
+        return numpy.sqrt(((self.coords - point) ** 2).sum(axis=1))
+
+    def test_query_knn(self):
+        """Find the k nearest neighbors of many points."""
+        tree = ArrayKDTree(self.coords, bucket_size=5)
+        distances, indices = tree.query_knn(self.points, 8)
+        self.assertEqual(indices.shape, (50, 8))
+        self.assertEqual(distances.shape, (50, 8))
+        for k, point in enumerate(self.points):
+            d = self.distances(point)
+            expected = numpy.lexsort((numpy.arange(len(d)), d))[:8]
+            self.assertEqual(list(indices[k]), list(expected))
+            self.assertTrue(numpy.allclose(distances[k], d[expected]))
+
+    def test_query_knn_few_points(self):
+        """Ask for more neighbors than there are points."""
+        tree = ArrayKDTree(self.coords[:3])
+        distances, indices = tree.query_knn(self.points[0], 5)
+        self.assertEqual(indices.shape, (1, 5))
+        self.assertEqual(sorted(indices[0, :3]), [0, 1, 2])
+        self.assertEqual(list(indices[0, 3:]), [-1, -1])
+        self.assertTrue(numpy.isinf(distances[0, 3:]).all())
+        tree = ArrayKDTree(numpy.zeros((0, 3)))
+        distances, indices = tree.query_knn(self.points, 1)
+        self.assertTrue((indices == -1).all())
+
+    def test_query_radius(self):
+        """Find the neighbors within a radius of many points."""
+        tree = ArrayKDTree(self.coords, bucket_size=1)
+        indptr, indices, distances = tree.query_radius(self.points, 0.2,
+                                                       return_distance=True)
+        self.assertEqual(len(indptr), 51)
+        self.assertEqual(indptr[-1], len(indices))
+        for k, point in enumerate(self.points):
+            d = self.distances(point)
+            expected = numpy.nonzero(d <= 0.2)[0]
+            self.assertEqual(list(indices[indptr[k]:indptr[k + 1]]),
+                             list(expected))
+            self.assertTrue(numpy.allclose(distances[indptr[k]:indptr[k + 1]],
+                                           d[expected]))
+        indptr, indices = tree.query_radius([5.0, 5.0, 5.0], 0.2)
+        self.assertEqual(list(indptr), [0, 0])
+        self.assertEqual(len(indices), 0)
+
+    def test_coords_copied(self):
+        """Changing the coordinates does not change the tree."""
+        coords = self.coords.copy()
+        tree = ArrayKDTree(coords)
+        before = tree.query_knn(self.points, 3)[1]
+        coords[:] = 0
+        self.assertTrue((before == tree.query_knn(self.points, 3)[1]).all())
+
+    def test_threads(self):
+        """Query one tree from several threads."""
+        tree = ArrayKDTree(self.coords)
+        expected = tree.query_knn(self.points, 4)[1]
+        results = [None] * 4
+
+        def query(i):
+            results[i] = tree.query_knn(self.points, 4)[1]
+
+        threads = [threading.Thread(target=query, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result in results:
+            self.assertTrue((result == expected).all())
+
+    def test_errors(self):
+        """Reject badly shaped input."""
+        self.assertRaises(ValueError, ArrayKDTree, numpy.zeros(3))
+        self.assertRaises(ValueError, ArrayKDTree, self.coords, 0)
+        tree = ArrayKDTree(self.coords)
+        self.assertRaises(ValueError, tree.query_knn, numpy.zeros((2, 2)), 1)
+        self.assertRaises(ValueError, tree.query_knn, self.points, 0)
+        self.assertRaises(ValueError, tree.query_radius, self.points, -1.0)
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
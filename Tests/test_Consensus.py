@@ -4,8 +4,9 @@
 # as part of this package.
 
 """Unit tests for the Bio.Phylo.Consensus module."""
+import random
 import unittest
-#from Bio._py3k import StringIO
+from Bio._py3k import StringIO
 from Bio import AlignIO
 from Bio import Phylo
 from Bio.Phylo import BaseTree
@@ -57,6 +58,24 @@ class ConsensusTest(unittest.TestCase):
         self.assertEqual(bitstr_counts[_BitString('00011')][0], 1)
         self.assertEqual(bitstr_counts[_BitString('01111')][0], 1)
 
+    def test_terminal_order(self):
+        """Check clades are counted the same whatever the terminal order."""
+        reordered = list(Phylo.parse('./TreeConstruction/trees.tre', 'newick'))
+        for tree in reordered[1:]:
+            tree.ladderize(reverse=True)
+        self.assertNotEqual([t.name for t in reordered[1].get_terminals()],
+                            [t.name for t in self.trees[1].get_terminals()])
+        self.assertEqual(Consensus._count_clades(reordered),
+                         Consensus._count_clades(self.trees))
+        self.assertTrue(Consensus._equal_topology(
+            Consensus.majority_consensus(reordered),
+            Consensus.majority_consensus(self.trees)))
+        other = Phylo.read(StringIO('((Alpha,Beta),(Gamma,Zeta));'), 'newick')
+        self.assertRaises(ValueError, Consensus.majority_consensus,
+                          self.trees + [other])
+        self.assertRaises(ValueError, Consensus.strict_consensus,
+                          self.trees + [other])
+
     def test_strict_consensus(self):
         ref_trees = list(Phylo.parse('./TreeConstruction/strict_refs.tre', 'newick'))
         # three trees
@@ -114,6 +133,16 @@ class ConsensusTest(unittest.TestCase):
         clade = support_tree.common_ancestor([support_tree.find_any(name="Delta"), support_tree.find_any(name="Epsilon")])
         self.assertEqual(clade.confidence, 2 * 100.0 / 3)
 
+    def test_iterators(self):
+        """Check the trees can be given as an iterator."""
+        for consensus in [Consensus.strict_consensus,
+                          Consensus.majority_consensus]:
+            self.assertTrue(Consensus._equal_topology(
+                consensus(iter(self.trees)), consensus(self.trees)))
+        support_tree = Consensus.get_support(self.trees[0], iter(self.trees))
+        clade = support_tree.common_ancestor([support_tree.find_any(name="Beta"), support_tree.find_any(name="Gamma")])
+        self.assertEqual(clade.confidence, 2 * 100.0 / 3)
+
 
 class BootstrapTest(unittest.TestCase):
     """Test for bootstrap methods"""
@@ -127,6 +156,16 @@ class BootstrapTest(unittest.TestCase):
         self.assertEqual(len(msa_list[0]), len(self.msa))
         self.assertEqual(len(msa_list[0][0]), len(self.msa[0]))
 
+    def test_bootstrap_columns(self):
+        """Check replicates are made of columns of the alignment."""
+        random.seed(0)
+        for replicate in Consensus.bootstrap(self.msa, 10):
+            self.assertEqual([r.id for r in replicate],
+                             [r.id for r in self.msa])
+            columns = set(self.msa[:, i] for i in range(len(self.msa[0])))
+            for i in range(len(replicate[0])):
+                self.assertTrue(replicate[:, i] in columns)
+
     def test_bootstrap_trees(self):
         calculator = DistanceCalculator('blosum62')
         constructor = DistanceTreeConstructor(calculator)
@@ -134,6 +173,21 @@ class BootstrapTest(unittest.TestCase):
         self.assertEqual(len(trees), 100)
         self.assertTrue(isinstance(trees[0], BaseTree.Tree))
 
+    def test_bootstrap_trees_processes(self):
+        """Check trees built in several processes are the same."""
+        calculator = DistanceCalculator('identity')
+        constructor = DistanceTreeConstructor(calculator)
+        results = []
+        for processes in [None, 2]:
+            random.seed(1)
+            handle = StringIO()
+            Phylo.write(Consensus.bootstrap_trees(self.msa, 10, constructor,
+                                                  processes),
+                        handle, 'newick')
+            results.append(handle.getvalue())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0].count(';'), 10)
+
     def test_bootstrap_consensus(self):
         calculator = DistanceCalculator('blosum62')
         constructor = DistanceTreeConstructor(calculator , 'nj')
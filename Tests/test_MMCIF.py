@@ -27,6 +27,8 @@ from Bio.Alphabet import generic_protein
 from Bio.PDB.PDBExceptions import PDBConstructionException, PDBConstructionWarning
 
 from Bio.PDB import PPBuilder, CaPPBuilder
+from Bio.PDB.AtomTable import AtomTable
+from Bio.PDB.MMCIF2Dict import MMCIF2Dict
 from Bio.PDB.MMCIFParser import MMCIFParser
 
 
@@ -127,6 +129,63 @@ class ParseReal(unittest.TestCase):
                 self.assertEqual("MKPVTLYDVAEYAGVSYQTVSRVVNQASHVSAKTREKVEAAMAELNYIPNR",
                                  str(s))
 
+
+class AtomTableTest(unittest.TestCase):
+    """Reading the _atom_site loop in bulk."""
+
+    def test_table(self):
+        """Read the atoms of a file with several models."""
+        parser = MMCIFParser()
+        table = parser.get_atom_table("PDB/1LCD.cif")
+        self.assertEqual(len(table), 3384)
+        self.assertEqual([serial for (_, serial, _) in table.models], [1, 2, 3])
+        structure = parser.build_structure("example", table)
+        atoms = list(structure.get_atoms())
+        self.assertEqual(len(atoms), len(table))
+        self.assertEqual(atoms[0].get_name(), "O5'")
+        self.assertEqual(atoms[-1].get_serial_number(), 3384)
+        self.assertTrue((atoms[-1].get_coord() == table.coord[-1]).all())
+        self.assertEqual(atoms[-1].get_parent().get_id(), ("H_HOH", 2570, " "))
+
+    def test_categories(self):
+        """Read only some categories into a dictionary."""
+        mmcif_dict = MMCIF2Dict("PDB/1A8O.cif", ["_cell", "_atom_site"])
+        everything = MMCIF2Dict("PDB/1A8O.cif")
+        self.assertEqual(everything["_cell.length_a"], "41.980")
+        self.assertEqual(everything["data_"], "1A8O")
+        self.assertTrue(len(everything) > len(mmcif_dict))
+        del mmcif_dict["data_"]
+        for key, value in mmcif_dict.items():
+            self.assertTrue(key.startswith(("_cell.", "_atom_site.")), key)
+            self.assertEqual(value, everything[key])
+
+    def test_unaligned(self):
+        """Read a loop whose values don't line up in columns."""
+        tags = ["_atom_site.group_PDB", "_atom_site.label_atom_id",
+                "_atom_site.label_alt_id", "_atom_site.label_comp_id",
+                "_atom_site.label_asym_id", "_atom_site.label_seq_id",
+                "_atom_site.Cartn_x", "_atom_site.Cartn_y",
+                "_atom_site.Cartn_z", "_atom_site.occupancy",
+                "_atom_site.B_iso_or_equiv"]
+        lines = ["ATOM 'C1 A' . LIG A 10A 1.0 2.0 3.0 1.00 5.0\n",
+                 "HETATM \"O1'\" B LIG A 10A 1.5 2.5\n",
+                 "3.5 ? 6.0\n",
+                 "ATOM\n", ("N1",), "A ALA B 11 -1 -2 -3 1.0 7.0\n"]
+        table = AtomTable.from_mmcif_loop(tags, lines, [1, 2, 3, 4, 5, 6])
+        self.assertEqual(list(table.name), ["C1 A", "O1'", "N1"])
+        self.assertEqual(list(table.altloc), [" ", "B", "A"])
+        self.assertEqual(list(table.resseq), [10, 10, 11])
+        self.assertEqual(list(table.icode), ["A", "A", " "])
+        self.assertEqual(list(table.hetero_flag), [" ", "H", " "])
+        self.assertEqual(table.coord[2].tolist(), [-1, -2, -3])
+        self.assertTrue(numpy.isnan(table.occupancy[1]))
+        # the rows don't match the lines
+        self.assertEqual(list(table.line), [0, 0, 0])
+        self.assertEqual(table.models, [(0, None, 0)])
+        self.assertRaises(PDBConstructionException, AtomTable.from_mmcif_loop,
+                          tags, lines[:2])
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity=2)
     unittest.main(testRunner=runner)
@@ -34,10 +34,13 @@ from Bio.Alphabet import generic_protein
 from Bio.PDB import PDBParser, PPBuilder, CaPPBuilder, PDBIO, Select
 from Bio.PDB import HSExposureCA, HSExposureCB, ExposureCN
 from Bio.PDB.PDBExceptions import PDBConstructionException, PDBConstructionWarning
-from Bio.PDB import rotmat, Vector
-from Bio.PDB import Residue, Atom
+from Bio.PDB import rotmat, Vector, Selection, Superimposer
+from Bio.PDB.Superimposer import rms_matrix
+from Bio.SVDSuperimposer import SVDSuperimposer
+from Bio.PDB import Residue, Atom, Chain, Model, Structure
 from Bio.PDB import make_dssp_dict
 from Bio.PDB.NACCESS import process_asa_data, process_rsa_data
+from Bio.PDB.PDBTrajectory import PDBTrajectory
 
 
 # NB: the 'A_' prefix ensures this test case is run first
@@ -704,6 +707,169 @@ class ParseReal(unittest.TestCase):
             os.remove(filename)
 
 
+class AtomTableTest(unittest.TestCase):
+    def test_columns(self):
+        """Read the atoms of a PDB file into an AtomTable."""
+        parser = PDBParser()
+        table = parser.get_atom_table("PDB/1A8O.pdb")
+        self.assertEqual(parser.get_header()["resolution"], 1.7)
+        structure = parser.get_structure("example", "PDB/1A8O.pdb")
+        atoms = list(structure.get_atoms())
+        self.assertEqual(len(table), len(atoms))
+        self.assertEqual(table.coord.shape, (len(atoms), 3))
+        self.assertEqual(table.coord.dtype, numpy.dtype("f"))
+        self.assertEqual(list(table.name), [a.get_name() for a in atoms])
+        self.assertEqual(list(table.fullname), [a.get_fullname() for a in atoms])
+        self.assertEqual(list(table.element), [a.element for a in atoms])
+        self.assertEqual(list(table.serial_number),
+                         [a.get_serial_number() for a in atoms])
+        self.assertEqual(list(table.bfactor), [a.get_bfactor() for a in atoms])
+        self.assertEqual(list(zip(table.resseq, table.icode)),
+                         [a.get_parent().get_id()[1:] for a in atoms])
+        for row, atom in zip(table.coord, atoms):
+            self.assertTrue(numpy.array_equal(row, atom.get_coord()))
+        # No MODEL record, so the model starts at the first atom
+        self.assertEqual(table.models, [(table.line[0], None, 0)])
+        self.assertEqual(list(table.hetero_flag[:8]), ["H"] * 8)
+
+    def test_shared_coordinates(self):
+        """Build a Structure which shares the coordinates of an AtomTable."""
+        parser = PDBParser()
+        table = parser.get_atom_table("PDB/1MOT.pdb")
+        self.assertEqual(len(table.models), 20)
+        structure = parser.build_structure("1mot", table)
+        self.assertEqual(len(structure), 20)
+        for index, model in enumerate(structure):
+            atoms = table.get_model_slice(index)
+            self.assertEqual(len(list(model.get_atoms())),
+                             atoms.stop - atoms.start)
+            self.assertTrue((table.model[atoms] == index).all())
+        atoms = table.get_model_slice(1)
+        atom = list(structure[1].get_atoms())[3]
+        self.assertTrue(numpy.may_share_memory(atom.get_coord(), table.coord))
+        table.coord[atoms] += 1.0
+        self.assertTrue(numpy.array_equal(atom.get_coord(),
+                                          table.coord[atoms.start + 3]))
+
+    def test_missing_values(self):
+        """Keep missing occupancies and bad serial numbers in an AtomTable."""
+        parser = PDBParser(PERMISSIVE=True)
+        table = parser.get_atom_table("PDB/occupancy.pdb")
+        self.assertTrue(numpy.isnan(table.occupancy[0]))
+        self.assertEqual(list(table.occupancy[1:]), [1.0, 0.0])
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always", PDBConstructionWarning)
+            structure = parser.build_structure("test", table)
+            self.assertEqual(len(w), 3, w)
+        atoms = structure[0]["A"][(" ", 152, " ")]
+        self.assertEqual(atoms["N"].get_occupancy(), None)
+        data = ("ATOM  A0000  N   ASP A 152      21.554  34.953  27.691  1.00 19.26           N\n"
+                "ANISOU    1  N   ASP A 152     1234   -234    345    456   5678   -678       N\n"
+                "HETATM    2  O   HOH A 153      21.ish  34.953  27.691  1.00 19.26           O\n")
+        table = parser.get_atom_table(StringIO(data[:-82]))
+        self.assertEqual(list(table.serial_number), [0])
+        self.assertEqual(list(table.anisou[0] * 10000), [1234, -234, 345, 456, 5678, -678])
+        self.assertRaises(PDBConstructionException,
+                          parser.get_atom_table, StringIO(data))
+
+
+class TrajectoryTest(unittest.TestCase):
+    def test_models(self):
+        """Read the models of an NMR structure as coordinate arrays."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", PDBConstructionWarning)
+            structure = PDBParser().get_structure("1mot", "PDB/1MOT.pdb")
+        trajectory = PDBTrajectory("PDB/1MOT.pdb")
+        self.assertEqual(len(trajectory), len(structure))
+        atoms = structure[0].get_coords()
+        self.assertEqual(trajectory.n_atoms, len(atoms))
+        self.assertTrue(numpy.array_equal(trajectory.topology.coord, atoms))
+        for model, coords in zip(structure, trajectory):
+            self.assertTrue(numpy.array_equal(model.get_coords(), coords))
+        self.assertTrue(numpy.array_equal(trajectory[-1],
+                                          structure[19].get_coords()))
+        coords = trajectory[::7]
+        self.assertEqual(coords.shape, (3, len(atoms), 3))
+        self.assertTrue(numpy.array_equal(coords[2],
+                                          structure[14].get_coords()))
+        self.assertRaises(IndexError, trajectory.__getitem__, 20)
+        # a single model as a Structure
+        model = trajectory.get_structure("1mot", 14)[0]
+        self.assertEqual(model.serial_num, 15)
+        self.assertTrue(numpy.array_equal(model.get_coords(),
+                                          structure[14].get_coords()))
+
+    def test_single_model(self):
+        """Read a file without MODEL records."""
+        trajectory = PDBTrajectory("PDB/1A8O.pdb")
+        self.assertEqual(len(trajectory), 1)
+        table = PDBParser().get_atom_table("PDB/1A8O.pdb")
+        self.assertTrue(numpy.array_equal(trajectory[0], table.coord))
+        self.assertEqual(trajectory.topology.header["head"], "viral protein")
+
+    def test_bare_model(self):
+        """Find models started by MODEL with no serial number."""
+        with open("PDB/1MOT.pdb") as handle:
+            lines = handle.readlines()
+        lines = ["MODEL\n" if line.startswith("MODEL") else line
+                 for line in lines]
+        filenumber, filename = tempfile.mkstemp()
+        os.close(filenumber)
+        try:
+            with open(filename, "wb") as handle:
+                handle.write("".join(lines).replace("\n", "\r\n").encode())
+            trajectory = PDBTrajectory(filename)
+            self.assertEqual(len(trajectory), 20)
+            expected = PDBTrajectory("PDB/1MOT.pdb")
+            self.assertTrue(numpy.array_equal(trajectory[:], expected[:]))
+        finally:
+            os.remove(filename)
+        # atoms after an ENDMDL start another model, as in the PDBParser
+        trajectory = PDBTrajectory("PDB/a_structure.pdb")
+        table = PDBParser().get_atom_table("PDB/a_structure.pdb")
+        self.assertEqual(len(trajectory), len(table.models))
+        self.assertTrue(numpy.array_equal(trajectory[0],
+                                          table.coord[table.get_model_slice(0)]))
+        self.assertRaises(PDBConstructionException, trajectory.__getitem__, 1)
+
+    def test_changed_atom(self):
+        """Reject a model with different atoms."""
+        with open("PDB/1MOT.pdb") as handle:
+            lines = handle.readlines()
+        # rename the first atom of the second model
+        index = lines.index("MODEL      2\n") + 1
+        lines[index] = lines[index][:12] + " XX " + lines[index][16:]
+        filenumber, filename = tempfile.mkstemp()
+        os.close(filenumber)
+        try:
+            with open(filename, "w") as handle:
+                handle.writelines(lines)
+            trajectory = PDBTrajectory(filename)
+            self.assertEqual(len(trajectory[2]), trajectory.n_atoms)
+            self.assertRaises(PDBConstructionException,
+                              trajectory.__getitem__, 1)
+        finally:
+            os.remove(filename)
+
+    def test_missing_atom(self):
+        """Reject a model with a different number of atoms."""
+        with open("PDB/1MOT.pdb") as handle:
+            lines = handle.readlines()
+        # drop the first atom of the second model
+        del lines[lines.index("MODEL      2\n") + 1]
+        filenumber, filename = tempfile.mkstemp()
+        os.close(filenumber)
+        try:
+            with open(filename, "w") as handle:
+                handle.writelines(lines)
+            trajectory = PDBTrajectory(filename)
+            self.assertEqual(len(trajectory[0]), trajectory.n_atoms)
+            self.assertRaises(PDBConstructionException,
+                              trajectory.__getitem__, 1)
+        finally:
+            os.remove(filename)
+
+
 class WriteTest(unittest.TestCase):
     def setUp(self):
         with warnings.catch_warnings():
@@ -1036,6 +1202,201 @@ class TransformTests(unittest.TestCase):
             for i in range(0, 3):
                 self.assertAlmostEqual(newpos[i], newpos_check[i])
 
+    def test_shared_coords(self):
+        """Keep the coordinates of a model in one array."""
+        atoms = self.m.get_coords()
+        unpacked = [a for c in self.m for r in c.get_unpacked_list()
+                    for a in r.get_unpacked_list()]
+        self.assertEqual(atoms.shape, (len(unpacked), 3))
+        for row, atom in zip(atoms, unpacked):
+            self.assertTrue(numpy.array_equal(row, atom.get_coord()))
+        # every alternative location moves, not just the selected one
+        rotation = rotmat(Vector(1, 3, 5), Vector(1, 0, 0))
+        translation = numpy.array((2.4, 0, 1), 'f')
+        self.c.transform(rotation, translation)
+        coords = self.c.get_coords()
+        self.assertTrue(numpy.allclose(coords, numpy.dot(atoms[:len(coords)],
+                                                         rotation) + translation))
+        for row, atom in zip(coords, unpacked):
+            self.assertTrue(numpy.array_equal(row, atom.get_coord()))
+        # new coordinates for one atom, then a new atom
+        self.a.set_coord(numpy.array((1.0, 2.0, 3.0)))
+        self.assertEqual(list(self.r.get_coords()[0]), [1.0, 2.0, 3.0])
+        atom = Atom.Atom("XX", numpy.array((1.0, 2.0, 3.0), 'f'), 0.0, 1.0,
+                         " ", " XX ", 0, "C")
+        self.r.add(atom)
+        self.m.transform(numpy.identity(3), numpy.array((1.0, 0.0, 0.0)))
+        self.assertEqual(list(atom.get_coord()), [2.0, 2.0, 3.0])
+        self.assertEqual(list(self.a.get_coord()), [2.0, 2.0, 3.0])
+        self.r.detach_child("XX")
+        self.assertEqual(len(self.m.get_coords()), len(unpacked))
+
+    def test_saved_coords(self):
+        """Keep coordinates returned before a transformation unchanged."""
+        rotation = rotmat(Vector(1, 3, 5), Vector(1, 0, 0))
+        for translation in (numpy.array((2.4, 0, 1), 'f'),
+                            numpy.array((2.4, 0, 1))):
+            old = self.a.get_coord()
+            saved = old.copy()
+            self.s.transform(rotation, translation)
+            self.assertTrue(numpy.array_equal(old, saved))
+            self.assertFalse(numpy.allclose(self.a.get_coord(), saved))
+        atoms = self.r.get_unpacked_list()
+        old = atoms[0].get_coord()
+        saved = old.copy()
+        sup = Superimposer()
+        sup.rotran = (rotation, numpy.array((2.4, 0, 1), 'f'))
+        sup.apply(atoms)
+        self.assertTrue(numpy.array_equal(old, saved))
+        self.assertTrue(numpy.allclose(atoms[0].get_coord(),
+                                       numpy.dot(saved, rotation) + (2.4, 0, 1)))
+
+    def test_shared_residue(self):
+        """Keep the coordinates of a residue in two models up to date."""
+        structure = Structure.Structure("Y")
+        model = Model.Model(0)
+        structure.add(model)
+        chain = Chain.Chain(self.c.id)
+        model.add(chain)
+        # without detaching it from the first model
+        chain.add(self.r)
+        atom = self.r.get_unpacked_list()[0]
+        start = atom.get_coord().copy()
+        self.m.get_coords()
+        model.get_coords()
+        shift = numpy.array((10.0, 0.0, 0.0))
+        for step, entity in enumerate((self.m, model, self.m)):
+            entity.transform(numpy.identity(3), shift)
+            coord = start + shift * (step + 1)
+            self.assertTrue(numpy.allclose(atom.get_coord(), coord))
+            for other in (self.m, model):
+                self.assertTrue(numpy.allclose(other.get_coords()[0], coord))
+            for other in (self.s, structure):
+                handle = StringIO()
+                io = PDBIO()
+                io.set_structure(other)
+                io.save(handle)
+                line = [line for line in handle.getvalue().splitlines()
+                        if line[:6] in ("ATOM  ", "HETATM")][0]
+                self.assertAlmostEqual(float(line[30:38]), coord[0], places=3)
+
+    def test_center_of_mass(self):
+        """Calculate centers of mass and centroids."""
+        for o in (self.s, self.m, self.c, self.r):
+            coords = o.get_coords()
+            self.assertTrue(numpy.allclose(o.center_of_mass(geometric=True),
+                                           coords.mean(axis=0)))
+        atoms = self.r.get_unpacked_list()
+        masses = numpy.array([a.mass for a in atoms])
+        self.assertTrue(numpy.allclose(self.r.center_of_mass(),
+                                       numpy.dot(masses, self.r.get_coords())
+                                       / masses.sum()))
+
+    def test_superimposer(self):
+        """Superimpose a list of atoms, or a whole entity."""
+        fixed = [a for r in self.c for a in r]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", PDBConstructionWarning)
+            moved = PDBParser(PERMISSIVE=True).get_structure(
+                'Y', "PDB/a_structure.pdb")
+        rotation = rotmat(Vector(1, 3, 5), Vector(1, 0, 0))
+        moved.transform(rotation, numpy.array((2.4, 0, 1)))
+        moving = [a for r in moved[0][self.c.id] for a in r]
+        self.assertEqual(len(Selection.get_coords(moving)), len(fixed))
+        sup = Superimposer()
+        sup.set_atoms(fixed, moving)
+        self.assertAlmostEqual(sup.rms, 0.0, places=3)
+        sup.apply(moving)
+        self.assertTrue(numpy.allclose(Selection.get_coords(moving),
+                                       Selection.get_coords(fixed), atol=1e-3))
+        sup.apply(moved)
+        self.assertFalse(numpy.allclose(Selection.get_coords(moving),
+                                        Selection.get_coords(fixed), atol=1e-3))
+
+
+class RMSMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        random = numpy.random.RandomState(0)
+        base = random.normal(scale=5.0, size=(30, 3))
+        frames = []
+        for k in range(9):
+            rotation = rotmat(Vector(*random.normal(size=3)),
+                              Vector(*random.normal(size=3)))
+            moved = base + random.normal(scale=0.1 * k, size=base.shape)
+            frames.append(numpy.dot(moved, rotation) + random.normal(size=3))
+        self.coords = numpy.array(frames)
+
+    def expected(self):
+        sup = SVDSuperimposer()
+        distances = []
+        for i in range(1, len(self.coords)):
+            for j in range(i):
+                sup.set(self.coords[i], self.coords[j])
+                sup.run()
+                distances.append(sup.get_rms())
+        return numpy.array(distances)
+
+    def test_rms_matrix(self):
+        """Find the RMSDs of all pairs of frames, in tiles."""
+        expected = self.expected()
+        self.assertEqual(len(expected), 36)
+        for tile_size in (1, 2, 4, 256):
+            distances = rms_matrix(self.coords, tile_size=tile_size)
+            self.assertTrue(numpy.allclose(distances, expected))
+        # the same frame, moved
+        coords = numpy.array([self.coords[0], self.coords[0] + 3.0])
+        self.assertAlmostEqual(rms_matrix(coords)[0], 0.0, places=5)
+        self.assertEqual(len(rms_matrix(self.coords[:1])), 0)
+
+    def test_rms_matrix_degenerate(self):
+        """Find the RMSDs of collinear atoms, and of pairs of atoms."""
+        random = numpy.random.RandomState(1)
+        line = numpy.outer(numpy.linspace(-5.0, 5.0, 10), (1.0, 2.0, 3.0))
+        frames = []
+        for k in range(6):
+            rotation = rotmat(Vector(*random.normal(size=3)),
+                              Vector(*random.normal(size=3)))
+            moved = line * (1.0 + 1e-4 * random.normal(size=(10, 1)))
+            frames.append(numpy.dot(moved, rotation) + random.normal(size=3))
+        for coords in (numpy.array(frames), random.normal(size=(6, 2, 3))):
+            self.coords = coords
+            expected = self.expected()
+            distances = rms_matrix(coords)
+            self.assertTrue(numpy.allclose(distances, expected, rtol=1e-5,
+                                           atol=0.0))
+
+    def test_rms_matrix_identical(self):
+        """Find the RMSDs of identical and nearly identical frames."""
+        random = numpy.random.RandomState(2)
+        frames = []
+        for k in range(6):
+            rotation = rotmat(Vector(*random.normal(size=3)),
+                              Vector(*random.normal(size=3)))
+            moved = self.coords[0] + 1e-6 * k * random.normal(size=(30, 3))
+            frames.append(numpy.dot(moved, rotation) + random.normal(size=3))
+        frames.append(frames[-1])
+        self.coords = numpy.array(frames)
+        expected = self.expected()
+        distances = rms_matrix(self.coords, tile_size=4)
+        self.assertTrue(numpy.allclose(distances, expected, rtol=1e-6,
+                                       atol=1e-12))
+        self.assertTrue(distances[-1] < 1e-12)
+
+    def test_rms_matrix_processes(self):
+        """Find the RMSDs in several processes, and store them in an array."""
+        out = numpy.zeros(36)
+        distances = rms_matrix(self.coords, processes=2, tile_size=3, out=out)
+        self.assertTrue(distances is out)
+        self.assertTrue(numpy.allclose(out, self.expected()))
+
+    def test_rms_matrix_errors(self):
+        """Reject badly shaped input."""
+        self.assertRaises(ValueError, rms_matrix, self.coords[0])
+        self.assertRaises(ValueError, rms_matrix, self.coords, tile_size=0)
+        self.assertRaises(ValueError, rms_matrix, self.coords,
+                          out=numpy.zeros(35))
+
 
 class CopyTests(unittest.TestCase):
 
@@ -10,8 +10,10 @@
 
 """Unit tests for those parts of the Bio.PDB module using Bio.KDTree."""
 import unittest
+import warnings
 
 try:
+    import numpy
     from numpy import array
     from numpy.random import random
 except ImportError:
@@ -26,7 +28,18 @@ except ImportError:
     raise MissingExternalDependencyError(
         "C module in Bio.KDTree not compiled")
 
-from Bio.PDB.NeighborSearch import NeighborSearch
+from Bio.PDB import PDBParser
+from Bio.PDB.NeighborSearch import NeighborSearch, _get_cell_vectors
+
+
+class RandomAtom:
+    def __init__(self, coord=None):
+        if coord is None:
+            coord = 100 * random(3)
+        self.coord = coord
+
+    def get_coord(self):
+        return self.coord
 
 
 class NeighborTest(unittest.TestCase):
@@ -35,13 +48,6 @@ class NeighborTest(unittest.TestCase):
 
         Based on the self test in Bio.PDB.NeighborSearch.
         """
-        class RandomAtom:
-            def __init__(self):
-                self.coord = 100 * random(3)
-
-            def get_coord(self):
-                return self.coord
-
         for i in range(0, 20):
             atoms = [RandomAtom() for j in range(100)]
             ns = NeighborSearch(atoms)
@@ -55,6 +61,93 @@ class NeighborTest(unittest.TestCase):
         self.assertEqual([], ns.search(x, 5.0, "M"))
         self.assertEqual([], ns.search(x, 5.0, "S"))
 
+    def test_search_batch(self):
+        """NeighborSearch: Search many centers at once."""
+        atoms = [RandomAtom() for j in range(200)]
+        ns = NeighborSearch(atoms)
+        centers = 100 * random((30, 3))
+        centers[0] = [250, 250, 250]
+        indptr, indices = ns.search_batch(centers, 10.0)
+        self.assertEqual(len(indptr), len(centers) + 1)
+        self.assertEqual(indptr[-1], len(indices))
+        coords = ns.coords.astype(float)
+        for k, center in enumerate(centers):
+            distances = numpy.sqrt(((coords - center) ** 2).sum(axis=1))
+            self.assertEqual(list(numpy.nonzero(distances < 10.0)[0]),
+                             list(indices[indptr[k]:indptr[k + 1]]))
+        self.assertEqual(indptr[0], indptr[1])
+        self.assertEqual([atoms[i] for i in indices[indptr[1]:indptr[2]]],
+                         ns.search(centers[1], 10.0))
+        # all the pairs, each with the lower index first
+        distances = numpy.sqrt(((coords[:, None] - coords) ** 2).sum(axis=2))
+        expected = list(zip(*numpy.nonzero(numpy.triu(distances < 10.0, 1))))
+        index = dict((id(a), i) for i, a in enumerate(atoms))
+        self.assertEqual(sorted((index[id(a1)], index[id(a2)])
+                                for a1, a2 in ns.search_all(10.0)),
+                         expected)
+
+    def test_search_batch_cell(self):
+        """NeighborSearch: Search many centers in a crystal lattice."""
+        cell = (20.0, 25.0, 30.0, 80.0, 100.0, 110.0)
+        vectors = _get_cell_vectors(cell)
+        fractions = random((100, 3))
+        atoms = [RandomAtom(c) for c in numpy.dot(fractions, vectors)]
+        ns = NeighborSearch(atoms)
+        centers = numpy.dot(3 * random((20, 3)) - 1, vectors)
+        indptr, indices = ns.search_batch(centers, 8.0, cell)
+        coords = ns.coords.astype(float)
+        for k, center in enumerate(centers):
+            distances = numpy.inf
+            for shift in numpy.ndindex(7, 7, 7):
+                images = coords + numpy.dot(numpy.subtract(shift, 3), vectors)
+                distances = numpy.minimum(
+                    distances, numpy.sqrt(((images - center) ** 2).sum(axis=1)))
+            self.assertEqual(list(numpy.nonzero(distances < 8.0)[0]),
+                             list(indices[indptr[k]:indptr[k + 1]]))
+        # the same lattice given by its vectors
+        self.assertTrue(numpy.array_equal(
+            indices, ns.search_batch(centers, 8.0, vectors)[1]))
+        # no centers at all
+        for lattice in (None, cell):
+            indptr, indices = ns.search_batch(numpy.zeros((0, 3)), 8.0, lattice)
+            self.assertEqual(list(indptr), [0])
+            self.assertEqual(len(indices), 0)
+
+
+class ContactMapTest(unittest.TestCase):
+    def setUp(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            structure = PDBParser().get_structure("X", "PDB/a_structure.pdb")
+        self.atoms = list(structure.get_atoms())
+        self.ns = NeighborSearch(self.atoms)
+
+    def test_search_all(self):
+        """NeighborSearch: Find residue pairs in contact."""
+        pairs = set()
+        for a1, a2 in self.ns.search_all(4.0):
+            r1, r2 = a1.get_parent(), a2.get_parent()
+            if r1 is not r2:
+                pairs.add(frozenset((id(r1), id(r2))))
+        hits = self.ns.search_all(4.0, "R")
+        self.assertEqual(len(hits), len(pairs))
+        self.assertEqual(pairs, set(frozenset((id(r1), id(r2)))
+                                    for r1, r2 in hits))
+
+    def test_contact_map(self):
+        """NeighborSearch: Residue contact map."""
+        residues, contacts = self.ns.contact_map(4.0)
+        self.assertEqual(contacts.shape, (len(residues), len(residues)))
+        self.assertTrue((contacts == contacts.T).all())
+        self.assertFalse(contacts.diagonal().any())
+        index = dict((id(r), i) for i, r in enumerate(residues))
+        expected = numpy.zeros(contacts.shape, bool)
+        for r1, r2 in self.ns.search_all(4.0, "R"):
+            expected[index[id(r1)], index[id(r2)]] = True
+            expected[index[id(r2)], index[id(r1)]] = True
+        self.assertTrue((contacts == expected).all())
+        self.assertTrue(contacts.any())
+
 
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity=2)
@@ -90,6 +90,38 @@ class IOTests(unittest.TestCase):
         self.assertEqual(clade_a.name, 'foo')
         self.assertAlmostEqual(clade_a.branch_length, 0.1)
 
+    def test_newick_branch_lengths_only(self):
+        """Parse Newick trees, skipping comments and confidences."""
+        handle = StringIO("((A:1[x],'B c':2)90:1,C[y])\n;\n(D,E)0.5;")
+        trees = list(Phylo.parse(handle, 'newick', branch_lengths_only=True))
+        self.assertEqual(len(trees), 2)
+        clade = trees[0].clade[0]
+        self.assertEqual(clade.name, '90')
+        self.assertEqual(clade.confidence, None)
+        self.assertEqual(clade.branch_length, 1)
+        self.assertEqual(clade[0].comment, None)
+        self.assertEqual(clade[1].name, 'B c')
+        self.assertEqual(clade[1].branch_length, 2)
+        self.assertEqual(trees[1].root.name, '0.5')
+        handle.seek(0)
+        trees = list(Phylo.parse(handle, 'newick'))
+        self.assertEqual(trees[0].clade[0].confidence, 90)
+        self.assertEqual(trees[0].clade[0][0].comment, 'x')
+        self.assertEqual(trees[1].root.confidence, 0.5)
+
+    def test_newick_deep(self):
+        """Read and write a Newick tree deeper than the recursion limit."""
+        size = sys.getrecursionlimit() + 100
+        text = '(' * size + 'A' + ''.join(',t%d:%d)' % (i, i)
+                                          for i in range(size)) + ';'
+        tree = Phylo.read(StringIO(text), 'newick')
+        self.assertEqual(tree.count_terminals(), size + 1)
+        mem_file = StringIO()
+        Phylo.write(tree, mem_file, 'newick', plain=True)
+        self.assertEqual(mem_file.getvalue(),
+                         '(' * size + 'A' + ''.join(',t%d)' % i
+                                                    for i in range(size)) + ';\n')
+
     def test_format_branch_length(self):
         """Custom format string for Newick branch length serialization."""
         tree = Phylo.read(StringIO('A:0.1;'), 'newick')
@@ -314,6 +346,53 @@ class MixinTests(unittest.TestCase):
         self.assertAlmostEqual(t.distance('A', 'C'), 0.562)
         self.assertAlmostEqual(t.distance('B', 'C'), 0.69)
 
+    def test_build_index(self):
+        """TreeMixin: build_index() method."""
+        t = self.phylogenies[1]
+        index = t.build_index()
+        self.assertEqual(len(index), 5)
+        self.assertTrue(t.clade[0] in index)
+        self.assertTrue(index.parent('A') is t.clade[0])
+        self.assertEqual(index.parent(t.clade), None)
+        self.assertEqual(index.get_path('B'), t.get_path('B'))
+        self.assertEqual(index.get_path('Z'), None)
+        self.assertTrue(index.common_ancestor('A', 'B') is t.clade[0])
+        self.assertTrue(index.common_ancestor(['A', 'C']) is t.clade)
+        self.assertAlmostEqual(index.distance('A'), 0.162)
+        self.assertAlmostEqual(index.distance('A', 'B'), 0.332)
+        self.assertAlmostEqual(index.distance('B', 'C'), 0.69)
+        self.assertAlmostEqual(index.distance({'name': 'C'}), 0.4)
+        self.assertRaises(ValueError, index.distance, 'A', 'Z')
+        tree = self.phylogenies[10]
+        index = tree.build_index()
+        self.assertTrue(index.common_ancestor('A', 'B', 'C') is tree.clade[0])
+        for clade in tree.find_clades():
+            self.assertEqual(index.get_path(clade), tree.get_path(clade))
+            for other in tree.find_clades():
+                self.assertTrue(index.common_ancestor(clade, other) is
+                                tree.common_ancestor(clade, other))
+
+    def test_deep_tree(self):
+        """TreeMixin: methods on a tree deeper than the recursion limit."""
+        size = sys.getrecursionlimit() + 100
+        root = clade = PhyloXML.Clade()
+        for i in range(size):
+            clade.clades = [PhyloXML.Clade(1.0, name='t%d' % i),
+                            PhyloXML.Clade(1.0)]
+            clade = clade.clades[1]
+        tree = PhyloXML.Phylogeny(root)
+        self.assertEqual(len(tree.get_terminals()), size + 1)
+        self.assertEqual(len(list(tree.find_clades(order='postorder'))),
+                         2 * size + 1)
+        self.assertEqual(len(tree.depths()), 2 * size + 1)
+        self.assertEqual(len(tree.get_path(clade)), size)
+        self.assertEqual(tree.distance('t0', clade), size + 1)
+        self.assertTrue(tree.common_ancestor('t5', 't9') is root[1][1][1][1][1])
+        index = tree.build_index()
+        self.assertEqual(index.distance('t0', clade), size + 1)
+        self.assertTrue(index.common_ancestor('t5', 't9') is
+                        root[1][1][1][1][1])
+
     def test_is_bifurcating(self):
         """TreeMixin: is_bifurcating() method."""
         for tree, is_b in zip(self.phylogenies,
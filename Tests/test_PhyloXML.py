@@ -7,8 +7,10 @@
 """
 
 import os
+import sys
 import tempfile
 import unittest
+from io import BytesIO
 from itertools import chain
 
 from Bio import Alphabet
@@ -16,6 +18,7 @@ from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.Align import MultipleSeqAlignment
 from Bio.Phylo import PhyloXML as PX, PhyloXMLIO
+from Bio._py3k import _as_bytes
 
 # Example PhyloXML files
 EX_APAF = 'PhyloXML/apaf.xml'
@@ -164,6 +167,41 @@ class ParseTests(unittest.TestCase):
                 ),
             )
 
+    def test_parse_branch_lengths_only(self):
+        """Parse only the outline of each phylogeny."""
+        for source in (EX_APAF, EX_BCL2, EX_MADE, EX_PHYLO, EX_DOLLO):
+            full = list(PhyloXMLIO.parse(source))
+            outlines = list(PhyloXMLIO.parse(source, branch_lengths_only=True))
+            self.assertEqual(len(full), len(outlines))
+            for tree, outline in zip(full, outlines):
+                self.assertTrue(isinstance(outline, PX.Phylogeny))
+                self.assertEqual(outline.name, tree.name)
+                self.assertEqual(outline.rooted, tree.rooted)
+                for clade, other in zip(tree.find_clades(),
+                                        outline.find_clades()):
+                    self.assertEqual(other.name, clade.name)
+                    self.assertEqual(other.branch_length, clade.branch_length)
+                    self.assertEqual(len(other), len(clade))
+                    self.assertEqual(other.taxonomies, [])
+                    self.assertEqual(other.sequences, [])
+                    self.assertEqual(other.confidences, [])
+
+    def test_parse_deep(self):
+        """Parse a phylogeny deeper than the recursion limit."""
+        size = sys.getrecursionlimit() + 100
+        text = ('<phyloxml xmlns="http://www.phyloxml.org"><phylogeny>' +
+                '<clade><name>A</name>' * size +
+                '<clade branch_length="0.5"><taxonomy><code>X</code>' +
+                '</taxonomy></clade>' + '</clade>' * size +
+                '</phylogeny></phyloxml>')
+        for branch_lengths_only in (False, True):
+            tree = next(PhyloXMLIO.parse(BytesIO(_as_bytes(text)),
+                                         branch_lengths_only))
+            self.assertEqual(len(tree.get_nonterminals()), size)
+            leaf = tree.get_terminals()[0]
+            self.assertEqual(leaf.branch_length, 0.5)
+            self.assertEqual(len(leaf.taxonomies), int(not branch_lengths_only))
+
 
 class TreeTests(unittest.TestCase):
     """Tests for instantiation and attributes of each complex type."""
@@ -396,6 +396,93 @@ BB!!!<!!21!=9,!'!!!>!)>9!!))!5!.!!).!=+9!+!!!%!!('
 """)
 
 
+class TestPairedFastq(unittest.TestCase):
+    """Tests with paired-end FASTQ files."""
+    def setUp(self):
+        self.r1 = ""
+        self.r2 = ""
+        for i in range(25):
+            seq = "ACGT" * (i % 5 + 1)
+            qual = "".join(chr(33 + (i + j) % 40) for j in range(len(seq)))
+            self.r1 += "@read%i/1\n%s\n+\n%s\n" % (i, seq, qual)
+            self.r2 += "@read%i/2\n%s\n+\n%s\n" % (i, seq[::-1], qual)
+
+    def test_pairs(self):
+        """Check pairs match parsing each file."""
+        records1 = list(SeqIO.parse(StringIO(self.r1), "fastq"))
+        records2 = list(SeqIO.parse(StringIO(self.r2), "fastq"))
+        for threads in [False, True]:
+            for batch_size in [1, 7, 1000]:
+                pairs = list(QualityIO.PairedFastqIterator(
+                    StringIO(self.r1), StringIO(self.r2), threads=threads,
+                    batch_size=batch_size))
+                self.assertTrue(compare_records(records1,
+                                                [p[0] for p in pairs]))
+                self.assertTrue(compare_records(records2,
+                                                [p[1] for p in pairs]))
+                pairs = list(QualityIO.PairedFastqGeneralIterator(
+                    StringIO(self.r1), StringIO(self.r2), threads=threads,
+                    batch_size=batch_size))
+                self.assertEqual(len(pairs), 25)
+                self.assertEqual(pairs[3][0][0], "read3/1")
+                self.assertEqual(pairs[3][1][0], "read3/2")
+
+    def test_interleaved(self):
+        """Check interleaved output and input."""
+        pairs = QualityIO.PairedFastqIterator(StringIO(self.r1),
+                                              StringIO(self.r2))
+        h = StringIO()
+        self.assertEqual(25, QualityIO.write_paired_fastq(pairs, h))
+        h.seek(0)
+        self.assertEqual(50, len(list(SeqIO.parse(h, "fastq"))))
+        h.seek(0)
+        pairs = list(QualityIO.PairedFastqIterator(h))
+        #And back to two files
+        h1 = StringIO()
+        h2 = StringIO()
+        self.assertEqual(25, QualityIO.write_paired_fastq(pairs, h1, h2))
+        self.assertEqual(h1.getvalue(), self.r1)
+        self.assertEqual(h2.getvalue(), self.r2)
+
+    def test_mismatched(self):
+        """Check mismatched pairs are caught."""
+        lines = self.r2.split("\n")
+        lines[4] = "@read7/2"
+        bad = "\n".join(lines)
+        for threads in [False, True]:
+            self.assertRaises(ValueError, list,
+                              QualityIO.PairedFastqIterator(
+                                  StringIO(self.r1), StringIO(bad),
+                                  threads=threads))
+            #Unless not checking
+            self.assertEqual(25, len(list(QualityIO.PairedFastqIterator(
+                StringIO(self.r1), StringIO(bad), check_ids=False,
+                threads=threads))))
+        self.assertRaises(ValueError, list,
+                          QualityIO.PairedFastqIterator(StringIO(self.r1)))
+
+    def test_different_lengths(self):
+        """Check files with different numbers of reads are caught."""
+        short = "\n".join(self.r2.split("\n")[:-5]) + "\n"
+        for threads in [False, True]:
+            for batch_size in [1, 24, 25, 1000]:
+                for handles in [(self.r1, short), (short, self.r1)]:
+                    pairs = QualityIO.PairedFastqGeneralIterator(
+                        StringIO(handles[0]), StringIO(handles[1]),
+                        check_ids=False, threads=threads,
+                        batch_size=batch_size)
+                    self.assertRaises(ValueError, list, pairs)
+
+    def test_early_stop(self):
+        """Check stopping part way through with threads."""
+        pairs = QualityIO.PairedFastqIterator(StringIO(self.r1 * 20),
+                                              StringIO(self.r2 * 20),
+                                              threads=True, batch_size=5)
+        first, second = next(pairs)
+        self.assertEqual(first.id, "read0/1")
+        pairs.close()
+
+
 class TestReadWrite(unittest.TestCase):
     """Test can read and write back files."""
     def test_fastq_2000(self):
@@ -0,0 +1,147 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Tests for the UCSC .2bit format support in Bio.SeqIO."""
+
+import pickle
+import struct
+import unittest
+from io import BytesIO
+
+from Bio import SeqIO
+from Bio.Alphabet import generic_dna
+from Bio.Seq import Seq, MmapSeq, PackedSeq
+from Bio.SeqRecord import SeqRecord
+
+
+class TestTwoBit(unittest.TestCase):
+
+    def setUp(self):
+        self.records = list(SeqIO.parse("TwoBit/sequence.fa", "fasta",
+                                        generic_dna))
+
+    def compare(self, records):
+        self.assertEqual(len(records), len(self.records))
+        for old, new in zip(self.records, records):
+            self.assertEqual(old.id, new.id)
+            self.assertEqual(len(old), len(new))
+            self.assertEqual(str(old.seq), str(new.seq))
+
+    def test_parse(self):
+        """Parse a .2bit file, compare to FASTA."""
+        records = list(SeqIO.parse("TwoBit/sequence.2bit", "twobit"))
+        self.compare(records)
+        for record in records:
+            self.assertTrue(isinstance(record.seq, MmapSeq))
+
+    def test_handle(self):
+        """Parse a .2bit file from an in memory handle."""
+        with open("TwoBit/sequence.2bit", "rb") as handle:
+            data = handle.read()
+        self.compare(list(SeqIO.parse(BytesIO(data), "twobit")))
+
+    def test_big_endian(self):
+        """Parse a big endian .2bit file."""
+        with open("TwoBit/sequence.2bit", "rb") as handle:
+            data = handle.read()
+        #Byte swap all the 32 bit integers in the headers, leaving the
+        #names and packed sequences alone
+        buffer = bytearray(data)
+
+        def swap(position, count=1):
+            for i in range(count):
+                value = struct.unpack_from("<I", data, position)[0]
+                struct.pack_into(">I", buffer, position, value)
+                position += 4
+            return position
+
+        count = struct.unpack_from("<I", data, 8)[0]
+        swap(0, 4)
+        position = 16
+        offsets = []
+        for i in range(count):
+            position += 1 + struct.unpack_from("B", data, position)[0]
+            offsets.append(struct.unpack_from("<I", data, position)[0])
+            position = swap(position)
+        for offset in offsets:
+            position = swap(offset, 2)
+            blocks = struct.unpack_from("<I", data, offset + 4)[0]
+            position = swap(position, 2 * blocks)
+            blocks = struct.unpack_from("<I", data, position)[0]
+            swap(position, 2 * blocks + 2)
+        self.compare(list(SeqIO.parse(BytesIO(bytes(buffer)), "twobit")))
+
+    def test_index(self):
+        """Random access to regions via SeqIO.index."""
+        index = SeqIO.index("TwoBit/sequence.2bit", "twobit")
+        self.assertEqual(len(index), len(self.records))
+        for old in self.records:
+            new = index[old.id]
+            self.assertEqual(old.id, new.id)
+            self.assertTrue(isinstance(new.seq, MmapSeq))
+            for start, end in [(0, 10), (3, 17), (100, 200), (-50, -1)]:
+                self.assertEqual(str(old.seq[start:end]),
+                                 str(new.seq[start:end]))
+            self.assertEqual(str(old.seq[500:600].reverse_complement()),
+                             str(new.seq[500:600].reverse_complement()))
+            #Can pickle the sequence for use in another process
+            self.assertEqual(str(pickle.loads(pickle.dumps(new.seq))),
+                             str(old.seq))
+            self.assertTrue(index.get_raw(old.id).startswith(
+                struct.pack("<I", len(old))))
+        index.close()
+
+    def test_write(self):
+        """Write a .2bit file and read it back."""
+        handle = BytesIO()
+        self.assertEqual(3, SeqIO.write(self.records, handle, "twobit"))
+        with open("TwoBit/sequence.2bit", "rb") as expected:
+            self.assertEqual(handle.getvalue(), expected.read())
+        handle.seek(0)
+        self.compare(list(SeqIO.parse(handle, "twobit")))
+
+    def test_write_bad(self):
+        """Check writing unsupported sequences fails."""
+        handle = BytesIO()
+        record = SeqRecord(Seq("ACGTRY", generic_dna), id="ambig")
+        self.assertRaises(ValueError, SeqIO.write, [record], handle, "twobit")
+        record = SeqRecord(Seq("ACGT", generic_dna), id="x" * 256)
+        self.assertRaises(ValueError, SeqIO.write, [record], handle, "twobit")
+
+    def test_bad_signature(self):
+        """Check parsing something else fails."""
+        handle = BytesIO(b"This is not a .2bit file at all")
+        self.assertRaises(ValueError, list, SeqIO.parse(handle, "twobit"))
+
+
+class TestPackedSeq(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Pack and unpack sequences."""
+        for text in ["", "A", "AC", "ACG", "ACGT", "ACGTA", "NNNN", "nnnn",
+                     "acgtNNNNacgtACGTnn", "TTTTTTTTCCCCAAAAGGGGNA"]:
+            seq = PackedSeq(text, generic_dna)
+            self.assertEqual(str(seq), text)
+            self.assertEqual(len(seq), len(text))
+            for start in range(len(text)):
+                for end in range(start, len(text) + 1):
+                    self.assertEqual(str(seq[start:end]), text[start:end])
+            self.assertEqual(seq.count("A"), text.count("A"))
+            self.assertEqual(seq.find("GT"), text.find("GT"))
+
+    def test_pickle(self):
+        """Pickle an in memory packed sequence."""
+        seq = PackedSeq("acgtNNNNacgtACGTnn", generic_dna)[3:15]
+        self.assertEqual(str(pickle.loads(pickle.dumps(seq))), str(seq))
+
+    def test_errors(self):
+        """Check invalid letters fail."""
+        self.assertRaises(ValueError, PackedSeq, "ACGU")
+        self.assertRaises(ValueError, PackedSeq, "ACG-")
+        self.assertRaises(TypeError, PackedSeq, Seq("ACGT"))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -0,0 +1,162 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Tests for the Bio.SeqUtils.QualityControl module."""
+
+import pickle
+import random
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use Bio.SeqUtils.QualityControl.")
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from Bio.SeqUtils import GC
+from Bio.SeqUtils.QualityControl import QCStats
+
+
+def random_records(count, seed):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        length = rng.randint(0, 60)
+        seq = "".join(rng.choice("ACGTNacgtS") for j in range(length))
+        record = SeqRecord(Seq(seq), id="read%i" % i)
+        if rng.random() < 0.8:
+            record.letter_annotations["phred_quality"] = \
+                [rng.randint(0, 50) for j in range(length)]
+        records.append(record)
+    return records
+
+
+class QCStatsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.records = random_records(500, 1234)
+
+    def test_counts(self):
+        """Compare the stats to simple calculations."""
+        stats = QCStats(max_length=40, max_quality=45, batch_size=37)
+        self.assertEqual(500, stats.update(self.records))
+        self.assertEqual(stats.reads, 500)
+        lengths = [len(r) for r in self.records]
+        self.assertEqual(stats.bases, sum(lengths))
+        self.assertEqual(stats.min_length, min(lengths))
+        self.assertEqual(stats.max_read_length, max(lengths))
+        self.assertEqual(stats.length_counts.sum(), 500)
+        self.assertEqual(stats.length_counts[40],
+                         len([l for l in lengths if l >= 40]))
+        self.assertEqual(stats.length_counts[7], lengths.count(7))
+        self.assertAlmostEqual(stats.mean_length(),
+                               float(sum(lengths)) / len(lengths))
+        all_seq = "".join(str(r.seq) for r in self.records)
+        self.assertAlmostEqual(stats.gc_content(), GC(all_seq))
+        self.assertEqual(stats.gc_counts.sum(),
+                         len([l for l in lengths if l]))
+        #Position 3 and pooled positions from 39 onwards
+        for position, slice_ in [(3, slice(3, 4)), (39, slice(39, None))]:
+            letters = "".join(str(r.seq[slice_]).upper()
+                              for r in self.records)
+            composition = stats.base_composition()
+            for letter in "ACGT":
+                self.assertAlmostEqual(composition[letter][position],
+                                       letters.count(letter)
+                                       / float(len(letters)))
+            self.assertAlmostEqual(composition["N"][position],
+                                   (letters.count("N") + letters.count("S"))
+                                   / float(len(letters)))
+            quals = [min(q, 45) for r in self.records
+                     for q in r.letter_annotations.get("phred_quality",
+                                                       [])[slice_]]
+            self.assertAlmostEqual(stats.mean_quality()[position],
+                                   float(sum(quals)) / len(quals))
+            quals.sort()
+            self.assertEqual(stats.quality_quantile(0)[position], quals[0])
+            self.assertEqual(stats.quality_quantile(1)[position], quals[-1])
+            self.assertEqual(stats.quality_quantile(0.5)[position],
+                             quals[(len(quals) - 1) // 2])
+        self.assertEqual(stats.quality_reads,
+                         len([r for r in self.records
+                              if "phred_quality" in r.letter_annotations]))
+
+    def test_merge(self):
+        """Merged stats match a single pass, and can be pickled."""
+        single = QCStats(max_length=50)
+        single.update(self.records)
+        parts = []
+        for start in range(0, 500, 150):
+            stats = QCStats(max_length=50)
+            stats.update(self.records[start:start + 150])
+            parts.append(pickle.loads(pickle.dumps(stats)))
+        merged = sum(parts)
+        self.assertEqual(merged.reads, single.reads)
+        self.assertEqual(merged.bases, single.bases)
+        self.assertEqual(merged.min_length, single.min_length)
+        self.assertEqual(merged.max_read_length, single.max_read_length)
+        for name in ["length_counts", "quality_counts", "base_counts",
+                     "gc_counts", "_registers"]:
+            self.assertTrue((getattr(merged, name)
+                             == getattr(single, name)).all(), name)
+        self.assertEqual(merged.distinct_reads(), single.distinct_reads())
+        #The parts are unchanged
+        self.assertEqual(parts[0].reads, 150)
+        self.assertRaises(ValueError, single.merge, QCStats(max_length=20))
+        self.assertRaises(TypeError, single.merge, self.records)
+
+    def test_snapshot(self):
+        """Snapshots are not changed by later updates."""
+        stats = QCStats()
+        stats.update(self.records[:100])
+        snapshot = stats.copy()
+        stats.update(self.records[100:])
+        self.assertEqual(snapshot.reads, 100)
+        self.assertEqual(snapshot.length_counts.sum(), 100)
+        self.assertEqual(stats.reads, 500)
+
+    def test_duplicates(self):
+        """Estimate the number of distinct reads."""
+        rng = random.Random(42)
+        sequences = ["".join(rng.choice("ACGT") for i in range(30))
+                     for j in range(3000)]
+        stats = QCStats()
+        stats.update_batch(sequences * 2 + [s.lower() for s in sequences])
+        self.assertEqual(stats.reads, 9000)
+        self.assertTrue(2900 < stats.distinct_reads() < 3100,
+                        stats.distinct_reads())
+        self.assertTrue(0.65 < stats.duplicate_fraction() < 0.68,
+                        stats.duplicate_fraction())
+        self.assertEqual(QCStats().duplicate_fraction(), 0.0)
+
+    def test_fasta(self):
+        """Records without qualities."""
+        stats = QCStats()
+        stats.update(SeqIO.parse("Fasta/f002", "fasta"))
+        self.assertEqual(stats.reads, 3)
+        self.assertEqual(stats.quality_reads, 0)
+        self.assertTrue(numpy.isnan(stats.mean_quality()).all())
+
+    def test_errors(self):
+        """Check invalid input fails."""
+        self.assertRaises(ValueError, QCStats, max_length=0)
+        self.assertRaises(ValueError, QCStats, precision=20)
+        stats = QCStats()
+        self.assertRaises(ValueError, stats.update_batch, ["ACGT"], [[1, 2]])
+        self.assertRaises(ValueError, stats.update_batch, ["ACGT"],
+                          [[1, 2, 3, -4]])
+        self.assertRaises(ValueError, stats.update_batch, ["ACGT"], [])
+        #Nothing was recorded from the bad batches
+        self.assertEqual(stats.reads, 0)
+        self.assertEqual(stats.base_counts.sum(), 0)
+        self.assertRaises(ValueError, stats.quality_quantile, 2)
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
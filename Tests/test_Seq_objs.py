@@ -6,6 +6,9 @@
 """Unittests for the Seq objects."""
 from __future__ import print_function
 
+import os
+import pickle
+import tempfile
 import unittest
 import sys
 if sys.version_info[0] == 3:
@@ -13,12 +16,14 @@ if sys.version_info[0] == 3:
 else:
     from string import maketrans
 
+from Bio._py3k import _as_unicode
 from Bio.Alphabet import generic_protein, generic_nucleotide, \
                          generic_dna, generic_rna
 from Bio.Alphabet.IUPAC import protein, extended_protein
 from Bio.Alphabet.IUPAC import unambiguous_dna, ambiguous_dna, ambiguous_rna
 from Bio.Data.IUPACData import ambiguous_dna_values, ambiguous_rna_values
-from Bio.Seq import Seq, UnknownSeq, MutableSeq, translate
+from Bio.Seq import Seq, UnknownSeq, MutableSeq, MmapSeq, translate
+from Bio.SeqFeature import SeqFeature, FeatureLocation, CompoundLocation
 from Bio.Data.CodonTable import TranslationError, CodonTable
 
 #This is just the standard table with less stop codons
@@ -90,6 +95,11 @@ class StringMethodTests(unittest.TestCase):
         UnknownSeq(12, generic_protein, "X"),
         UnknownSeq(12, character="X"),
         UnknownSeq(12),
+        MmapSeq(b"ACGTGGGGT", generic_dna),
+        MmapSeq(b"ACGUGGGGU", generic_rna),
+        MmapSeq(b"NNACGTGGGGTNN", generic_nucleotide, offset=2, length=9),
+        MmapSeq(b"GG", generic_protein),
+        MmapSeq(b"A", generic_dna),
         ]
     for seq in _examples[:]:
         if isinstance(seq, Seq):
@@ -535,6 +545,108 @@ class StringMethodTests(unittest.TestCase):
 
     #TODO - Addition...
 
+
+class MmapSeqTests(unittest.TestCase):
+    """Tests for the memory mapped MmapSeq object."""
+    plain = "ACGTTGCANNNNATGGCCATTGTAATGGGCCGCTGAAAGGGTGCCCGATAGGCTAGCCTAGC"
+
+    def setUp(self):
+        handle, filename = tempfile.mkstemp(suffix=".seq")
+        #On Python 2 a (byte) str would be taken as the sequence data
+        self.filename = _as_unicode(filename)
+        os.write(handle, b">header\n" + self.plain.encode("ascii") + b"\n")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_file(self):
+        """Check a plain sequence file."""
+        seq = MmapSeq(self.filename, generic_dna, offset=8,
+                      length=len(self.plain))
+        self.assertEqual(len(seq), len(self.plain))
+        self.assertEqual(str(seq), self.plain)
+        self.assertEqual(str(seq[12:-3]), self.plain[12:-3])
+        self.assertTrue(isinstance(seq[12:-3], MmapSeq))
+        self.assertEqual(str(seq[12:-3][3:9]), self.plain[12:-3][3:9])
+        self.assertEqual(seq[-1], self.plain[-1])
+        self.assertRaises(IndexError, seq.__getitem__, len(self.plain))
+        self.assertEqual(str(seq[12:].translate()),
+                         str(Seq(self.plain[12:]).translate()))
+        self.assertEqual(str(seq[5:40].reverse_complement()),
+                         str(Seq(self.plain[5:40]).reverse_complement()))
+        self.assertEqual(seq[12:].find("GCC"), self.plain[12:].find("GCC"))
+        self.assertEqual(seq[12:].rfind("GCC"), self.plain[12:].rfind("GCC"))
+        self.assertTrue("GATAG" in seq)
+        with open(self.filename, "rb") as handle:
+            seq = MmapSeq(handle, generic_dna, offset=8)
+            self.assertEqual(str(seq).rstrip(), self.plain)
+
+    def test_pickle(self):
+        """Check pickling re-opens the file."""
+        seq = MmapSeq(self.filename, generic_dna, offset=8,
+                      length=len(self.plain))[10:30]
+        other = pickle.loads(pickle.dumps(seq))
+        self.assertTrue(isinstance(other, MmapSeq))
+        self.assertEqual(str(other), self.plain[10:30])
+        self.assertEqual(repr(other.alphabet), repr(seq.alphabet))
+
+    def test_chunked_search(self):
+        """Check searching across decoding block boundaries."""
+        text = "AACCAAAAGGAACAACCAAAAAAACCC"
+        for packed in (False, True):
+            if packed:
+                #Pack by hand using T=0, C=1, A=2, G=3
+                codes = ["TCAG".index(c) for c in text + "TTT"]
+                data = bytes(bytearray(
+                    (codes[i] << 6) | (codes[i + 1] << 4) |
+                    (codes[i + 2] << 2) | codes[i + 3]
+                    for i in range(0, len(text), 4)))
+                seq = MmapSeq(data, generic_dna, length=len(text),
+                              packed=True)
+            else:
+                seq = MmapSeq(text.encode("ascii"), generic_dna)
+            self.assertEqual(str(seq), text)
+            for size in (1, 2, 3, 5, 100):
+                seq._chunk_size = size
+                for sub in ("A", "AA", "AAA", "CC", "ACC", "AACAA", "G"):
+                    for start in (0, 1, 3, -5):
+                        self.assertEqual(seq.count(sub, start),
+                                         text.count(sub, start))
+                        self.assertEqual(seq.find(sub, start),
+                                         text.find(sub, start))
+                        self.assertEqual(seq.rfind(sub, start),
+                                         text.rfind(sub, start))
+
+    def test_packed_blocks(self):
+        """Check N and soft-mask blocks on packed data."""
+        seq = MmapSeq(b"\x07\xb1\xb8", generic_dna, length=11, packed=True,
+                      n_blocks=[(0, 2)], mask_blocks=[(8, 3)])
+        self.assertEqual(str(seq), "NNCGAGTCaga")
+        for start in range(11):
+            for end in range(start, 12):
+                self.assertEqual(str(seq[start:end]), "NNCGAGTCaga"[start:end])
+        self.assertEqual(seq.count("N"), 2)
+        self.assertEqual(seq.find("ag"), 8)
+        self.assertRaises(ValueError, MmapSeq, b"\x07", packed=True)
+        self.assertRaises(ValueError, MmapSeq, b"\x07", length=5, packed=True)
+        self.assertRaises(ValueError, MmapSeq, b"ACGT", n_blocks=[(0, 2)])
+
+    def test_extract(self):
+        """Check SeqFeature.extract accepts an MmapSeq."""
+        seq = MmapSeq(self.filename, generic_dna, offset=8,
+                      length=len(self.plain))
+        plain = Seq(self.plain, generic_dna)
+        for location in [FeatureLocation(12, 51, strand=+1),
+                         FeatureLocation(12, 51, strand=-1),
+                         CompoundLocation([FeatureLocation(0, 8, strand=-1),
+                                           FeatureLocation(12, 24, strand=-1)]),
+                         CompoundLocation([FeatureLocation(0, 8),
+                                           FeatureLocation(12, 24)])]:
+            feature = SeqFeature(location, type="CDS")
+            self.assertEqual(str(feature.extract(seq)),
+                             str(feature.extract(plain)))
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
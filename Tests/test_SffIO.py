@@ -6,8 +6,10 @@
 
 import re
 import unittest
+from io import BytesIO
 
 from Bio import SeqIO
+from Bio.SeqIO.SffIO import SffIterator, SffWriter
 
 # sffinfo E3MFGYR02_random_10_reads.sff | sed -n '/>\|Run Prefix\|Region\|XY/p'
 test_data = """
@@ -136,6 +138,45 @@ class TestConcatenated(unittest.TestCase):
             raise ValueError("Indxing Roche/invalid_paired_E3MFGYR02.sff should fail")
 
 
+class TestFlowArrays(unittest.TestCase):
+    def test_parse(self):
+        """Flow values and index as arrays match the tuples."""
+        filename = "Roche/E3MFGYR02_index_in_middle.sff"
+        with open(filename, "rb") as handle:
+            records = list(SffIterator(handle))
+        with open(filename, "rb") as handle:
+            arrays = list(SffIterator(handle, flow_arrays=True))
+        self.assertEqual(len(records), len(arrays))
+        for old, new in zip(records, arrays):
+            self.assertEqual(old.id, new.id)
+            self.assertEqual(str(old.seq), str(new.seq))
+            self.assertEqual(old.letter_annotations, new.letter_annotations)
+            for key in ["flow_values", "flow_index"]:
+                self.assertEqual(new.annotations[key].typecode,
+                                 {"flow_values": "H", "flow_index": "B"}[key])
+                self.assertEqual(old.annotations[key],
+                                 tuple(new.annotations[key]))
+
+    def test_write(self):
+        """Write records with flow arrays."""
+        filename = "Roche/E3MFGYR02_random_10_reads.sff"
+        with open(filename, "rb") as handle:
+            records = list(SffIterator(handle))
+        with open(filename, "rb") as handle:
+            arrays = list(SffIterator(handle, flow_arrays=True))
+        expected = BytesIO()
+        SffWriter(expected, xml="").write_file(records)
+        handle = BytesIO()
+        self.assertEqual(10, SffWriter(handle, xml="").write_file(arrays))
+        self.assertEqual(handle.getvalue(), expected.getvalue())
+        handle.seek(0)
+        for old, new in zip(records, SffIterator(handle)):
+            self.assertEqual(old.id, new.id)
+            self.assertEqual(str(old.seq), str(new.seq))
+            self.assertEqual(old.annotations["flow_values"],
+                             new.annotations["flow_values"])
+
+
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
@@ -0,0 +1,138 @@
+# Copyright 2014 by David Bulger.  All rights reserved.
+# This code is part of the Biopython distribution and governed by its
+# license.  Please see the LICENSE file that should have been included
+# as part of this package.
+"""Tests for the NumPy based bulk SFF parsing in Bio.SeqIO.SffIO."""
+
+import unittest
+import warnings
+from io import BytesIO
+
+try:
+    import numpy
+except ImportError:
+    from Bio import MissingPythonDependencyError
+    raise MissingPythonDependencyError(
+        "Install NumPy if you want to use SffBatchIterator.")
+
+from Bio import BiopythonParserWarning
+from Bio.SeqIO.SffIO import SffIterator, SffBatchIterator, SffWriter
+
+
+class TestSffBatch(unittest.TestCase):
+    filenames = ["Roche/E3MFGYR02_random_10_reads.sff",
+                 "Roche/E3MFGYR02_index_at_start.sff",
+                 "Roche/E3MFGYR02_index_in_middle.sff",
+                 "Roche/greek.sff",
+                 "Roche/paired.sff"]
+
+    def compare(self, old, new):
+        self.assertEqual(old.id, new.id)
+        self.assertEqual(str(old.seq), str(new.seq))
+        self.assertEqual(old.letter_annotations, new.letter_annotations)
+        self.assertEqual(sorted(old.annotations), sorted(new.annotations))
+        for key, value in old.annotations.items():
+            if key in ["flow_values", "flow_index"]:
+                self.assertEqual(list(value), new.annotations[key].tolist())
+            else:
+                self.assertEqual(value, new.annotations[key])
+
+    def test_records(self):
+        """Batches give the same records as SffIterator."""
+        for filename in self.filenames:
+            for trim in [False, True]:
+                with open(filename, "rb") as handle:
+                    records = list(SffIterator(handle, trim=trim))
+                with open(filename, "rb") as handle:
+                    batches = list(SffBatchIterator(handle, batch_size=7))
+                self.assertEqual([len(b) for b in batches[:-1]],
+                                 [7] * (len(batches) - 1))
+                self.assertEqual(sum(len(b) for b in batches), len(records))
+                new = [r for b in batches for r in b.records(trim=trim)]
+                for old_record, new_record in zip(records, new):
+                    self.compare(old_record, new_record)
+
+    def test_trimmed(self):
+        """Vectorised clipping matches trimmed SffIterator records."""
+        for filename in self.filenames:
+            with open(filename, "rb") as handle:
+                records = list(SffIterator(handle, trim=True))
+            with open(filename, "rb") as handle:
+                batches = list(SffBatchIterator(handle))
+            self.assertEqual(len(batches), 1)
+            batch = batches[0]
+            left, right = batch.clip_positions()
+            self.assertEqual((right - left).tolist(),
+                             [len(r) for r in records])
+            for record, (name, bases, quals) in zip(records, batch.trimmed()):
+                self.assertEqual(record.id, name)
+                self.assertEqual(str(record.seq), bases.decode("ascii"))
+                self.assertEqual(record.letter_annotations["phred_quality"],
+                                 quals.tolist())
+
+    def test_overlapping_clips(self):
+        """Overlapping clip values trim reads to nothing."""
+        with open("Roche/E3MFGYR02_random_10_reads.sff", "rb") as handle:
+            batch = next(SffBatchIterator(handle))
+        batch.clip_qual_left[:3] = 300
+        left, right = batch.clip_positions()
+        self.assertEqual((right - left).tolist()[:3], [0, 0, 0])
+        self.assertTrue((left <= batch.seq_lengths).all())
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", BiopythonParserWarning)
+            records = list(batch.records(trim=True))
+        self.assertEqual([len(r) for r in records[:3]], [0, 0, 0])
+
+    def test_write(self):
+        """Writing batches matches writing records."""
+        for filename in self.filenames:
+            with open(filename, "rb") as handle:
+                records = list(SffIterator(handle))
+            expected = BytesIO()
+            SffWriter(expected, xml="").write_file(records)
+            for batch_size in [1, 4, 1000]:
+                with open(filename, "rb") as handle:
+                    batches = SffBatchIterator(handle, batch_size)
+                    handle = BytesIO()
+                    count = SffWriter(handle, xml="").write_batches(batches)
+                self.assertEqual(count, len(records))
+                self.assertEqual(handle.getvalue(), expected.getvalue())
+
+    def test_write_trimmed_primer(self):
+        """Adjust clipping for whole batches and write them."""
+        filename = "Roche/E3MFGYR02_random_10_reads.sff"
+        with open(filename, "rb") as handle:
+            batches = list(SffBatchIterator(handle))
+        batch = batches[0]
+        batch.clip_qual_left += 5
+        handle = BytesIO()
+        self.assertEqual(10, SffWriter(handle).write_batches(batches))
+        handle.seek(0)
+        with open(filename, "rb") as original:
+            for old, new in zip(SffIterator(original), SffIterator(handle)):
+                self.assertEqual(old.annotations["clip_qual_left"] + 5,
+                                 new.annotations["clip_qual_left"])
+                self.assertEqual(str(old.seq).upper(), str(new.seq).upper())
+
+    def test_errors(self):
+        """Check bad batches and arguments fail."""
+        with open("Roche/E3MFGYR02_random_10_reads.sff", "rb") as handle:
+            self.assertRaises(ValueError, next,
+                              SffBatchIterator(handle, batch_size=0))
+        with open("Roche/E3MFGYR02_random_10_reads.sff", "rb") as handle:
+            batch = next(SffBatchIterator(handle))
+        batch.clip_adapter_right[0] = -1
+        self.assertRaises(ValueError, SffWriter(BytesIO()).write_batches,
+                          [batch])
+        self.assertRaises(ValueError, SffWriter(BytesIO()).write_batches, [])
+        self.assertRaises(ValueError, SffWriter(BytesIO()).write_batch, batch)
+
+    def test_concatenated(self):
+        """Concatenated SFF files are spotted."""
+        with open("Roche/invalid_greek_E3MFGYR02.sff", "rb") as handle:
+            self.assertRaises(ValueError, list, SffBatchIterator(handle))
+
+
+if __name__ == "__main__":
+    runner = unittest.TextTestRunner(verbosity=2)
+    unittest.main(testRunner=runner)
@@ -5,8 +5,9 @@
 
 """Unit tests for the Bio.Phylo.TreeConstruction module."""
 
+import random
 import unittest
-#from Bio._py3k import StringIO
+from Bio._py3k import StringIO
 from Bio import AlignIO
 from Bio import Phylo
 from Bio.Phylo import BaseTree
@@ -20,6 +21,12 @@ from Bio.Phylo.TreeConstruction import ParsimonyScorer
 from Bio.Phylo.TreeConstruction import NNITreeSearcher
 from Bio.Phylo.TreeConstruction import ParsimonyTreeConstructor
 
+try:
+    import numpy
+    from Bio.Phylo.TreeConstruction import _CondensedDistanceMatrix
+except ImportError:
+    numpy = None
+
 
 class DistanceMatrixTest(unittest.TestCase):
     """Test for _DistanceMatrix construction and manipulation"""
@@ -90,6 +97,61 @@ class DistanceMatrixTest(unittest.TestCase):
         self.assertRaises(TypeError, dm.__setitem__, ('Alpha', 'Beta'), 'a')
         self.assertRaises(TypeError, dm.__setitem__, 'Alpha', ['a', 'b', 'c'])
 
+
+if numpy is not None:
+    class CondensedDistanceMatrixTest(unittest.TestCase):
+        """Test _CondensedDistanceMatrix works like _DistanceMatrix"""
+        def setUp(self):
+            self.names = ['Alpha', 'Beta', 'Gamma', 'Delta']
+            self.condensed = [1, 2, 3, 4, 5, 6]
+
+        def test_good_construction(self):
+            dm = _CondensedDistanceMatrix(self.names, self.condensed)
+            self.assertTrue(isinstance(dm, _DistanceMatrix))
+            self.assertEqual(dm.matrix, [[0], [1, 0], [2, 3, 0], [4, 5, 6, 0]])
+            self.assertEqual(len(dm), 4)
+            self.assertEqual(_CondensedDistanceMatrix(self.names).matrix,
+                             [[0], [0, 0], [0, 0, 0], [0, 0, 0, 0]])
+            self.assertRaises(ValueError, _CondensedDistanceMatrix,
+                              self.names, [1, 2, 3])
+            self.assertRaises(ValueError, _CondensedDistanceMatrix,
+                              ['Alpha', 'Alpha'], [1])
+
+        def test_good_manipulation(self):
+            dm = _CondensedDistanceMatrix(self.names, self.condensed)
+            self.assertEqual(dm[1], [1, 0, 3, 5])
+            self.assertEqual(dm[1, 2], 3)
+            self.assertEqual(dm['Gamma', 'Delta'], 6)
+            dm['Alpha'] = [0, 10, 20, 40]
+            self.assertEqual(dm['Alpha'], [0, 10, 20, 40])
+            del dm[1]
+            self.assertEqual(dm.names, ['Alpha', 'Gamma', 'Delta'])
+            self.assertEqual(dm.matrix, [[0], [20, 0], [40, 6, 0]])
+            dm.insert('Beta', [1, 0, 3, 5], 1)
+            self.assertEqual(dm.matrix, [[0], [1, 0], [20, 3, 0], [40, 5, 6, 0]])
+            del dm['Alpha']
+            dm.insert('Alpha', [1, 2, 4, 0])
+            self.assertEqual(dm.names, ['Beta', 'Gamma', 'Delta', 'Alpha'])
+            self.assertEqual(dm.matrix, [[0], [3, 0], [5, 6, 0], [1, 2, 4, 0]])
+            self.assertEqual(dm.condensed.tolist(), [3, 5, 6, 1, 2, 4])
+            self.assertRaises(ValueError, dm.__getitem__, 'A')
+            self.assertRaises(IndexError, dm.__getitem__, (10, 10))
+            self.assertRaises(ValueError, dm.__setitem__, 0, [1, 2])
+
+        def test_set_matrix_values(self):
+            dm = _CondensedDistanceMatrix(self.names, self.condensed)
+            dm.matrix[2][1] = 30
+            self.assertEqual(dm['Beta', 'Gamma'], 30)
+            row = dm.matrix[3]
+            row[0:2] = [7, 8]
+            row[-2] = 9
+            self.assertEqual(dm.matrix, [[0], [1, 0], [2, 30, 0], [7, 8, 9, 0]])
+            self.assertEqual(dm.condensed.tolist(), [1, 2, 30, 7, 8, 9])
+            self.assertRaises(ValueError, row.__setitem__, 3, 1)
+            self.assertRaises(ValueError, row.__setitem__, slice(0, 2), [1])
+            self.assertEqual(dm.matrix[3], [7, 8, 9, 0])
+
+
 class DistanceCalculatorTest(unittest.TestCase):
     """Test DistanceCalculator"""
 
@@ -112,6 +174,30 @@ class DistanceCalculatorTest(unittest.TestCase):
         dm = calculator.get_distance(aln)
         self.assertEqual(dm['Alpha', 'Beta'], 1 - (53 * 1.0 / 84))
 
+    def test_all_pairs(self):
+        """Check all the distances match those for each pair."""
+        aln = AlignIO.read('TreeConstruction/msa.phy', 'phylip')
+        opuntia = AlignIO.read('Clustalw/opuntia.aln', 'clustal')
+        for msa, model in [(aln, 'identity'), (aln, 'blastn'),
+                           (aln, 'trans'), (aln, 'blosum62'),
+                           (aln, 'pam250'), (opuntia, 'identity'),
+                           (opuntia, 'blastn')]:
+            for processes in [None, 2]:
+                calculator = DistanceCalculator(model, processes)
+                dm = calculator.get_distance(msa)
+                for i, seq1 in enumerate(msa):
+                    for seq2 in msa[:i]:
+                        self.assertEqual(dm[seq1.id, seq2.id],
+                                         calculator._pairwise(seq1, seq2))
+
+    def test_bad_alphabet(self):
+        """Check letters missing from the scoring matrix are an error."""
+        aln = AlignIO.read('TreeConstruction/msa.phy', 'phylip')
+        aln[1].seq = aln[1].seq.tomutable()
+        aln[1].seq[3] = 'N'
+        calculator = DistanceCalculator('blastn')
+        self.assertRaises(ValueError, calculator.get_distance, aln)
+
 
 class DistanceTreeConstructorTest(unittest.TestCase):
     """Test DistanceTreeConstructor"""
@@ -148,6 +234,33 @@ class DistanceTreeConstructorTest(unittest.TestCase):
         self.assertTrue(Consensus._equal_topology(tree, ref_tree))
         #ref_tree.close()
 
+    def test_array_trees(self):
+        """Check the trees are the same with and without NumPy."""
+        if numpy is None:
+            return
+        rand = random.Random(0)
+        names = ['T%i' % i for i in range(12)]
+        for size in [3, 4, 7, 12]:
+            for values in [lambda: rand.randint(1, 3), rand.random]:
+                matrix = [[values() for j in range(i)] + [0]
+                          for i in range(size)]
+                dm = _DistanceMatrix(names[:size], matrix)
+                trees = []
+                for use_numpy in [True, False]:
+                    if not use_numpy:
+                        saved = TreeConstruction._distance_array
+                        TreeConstruction._distance_array = lambda dm: None
+                    try:
+                        for method in ['upgma', 'nj']:
+                            handle = StringIO()
+                            tree = getattr(self.constructor, method)(dm)
+                            Phylo.write(tree, handle, 'newick')
+                            trees.append(handle.getvalue())
+                    finally:
+                        if not use_numpy:
+                            TreeConstruction._distance_array = saved
+                self.assertEqual(trees[:2], trees[2:])
+
 class ParsimonyScorerTest(unittest.TestCase):
     """Test ParsimonyScorer"""
 
@@ -198,6 +311,37 @@ class ParsimonyScorerTest(unittest.TestCase):
         score = scorer.get_score(tree, aln)
         self.assertEqual(score, 3 + 1 + 3 + 3 + 2 + 1 + 2 + 5)
 
+    def test_fitch_patterns(self):
+        """Check identical columns are only scored once."""
+        if numpy is None:
+            return
+        aln = AlignIO.read('TreeConstruction/msa.phy', 'phylip')
+        tree = Phylo.read('./TreeConstruction/upgma.tre', 'newick')
+        scorer = ParsimonyScorer()
+        double = aln + aln
+        patterns, weights = scorer._fitch_patterns(double)
+        self.assertEqual(patterns.shape, (5, 8))
+        self.assertEqual(weights.tolist(), [2] * 8)
+        self.assertEqual(scorer.get_score(tree, double),
+                         2 * (2 + 1 + 2 + 2 + 1 + 1 + 1 + 3))
+
+    def test_fitch_rescore(self):
+        """Check NNI changes are scored the same incrementally."""
+        if numpy is None:
+            return
+        aln = AlignIO.read('TreeConstruction/msa.phy', 'phylip')
+        tree = Phylo.read('./TreeConstruction/upgma.tre', 'newick')
+        scorer = ParsimonyScorer()
+        searcher = NNITreeSearcher(scorer)
+        scorer.get_score(tree, aln)
+        patterns, weights = scorer._fitch_patterns(aln)
+        scores = scorer._fitch_scores(tree, patterns, weights)
+        expected = [scorer.get_score(neighbor, aln)
+                    for neighbor in searcher._get_neighbors(tree)]
+        rescored = [scorer._fitch_rescore(scores, path, weights)
+                    for path in searcher._nni_moves(tree)]
+        self.assertEqual(expected, rescored)
+
 
 class NNITreeSearcherTest(unittest.TestCase):
     """Test NNITreeSearcher"""
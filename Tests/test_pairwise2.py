@@ -428,6 +428,164 @@ AAAABBBAAAACCCCCCCCCCCCCCAAAABBBAAAA
 """)
 
 
+class TestPairwiseLinearMemory(unittest.TestCase):
+    """Check the linear space and banded modes against the full matrix."""
+
+    seqA = "GCATTCAGGTCGATTACCGGATAACTTAGGCTCAGATTTACGATCGGACTTAGCA" * 4
+    seqB = "GCATCAGGTCGATTTACGGATAAGCTTAGGCTCAGATTACGATCGCGACTTAGA" * 4
+
+    def check(self, function, *args, **keywds):
+        expected = function(self.seqA, self.seqB, *args, **keywds)
+        score = function(self.seqA, self.seqB, *args,
+                         score_only=True, **keywds)
+        aligns = function(self.seqA, self.seqB, *args,
+                          linear_memory=True, **keywds)
+        self.assertEqual(len(aligns), 1)
+        self.assertAlmostEqual(score, expected[0][2])
+        seq1, seq2, score, begin, end = aligns[0]
+        self.assertAlmostEqual(score, expected[0][2])
+        self.assertEqual(seq1.replace("-", ""), self.seqA)
+        self.assertEqual(seq2.replace("-", ""), self.seqB)
+        return aligns[0]
+
+    def test_short(self):
+        expected = pairwise2.align.globalms("ACCGT", "ACG", 2, -1, -.5, -.1)
+        aligns = pairwise2.align.globalms("ACCGT", "ACG", 2, -1, -.5, -.1,
+                                          linear_memory=True)
+        self.assertEqual(len(aligns), 1)
+        self.assertTrue(aligns[0] in expected)
+        self.assertEqual(pairwise2.align.localxx("AAA", "TTT",
+                                                 linear_memory=True), [])
+
+    def test_global(self):
+        seq1, seq2, score, begin, end = self.check(pairwise2.align.globalms,
+                                                   2, -1, -3, -0.5,
+                                                   one_alignment_only=True)
+        self.assertEqual((begin, end), (0, len(seq1)))
+        self.check(pairwise2.align.globalxx, one_alignment_only=True)
+        self.check(pairwise2.align.globalmd, 1, -1, -5, -1, -1, -0.5,
+                   penalize_end_gaps=(False, True), one_alignment_only=True)
+
+    def test_local(self):
+        seq1, seq2, score, begin, end = self.check(pairwise2.align.localms,
+                                                   2, -1, -3, -0.5,
+                                                   one_alignment_only=True)
+        self.assertTrue(0 <= begin < end <= len(seq1))
+        self.check(pairwise2.align.localmd, 5, -4, -10, -1, -1, -1,
+                   penalize_extend_when_opening=True, one_alignment_only=True)
+
+    def test_dictionary(self):
+        match_dict = {("A", "A"): 1.5, ("A", "T"): -1, ("T", "T"): 1.5,
+                      ("G", "G"): 2, ("C", "C"): 2, ("G", "C"): -0.5}
+        for letter in "AGCT":
+            for other in "AGCT":
+                if (letter, other) not in match_dict and \
+                   (other, letter) not in match_dict:
+                    match_dict[letter, other] = -1.5
+        self.check(pairwise2.align.globaldd, match_dict, -2, -1, -3, -1,
+                   one_alignment_only=True)
+        self.check(pairwise2.align.localdd, match_dict, -2, -1, -3, -1,
+                   one_alignment_only=True)
+
+    def test_band(self):
+        expected = pairwise2.align.globalms(self.seqA, self.seqB, 2, -1, -3,
+                                            -0.5, score_only=True)
+        aligns = pairwise2.align.globalms(self.seqA, self.seqB, 2, -1, -3,
+                                          -0.5, band=5)
+        self.assertEqual(len(aligns), 1)
+        self.assertAlmostEqual(aligns[0][2], expected)
+        # A narrower band can only lower the score.
+        score = pairwise2.align.globalms(self.seqA, self.seqB, 2, -1, -3,
+                                         -0.5, score_only=True, band=0)
+        self.assertTrue(score <= expected)
+        seq1, seq2, score, begin, end = pairwise2.align.globalms(
+            "ACGT" * 10, "ACGT" * 12, 1, 0, 0, 0, band=0)[0]
+        self.assertEqual(score, 40)
+        self.assertEqual(seq1, "ACGT" * 10 + "-" * 8)
+        self.assertEqual(pairwise2.align.localxx(
+            "ACGT" * 10, "ACGT" * 12, band=3, score_only=True), 40)
+        self.assertRaises(ValueError, pairwise2.align.globalxx, "ACGT", "AC",
+                          band=-1)
+
+    def test_list(self):
+        aligns = pairwise2.align.globalxx(list("GAACT"), list("GAT"),
+                                          gap_char=["-"], linear_memory=True)
+        seq1, seq2, score, begin, end = aligns[0]
+        self.assertEqual(seq1, list("GAACT"))
+        self.assertTrue(seq2 in (list("G-A-T"), list("GA--T")))
+        self.assertEqual(score, 3)
+
+    def test_not_affine(self):
+        gap_fn = lambda x, y: -2 - y
+        self.assertRaises(ValueError, pairwise2.align.globalmc, "ACGT", "AGT",
+                          1, -1, gap_fn, gap_fn, linear_memory=True)
+        self.assertRaises(ValueError, pairwise2.align.globalxx, "ACGT", "AGT",
+                          force_generic=True, band=2)
+
+
+class TestPairwiseAlignMany(unittest.TestCase):
+
+    query = "HEAGAWGHEE"
+    targets = ["PAWHEAE", "HEAGAWGHEE", "GAWGHE", "", "WWWWW", "PAWHEAE"]
+
+    def test_score_only(self):
+        from Bio.SubsMat.MatrixInfo import blosum62
+        scores = list(pairwise2.align_many.localds(self.query, self.targets,
+                                                   blosum62, -10, -1,
+                                                   score_only=True))
+        self.assertEqual(len(scores), len(self.targets))
+        for target, score in zip(self.targets, scores):
+            if not target:
+                self.assertEqual(score, [])
+                continue
+            self.assertAlmostEqual(score, pairwise2.align.localds(
+                self.query, target, blosum62, -10, -1, score_only=True))
+        for target, score in zip(self.targets, pairwise2.align_many.globalms(
+                self.query, self.targets, 2, -1, -3, -0.5, score_only=True)):
+            if target:
+                self.assertAlmostEqual(score, pairwise2.align.globalms(
+                    self.query, target, 2, -1, -3, -0.5, score_only=True))
+
+    def test_striped(self):
+        # Whole number local scores, which can overflow 8 or 16 bits.
+        from Bio.SubsMat.MatrixInfo import blosum62
+        query = "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQ" \
+            "VKVKALPDAQ"
+        targets = [query, query[10:50], query[::-1], "WWWWW", "A",
+                   "MKTAYIAKQW" * 5, query + "GG" + query]
+        for args in [(blosum62, -10, -1), (blosum62, -5, -5, -3, 0),
+                     (blosum62, -12, -2, -4, -1)]:
+            if len(args) == 3:
+                align_many = pairwise2.align_many.localds
+                align = pairwise2.align.localds
+            else:
+                align_many = pairwise2.align_many.localdd
+                align = pairwise2.align.localdd
+            for target, score in zip(targets, align_many(
+                    query, targets, *args, score_only=True)):
+                self.assertEqual(score, align(query, target, *args,
+                                              score_only=True))
+        for target, score in zip(targets, pairwise2.align_many.localms(
+                query, targets, 600, -300, -900, -60, score_only=True,
+                penalize_end_gaps=True)):
+            self.assertEqual(score, pairwise2.align.localms(
+                query, target, 600, -300, -900, -60, score_only=True,
+                penalize_end_gaps=True))
+
+    def test_threads(self):
+        expected = list(pairwise2.align_many.globalxs(
+            self.query, self.targets * 5, -2, -1, score_only=True))
+        scores = list(pairwise2.align_many.globalxs(
+            self.query, self.targets * 5, -2, -1, score_only=True, threads=2))
+        self.assertEqual(scores, expected)
+
+    def test_alignments(self):
+        for target, aligns in zip(self.targets, pairwise2.align_many.globalxx(
+                self.query, self.targets, threads=2)):
+            expected = pairwise2.align.globalxx(self.query, target)
+            self.assertEqual(sorted(aligns), sorted(expected))
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner(verbosity = 2)
     unittest.main(testRunner=runner)
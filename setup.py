@@ -422,6 +422,11 @@ if is_Numpy_installed():
                    "Bio/KDTree/KDTreemodule.c"],
                   include_dirs=[numpy_include_dir],
                   ))
+    EXTENSIONS.append(
+        Extension('Bio.KDTree._CArrayKDTree',
+                  ["Bio/KDTree/ArrayKDTreemodule.c"],
+                  include_dirs=[numpy_include_dir],
+                  ))
     EXTENSIONS.append(
         Extension('Bio.Motif._pwm',
                   ["Bio/Motif/_pwm.c"],